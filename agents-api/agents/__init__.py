@@ -1,59 +1,197 @@
 """
 Agents package - AI agents for bookmark and collection management
+
+Agents are declared by ``AgentSpec`` (see core/agent_runtime.py): built-in
+agents export ``AGENT`` from their package, and installed packages can add
+more through the ``cur8t.agents`` entry point group. Specs are metadata only.
+An agent's routes module, and with it its service, OpenAI client,
+BeautifulSoup and so on, is imported the first time
+a request reaches the agent's path, when the OpenAPI schema is requested, or at
+startup for agents named in AGENTS_PRELOAD. An agent that fails to import (for
+example because its API key is missing) is reported as unavailable and answers
+503, while the rest of the API keeps serving.
 """
 
-from .article_extractor.routes import router as article_extractor_router
-from .bookmark_importer.routes import router as bookmark_importer_router
-
-# Export available agent routers
-available_agents = {
-    "article_extractor": {
-        "name": "Article Link Extractor",
-        "description": "Extract links from articles and create collections",
-        "status": "active",
-        "router": article_extractor_router,
-    },
-    "smart_export": {
-        "name": "Smart Export Guide",
-        "description": "Export collections as detailed guides",
-        "status": "coming_soon",
-        "router": None,
-    },
-    "collection_generator": {
-        "name": "Smart Collection Generator",
-        "description": "AI-powered collection creation",
-        "status": "coming_soon",
-        "router": None,
-    },
-    "youtube_extractor": {
-        "name": "YouTube Link Extractor",
-        "description": "Extract links from YouTube video descriptions",
-        "status": "coming_soon",
-        "router": None,
-    },
-    "watch_later_organizer": {
-        "name": "Watch Later Organizer",
-        "description": "Organize Watch Later playlists into collections",
-        "status": "coming_soon",
-        "router": None,
-    },
-    "bookmark_importer": {
-        "name": "Bookmark File Importer",
-        "description": "Import and organize bookmark files using OpenAI",
-        "status": "active",
-        "router": bookmark_importer_router,
-    },
-}
-
-
-# Get active agent routers
-def get_active_routers():
-    """Get all active agent routers"""
-    return [
-        agent_info["router"]
-        for agent_info in available_agents.values()
-        if agent_info["status"] == "active" and agent_info["router"] is not None
-    ]
+import importlib
+import logging
+import time
+from importlib.metadata import entry_points
+from typing import Dict, Iterable, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from config.settings import settings
+from core.agent_runtime import AgentRuntime, AgentSpec
+from core.metrics import AGENT_IMPORT_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Prefix every agent router is mounted under
+AGENTS_PREFIX = "/agents"
+
+# Entry point group through which installed packages add agents. Each entry
+# point names an AgentSpec (or a callable returning one)
+ENTRY_POINT_GROUP = "cur8t.agents"
+
+# Agents shipped in this package, in display order; each exports ``AGENT``
+BUILTIN_AGENTS = (
+    "article_extractor",
+    "smart_export",
+    "collection_generator",
+    "youtube_extractor",
+    "watch_later_organizer",
+    "bookmark_importer",
+)
+
+
+def discover_agents() -> Dict[str, AgentSpec]:
+    """Collect built-in agent specs, then those registered as entry points"""
+    specs: Dict[str, AgentSpec] = {}
+    for name in BUILTIN_AGENTS:
+        spec = importlib.import_module(f"{__name__}.{name}").AGENT
+        specs[spec.key] = spec
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            spec = entry_point.load()
+            if callable(spec):
+                spec = spec()
+        except Exception:
+            logger.exception("Failed to load agent plugin %s", entry_point.name)
+            continue
+        if not isinstance(spec, AgentSpec):
+            logger.error("Agent plugin %s is not an AgentSpec", entry_point.name)
+            continue
+        if spec.key in specs:
+            logger.warning(
+                "Agent plugin %s duplicates agent %s", entry_point.name, spec.key
+            )
+            continue
+        specs[spec.key] = spec
+    return specs
+
+
+available_agents: Dict[str, AgentSpec] = discover_agents()
+_runtimes: Dict[str, AgentRuntime] = {}
+
+# Import time in seconds of each loaded agent, and the error of each that failed
+_loaded_agents: Dict[str, float] = {}
+_failed_agents: Dict[str, str] = {}
+
+
+def _is_loadable(spec: AgentSpec) -> bool:
+    return spec.status == "active" and spec.module is not None
+
+
+def get_runtime(key: str) -> AgentRuntime:
+    """Return the execution resources of an agent, created on first use"""
+    runtime = _runtimes.get(key)
+    if runtime is None:
+        runtime = _runtimes[key] = AgentRuntime(available_agents[key])
+    return runtime
+
+
+def agent_for_path(path: str) -> Optional[str]:
+    """Return the key of the active agent serving ``path``, if any"""
+    if not path.startswith(AGENTS_PREFIX + "/"):
+        return None
+    agent_path = path[len(AGENTS_PREFIX) :]
+    for key, spec in available_agents.items():
+        if not _is_loadable(spec):
+            continue
+        prefix = spec.path
+        if agent_path == prefix or agent_path.startswith(prefix + "/"):
+            return key
+    return None
+
+
+def load_agent(app: FastAPI, key: str) -> bool:
+    """
+    Import an agent and add its routes to ``app``, once.
+
+    Returns False if the agent could not be imported; the failure is logged and
+    remembered, so later requests get a 503 without retrying the import.
+    """
+    if key in _loaded_agents:
+        return True
+    if key in _failed_agents:
+        return False
+
+    spec = available_agents[key]
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(spec.module)
+        app.include_router(module.router, prefix=AGENTS_PREFIX)
+    except Exception as e:
+        _failed_agents[key] = str(e)
+        logger.exception("Failed to load agent %s", key)
+        return False
+    duration = time.perf_counter() - start
+
+    _loaded_agents[key] = duration
+    AGENT_IMPORT_DURATION.set(duration, key)
+    # Rebuild the schema on the next /openapi.json so it includes the new routes
+    app.openapi_schema = None
+
+    if duration * 1000 > settings.agent_import_budget_ms:
+        logger.warning(
+            "Agent %s took %.0f ms to import (budget %d ms)",
+            key,
+            duration * 1000,
+            settings.agent_import_budget_ms,
+        )
+    else:
+        logger.info("Loaded agent %s in %.0f ms", key, duration * 1000)
+    return True
+
+
+def load_agents(app: FastAPI, keys: Optional[Iterable[str]] = None) -> None:
+    """Load the given agents, or every active agent when ``keys`` is None"""
+    for key, spec in available_agents.items():
+        if _is_loadable(spec) and (keys is None or key in keys):
+            load_agent(app, key)
+
+
+def preload_agents(app: FastAPI, preload: str) -> None:
+    """Load agents named in a comma-separated AGENTS_PRELOAD value ("all" for all)"""
+    names = {name.strip() for name in preload.split(",") if name.strip()}
+    if not names:
+        return
+    unknown = names - set(available_agents) - {"all"}
+    if unknown:
+        logger.warning("Unknown agents in AGENTS_PRELOAD: %s", ", ".join(unknown))
+    load_agents(app, None if "all" in names else names)
+
+
+class LazyAgentMiddleware:
+    """
+    ASGI middleware that loads an agent before its first request is routed.
+
+    It must sit outside any middleware that looks up routes (SlowAPI), so the
+    agent's routes exist by the time they are matched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            app = scope["app"]
+            if scope["path"] == app.openapi_url:
+                load_agents(app)
+            else:
+                key = agent_for_path(scope["path"])
+                if key is not None and not load_agent(app, key):
+                    response = JSONResponse(
+                        status_code=503,
+                        content={
+                            "detail": f"{available_agents[key].name} is unavailable"
+                        },
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
 
 
 # Get agent list for API response
@@ -61,9 +199,31 @@ def get_agent_list():
     """Get list of all agents with their status"""
     return [
         {
-            "name": agent_info["name"],
-            "description": agent_info["description"],
-            "status": agent_info["status"],
+            "name": spec.name,
+            "description": spec.description,
+            "status": "unavailable" if key in _failed_agents else spec.status,
         }
-        for agent_info in available_agents.values()
+        for key, spec in available_agents.items()
     ]
+
+
+async def get_agent_health() -> Dict[str, str]:
+    """Probe loaded agents; agents not yet imported are reported, not loaded"""
+    health = {}
+    for key, spec in available_agents.items():
+        if not _is_loadable(spec):
+            continue
+        if key in _failed_agents:
+            health[key] = "unavailable"
+        elif key not in _loaded_agents:
+            health[key] = "not_loaded"
+        else:
+            healthy = await get_runtime(key).probe()
+            health[key] = "healthy" if healthy else "unhealthy"
+    return health
+
+
+def shutdown_agents() -> None:
+    """Stop every agent's executor"""
+    for runtime in _runtimes.values():
+        runtime.shutdown()
@@ -1 +1,19 @@
-# Article Link Extractor Agent
+"""
+Article Link Extractor Agent
+"""
+
+from core.agent_runtime import AgentSpec
+
+# Fetching articles is blocking network I/O: many threads, generous timeout
+AGENT = AgentSpec(
+    key="article_extractor",
+    name="Article Link Extractor",
+    description="Extract links from articles and create collections",
+    module="agents.article_extractor.routes",
+    path="/article-extractor",
+    max_concurrency=16,
+    executor="thread",
+    pool_size=8,
+    timeout=45.0,
+    health_probe="agents.article_extractor.service:health_probe",
+)
@@ -19,6 +19,11 @@ class ArticleLinkRequest(BaseModel):
     collection_name: Optional[str] = Field(
         None, description="Name for the new collection"
     )
+    enrich: bool = Field(
+        False,
+        description="Fetch each link's page head for a description, tags, "
+        "favicon and canonical URL",
+    )
 
 
 class ArticleLinkResponse(BaseResponse):
@@ -29,3 +34,4 @@ class ArticleLinkResponse(BaseResponse):
     total_links_found: int
     extracted_links: List[ExtractedLink]
     collection_name: str
+    links_enriched: Optional[int] = None
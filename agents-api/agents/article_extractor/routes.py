@@ -4,8 +4,11 @@ Article Link Extractor API routes
 
 from fastapi import APIRouter, HTTPException, Request
 
+from agents import get_runtime
+from core.enrichment import link_enricher
 from core.limiter import limiter
 from core.models import AgentStatus, HealthResponse
+from core.ratelimit import charge_request
 
 from .models import ArticleLinkRequest, ArticleLinkResponse
 from .service import article_extractor_service
@@ -13,6 +16,12 @@ from .service import article_extractor_service
 # Create router for this agent
 router = APIRouter(prefix="/article-extractor", tags=["Article Link Extractor"])
 
+ERROR_STATUS_CODES = {
+    "INVALID_URL": 400,
+    "ROBOTS_DISALLOWED": 403,
+    "FETCH_BUSY": 503,
+}
+
 
 @router.post("/", response_model=ArticleLinkResponse)
 @limiter.limit("30/minute")
@@ -24,17 +33,31 @@ async def extract_article_links(request: Request, payload: ArticleLinkRequest):
     - Fetches the article from the provided URL
     - Extracts all valid links from the article content
     - Filters out social sharing links and duplicates
+    - Optionally enriches links with descriptions, tags, favicons and
+      canonical URLs from their pages, within a fixed time budget; each page
+      fetched for this costs one rate-limit credit
     - Returns structured data ready for collection creation
     """
 
-    result, error = article_extractor_service.extract_links_from_article(
-        article_url=str(payload.article_url), collection_name=payload.collection_name
+    # Fetching and parsing block, so they run on the agent's own threads
+    result, error = await get_runtime("article_extractor").run(
+        article_extractor_service.extract_links_from_article,
+        article_url=str(payload.article_url),
+        collection_name=payload.collection_name,
     )
 
     if error:
-        status_code = 400 if error.error_code == "INVALID_URL" else 500
+        status_code = ERROR_STATUS_CODES.get(error.error_code, 500)
         raise HTTPException(status_code=status_code, detail=error.dict())
 
+    if payload.enrich and result.extracted_links:
+        # Bounded by its own deadline; links not done in time come back as-is.
+        # Every page head fetched costs the client one credit
+        result.extracted_links, result.links_enriched = await link_enricher.enrich(
+            result.extracted_links,
+            charge=lambda fetches: charge_request(request, fetches),
+        )
+
     return result
 
 
@@ -4,16 +4,17 @@ Article Link Extractor service implementation
 
 from datetime import datetime
 from typing import List, Optional, Tuple
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
 
 from config.settings import settings
+from core.fetcher import FetchBusy, RobotsDisallowed, fetcher
 from core.models import ErrorResponse, ExtractedLink
+from core.urlnorm import canonicalize_url
 from core.utils import (
     clean_text,
-    create_http_session,
     get_domain_from_url,
     is_valid_url,
     should_skip_url,
@@ -26,7 +27,7 @@ class ArticleLinkExtractorService:
     """Service for extracting links from articles"""
 
     def __init__(self):
-        self.session = create_http_session()
+        self.fetcher = fetcher
 
     def extract_links_from_article(
         self, article_url: str, collection_name: Optional[str] = None
@@ -49,8 +50,7 @@ class ArticleLinkExtractorService:
                 )
 
             # Fetch the article
-            response = self.session.get(article_url, timeout=settings.request_timeout)
-            response.raise_for_status()
+            response = self._fetch(article_url)
 
             # Parse HTML
             soup = BeautifulSoup(response.content, "html.parser")
@@ -83,6 +83,18 @@ class ArticleLinkExtractorService:
 
             return result, None
 
+        except RobotsDisallowed as e:
+            return None, ErrorResponse(
+                error="Fetching this article is not allowed",
+                details=str(e),
+                error_code="ROBOTS_DISALLOWED",
+            )
+        except FetchBusy as e:
+            return None, ErrorResponse(
+                error="Too many fetches in progress",
+                details=str(e),
+                error_code="FETCH_BUSY",
+            )
         except requests.exceptions.RequestException as e:
             return None, ErrorResponse(
                 error="Failed to fetch article",
@@ -94,6 +106,12 @@ class ArticleLinkExtractorService:
                 error="Processing error", details=str(e), error_code="PROCESSING_ERROR"
             )
 
+    def _fetch(self, url: str) -> requests.Response:
+        """GET a page through the shared polite fetcher"""
+        response = self.fetcher.get(url)
+        response.raise_for_status()
+        return response
+
     def _extract_title(self, soup: BeautifulSoup) -> Optional[str]:
         """Extract article title from HTML"""
         title_selectors = [
@@ -157,8 +175,9 @@ class ArticleLinkExtractorService:
         for link in links:
             url = link["url"]
 
-            # Skip duplicates
-            if url in seen_urls:
+            # Skip duplicates, including tracking-parameter and scheme variants
+            dedup_key = canonicalize_url(url) or url
+            if dedup_key in seen_urls:
                 continue
 
             # Validate URL
@@ -181,7 +200,7 @@ class ArticleLinkExtractorService:
             )
 
             filtered.append(extracted_link)
-            seen_urls.add(url)
+            seen_urls.add(dedup_key)
 
             # Limit results
             if len(filtered) >= settings.max_links_per_extraction:
@@ -190,5 +209,10 @@ class ArticleLinkExtractorService:
         return filtered
 
 
+def health_probe() -> bool:
+    """The agent only needs the shared fetcher"""
+    return article_extractor_service.fetcher is not None
+
+
 # Global instance
 article_extractor_service = ArticleLinkExtractorService()
@@ -124,6 +124,26 @@ class TestArticleLinkExtractorService:
             assert error is None
             assert "Links from Article Title" in result.collection_name
 
+    def test_duplicate_url_variants_are_collapsed(self):
+        """Test that tracking-parameter and scheme variants count as one link"""
+        links = [
+            {"url": "https://example.com/post", "title": "Post", "text": ""},
+            {
+                "url": "http://www.example.com/post/?utm_source=newsletter",
+                "title": "Post again",
+                "text": "",
+            },
+            {"url": "https://example.com/post#comments", "title": "", "text": ""},
+            {"url": "https://example.com/other", "title": "Other", "text": ""},
+        ]
+
+        filtered = self.service._filter_links(links)
+
+        assert [link.url for link in filtered] == [
+            "https://example.com/post",
+            "https://example.com/other",
+        ]
+
 
 def test_article_link_request_model():
     """Test ArticleLinkRequest model validation"""
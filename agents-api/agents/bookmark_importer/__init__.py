@@ -1 +1,19 @@
-# Bookmark File Importer Agent - Coming Soon
+"""
+Bookmark File Importer Agent
+"""
+
+from core.agent_runtime import AgentSpec
+
+# Parsing large bookmark exports is CPU-bound, so it runs in worker processes
+AGENT = AgentSpec(
+    key="bookmark_importer",
+    name="Bookmark File Importer",
+    description="Import and organize bookmark files using OpenAI",
+    module="agents.bookmark_importer.routes",
+    path="/bookmark-importer",
+    max_concurrency=2,
+    executor="process",
+    pool_size=2,
+    timeout=60.0,
+    health_probe="agents.bookmark_importer.service:health_probe",
+)
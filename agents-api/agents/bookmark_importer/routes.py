@@ -8,8 +8,10 @@ from typing import Any, Dict, Optional
 from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
 from fastapi.responses import JSONResponse
 
+from config.settings import settings
 from core.limiter import limiter
 from core.models import AgentStatus, ErrorResponse, HealthResponse
+from core.ratelimit import charge_request
 
 from .models import (
     BookmarkAnalysisRequest,
@@ -83,6 +85,8 @@ async def upload_bookmarks(
             status_code=400,
             detail="Invalid file encoding. Please ensure the file is UTF-8 encoded.",
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
@@ -100,6 +104,11 @@ async def analyze_bookmarks(request: Request, body: BookmarkAnalysisRequest):
     - Returns suggested collections with confidence scores
     """
 
+    # Charge by the size of the OpenAI call rather than per request
+    tokens = bookmark_importer_service.estimate_analysis_tokens(body.session_id)
+    if tokens is not None:
+        charge_request(request, 1 + tokens // settings.rate_limit_tokens_per_credit)
+
     result, error = await bookmark_importer_service.analyze_bookmarks(
         session_id=body.session_id,
         max_categories=body.max_categories or 5,
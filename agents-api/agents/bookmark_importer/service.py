@@ -6,6 +6,7 @@ import asyncio
 import json
 import os
 import re
+import time
 import uuid
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
@@ -14,7 +15,10 @@ from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 from openai import OpenAI
 
+from agents import get_runtime
 from config.settings import settings
+from core.agent_runtime import AgentTimeout
+from core.metrics import OPENAI_REQUEST_DURATION, OPENAI_TOKENS
 from core.models import ErrorResponse
 from core.utils import clean_text, get_domain_from_url, is_valid_url
 
@@ -29,6 +33,14 @@ from .models import (
     CollectionCreationResponse,
 )
 
+# Completion budget for the categorization call
+MAX_COMPLETION_TOKENS = 4000
+# Fixed instructions around the bookmark list, in tokens
+PROMPT_OVERHEAD_TOKENS = 600
+
+# Links in an export, counted cheaply before the file is parsed
+_ANCHOR_RE = re.compile(r"<a\s", re.IGNORECASE)
+
 
 class BookmarkImporterService:
     """Service for importing and categorizing bookmarks using OpenAI"""
@@ -71,10 +83,19 @@ class BookmarkImporterService:
             # Create session
             session_id = str(uuid.uuid4())
 
-            # Parse bookmarks
-            bookmarks, detected_browser, folder_structure = self._parse_bookmark_file(
-                file_content, browser_type
-            )
+            max_bookmarks = settings.max_bookmarks_per_upload
+            if sum(1 for _ in _ANCHOR_RE.finditer(file_content)) > max_bookmarks:
+                return None, ErrorResponse(
+                    error="Too many bookmarks",
+                    details=f"Upload at most {max_bookmarks} bookmarks per file",
+                    error_code="TOO_MANY_BOOKMARKS",
+                )
+
+            # Parse bookmarks in the agent's worker processes: a large export
+            # holds the CPU for seconds and would otherwise stall the event loop
+            bookmarks, detected_browser, folder_structure = await get_runtime(
+                "bookmark_importer"
+            ).run(parse_bookmark_file, file_content, browser_type)
 
             if not bookmarks:
                 return None, ErrorResponse(
@@ -108,13 +129,16 @@ class BookmarkImporterService:
 
             return response, None
 
+        except AgentTimeout:
+            raise
         except Exception as e:
             return None, ErrorResponse(
                 error="Upload failed", details=str(e), error_code="UPLOAD_ERROR"
             )
 
+    @classmethod
     def _parse_bookmark_file(
-        self, file_content: str, browser_hint: Optional[str] = None
+        cls, file_content: str, browser_hint: Optional[str] = None
     ) -> Tuple[List[BookmarkItem], Optional[str], Dict[str, int]]:
         """Parse HTML bookmark file from various browsers"""
 
@@ -123,24 +147,23 @@ class BookmarkImporterService:
         folder_structure = {}
 
         # Detect browser type
-        browser_type = self._detect_browser_type(soup, browser_hint)
+        browser_type = cls._detect_browser_type(soup, browser_hint)
 
         # Parse bookmarks based on browser type
         if browser_type == "chrome":
-            bookmarks, folder_structure = self._parse_chrome_bookmarks(soup)
+            bookmarks, folder_structure = cls._parse_chrome_bookmarks(soup)
         elif browser_type == "firefox":
-            bookmarks, folder_structure = self._parse_firefox_bookmarks(soup)
+            bookmarks, folder_structure = cls._parse_firefox_bookmarks(soup)
         elif browser_type == "safari":
-            bookmarks, folder_structure = self._parse_safari_bookmarks(soup)
+            bookmarks, folder_structure = cls._parse_safari_bookmarks(soup)
         else:
             # Generic parsing
-            bookmarks, folder_structure = self._parse_generic_bookmarks(soup)
+            bookmarks, folder_structure = cls._parse_generic_bookmarks(soup)
 
         return bookmarks, browser_type, folder_structure
 
-    def _detect_browser_type(
-        self, soup: BeautifulSoup, hint: Optional[str]
-    ) -> Optional[str]:
+    @staticmethod
+    def _detect_browser_type(soup: BeautifulSoup, hint: Optional[str]) -> Optional[str]:
         """Detect browser type from HTML structure"""
         if hint and hint.lower() in ["chrome", "firefox", "safari", "edge"]:
             return hint.lower()
@@ -160,8 +183,9 @@ class BookmarkImporterService:
 
         return None
 
+    @classmethod
     def _parse_chrome_bookmarks(
-        self, soup: BeautifulSoup
+        cls, soup: BeautifulSoup
     ) -> Tuple[List[BookmarkItem], Dict[str, int]]:
         """Parse Chrome bookmark format"""
         bookmarks = []
@@ -188,7 +212,7 @@ class BookmarkImporterService:
                 if link:
                     url = link["href"]
                     title = link.get_text(strip=True)
-                    date_added = self._parse_chrome_date(link.get("add_date"))
+                    date_added = cls._parse_chrome_date(link.get("add_date"))
 
                     if is_valid_url(url):
                         bookmark = BookmarkItem(
@@ -211,22 +235,25 @@ class BookmarkImporterService:
 
         return bookmarks, folder_structure
 
+    @classmethod
     def _parse_firefox_bookmarks(
-        self, soup: BeautifulSoup
+        cls, soup: BeautifulSoup
     ) -> Tuple[List[BookmarkItem], Dict[str, int]]:
         """Parse Firefox bookmark format"""
         # Firefox format is similar to Chrome but with some differences
-        return self._parse_chrome_bookmarks(soup)  # Use Chrome parser as base
+        return cls._parse_chrome_bookmarks(soup)  # Use Chrome parser as base
 
+    @classmethod
     def _parse_safari_bookmarks(
-        self, soup: BeautifulSoup
+        cls, soup: BeautifulSoup
     ) -> Tuple[List[BookmarkItem], Dict[str, int]]:
         """Parse Safari bookmark format"""
         # Safari exports are typically in plist format, but also support HTML
-        return self._parse_chrome_bookmarks(soup)
+        return cls._parse_chrome_bookmarks(soup)
 
+    @staticmethod
     def _parse_generic_bookmarks(
-        self, soup: BeautifulSoup
+        soup: BeautifulSoup,
     ) -> Tuple[List[BookmarkItem], Dict[str, int]]:
         """Generic bookmark parsing for unknown formats"""
         bookmarks = []
@@ -244,7 +271,8 @@ class BookmarkImporterService:
 
         return bookmarks, folder_structure
 
-    def _parse_chrome_date(self, date_str: Optional[str]) -> Optional[datetime]:
+    @staticmethod
+    def _parse_chrome_date(date_str: Optional[str]) -> Optional[datetime]:
         """Parse Chrome bookmark date format"""
         if not date_str:
             return None
@@ -379,13 +407,22 @@ class BookmarkImporterService:
 
         try:
             # Generate categorization using OpenAI
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=4000,  # Reduced to match model limits
-                temperature=0.3,  # Lower temperature for more consistent categorization
-                response_format={"type": "json_object"},
-            )
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=MAX_COMPLETION_TOKENS,  # Reduced to match model limits
+                    temperature=0.3,  # Lower temperature for more consistent categorization
+                    response_format={"type": "json_object"},
+                )
+                outcome = "ok"
+            finally:
+                OPENAI_REQUEST_DURATION.observe(
+                    time.perf_counter() - start, self.model, outcome
+                )
+            self._record_token_usage(response)
 
             # Parse the response
             categories = self._parse_openai_response(
@@ -402,6 +439,26 @@ class BookmarkImporterService:
                 bookmark_data, max_categories, min_bookmarks_per_category
             )
 
+    def estimate_analysis_tokens(self, session_id: str) -> Optional[int]:
+        """Rough token count of analysing a session, at ~4 characters per token"""
+        session = self.sessions.get(session_id)
+        if not session:
+            return None
+        # Each prompt line holds the title, the URL and its domain
+        characters = sum(
+            len(bookmark.title) + 2 * len(bookmark.url) + 20
+            for bookmark in session["bookmarks"]
+        )
+        return PROMPT_OVERHEAD_TOKENS + characters // 4 + MAX_COMPLETION_TOKENS
+
+    def _record_token_usage(self, response) -> None:
+        """Add the token counts reported by OpenAI to the usage counters"""
+        usage = getattr(response, "usage", None)
+        if not usage:
+            return
+        OPENAI_TOKENS.inc(self.model, "prompt", amount=usage.prompt_tokens or 0)
+        OPENAI_TOKENS.inc(self.model, "completion", amount=usage.completion_tokens or 0)
+
     def _create_categorization_prompt(
         self,
         bookmark_data: List[Dict[str, Any]],
@@ -583,5 +640,17 @@ Analyze the bookmarks and provide intelligent categorization in the exact JSON f
         )
 
 
+def parse_bookmark_file(
+    file_content: str, browser_hint: Optional[str] = None
+) -> Tuple[List[BookmarkItem], Optional[str], Dict[str, int]]:
+    """Module-level entry point so the parser can run in a worker process"""
+    return BookmarkImporterService._parse_bookmark_file(file_content, browser_hint)
+
+
+def health_probe() -> bool:
+    """The agent is usable once its OpenAI client is configured"""
+    return getattr(bookmark_importer_service, "client", None) is not None
+
+
 # Global instance
 bookmark_importer_service = BookmarkImporterService()
@@ -7,6 +7,7 @@ from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
+from config.settings import settings
 from core.models import ErrorResponse
 
 from .models import BookmarkCategory, BookmarkImportStatus, BookmarkItem
@@ -105,6 +106,21 @@ class TestBookmarkImporterService:
         assert error is not None
         assert error.error == "No bookmarks found"
 
+    @pytest.mark.asyncio
+    async def test_upload_over_the_bookmark_cap_is_refused(self, service):
+        """Test an export over MAX_BOOKMARKS_PER_UPLOAD is refused before parsing"""
+        with (
+            patch.object(settings, "max_bookmarks_per_upload", 2),
+            patch("agents.bookmark_importer.service.get_runtime") as get_runtime,
+        ):
+            result, error = await service.upload_bookmarks(
+                file_content=CHROME_BOOKMARK_HTML, filename="bookmarks.html"
+            )
+
+        assert result is None
+        assert error.error_code == "TOO_MANY_BOOKMARKS"
+        get_runtime.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_analyze_bookmarks_success(self, service):
         """Test successful bookmark analysis"""
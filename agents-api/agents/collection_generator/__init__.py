@@ -1 +1,20 @@
-# Smart Collection Generator Agent - Coming Soon
+"""
+Smart Collection Generator Agent
+"""
+
+from core.agent_runtime import AgentSpec
+
+# Search runs on the event loop; only OpenAI re-ranking uses the executor, and
+# a short timeout falls back to the index's own ranking
+AGENT = AgentSpec(
+    key="collection_generator",
+    name="Smart Collection Generator",
+    description="AI-powered collection creation",
+    module="agents.collection_generator.routes",
+    path="/collection-generator",
+    max_concurrency=8,
+    executor="thread",
+    pool_size=8,
+    timeout=8.0,
+    health_probe="agents.collection_generator.service:health_probe",
+)
@@ -0,0 +1,200 @@
+"""
+Retrieval indexes over a user's links.
+
+``BM25Index`` is an inverted index scored with Okapi BM25. ``VectorIndex``
+keeps one normalized vector per link; the default embedding hashes character
+trigrams of the text, so it needs no model and still matches word variants
+("deploy"/"deployment", "tutorial"/"tutorials") that exact terms miss.
+Both are updated per link: adding or removing a link touches only that link's
+postings and vector, so the index stays current without rebuilds.
+"""
+
+import math
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SparseVector = Dict[int, float]
+Embedder = Callable[[str], SparseVector]
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Hashed trigram space of the default embedding
+EMBEDDING_DIMENSIONS = 1 << 16
+# Rank constant of reciprocal rank fusion; 60 is the usual choice
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = frozenset(
+    """a an and are as at be by for from how i in into is it its of on or that
+    the this to what when why with you your www com http https""".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def hashing_embedder(text: str) -> SparseVector:
+    """Embed text as L2-normalized counts of hashed character trigrams"""
+    counts: Counter = Counter()
+    for token in tokenize(text):
+        padded = f" {token} "
+        for start in range(len(padded) - 2):
+            trigram = padded[start : start + 3]
+            counts[zlib.crc32(trigram.encode("utf-8")) % EMBEDDING_DIMENSIONS] += 1
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {index: count / norm for index, count in counts.items()} if norm else {}
+
+
+class BM25Index:
+    """Inverted index with incremental updates and BM25 scoring"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, int] = {}
+        # Terms of each document, so removing it touches only its own postings
+        self.doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index a document, replacing any earlier version of it"""
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        for term, frequency in terms.items():
+            self.postings[term][doc_id] = frequency
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.doc_terms[doc_id] = tuple(terms)
+        self._total_length += length
+
+    def remove(self, doc_id: str) -> None:
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self.doc_terms.pop(doc_id):
+            docs = self.postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` (doc_id, score) pairs, best first"""
+        if not self.doc_lengths:
+            return []
+        total_docs = len(self.doc_lengths)
+        average_length = self._total_length / total_docs or 1.0
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, frequency in docs.items():
+                length_norm = (
+                    1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / (average_length)
+                )
+                scores[doc_id] += (
+                    idf
+                    * frequency
+                    * (BM25_K1 + 1)
+                    / (frequency + BM25_K1 * length_norm)
+                )
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class VectorIndex:
+    """Cosine search over sparse, normalized link vectors"""
+
+    def __init__(self, embedder: Embedder = hashing_embedder, min_score: float = 0.2):
+        self.embedder = embedder
+        self.min_score = min_score
+        self.vectors: Dict[str, SparseVector] = {}
+        # Feature -> {doc_id: weight}: a query only visits links sharing a feature
+        self.postings: Dict[int, Dict[str, float]] = defaultdict(dict)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def add(self, doc_id: str, text: str) -> None:
+        self.remove(doc_id)
+        vector = self.embedder(text)
+        self.vectors[doc_id] = vector
+        for index, value in vector.items():
+            self.postings[index][doc_id] = value
+
+    def remove(self, doc_id: str) -> None:
+        vector = self.vectors.pop(doc_id, None)
+        if vector is None:
+            return
+        for index in vector:
+            docs = self.postings[index]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[index]
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        scores: Dict[str, float] = defaultdict(float)
+        for index, value in self.embedder(query).items():
+            for doc_id, weight in self.postings.get(index, {}).items():
+                scores[doc_id] += value * weight
+        matches = [item for item in scores.items() if item[1] >= self.min_score]
+        matches.sort(key=lambda item: item[1], reverse=True)
+        return matches[:limit]
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[List[Tuple[str, float]]], limit: int
+) -> List[Tuple[str, float]]:
+    """Merge ranked lists by summing 1 / (RRF_K + rank) per document"""
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (RRF_K + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class LinkIndex:
+    """BM25 plus an optional vector index over one user's links"""
+
+    def __init__(self, use_vectors: bool = True, embedder: Optional[Embedder] = None):
+        self.bm25 = BM25Index()
+        self.vectors = (
+            VectorIndex(embedder or hashing_embedder) if use_vectors else None
+        )
+        self.documents: Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def upsert(self, doc_id: str, document: dict, text: str) -> bool:
+        """Add or replace a link; returns True if it was new"""
+        is_new = doc_id not in self.documents
+        self.documents[doc_id] = document
+        self.bm25.add(doc_id, text)
+        if self.vectors is not None:
+            self.vectors.add(doc_id, text)
+        return is_new
+
+    def remove(self, doc_id: str) -> bool:
+        if self.documents.pop(doc_id, None) is None:
+            return False
+        self.bm25.remove(doc_id)
+        if self.vectors is not None:
+            self.vectors.remove(doc_id)
+        return True
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Candidates for a query: BM25 and vector rankings fused by rank"""
+        depth = limit * 2
+        rankings = [self.bm25.search(query, depth)]
+        if self.vectors is not None:
+            rankings.append(self.vectors.search(query, depth))
+        return reciprocal_rank_fusion(rankings, limit)
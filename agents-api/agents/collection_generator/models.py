@@ -0,0 +1,62 @@
+"""
+Smart Collection Generator agent models
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from core.models import BaseResponse, ExtractedLink
+
+
+class IndexedLink(BaseModel):
+    """A link of the user's to make searchable"""
+
+    url: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    tags: Optional[List[str]] = None
+
+
+class IndexUpdateRequest(BaseModel):
+    """Request model for adding, updating and removing indexed links"""
+
+    links: List[IndexedLink] = Field(default_factory=list, max_length=5000)
+    remove_urls: List[str] = Field(default_factory=list, max_length=5000)
+
+
+class IndexUpdateResponse(BaseResponse):
+    """Response model for an index update"""
+
+    index_id: str
+    added: int
+    updated: int
+    removed: int
+    skipped: int
+    total_links: int
+
+
+class CollectionGenerationRequest(BaseModel):
+    """Request model for generating a collection from a topic"""
+
+    topic: str = Field(..., min_length=2, max_length=500)
+    max_links: int = Field(20, ge=1, le=100)
+    rerank: bool = Field(
+        True, description="Let OpenAI re-rank the candidates when it is configured"
+    )
+    collection_name: Optional[str] = Field(
+        None, description="Name for the new collection"
+    )
+
+
+class CollectionGenerationResponse(BaseResponse):
+    """Response model for a generated collection"""
+
+    index_id: str
+    topic: str
+    collection_name: str
+    description: Optional[str] = None
+    links: List[ExtractedLink]
+    candidates_considered: int
+    reranked: bool
+    search_ms: float
@@ -0,0 +1,119 @@
+"""
+Smart Collection Generator API routes
+"""
+
+from fastapi import APIRouter, HTTPException, Request
+
+from config.settings import settings
+from core.limiter import limiter
+from core.models import AgentStatus, HealthResponse
+from core.ratelimit import charge_request
+
+from .models import (
+    CollectionGenerationRequest,
+    CollectionGenerationResponse,
+    IndexUpdateRequest,
+    IndexUpdateResponse,
+)
+from .service import collection_generator_service
+
+# Create router for this agent
+router = APIRouter(prefix="/collection-generator", tags=["Collection Generator"])
+
+ERROR_STATUS_CODES = {
+    "NOT_FOUND": 404,
+    "IMPORTER_UNAVAILABLE": 503,
+}
+
+
+def _raise_for(error) -> None:
+    status_code = ERROR_STATUS_CODES.get(error.error_code, 500)
+    raise HTTPException(status_code=status_code, detail=error.dict())
+
+
+@router.post("/indexes", response_model=IndexUpdateResponse)
+@limiter.limit("10/minute")
+async def create_index(request: Request, body: IndexUpdateRequest):
+    """
+    Create an index, optionally with its first links.
+
+    The returned ``index_id`` is random and is the only way to reach the
+    index. Indexes live in memory and expire after COLLECTION_GENERATOR_INDEX_TTL
+    seconds without use.
+    """
+    result, error = await collection_generator_service.update_index(
+        None, body.links, body.remove_urls
+    )
+    if error:
+        _raise_for(error)
+    return result
+
+
+@router.put("/{index_id}/links", response_model=IndexUpdateResponse)
+@limiter.limit("30/minute")
+async def update_index(request: Request, index_id: str, body: IndexUpdateRequest):
+    """
+    Add, update or remove links in an index created with POST /indexes.
+
+    Links are matched by canonical URL, so sending a link again updates it.
+    Only the changed links are re-indexed.
+    """
+    result, error = await collection_generator_service.update_index(
+        index_id, body.links, body.remove_urls
+    )
+    if error:
+        _raise_for(error)
+    return result
+
+
+@router.post("/{index_id}/sessions/{session_id}", response_model=IndexUpdateResponse)
+@limiter.limit("10/minute")
+async def index_bookmark_session(request: Request, index_id: str, session_id: str):
+    """Index the bookmarks of a Bookmark Importer upload session"""
+    result, error = await collection_generator_service.import_session(
+        index_id, session_id
+    )
+    if error:
+        _raise_for(error)
+    return result
+
+
+@router.post("/{index_id}/generate", response_model=CollectionGenerationResponse)
+@limiter.limit("20/minute")
+async def generate_collection(
+    request: Request, index_id: str, body: CollectionGenerationRequest
+):
+    """
+    Generate a collection on a topic from the user's indexed links.
+
+    This agent:
+    - Finds candidates with a local BM25 index and a vector index
+    - Lets OpenAI re-rank only the short candidate list, when configured
+    - Falls back to the index ranking if re-ranking fails or is slow
+    """
+    tokens = collection_generator_service.estimate_generation_tokens(body.rerank)
+    if tokens:
+        charge_request(request, 1 + tokens // settings.rate_limit_tokens_per_credit)
+
+    result, error = await collection_generator_service.generate(
+        index_id,
+        topic=body.topic,
+        max_links=body.max_links,
+        rerank=body.rerank,
+        collection_name=body.collection_name,
+    )
+    if error:
+        _raise_for(error)
+    return result
+
+
+@router.get("/health", response_model=HealthResponse)
+@limiter.exempt
+async def get_health(request: Request):
+    """Health check for the Smart Collection Generator agent"""
+    return HealthResponse(
+        agent="Smart Collection Generator",
+        status=AgentStatus.HEALTHY,
+        description="Ready to generate collections from indexed links",
+        version="1.0.0",
+    )
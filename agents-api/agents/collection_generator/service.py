@@ -0,0 +1,324 @@
+"""
+Smart Collection Generator service
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from openai import OpenAI
+
+from agents import get_runtime
+from config.settings import settings
+from core.metrics import OPENAI_REQUEST_DURATION, OPENAI_TOKENS
+from core.models import ErrorResponse, ExtractedLink
+from core.urlnorm import url_hash
+from core.utils import clean_text, get_domain_from_url, is_valid_url
+
+from .index import LinkIndex
+from .models import (
+    CollectionGenerationResponse,
+    IndexedLink,
+    IndexUpdateResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+_URL_WORDS_RE = re.compile(r"[^A-Za-z0-9]+")
+
+# Links indexed between yields to the event loop during large updates
+UPDATE_YIELD_EVERY = 500
+# Re-ranking prompt: fixed instructions plus one short line per candidate
+RERANK_PROMPT_TOKENS = 250
+RERANK_TOKENS_PER_CANDIDATE = 45
+RERANK_MAX_COMPLETION_TOKENS = 500
+
+
+def _index_text(link: IndexedLink) -> str:
+    """Searchable text of a link: title, description, tags and URL words"""
+    parts = [link.title or "", link.description or "", " ".join(link.tags or [])]
+    parts.append(_URL_WORDS_RE.sub(" ", link.url.split("://", 1)[-1]))
+    return " ".join(parts)
+
+
+def _index_not_found(index_id: str) -> ErrorResponse:
+    return ErrorResponse(
+        error="Index not found",
+        details=f"Index {index_id} does not exist or has expired",
+        error_code="NOT_FOUND",
+    )
+
+
+class CollectionGeneratorService:
+    """Service for assembling collections from a user's own links"""
+
+    def __init__(self):
+        # index_id -> (last used, index), least recently used first. IDs are
+        # issued here, so callers can only reach indexes they created
+        self.indexes: "OrderedDict[str, Tuple[float, LinkIndex]]" = OrderedDict()
+        self._initialize_openai()
+
+    def _initialize_openai(self):
+        """Initialize the OpenAI client; without a key, results are not re-ranked"""
+        api_key = settings.openai_api_key or os.getenv("OPENAI_API_KEY")
+        self.client = OpenAI(api_key=api_key) if api_key else None
+        self.model = settings.openai_model
+
+    def _create_index(self) -> str:
+        """Start an empty index under a new unguessable ID"""
+        index_id = str(uuid.uuid4())
+        self.indexes[index_id] = (
+            time.monotonic(),
+            LinkIndex(use_vectors=settings.collection_generator_vectors),
+        )
+        while len(self.indexes) > settings.collection_generator_max_indexes:
+            self.indexes.popitem(last=False)
+        return index_id
+
+    def _get_index(self, index_id: str) -> Optional[LinkIndex]:
+        """Return a live index and mark it used; idle indexes expire"""
+        entry = self.indexes.get(index_id)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now - entry[0] > settings.collection_generator_index_ttl:
+            del self.indexes[index_id]
+            return None
+        self.indexes[index_id] = (now, entry[1])
+        self.indexes.move_to_end(index_id)
+        return entry[1]
+
+    async def update_index(
+        self,
+        index_id: Optional[str],
+        links: List[IndexedLink],
+        remove_urls: List[str],
+    ) -> Tuple[Optional[IndexUpdateResponse], Optional[ErrorResponse]]:
+        """
+        Add, replace and remove links of an index
+
+        Args:
+            index_id: ID returned when the index was created, or None to
+                create a new index
+            links: Links to add or replace, matched by canonical URL
+            remove_urls: URLs to drop from the index
+
+        Returns:
+            Tuple of (response, error) - one will be None
+        """
+        if index_id is None:
+            index_id = self._create_index()
+        index = self._get_index(index_id)
+        if index is None:
+            return None, _index_not_found(index_id)
+
+        removed = sum(index.remove(url_hash(url)) for url in remove_urls)
+        added = updated = skipped = 0
+        for position, link in enumerate(links, start=1):
+            if not is_valid_url(link.url) or (
+                len(index) >= settings.collection_generator_max_links
+                and url_hash(link.url) not in index.documents
+            ):
+                skipped += 1
+                continue
+            document = link.model_dump()
+            if index.upsert(url_hash(link.url), document, _index_text(link)):
+                added += 1
+            else:
+                updated += 1
+            if position % UPDATE_YIELD_EVERY == 0:
+                # Keep other requests moving while a large batch is indexed
+                await asyncio.sleep(0)
+
+        return (
+            IndexUpdateResponse(
+                success=True,
+                message=f"Indexed {added + updated} links",
+                index_id=index_id,
+                added=added,
+                updated=updated,
+                removed=removed,
+                skipped=skipped,
+                total_links=len(index),
+            ),
+            None,
+        )
+
+    async def import_session(
+        self, index_id: str, session_id: str
+    ) -> Tuple[Optional[IndexUpdateResponse], Optional[ErrorResponse]]:
+        """Index the bookmarks of a Bookmark Importer upload session"""
+        try:
+            from ..bookmark_importer.service import bookmark_importer_service
+        except Exception as e:
+            return None, ErrorResponse(
+                error="Bookmark importer unavailable",
+                details=str(e),
+                error_code="IMPORTER_UNAVAILABLE",
+            )
+
+        session = bookmark_importer_service.sessions.get(session_id)
+        if not session:
+            return None, ErrorResponse(
+                error="Session not found",
+                details=f"No bookmark import session {session_id}",
+                error_code="NOT_FOUND",
+            )
+        links = [
+            IndexedLink(
+                url=bookmark.url,
+                title=bookmark.title,
+                description=bookmark.description,
+                tags=[bookmark.folder_path] if bookmark.folder_path else None,
+            )
+            for bookmark in session["bookmarks"]
+        ]
+        return await self.update_index(index_id, links, [])
+
+    def estimate_generation_tokens(self, rerank: bool) -> int:
+        """OpenAI tokens a generation may use; 0 when nothing is sent to OpenAI"""
+        if not rerank or self.client is None:
+            return 0
+        return (
+            RERANK_PROMPT_TOKENS
+            + settings.collection_generator_candidates * RERANK_TOKENS_PER_CANDIDATE
+            + RERANK_MAX_COMPLETION_TOKENS
+        )
+
+    async def generate(
+        self,
+        index_id: str,
+        topic: str,
+        max_links: int = 20,
+        rerank: bool = True,
+        collection_name: Optional[str] = None,
+    ) -> Tuple[Optional[CollectionGenerationResponse], Optional[ErrorResponse]]:
+        """
+        Assemble a collection on a topic from the links of an index
+
+        Candidates come from the local indexes; only that short list is sent
+        to OpenAI for re-ranking, and the index order is kept if it fails.
+
+        Returns:
+            Tuple of (response, error) - one will be None
+        """
+        index = self._get_index(index_id)
+        if index is None:
+            return None, _index_not_found(index_id)
+
+        start = time.perf_counter()
+        candidates = index.search(topic, settings.collection_generator_candidates)
+        search_ms = (time.perf_counter() - start) * 1000
+        documents = [index.documents[doc_id] for doc_id, _ in candidates]
+
+        selected = documents[:max_links]
+        description = None
+        reranked = False
+        if rerank and self.client is not None and documents:
+            try:
+                ranking = await get_runtime("collection_generator").run(
+                    self._rerank, topic, documents, max_links
+                )
+                selected = [documents[i] for i in ranking["selected"]][:max_links]
+                collection_name = collection_name or ranking.get("collection_name")
+                description = ranking.get("description")
+                reranked = True
+            except Exception as e:
+                # Includes AgentTimeout: a slow model must not cost the results
+                logger.warning("Re-ranking failed, keeping index order: %s", e)
+
+        links = [
+            ExtractedLink(
+                url=document["url"],
+                title=document.get("title"),
+                description=document.get("description"),
+                domain=get_domain_from_url(document["url"]),
+                tags=document.get("tags"),
+            )
+            for document in selected
+        ]
+        return (
+            CollectionGenerationResponse(
+                success=True,
+                message=f"Selected {len(links)} links for '{topic}'",
+                index_id=index_id,
+                topic=topic,
+                collection_name=collection_name or clean_text(topic, 100).title(),
+                description=description,
+                links=links,
+                candidates_considered=len(documents),
+                reranked=reranked,
+                search_ms=round(search_ms, 2),
+            ),
+            None,
+        )
+
+    def _rerank(
+        self, topic: str, documents: List[Dict[str, Any]], max_links: int
+    ) -> Dict[str, Any]:
+        """Ask OpenAI to pick and order the relevant candidates"""
+        lines = []
+        for number, document in enumerate(documents, start=1):
+            title = clean_text(document.get("title") or "", 120)
+            description = clean_text(document.get("description") or "", 120)
+            lines.append(
+                f"{number}. {title} | {get_domain_from_url(document['url'])}"
+                + (f" | {description}" if description else "")
+            )
+        prompt = (
+            f'Build a collection of links about: "{topic}"\n\n'
+            f"Candidates from the user's saved links:\n" + "\n".join(lines) + "\n\n"
+            f"Pick at most {max_links} candidates that are clearly about the topic, "
+            "most relevant first. Respond with JSON: "
+            '{"collection_name": "short name", "description": "one sentence", '
+            '"selected": [candidate numbers]}'
+        )
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=RERANK_MAX_COMPLETION_TOKENS,
+                temperature=0.2,
+                response_format={"type": "json_object"},
+            )
+            outcome = "ok"
+        finally:
+            OPENAI_REQUEST_DURATION.observe(
+                time.perf_counter() - start, self.model, outcome
+            )
+        usage = getattr(response, "usage", None)
+        if usage:
+            OPENAI_TOKENS.inc(self.model, "prompt", amount=usage.prompt_tokens or 0)
+            OPENAI_TOKENS.inc(
+                self.model, "completion", amount=usage.completion_tokens or 0
+            )
+
+        result = json.loads(response.choices[0].message.content)
+        # Keep valid, distinct candidate numbers, as 0-based positions
+        seen = set()
+        selected = []
+        for number in result.get("selected", []):
+            if isinstance(number, int) and 1 <= number <= len(documents):
+                if number not in seen:
+                    seen.add(number)
+                    selected.append(number - 1)
+        result["selected"] = selected
+        return result
+
+
+def health_probe() -> bool:
+    """Search is local; re-ranking is optional"""
+    return True
+
+
+# Global instance
+collection_generator_service = CollectionGeneratorService()
@@ -0,0 +1,163 @@
+"""
+Tests for Smart Collection Generator agent
+"""
+
+import pytest
+
+from config.settings import settings
+
+from .index import BM25Index, LinkIndex, VectorIndex
+from .models import IndexedLink
+from .service import CollectionGeneratorService
+
+LINKS = [
+    IndexedLink(
+        url="https://example.com/docker",
+        title="Docker deployment tutorial",
+        description="Ship containers to production",
+    ),
+    IndexedLink(url="https://example.com/pasta", title="Fresh pasta recipes"),
+    IndexedLink(
+        url="https://example.com/k8s",
+        title="Kubernetes for beginners",
+        tags=["devops"],
+    ),
+]
+
+
+def _service() -> CollectionGeneratorService:
+    service = CollectionGeneratorService()
+    service.client = None
+    return service
+
+
+class TestIndexes:
+    """Test suite for the retrieval indexes"""
+
+    def test_bm25_ranks_matching_documents(self):
+        """Test BM25 favours the document with more query terms"""
+        index = BM25Index()
+        index.add("a", "python web framework")
+        index.add("b", "python snake care")
+        index.add("c", "gardening tips")
+
+        results = index.search("python framework", 10)
+        assert [doc_id for doc_id, _ in results] == ["a", "b"]
+
+    def test_bm25_updates_incrementally(self):
+        """Test replacing and removing documents updates their postings"""
+        index = BM25Index()
+        index.add("a", "rust compiler")
+        index.add("a", "go compiler")
+        index.remove("missing")
+
+        assert index.search("rust", 10) == []
+        assert index.search("go", 10)[0][0] == "a"
+
+        index.remove("a")
+        assert len(index) == 0
+        assert "compiler" not in index.postings
+
+    def test_vector_index_matches_word_variants(self):
+        """Test the trigram embedding matches forms BM25 treats as different"""
+        bm25, vectors = BM25Index(), VectorIndex()
+        for index in (bm25, vectors):
+            index.add("a", "deployment tutorials")
+            index.add("b", "pasta recipes")
+
+        assert bm25.search("deploy tutorial", 10) == []
+        assert [doc_id for doc_id, _ in vectors.search("deploy tutorial", 10)] == ["a"]
+
+    def test_link_index_without_vectors(self):
+        """Test the vector index can be turned off"""
+        index = LinkIndex(use_vectors=False)
+        assert index.upsert("a", {"url": "u"}, "kubernetes") is True
+        assert index.upsert("a", {"url": "u"}, "kubernetes guide") is False
+        assert index.search("kubernetes", 5)[0][0] == "a"
+
+
+class TestCollectionGeneratorService:
+    """Test suite for CollectionGeneratorService"""
+
+    @pytest.mark.asyncio
+    async def test_update_index_counts_changes(self):
+        """Test links are added, updated, skipped and removed by URL"""
+        service = _service()
+        result, error = await service.update_index(None, LINKS, [])
+        assert error is None
+        assert (result.added, result.total_links) == (3, 3)
+
+        invalid = IndexedLink(url="not a url")
+        result, _ = await service.update_index(
+            result.index_id, [LINKS[0], invalid], ["https://example.com/pasta"]
+        )
+        assert (result.updated, result.skipped, result.removed) == (1, 1, 1)
+        assert result.total_links == 2
+
+    @pytest.mark.asyncio
+    async def test_generate_without_openai(self):
+        """Test generation returns the index ranking when OpenAI is not set up"""
+        service = _service()
+        created, _ = await service.update_index(None, LINKS, [])
+
+        result, error = await service.generate(created.index_id, "deploying containers")
+
+        assert error is None
+        assert result.reranked is False
+        assert result.links[0].url == "https://example.com/docker"
+        assert all("pasta" not in link.url for link in result.links)
+        assert service.estimate_generation_tokens(rerank=True) == 0
+
+    @pytest.mark.asyncio
+    async def test_rerank_failure_keeps_index_order(self):
+        """Test a failing re-rank falls back to the local results"""
+        service = _service()
+        created, _ = await service.update_index(None, LINKS, [])
+
+        class FailingCompletions:
+            def create(self, **kwargs):
+                raise RuntimeError("model unavailable")
+
+        class FailingClient:
+            class chat:
+                completions = FailingCompletions()
+
+        service.client = FailingClient()
+        result, error = await service.generate(created.index_id, "kubernetes devops")
+
+        assert error is None
+        assert result.reranked is False
+        assert result.links[0].url == "https://example.com/k8s"
+
+    @pytest.mark.asyncio
+    async def test_unknown_indexes_are_not_found(self):
+        """Test indexes can't be created or reached under caller-chosen IDs"""
+        service = _service()
+
+        _, error = await service.update_index("user-1", LINKS, [])
+        assert error.error_code == "NOT_FOUND"
+        assert service.indexes == {}
+        _, error = await service.generate("user-1", "topic")
+        assert error.error_code == "NOT_FOUND"
+
+    @pytest.mark.asyncio
+    async def test_indexes_are_bounded_and_expire(self, monkeypatch):
+        """Test the least recently used index is dropped, and idle ones expire"""
+        monkeypatch.setattr(settings, "collection_generator_max_indexes", 2)
+        service = _service()
+        ids = []
+        for _ in range(2):
+            created, _ = await service.update_index(None, LINKS[:1], [])
+            ids.append(created.index_id)
+        # Using the first index makes the second the least recently used
+        await service.generate(ids[0], "docker")
+        created, _ = await service.update_index(None, LINKS[:1], [])
+
+        assert list(service.indexes) == [ids[0], created.index_id]
+        _, error = await service.generate(ids[1], "docker")
+        assert error.error_code == "NOT_FOUND"
+
+        monkeypatch.setattr(settings, "collection_generator_index_ttl", -1)
+        _, error = await service.generate(ids[0], "docker")
+        assert error.error_code == "NOT_FOUND"
+        assert ids[0] not in service.indexes
@@ -1 +1,15 @@
-# Smart Export Guide Agent - Coming Soon
+"""
+Smart Export Guide Agent
+"""
+
+from core.agent_runtime import AgentSpec
+
+# Rendering streams on the event loop; the spec only bounds the health probe
+AGENT = AgentSpec(
+    key="smart_export",
+    name="Smart Export Guide",
+    description="Export collections as detailed guides",
+    module="agents.smart_export.routes",
+    path="/smart-export",
+    health_probe="agents.smart_export.service:health_probe",
+)
@@ -0,0 +1,50 @@
+"""
+Smart Export agent models
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class ExportFormat(str, Enum):
+    """Formats a collection can be exported to"""
+
+    MARKDOWN = "markdown"
+    HTML = "html"
+    NETSCAPE = "netscape"
+
+
+class ExportLink(BaseModel):
+    """One link of an exported collection"""
+
+    url: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    added_at: Optional[datetime] = None
+
+    @field_validator("url")
+    @classmethod
+    def url_must_be_http(cls, url: str) -> str:
+        # Exports turn every URL into a clickable href; javascript: or data:
+        # URLs would run in whoever opens the file
+        parts = urlsplit(url.strip())
+        if parts.scheme.lower() not in ("http", "https") or not parts.netloc:
+            raise ValueError("Only http(s) URLs can be exported")
+        return url.strip()
+
+
+class ExportCollection(BaseModel):
+    """Collection details rendered before its links"""
+
+    name: str = Field(..., min_length=1, max_length=200)
+    description: Optional[str] = Field(None, max_length=5000)
+
+
+class SmartExportRequest(ExportCollection):
+    """Request model for exporting a collection sent as one JSON document"""
+
+    links: List[ExportLink] = Field(default_factory=list)
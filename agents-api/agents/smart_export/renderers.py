@@ -0,0 +1,114 @@
+"""
+Streaming renderers for collection exports.
+
+Each renderer is an async generator: it yields the document header as soon as
+it is called, then one fragment per link as links arrive, then the footer. No
+renderer looks at more than one link at a time, so an export's memory use does
+not depend on the size of the collection.
+"""
+
+import html
+import re
+from typing import AsyncIterator, Callable, Dict
+
+from core.utils import clean_text
+
+from .models import ExportCollection, ExportFormat, ExportLink
+
+Renderer = Callable[[ExportCollection, AsyncIterator[ExportLink]], AsyncIterator[str]]
+
+# Characters with meaning in Markdown link text
+_MARKDOWN_SPECIAL_RE = re.compile(r"([\\\[\]*_`<>])")
+
+
+def _markdown_text(text: str) -> str:
+    return _MARKDOWN_SPECIAL_RE.sub(r"\\\1", clean_text(text))
+
+
+def _markdown_url(url: str) -> str:
+    # Angle brackets let a link destination contain spaces and parentheses
+    return f"<{url}>" if re.search(r"[\s()<>]", url) else url
+
+
+async def render_markdown(
+    collection: ExportCollection, links: AsyncIterator[ExportLink]
+) -> AsyncIterator[str]:
+    """Render a collection as a Markdown reading guide"""
+    yield f"# {_markdown_text(collection.name)}\n\n"
+    if collection.description:
+        yield f"> {_markdown_text(collection.description)}\n\n"
+    async for link in links:
+        title = _markdown_text(link.title or link.url)
+        line = f"- [{title}]({_markdown_url(link.url)})"
+        if link.description:
+            line += f" — {_markdown_text(link.description)}"
+        yield line + "\n"
+
+
+async def render_html(
+    collection: ExportCollection, links: AsyncIterator[ExportLink]
+) -> AsyncIterator[str]:
+    """Render a collection as a standalone HTML guide page"""
+    name = html.escape(collection.name)
+    yield (
+        "<!DOCTYPE html>\n"
+        '<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        f"<title>{name}</title>\n"
+        "<style>body{font-family:system-ui,sans-serif;max-width:48rem;"
+        "margin:2rem auto;padding:0 1rem;line-height:1.5}"
+        "li{margin:.75rem 0}li p{margin:.25rem 0 0;color:#555}</style>\n"
+        f"</head>\n<body>\n<h1>{name}</h1>\n"
+    )
+    if collection.description:
+        yield f"<p>{html.escape(collection.description)}</p>\n"
+    yield "<ul>\n"
+    async for link in links:
+        url = html.escape(link.url, quote=True)
+        title = html.escape(link.title or link.url)
+        item = f'<li><a href="{url}">{title}</a>'
+        if link.description:
+            item += f"<p>{html.escape(clean_text(link.description))}</p>"
+        yield item + "</li>\n"
+    yield "</ul>\n</body>\n</html>\n"
+
+
+async def render_netscape(
+    collection: ExportCollection, links: AsyncIterator[ExportLink]
+) -> AsyncIterator[str]:
+    """Render a collection as a Netscape bookmark file, one folder per collection"""
+    yield (
+        "<!DOCTYPE NETSCAPE-Bookmark-file-1>\n"
+        "<!-- This is an automatically generated file. -->\n"
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+        "<TITLE>Bookmarks</TITLE>\n<H1>Bookmarks</H1>\n<DL><p>\n"
+        f"    <DT><H3>{html.escape(collection.name)}</H3>\n"
+    )
+    if collection.description:
+        yield f"    <DD>{html.escape(clean_text(collection.description))}\n"
+    yield "    <DL><p>\n"
+    async for link in links:
+        attributes = f'HREF="{html.escape(link.url, quote=True)}"'
+        if link.added_at:
+            attributes += f' ADD_DATE="{int(link.added_at.timestamp())}"'
+        item = (
+            f"        <DT><A {attributes}>{html.escape(link.title or link.url)}</A>\n"
+        )
+        if link.description:
+            item += f"        <DD>{html.escape(clean_text(link.description))}\n"
+        yield item
+    yield "    </DL><p>\n</DL><p>\n"
+
+
+RENDERERS: Dict[ExportFormat, Renderer] = {
+    ExportFormat.MARKDOWN: render_markdown,
+    ExportFormat.HTML: render_html,
+    ExportFormat.NETSCAPE: render_netscape,
+}
+
+# (media type, file extension) of each format
+CONTENT_TYPES = {
+    ExportFormat.MARKDOWN: ("text/markdown; charset=utf-8", "md"),
+    ExportFormat.HTML: ("text/html; charset=utf-8", "html"),
+    ExportFormat.NETSCAPE: ("text/html; charset=utf-8", "html"),
+}
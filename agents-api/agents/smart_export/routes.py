@@ -0,0 +1,106 @@
+"""
+Smart Export API routes
+"""
+
+import re
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+
+from core.limiter import limiter
+from core.models import AgentStatus, HealthResponse
+
+from .models import ExportFormat, SmartExportRequest
+from .renderers import CONTENT_TYPES
+from .service import (
+    ExportInputError,
+    iter_links,
+    negotiate_encoding,
+    smart_export_service,
+)
+
+# Create router for this agent
+router = APIRouter(prefix="/smart-export", tags=["Smart Export"])
+
+_FILENAME_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class ExportStreamResponse(StreamingResponse):
+    """
+    Streaming download that may still be reading the request body.
+
+    Same constraint as extension-api's ``IngestProgressResponse``: while the
+    body is unread, ``receive`` belongs to the body iterator.
+    """
+
+    def __init__(self, content, body_read: bool, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.body_read:
+            # Nothing else reads ``receive``; stop rendering on disconnect
+            await super().__call__(scope, receive, send)
+            return
+        try:
+            await self.stream_response(send)
+        except ClientDisconnect:
+            # Raised by request.stream(); the client is gone, so is the export
+            return
+        if self.background is not None:
+            await self.background()
+
+
+@router.post("/{export_format}")
+@limiter.limit("10/minute")
+async def export_collection(request: Request, export_format: ExportFormat):
+    """
+    Export a collection as Markdown, an HTML guide or a Netscape bookmark file.
+
+    The body is either one JSON document (name, description, links) or, for
+    large collections, NDJSON: a first line with the collection's name and
+    description followed by one link per line. The export is streamed as it
+    is rendered and compressed when Accept-Encoding allows gzip or deflate.
+    """
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    try:
+        if ndjson:
+            collection, links = await smart_export_service.read_ndjson(request.stream())
+        else:
+            payload = SmartExportRequest.model_validate_json(await request.body())
+            collection, links = payload, iter_links(payload.links)
+    except ExportInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    media_type, extension = CONTENT_TYPES[export_format]
+    filename = _FILENAME_UNSAFE_RE.sub("-", collection.name).strip("-") or "collection"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{extension}"',
+        "Vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    return ExportStreamResponse(
+        smart_export_service.render(export_format, collection, links, encoding),
+        body_read=not ndjson,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.get("/health", response_model=HealthResponse)
+@limiter.exempt
+async def get_health(request: Request):
+    """Health check for the Smart Export agent"""
+    return HealthResponse(
+        agent="Smart Export Guide",
+        status=AgentStatus.HEALTHY,
+        description="Ready to export collections",
+        version="1.0.0",
+    )
@@ -0,0 +1,171 @@
+"""
+Smart Export service
+"""
+
+import json
+import logging
+import re
+import zlib
+from typing import AsyncIterator, Iterable, Optional, Tuple
+
+from pydantic import ValidationError
+
+from config.settings import settings
+
+from .models import ExportCollection, ExportFormat, ExportLink
+from .renderers import RENDERERS
+
+logger = logging.getLogger(__name__)
+
+# Encodings offered for Accept-Encoding negotiation, most preferred first
+SUPPORTED_ENCODINGS = ("gzip", "deflate")
+# zlib wbits for each encoding: gzip framing, or the zlib format HTTP calls deflate
+_WBITS = {"gzip": 31, "deflate": 15}
+# Longest NDJSON line accepted
+MAX_LINE_BYTES = 64 * 1024
+
+_Q_VALUE_RE = re.compile(r"^q=([0-9.]+)$")
+
+
+class ExportInputError(ValueError):
+    """Raised when an NDJSON export body does not start with a collection"""
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick a supported content coding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            match = _Q_VALUE_RE.match(param)
+            if match:
+                try:
+                    quality = float(match.group(1))
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            weights[coding.lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+async def iter_links(links: Iterable[ExportLink]) -> AsyncIterator[ExportLink]:
+    """Adapt an in-memory link list to the renderers' async interface"""
+    for link in links:
+        yield link
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ExportInputError("An NDJSON line is longer than 64 KiB")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+class SmartExportService:
+    """Service for rendering collections into downloadable documents"""
+
+    async def read_ndjson(
+        self, chunks: AsyncIterator[bytes]
+    ) -> Tuple[ExportCollection, AsyncIterator[ExportLink]]:
+        """
+        Split an NDJSON body into its collection line and a stream of links
+
+        The first line is the collection ({"name", "description"}); every
+        further line is a link. Only the first line is read here; links are
+        read from the request as the export consumes them.
+        """
+        lines = _iter_lines(chunks)
+        try:
+            first = await lines.__anext__()
+        except StopAsyncIteration:
+            raise ExportInputError("The body is empty")
+        try:
+            collection = ExportCollection.model_validate_json(first)
+        except ValidationError as e:
+            raise ExportInputError(f"The first line must be the collection: {e}")
+
+        async def links() -> AsyncIterator[ExportLink]:
+            line_number = 1
+            async for line in lines:
+                line_number += 1
+                try:
+                    yield ExportLink.model_validate_json(line)
+                except (ValidationError, json.JSONDecodeError):
+                    # Headers are sent already; a bad line is skipped, not fatal
+                    logger.warning("Skipping invalid export line %d", line_number)
+
+        return collection, links()
+
+    async def render(
+        self,
+        export_format: ExportFormat,
+        collection: ExportCollection,
+        links: AsyncIterator[ExportLink],
+        encoding: Optional[str] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Render and optionally compress an export as a stream of byte chunks
+
+        The header is sent on its own so the download starts at once; link
+        fragments are then grouped into chunks of about
+        SMART_EXPORT_CHUNK_BYTES. At most SMART_EXPORT_MAX_LINKS links are
+        rendered.
+        """
+        compressor = (
+            zlib.compressobj(6, zlib.DEFLATED, _WBITS[encoding]) if encoding else None
+        )
+
+        def encode(text: str) -> bytes:
+            data = text.encode("utf-8")
+            if compressor is None:
+                return data
+            # A sync flush per chunk keeps the client's download moving
+            return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        async def limited() -> AsyncIterator[ExportLink]:
+            count = 0
+            async for link in links:
+                if count >= settings.smart_export_max_links:
+                    break
+                count += 1
+                yield link
+
+        parts = []
+        size = 0
+        first = True
+        async for part in RENDERERS[export_format](collection, limited()):
+            parts.append(part)
+            size += len(part)
+            if first or size >= settings.smart_export_chunk_bytes:
+                yield encode("".join(parts))
+                parts, size, first = [], 0, False
+        tail = "".join(parts).encode("utf-8")
+        if compressor is None:
+            yield tail
+        else:
+            yield compressor.compress(tail) + compressor.flush()
+
+
+def health_probe() -> bool:
+    """Rendering has no external dependencies"""
+    return True
+
+
+# Global instance
+smart_export_service = SmartExportService()
@@ -0,0 +1,210 @@
+"""
+Tests for Smart Export agent
+"""
+
+import asyncio
+import gzip
+import json
+
+import pytest
+from bs4 import BeautifulSoup
+from fastapi import FastAPI
+from pydantic import ValidationError
+
+from config.settings import settings
+from core.limiter import limiter
+
+from .models import ExportCollection, ExportFormat, ExportLink
+from .routes import router
+from .service import (
+    ExportInputError,
+    SmartExportService,
+    iter_links,
+    negotiate_encoding,
+)
+
+COLLECTION = ExportCollection(name="Reading list", description="Things to read")
+LINKS = [
+    ExportLink(url="https://example.com/a", title="First [draft]", description="Intro"),
+    ExportLink(url="https://example.com/b?q=1&r=2", title="Tom & Jerry"),
+]
+
+
+def _chunked(data: bytes, size: int):
+    async def chunks():
+        for start in range(0, len(data), size):
+            yield data[start : start + size]
+
+    return chunks()
+
+
+async def _render(export_format, links, encoding=None) -> bytes:
+    service = SmartExportService()
+    chunks = [
+        chunk
+        async for chunk in service.render(export_format, COLLECTION, links, encoding)
+    ]
+    return b"".join(chunks)
+
+
+class TestSmartExportService:
+    """Test suite for SmartExportService"""
+
+    def test_negotiate_encoding(self):
+        """Test Accept-Encoding negotiation honours q-values"""
+        assert negotiate_encoding(None) is None
+        assert negotiate_encoding("gzip, deflate, br") == "gzip"
+        assert negotiate_encoding("deflate, gzip;q=0.5") == "deflate"
+        assert negotiate_encoding("gzip;q=0, identity") is None
+        assert negotiate_encoding("*") == "gzip"
+
+    @pytest.mark.asyncio
+    async def test_markdown_escapes_link_text(self):
+        """Test titles cannot break out of Markdown link syntax"""
+        body = (await _render(ExportFormat.MARKDOWN, iter_links(LINKS))).decode()
+
+        assert body.startswith("# Reading list\n\n> Things to read\n")
+        assert "- [First \\[draft\\]](https://example.com/a) — Intro\n" in body
+
+    @pytest.mark.asyncio
+    async def test_gzip_stream_decompresses_to_plain_output(self):
+        """Test the compressed stream carries exactly the uncompressed export"""
+        plain = await _render(ExportFormat.HTML, iter_links(LINKS))
+        compressed = await _render(ExportFormat.HTML, iter_links(LINKS), "gzip")
+
+        assert gzip.decompress(compressed) == plain
+        assert b"Tom &amp; Jerry" in plain
+
+    @pytest.mark.asyncio
+    async def test_netscape_export_reimports(self):
+        """Test a Netscape export keeps every URL intact in its HREF attributes"""
+        body = (await _render(ExportFormat.NETSCAPE, iter_links(LINKS))).decode()
+
+        anchors = BeautifulSoup(body, "html.parser").find_all("a", href=True)
+        assert [anchor["href"] for anchor in anchors] == [
+            "https://example.com/a",
+            "https://example.com/b?q=1&r=2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_ndjson_links_are_streamed(self):
+        """Test NDJSON bodies are split into the collection and its links"""
+        lines = [json.dumps({"name": "Streamed"})]
+        lines += [json.dumps({"url": f"https://example.com/{i}"}) for i in range(50)]
+        lines.insert(3, "not json")
+        body = ("\n".join(lines) + "\n").encode()
+
+        service = SmartExportService()
+        collection, links = await service.read_ndjson(_chunked(body, 16))
+        rendered = [link async for link in links]
+
+        assert collection.name == "Streamed"
+        assert len(rendered) == 50
+
+    @pytest.mark.asyncio
+    async def test_ndjson_requires_collection_line(self):
+        """Test a body starting with a link is rejected before streaming"""
+        service = SmartExportService()
+        body = json.dumps({"url": "https://example.com"}).encode()
+
+        with pytest.raises(ExportInputError):
+            await service.read_ndjson(_chunked(body, 16))
+
+    def test_script_urls_are_rejected(self):
+        """Test javascript: and data: URLs cannot become export links"""
+        for url in ["javascript:alert(1)", " JavaScript:alert(1)", "data:text/html,x"]:
+            with pytest.raises(ValidationError):
+                ExportLink(url=url)
+
+    @pytest.mark.asyncio
+    async def test_ndjson_script_urls_are_skipped(self):
+        """Test streamed lines with non-http(s) URLs never reach an href"""
+        lines = [
+            json.dumps({"name": "Streamed"}),
+            json.dumps({"url": "javascript:alert(1)"}),
+            json.dumps({"url": "https://example.com/ok"}),
+        ]
+        service = SmartExportService()
+        collection, links = await service.read_ndjson(
+            _chunked("\n".join(lines).encode(), 16)
+        )
+        body = (await _render(ExportFormat.HTML, links)).decode()
+
+        assert "javascript:" not in body
+        assert 'href="https://example.com/ok"' in body
+
+
+async def _asgi_export(body_messages: list, headers: dict) -> list:
+    """Drive the route directly; the client disconnects once the body is sent"""
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(router)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/smart-export/markdown",
+        "raw_path": b"/smart-export/markdown",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        if body_messages:
+            return body_messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        # Give the disconnect a chance to be noticed between chunks
+        await asyncio.sleep(0)
+
+    await app(scope, receive, send)
+    return [m for m in messages if m["type"] == "http.response.body"]
+
+
+class TestExportDisconnect:
+    """A client that goes away stops the export"""
+
+    @pytest.fixture(autouse=True)
+    def small_chunks(self, monkeypatch):
+        monkeypatch.setattr(settings, "smart_export_chunk_bytes", 64)
+
+    @pytest.mark.asyncio
+    async def test_json_export_stops_when_the_client_aborts(self):
+        """Test rendering ends at the disconnect instead of running to the end"""
+        body = json.dumps(
+            {
+                "name": "Big",
+                "links": [{"url": f"https://example.com/{i}"} for i in range(5000)],
+            }
+        ).encode()
+
+        chunks = await _asgi_export(
+            [{"type": "http.request", "body": body, "more_body": False}],
+            {"Content-Type": "application/json"},
+        )
+        assert all(chunk.get("more_body") for chunk in chunks)
+        assert len(chunks) < 100
+
+    @pytest.mark.asyncio
+    async def test_ndjson_export_stops_when_the_client_aborts(self):
+        """Test a disconnect while the body is still arriving ends quietly"""
+        lines = [json.dumps({"name": "Big"})] + [
+            json.dumps({"url": f"https://example.com/{i}"}) for i in range(10)
+        ]
+        body = ("\n".join(lines) + "\n").encode()
+
+        chunks = await _asgi_export(
+            [{"type": "http.request", "body": body, "more_body": True}],
+            {"Content-Type": "application/x-ndjson"},
+        )
+        assert chunks
+        assert all(chunk.get("more_body") for chunk in chunks)
@@ -1 +1,19 @@
-# Watch Later Organizer Agent - Coming Soon
+"""
+Watch Later Organizer Agent
+"""
+
+from core.agent_runtime import AgentSpec
+
+# Clustering and state files are small, serialized work per library
+AGENT = AgentSpec(
+    key="watch_later_organizer",
+    name="Watch Later Organizer",
+    description="Organize Watch Later playlists into collections",
+    module="agents.watch_later_organizer.routes",
+    path="/watch-later-organizer",
+    max_concurrency=4,
+    executor="thread",
+    pool_size=4,
+    timeout=120.0,
+    health_probe="agents.watch_later_organizer.service:health_probe",
+)
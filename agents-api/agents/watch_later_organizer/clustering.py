@@ -0,0 +1,245 @@
+"""
+Incremental clustering of videos by local feature vectors.
+
+Each video becomes a sparse vector of hashed title, description and channel
+tokens, L2-normalized. Clusters are kept as the running sum of their members'
+vectors, so a new video is placed by comparing it with each centroid once: it
+joins the most similar cluster above ``threshold`` or starts a new one. Only
+new videos are placed; earlier assignments are never revisited, which is what
+keeps adding 20 videos to a 3,000-video list cheap and the collections stable.
+
+The whole state is plain JSON (see ``ClusterState.to_dict``) so it can be
+persisted between imports.
+"""
+
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import WatchLaterItem
+
+# Hashed feature space; large enough that collisions between a video's own
+# tokens are rare
+FEATURE_DIMENSIONS = 1 << 18
+# Features kept per centroid when the state is saved
+MAX_CENTROID_FEATURES = 400
+# Terms kept per cluster for naming
+MAX_CLUSTER_TERMS = 30
+# Description text considered; the rest is mostly links and sponsor reads
+MAX_DESCRIPTION_CHARS = 600
+
+TITLE_WEIGHT = 2.0
+CHANNEL_WEIGHT = 1.5
+DESCRIPTION_WEIGHT = 0.5
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]+")
+_STOPWORDS = frozenset(
+    """a an and are as at be by can for from how i in into is it its my new
+    of on or our so that the this to vs we what when why with you your video
+    videos official full part episode ep live 2020 2021 2022 2023 2024 2025
+    http https www com""".split()
+)
+
+SparseVector = Dict[int, float]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens without stopwords"""
+    if not text:
+        return []
+    return [
+        token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS
+    ]
+
+
+def _feature(token: str) -> int:
+    # crc32 rather than hash(): features must be stable across processes
+    return zlib.crc32(token.encode("utf-8")) % FEATURE_DIMENSIONS
+
+
+def vectorize(item: WatchLaterItem) -> SparseVector:
+    """Map a video to an L2-normalized sparse feature vector"""
+    weights: Counter = Counter()
+    for token in tokenize(item.title):
+        weights[_feature(token)] += TITLE_WEIGHT
+    description = (item.description or "")[:MAX_DESCRIPTION_CHARS]
+    for token in tokenize(description):
+        weights[_feature(token)] += DESCRIPTION_WEIGHT
+    if item.channel_title:
+        weights[_feature("channel:" + item.channel_title.lower())] += CHANNEL_WEIGHT
+
+    # Sublinear term frequency, so one repeated word does not dominate
+    vector = {index: 1.0 + math.log(weight) for index, weight in weights.items()}
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {index: value / norm for index, value in vector.items()} if norm else {}
+
+
+class Cluster:
+    """A group of videos: the sum of their vectors plus naming statistics"""
+
+    def __init__(
+        self,
+        cluster_id: int,
+        centroid: Optional[SparseVector] = None,
+        size: int = 0,
+        terms: Optional[Dict[str, int]] = None,
+        channels: Optional[Dict[str, int]] = None,
+        unsorted: bool = False,
+    ):
+        self.cluster_id = cluster_id
+        # Holds videos with no usable text, e.g. IDs the source did not know
+        self.unsorted = unsorted
+        self.centroid: SparseVector = centroid or {}
+        self.size = size
+        self.terms: Counter = Counter(terms or {})
+        self.channels: Counter = Counter(channels or {})
+        self._norm: Optional[float] = None
+
+    @property
+    def norm(self) -> float:
+        if self._norm is None:
+            self._norm = math.sqrt(sum(v * v for v in self.centroid.values()))
+        return self._norm
+
+    def similarity(self, vector: SparseVector) -> float:
+        """Cosine similarity between ``vector`` and the cluster's centroid"""
+        if not self.norm:
+            return 0.0
+        dot = sum(
+            value * self.centroid.get(index, 0.0) for index, value in vector.items()
+        )
+        return dot / self.norm
+
+    def add(self, item: WatchLaterItem, vector: SparseVector) -> None:
+        for index, value in vector.items():
+            self.centroid[index] = self.centroid.get(index, 0.0) + value
+        self._norm = None
+        self.size += 1
+        self.terms.update(set(tokenize(item.title)))
+        if item.channel_title:
+            self.channels[item.channel_title] += 1
+
+    @property
+    def name(self) -> str:
+        """A channel name when one channel dominates, else the top title terms"""
+        if self.unsorted:
+            return "Unsorted Watch Later videos"
+        if self.channels:
+            channel, count = self.channels.most_common(1)[0]
+            if count * 2 > self.size:
+                return channel
+        # Terms shared by most of the cluster, not ones a few titles repeat
+        terms = [
+            term
+            for term, count in self.terms.most_common(3)
+            if count > 1 and count * 2 >= self.size
+        ]
+        if not terms:
+            return f"Watch Later {self.cluster_id + 1}"
+        return " · ".join(
+            term.upper() if len(term) <= 3 else term.title() for term in terms
+        )
+
+    def to_dict(self) -> dict:
+        top_features = sorted(
+            self.centroid.items(), key=lambda feature: feature[1], reverse=True
+        )[:MAX_CENTROID_FEATURES]
+        return {
+            "cluster_id": self.cluster_id,
+            "size": self.size,
+            "centroid": {str(index): round(value, 6) for index, value in top_features},
+            "terms": dict(self.terms.most_common(MAX_CLUSTER_TERMS)),
+            "channels": dict(self.channels.most_common(MAX_CLUSTER_TERMS)),
+            "unsorted": self.unsorted,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Cluster":
+        return cls(
+            data["cluster_id"],
+            centroid={int(index): value for index, value in data["centroid"].items()},
+            size=data["size"],
+            terms=data.get("terms"),
+            channels=data.get("channels"),
+            unsorted=data.get("unsorted", False),
+        )
+
+
+class ClusterState:
+    """The clusters of one library and the cluster of every video in it"""
+
+    def __init__(self, threshold: float, max_clusters: int):
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self.clusters: List[Cluster] = []
+        self.videos: Dict[str, dict] = {}
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self.videos
+
+    def _nearest(self, vector: SparseVector) -> Tuple[Optional[Cluster], float]:
+        best, best_score = None, -1.0
+        for cluster in self.clusters:
+            if cluster.unsorted:
+                continue
+            score = cluster.similarity(vector)
+            if score > best_score:
+                best, best_score = cluster, score
+        return best, best_score
+
+    def _unsorted(self) -> Cluster:
+        for cluster in self.clusters:
+            if cluster.unsorted:
+                return cluster
+        cluster = Cluster(len(self.clusters), unsorted=True)
+        self.clusters.append(cluster)
+        return cluster
+
+    def assign(self, items: Iterable[WatchLaterItem]) -> int:
+        """Place videos not yet in the state; returns how many were placed"""
+        placed = 0
+        for item in items:
+            if item.video_id in self.videos:
+                continue
+            vector = vectorize(item)
+            if not vector:
+                cluster = self._unsorted()
+            else:
+                cluster, score = self._nearest(vector)
+                if cluster is None or (
+                    score < self.threshold and len(self.clusters) < self.max_clusters
+                ):
+                    cluster = Cluster(len(self.clusters))
+                    self.clusters.append(cluster)
+            cluster.add(item, vector)
+            self.videos[item.video_id] = {
+                "title": item.title,
+                "channel_title": item.channel_title,
+                "added_at": item.added_at,
+                "cluster_id": cluster.cluster_id,
+            }
+            placed += 1
+        return placed
+
+    def members(self) -> Dict[int, List[str]]:
+        """Video IDs of each cluster, in the order they were added"""
+        members: Dict[int, List[str]] = {c.cluster_id: [] for c in self.clusters}
+        for video_id, video in self.videos.items():
+            members[video["cluster_id"]].append(video_id)
+        return members
+
+    def to_dict(self) -> dict:
+        return {
+            "version": 1,
+            "clusters": [cluster.to_dict() for cluster in self.clusters],
+            "videos": self.videos,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, threshold: float, max_clusters: int):
+        state = cls(threshold, max_clusters)
+        state.clusters = [Cluster.from_dict(c) for c in data.get("clusters", [])]
+        state.videos = data.get("videos", {})
+        return state
@@ -0,0 +1,53 @@
+"""
+Watch Later Organizer agent models
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from core.models import BaseResponse, ExtractedLink
+
+
+class WatchLaterItem(BaseModel):
+    """One video of a Watch Later export"""
+
+    video_id: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    channel_title: Optional[str] = None
+    added_at: Optional[str] = None
+
+
+class ClusterSummary(BaseModel):
+    """A proposed collection and how many videos it holds"""
+
+    cluster_id: int
+    name: str
+    total_videos: int
+
+
+class WatchLaterImportResponse(BaseResponse):
+    """Response model for a Watch Later import"""
+
+    library_id: str
+    total_videos: int
+    new_videos: int
+    # Videos already organized by an earlier import, left where they were
+    unchanged_videos: int
+    clusters: List[ClusterSummary]
+
+
+class WatchLaterCollection(BaseModel):
+    """A collection ready to be created from one cluster"""
+
+    name: str
+    links: List[ExtractedLink]
+
+
+class WatchLaterCollectionsResponse(BaseResponse):
+    """Response model for the organized collections of a library"""
+
+    library_id: str
+    total_videos: int
+    collections: List[WatchLaterCollection]
@@ -0,0 +1,103 @@
+"""
+Watch Later Organizer API routes
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
+
+from core.limiter import limiter
+from core.models import AgentStatus, HealthResponse
+
+from .models import WatchLaterCollectionsResponse, WatchLaterImportResponse
+from .service import watch_later_organizer_service
+from .takeout import detect_format
+
+# Create router for this agent
+router = APIRouter(prefix="/watch-later-organizer", tags=["Watch Later Organizer"])
+
+ERROR_STATUS_CODES = {
+    "INVALID_LIBRARY": 400,
+    "INVALID_EXPORT": 400,
+    "NOT_FOUND": 404,
+    "FETCH_ERROR": 502,
+}
+
+# Bytes read from the upload per step of the streaming parser
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _raise_for(error) -> None:
+    status_code = ERROR_STATUS_CODES.get(error.error_code, 500)
+    raise HTTPException(status_code=status_code, detail=error.dict())
+
+
+async def _import(library_id: Optional[str], file: UploadFile):
+    async def chunks():
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+    result, error = await watch_later_organizer_service.import_export(
+        library_id,
+        chunks(),
+        detect_format(file.filename or "", file.content_type),
+    )
+    if error:
+        _raise_for(error)
+    return result
+
+
+@router.post("/import", response_model=WatchLaterImportResponse)
+@limiter.limit("6/minute")
+async def import_new_library(
+    request: Request,
+    file: UploadFile = File(..., description="Takeout Watch Later CSV or JSON"),
+):
+    """
+    Import a Google Takeout Watch Later export into a new library.
+
+    The response's ``library_id`` is random; use it for later imports and to
+    get the collections.
+    """
+    return await _import(None, file)
+
+
+@router.post("/{library_id}/import", response_model=WatchLaterImportResponse)
+@limiter.limit("6/minute")
+async def import_watch_later(
+    request: Request,
+    library_id: str,
+    file: UploadFile = File(..., description="Takeout Watch Later CSV or JSON"),
+):
+    """
+    Import a Google Takeout Watch Later export into an existing library.
+
+    This endpoint:
+    - Streams the CSV or JSON export instead of loading it whole
+    - Looks up titles for videos the export lists by ID only
+    - Places only videos new to the library into its clusters; videos from
+      earlier imports keep their collection
+    """
+    return await _import(library_id, file)
+
+
+@router.get("/{library_id}/collections", response_model=WatchLaterCollectionsResponse)
+@limiter.limit("30/minute")
+async def get_watch_later_collections(request: Request, library_id: str):
+    """Get a library's videos grouped into collections ready to be created"""
+    result, error = await watch_later_organizer_service.get_collections(library_id)
+    if error:
+        _raise_for(error)
+    return result
+
+
+@router.get("/health", response_model=HealthResponse)
+@limiter.exempt
+async def get_health(request: Request):
+    """Health check for the Watch Later Organizer agent"""
+    return HealthResponse(
+        agent="Watch Later Organizer",
+        status=AgentStatus.HEALTHY,
+        description="Ready to organize Watch Later exports",
+        version="1.0.0",
+    )
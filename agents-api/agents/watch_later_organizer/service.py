@@ -0,0 +1,315 @@
+"""
+Watch Later Organizer service
+
+Each library's cluster state is a JSON file under WATCH_LATER_STATE_DIR, with
+the most recently used libraries also kept in memory. The files are local to
+this process and imports are only serialized within it, so the agent must run
+as a single instance (or every instance must route a library to the same one).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import requests
+
+from agents import get_runtime
+from config.settings import settings
+from core.agent_runtime import AgentTimeout
+from core.models import ErrorResponse, ExtractedLink
+
+from ..youtube_extractor.sources import MetadataSource, create_metadata_source
+from .clustering import ClusterState
+from .models import (
+    ClusterSummary,
+    WatchLaterCollection,
+    WatchLaterCollectionsResponse,
+    WatchLaterImportResponse,
+    WatchLaterItem,
+)
+from .takeout import TakeoutFormatError, iter_csv_items, iter_json_items
+
+logger = logging.getLogger(__name__)
+
+# Imports into one library run one at a time; libraries share a fixed set of
+# locks so the lock table never grows
+LOCK_STRIPES = 64
+
+
+def _valid_library_id(library_id: str) -> bool:
+    """Library IDs are the UUIDs this service issues; nothing else is a path"""
+    try:
+        return str(uuid.UUID(library_id)) == library_id
+    except ValueError:
+        return False
+
+
+class WatchLaterOrganizerService:
+    """Service for organizing Watch Later exports into collections"""
+
+    def __init__(self, source: Optional[MetadataSource] = None):
+        self.source = source or create_metadata_source()
+        self.state_dir = settings.watch_later_state_dir
+        # library_id -> state, least recently used first; the files are the
+        # source of truth, so dropping an entry only costs a re-read
+        self._states: "OrderedDict[str, ClusterState]" = OrderedDict()
+        self._locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
+
+    async def import_export(
+        self,
+        library_id: Optional[str],
+        chunks: AsyncIterator[bytes],
+        export_format: str,
+    ) -> Tuple[Optional[WatchLaterImportResponse], Optional[ErrorResponse]]:
+        """
+        Add the videos of a Watch Later export to a library's clusters
+
+        Args:
+            library_id: ID returned by an earlier import, or None to start a
+                new library
+            chunks: The uploaded export as a stream of byte chunks
+            export_format: "csv" or "json"
+
+        Returns:
+            Tuple of (response, error) - one will be None
+        """
+        created = library_id is None
+        if created:
+            library_id = str(uuid.uuid4())
+        elif not _valid_library_id(library_id):
+            return None, _invalid_library()
+
+        runtime = get_runtime("watch_later_organizer")
+        parse = iter_json_items if export_format == "json" else iter_csv_items
+        try:
+            async with self._lock(library_id):
+                state = await self._load(library_id, create=created)
+                if state is None:
+                    return None, _library_not_found(library_id)
+
+                # Only videos the library has not seen are kept from the stream
+                new_items: Dict[str, WatchLaterItem] = {}
+                total_videos = len(state.videos)
+                async for item in parse(chunks):
+                    if item.video_id in state or item.video_id in new_items:
+                        continue
+                    if total_videos >= settings.watch_later_max_videos:
+                        break
+                    new_items[item.video_id] = item
+                    total_videos += 1
+
+                items = await self._with_metadata(list(new_items.values()))
+                try:
+                    placed = await runtime.run(state.assign, items)
+                    if placed or created:
+                        await runtime.run(self._save, library_id, state)
+                except BaseException:
+                    # A timed-out worker thread may still be changing this
+                    # state; the next import starts again from the saved file
+                    self._states.pop(library_id, None)
+                    raise
+
+                members = state.members()
+                clusters = [
+                    ClusterSummary(
+                        cluster_id=cluster.cluster_id,
+                        name=cluster.name,
+                        total_videos=len(members[cluster.cluster_id]),
+                    )
+                    for cluster in state.clusters
+                ]
+                return (
+                    WatchLaterImportResponse(
+                        success=True,
+                        message=f"Organized {placed} new videos",
+                        library_id=library_id,
+                        total_videos=len(state.videos),
+                        new_videos=placed,
+                        unchanged_videos=len(state.videos) - placed,
+                        clusters=clusters,
+                    ),
+                    None,
+                )
+
+        except AgentTimeout:
+            raise
+        except TakeoutFormatError as e:
+            return None, ErrorResponse(
+                error="Invalid export", details=str(e), error_code="INVALID_EXPORT"
+            )
+        except requests.exceptions.RequestException:
+            # The error text can include request details; it stays in our logs
+            logger.exception("Fetching video metadata failed")
+            return None, ErrorResponse(
+                error="Failed to fetch video metadata",
+                details="The YouTube Data API request failed",
+                error_code="FETCH_ERROR",
+            )
+        except Exception as e:
+            return None, ErrorResponse(
+                error="Import failed", details=str(e), error_code="PROCESSING_ERROR"
+            )
+
+    async def get_collections(
+        self, library_id: str
+    ) -> Tuple[Optional[WatchLaterCollectionsResponse], Optional[ErrorResponse]]:
+        """Return a library's clusters as collections ready to be created"""
+        if not _valid_library_id(library_id):
+            return None, _invalid_library()
+
+        async with self._lock(library_id):
+            state = await self._load(library_id)
+        if state is None or not state.videos:
+            return None, _library_not_found(library_id)
+
+        collections = []
+        leftovers: List[ExtractedLink] = []
+        members = state.members()
+        for cluster in state.clusters:
+            links = [
+                _video_link(video_id, state.videos[video_id])
+                for video_id in members[cluster.cluster_id]
+            ]
+            # Clusters too small to be a collection of their own are pooled
+            if len(links) < settings.min_bookmarks_per_category:
+                leftovers.extend(links)
+            else:
+                collections.append(WatchLaterCollection(name=cluster.name, links=links))
+        if leftovers:
+            collections.append(
+                WatchLaterCollection(name="Other Watch Later videos", links=leftovers)
+            )
+
+        return (
+            WatchLaterCollectionsResponse(
+                success=True,
+                message=f"Organized {len(state.videos)} videos into "
+                f"{len(collections)} collections",
+                library_id=library_id,
+                total_videos=len(state.videos),
+                collections=collections,
+            ),
+            None,
+        )
+
+    async def _with_metadata(self, items: List[WatchLaterItem]) -> List[WatchLaterItem]:
+        """Fill in titles the export lacks (Takeout CSVs only carry IDs)"""
+        missing = [item.video_id for item in items if not item.title]
+        if not missing:
+            return items
+
+        runtime = get_runtime("watch_later_organizer")
+        batch_size = self.source.batch_size
+        batches = await asyncio.gather(
+            *(
+                runtime.run(self.source.fetch_videos, missing[i : i + batch_size])
+                for i in range(0, len(missing), batch_size)
+            )
+        )
+        metadata = {k: v for batch in batches for k, v in batch.items()}
+
+        enriched = []
+        for item in items:
+            video = metadata.get(item.video_id)
+            if video is not None and not item.title:
+                item = item.model_copy(
+                    update={
+                        "title": video.title,
+                        "description": video.description,
+                        "channel_title": item.channel_title or video.channel_title,
+                    }
+                )
+            enriched.append(item)
+        return enriched
+
+    def _lock(self, library_id: str) -> asyncio.Lock:
+        # crc32 rather than hash(): stable, and spread well over UUIDs
+        return self._locks[zlib.crc32(library_id.encode()) % len(self._locks)]
+
+    def _path(self, library_id: str) -> str:
+        return os.path.join(self.state_dir, f"{library_id}.json")
+
+    async def _load(
+        self, library_id: str, create: bool = False
+    ) -> Optional[ClusterState]:
+        """Return a library's state, or None when it does not exist"""
+        state = self._states.get(library_id)
+        if state is not None:
+            self._states.move_to_end(library_id)
+            return state
+
+        if create:
+            state = ClusterState(
+                settings.watch_later_similarity_threshold,
+                settings.watch_later_max_clusters,
+            )
+        else:
+            state = await get_runtime("watch_later_organizer").run(
+                self._read, library_id
+            )
+            if state is None:
+                return None
+        self._states[library_id] = state
+        while len(self._states) > settings.watch_later_cache_size:
+            self._states.popitem(last=False)
+        return state
+
+    def _read(self, library_id: str) -> Optional[ClusterState]:
+        threshold = settings.watch_later_similarity_threshold
+        max_clusters = settings.watch_later_max_clusters
+        try:
+            with open(self._path(library_id), encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        return ClusterState.from_dict(data, threshold, max_clusters)
+
+    def _save(self, library_id: str, state: ClusterState) -> None:
+        """Write the state atomically, so a crash never leaves half a file"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._path(library_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state.to_dict(), f, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+
+def _invalid_library() -> ErrorResponse:
+    return ErrorResponse(
+        error="Invalid library ID",
+        details="Use the library ID returned by the first import",
+        error_code="INVALID_LIBRARY",
+    )
+
+
+def _library_not_found(library_id: str) -> ErrorResponse:
+    return ErrorResponse(
+        error="Library not found",
+        details=f"No Watch Later export has been imported into {library_id}",
+        error_code="NOT_FOUND",
+    )
+
+
+def _video_link(video_id: str, video: dict) -> ExtractedLink:
+    return ExtractedLink(
+        url=f"https://www.youtube.com/watch?v={video_id}",
+        title=video.get("title") or video_id,
+        description=video.get("channel_title"),
+        domain="www.youtube.com",
+        metadata={"video_id": video_id, "added_at": video.get("added_at")},
+    )
+
+
+def health_probe() -> bool:
+    """The agent needs a metadata source and a writable state directory"""
+    os.makedirs(watch_later_organizer_service.state_dir, exist_ok=True)
+    return os.access(watch_later_organizer_service.state_dir, os.W_OK)
+
+
+# Global instance
+watch_later_organizer_service = WatchLaterOrganizerService()
@@ -0,0 +1,157 @@
+"""
+Streaming parsers for Google Takeout Watch Later exports.
+
+Takeout writes the playlist as CSV ("Video ID,Playlist Video Creation
+Timestamp", older exports prefix a playlist metadata block and use "Video
+Id,Time Added") or, in older exports, as a JSON array of playlistItem
+resources. Both parsers take the upload as an async stream of byte chunks and
+yield one ``WatchLaterItem`` at a time, so a large export is never held in
+memory as a whole.
+"""
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional
+
+from .models import WatchLaterItem
+
+# Header names (lowercased) that carry each field, across export versions
+_CSV_COLUMNS = {
+    "video_id": ("video id", "video_id", "videoid"),
+    "added_at": ("playlist video creation timestamp", "time added", "added_at"),
+    "title": ("title", "video title"),
+    "channel_title": ("channel", "channel title", "channel_title"),
+}
+
+
+# Largest JSON element accepted; anything bigger is not a playlist item
+MAX_ELEMENT_CHARS = 1_000_000
+
+
+class TakeoutFormatError(ValueError):
+    """Raised when an upload is not a Watch Later export"""
+
+
+async def _decode(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode UTF-8 chunks, handling characters split across chunk boundaries"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buffer = ""
+    async for text in _decode(chunks):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+def _column_map(header: List[str]) -> Optional[Dict[str, int]]:
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in _CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    return columns if "video_id" in columns else None
+
+
+async def iter_csv_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[WatchLaterItem]:
+    """Yield the videos of a Takeout CSV, skipping any metadata block"""
+    columns = None
+    async for line in _lines(chunks):
+        if not line.strip():
+            continue
+        row = next(csv.reader([line]))
+        if columns is None:
+            # Rows before the video header describe the playlist itself
+            columns = _column_map(row)
+            continue
+        values = {
+            field: row[index].strip()
+            for field, index in columns.items()
+            if index < len(row) and row[index].strip()
+        }
+        if values.get("video_id"):
+            yield WatchLaterItem(**values)
+    if columns is None:
+        raise TakeoutFormatError("No 'Video ID' column found in the CSV export")
+
+
+def _item_from_json(entry: dict) -> Optional[WatchLaterItem]:
+    """Map a playlistItem resource (or a flat video record) to an item"""
+    snippet = entry.get("snippet") or {}
+    details = entry.get("contentDetails") or {}
+    video_id = (
+        details.get("videoId")
+        or (snippet.get("resourceId") or {}).get("videoId")
+        or entry.get("videoId")
+        or entry.get("video_id")
+    )
+    if not video_id:
+        return None
+    return WatchLaterItem(
+        video_id=video_id,
+        title=snippet.get("title") or entry.get("title"),
+        description=snippet.get("description") or entry.get("description"),
+        channel_title=snippet.get("videoOwnerChannelTitle")
+        or entry.get("channel_title"),
+        added_at=snippet.get("publishedAt") or entry.get("added_at"),
+    )
+
+
+async def iter_json_items(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[WatchLaterItem]:
+    """Yield the videos of a JSON array export, decoding one element at a time"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = finished = False
+    async for text in _decode(chunks):
+        buffer = buffer[position:] + text
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer) or finished:
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise TakeoutFormatError("Expected a JSON array of videos")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                finished = True
+                break
+            try:
+                entry, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk
+                if len(buffer) - position > MAX_ELEMENT_CHARS:
+                    raise TakeoutFormatError("Malformed JSON export")
+                break
+            item = _item_from_json(entry) if isinstance(entry, dict) else None
+            if item is not None:
+                yield item
+    if not finished:
+        raise TakeoutFormatError("The JSON export ended before its closing ']'")
+
+
+def detect_format(filename: str, content_type: Optional[str]) -> str:
+    """Return "json" or "csv" for an upload"""
+    if (filename or "").lower().endswith(".json") or "json" in (content_type or ""):
+        return "json"
+    return "csv"
@@ -0,0 +1,218 @@
+"""
+Tests for Watch Later Organizer agent
+"""
+
+import json
+import uuid
+
+import pytest
+
+from config.settings import settings
+
+from ..youtube_extractor.sources import FixtureSource
+from .clustering import ClusterState
+from .models import WatchLaterItem
+from .service import LOCK_STRIPES, WatchLaterOrganizerService
+from .takeout import TakeoutFormatError, iter_csv_items, iter_json_items
+
+TAKEOUT_CSV = b"""Playlist Id,Channel Id,Time Created,Time Updated,Title,Description
+WL,UCabc,2020-01-01 00:00:00 UTC,2024-01-01 00:00:00 UTC,Watch later,
+
+Video Id,Time Added
+dQw4w9WgXcQ,2024-03-02 16:00:00 UTC
+9bZkp7q19f0,2024-04-11 15:30:00 UTC
+"""
+
+
+def _chunked(data: bytes, size: int):
+    async def chunks():
+        for start in range(0, len(data), size):
+            yield data[start : start + size]
+
+    return chunks()
+
+
+async def _collect(items):
+    return [item async for item in items]
+
+
+def _item(video_id: str, title: str, channel: str) -> WatchLaterItem:
+    return WatchLaterItem(video_id=video_id, title=title, channel_title=channel)
+
+
+class TestTakeoutParsing:
+    """Test suite for the streaming Takeout parsers"""
+
+    @pytest.mark.asyncio
+    async def test_csv_skips_playlist_metadata_block(self):
+        """Test the older CSV layout with a metadata block before the videos"""
+        items = await _collect(iter_csv_items(_chunked(TAKEOUT_CSV, 7)))
+
+        assert [item.video_id for item in items] == ["dQw4w9WgXcQ", "9bZkp7q19f0"]
+        assert items[0].added_at == "2024-03-02 16:00:00 UTC"
+
+    @pytest.mark.asyncio
+    async def test_json_array_split_across_chunks(self):
+        """Test elements are decoded even when chunks cut through them"""
+        export = json.dumps(
+            [
+                {
+                    "snippet": {
+                        "title": "Café tour ☕",
+                        "resourceId": {"videoId": "dQw4w9WgXcQ"},
+                    }
+                },
+                {"contentDetails": {"videoId": "9bZkp7q19f0"}},
+            ],
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+        items = await _collect(iter_json_items(_chunked(export, 5)))
+
+        assert [item.video_id for item in items] == ["dQw4w9WgXcQ", "9bZkp7q19f0"]
+        assert items[0].title == "Café tour ☕"
+
+    @pytest.mark.asyncio
+    async def test_truncated_json_is_rejected(self):
+        """Test an export cut off mid-array is reported, not half-imported"""
+        with pytest.raises(TakeoutFormatError):
+            await _collect(iter_json_items(_chunked(b'[{"videoId": "a"}, {"vi', 8)))
+
+
+class TestClusterState:
+    """Test suite for incremental clustering"""
+
+    def test_similar_videos_share_a_cluster(self):
+        """Test videos on one topic group together and apart from others"""
+        state = ClusterState(threshold=0.3, max_clusters=10)
+        state.assign(
+            [
+                _item("py1", "Python asyncio tutorial", "Code Academy"),
+                _item("py2", "Advanced Python asyncio patterns", "Dev Talks"),
+                _item("bread1", "Sourdough bread recipe", "Home Baking"),
+                _item("bread2", "Easy sourdough bread for beginners", "Kitchen"),
+            ]
+        )
+
+        clusters = {vid: v["cluster_id"] for vid, v in state.videos.items()}
+        assert clusters["py1"] == clusters["py2"]
+        assert clusters["bread1"] == clusters["bread2"]
+        assert clusters["py1"] != clusters["bread1"]
+
+    def test_new_videos_do_not_move_existing_ones(self):
+        """Test an incremental import only places the new videos"""
+        state = ClusterState(threshold=0.3, max_clusters=10)
+        state.assign(
+            _item(f"old{i}", f"Python lesson {i} on asyncio", "Code") for i in range(50)
+        )
+        before = {vid: v["cluster_id"] for vid, v in state.videos.items()}
+
+        restored = ClusterState.from_dict(
+            json.loads(json.dumps(state.to_dict())), 0.3, 10
+        )
+        placed = restored.assign(
+            [_item("old3", "Python lesson 3 on asyncio", "Code")]
+            + [
+                _item(f"new{i}", f"Sourdough bread bake {i}", "Baking")
+                for i in range(20)
+            ]
+        )
+
+        assert placed == 20
+        assert {vid: restored.videos[vid]["cluster_id"] for vid in before} == before
+
+
+class TestWatchLaterOrganizerService:
+    """Test suite for WatchLaterOrganizerService"""
+
+    @pytest.mark.asyncio
+    async def test_import_is_persisted_and_incremental(self, tmp_path):
+        """Test a second import only adds unseen videos, across restarts"""
+        service = WatchLaterOrganizerService(source=FixtureSource())
+        service.state_dir = str(tmp_path)
+
+        result, error = await service.import_export(
+            None, _chunked(TAKEOUT_CSV, 64), "csv"
+        )
+        assert error is None
+        assert result.new_videos == 2
+        library_id = result.library_id
+        assert (tmp_path / f"{library_id}.json").exists()
+
+        # A fresh instance reads the saved state instead of starting over
+        service = WatchLaterOrganizerService(source=FixtureSource())
+        service.state_dir = str(tmp_path)
+        more = TAKEOUT_CSV + b"kJQP7kiw5Fk,2024-05-20 09:00:00 UTC\n"
+        result, error = await service.import_export(
+            library_id, _chunked(more, 64), "csv"
+        )
+        assert error is None
+        assert result.new_videos == 1
+        assert result.unchanged_videos == 2
+
+        collections, error = await service.get_collections(library_id)
+        assert error is None
+        titles = {link.title for c in collections.collections for link in c.links}
+        assert "Weekly reading list #12" in titles
+
+    @pytest.mark.asyncio
+    async def test_library_id_is_validated(self, tmp_path):
+        """Test library IDs cannot escape the state directory"""
+        service = WatchLaterOrganizerService(source=FixtureSource())
+        service.state_dir = str(tmp_path)
+
+        result, error = await service.get_collections("../secrets")
+        assert result is None
+        assert error.error_code == "INVALID_LIBRARY"
+
+    @pytest.mark.asyncio
+    async def test_libraries_are_issued_not_chosen(self, tmp_path):
+        """Test a caller can't start a library under an ID of their choosing"""
+        service = WatchLaterOrganizerService(source=FixtureSource())
+        service.state_dir = str(tmp_path)
+
+        _, error = await service.import_export("demo", _chunked(TAKEOUT_CSV, 64), "csv")
+        assert error.error_code == "INVALID_LIBRARY"
+        _, error = await service.import_export(
+            str(uuid.uuid4()), _chunked(TAKEOUT_CSV, 64), "csv"
+        )
+        assert error.error_code == "NOT_FOUND"
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_states_in_memory_are_bounded(self, tmp_path, monkeypatch):
+        """Test old libraries leave memory but are read back from disk"""
+        monkeypatch.setattr(settings, "watch_later_cache_size", 1)
+        service = WatchLaterOrganizerService(source=FixtureSource())
+        service.state_dir = str(tmp_path)
+
+        first, _ = await service.import_export(None, _chunked(TAKEOUT_CSV, 64), "csv")
+        second, _ = await service.import_export(None, _chunked(TAKEOUT_CSV, 64), "csv")
+        assert list(service._states) == [second.library_id]
+
+        collections, error = await service.get_collections(first.library_id)
+        assert error is None
+        assert collections.total_videos == 2
+        assert len(service._locks) == LOCK_STRIPES
+
+    @pytest.mark.asyncio
+    async def test_failed_import_drops_the_cached_state(self, tmp_path, monkeypatch):
+        """Test a state a failed worker may have touched is re-read from disk"""
+        service = WatchLaterOrganizerService(source=FixtureSource())
+        service.state_dir = str(tmp_path)
+        created, _ = await service.import_export(None, _chunked(TAKEOUT_CSV, 64), "csv")
+
+        def half_done_assign(state, items):
+            state.videos["half-placed"] = {"cluster_id": 0}
+            raise RuntimeError("worker gave up")
+
+        monkeypatch.setattr(ClusterState, "assign", half_done_assign)
+        more = TAKEOUT_CSV + b"kJQP7kiw5Fk,2024-05-20 09:00:00 UTC\n"
+        _, error = await service.import_export(
+            created.library_id, _chunked(more, 64), "csv"
+        )
+        assert error.error_code == "PROCESSING_ERROR"
+        assert created.library_id not in service._states
+
+        collections, _ = await service.get_collections(created.library_id)
+        assert collections.total_videos == 2
@@ -1 +1,19 @@
-# YouTube Link Extractor Agent - Coming Soon
+"""
+YouTube Link Extractor Agent
+"""
+
+from core.agent_runtime import AgentSpec
+
+# Metadata pulls are blocking API calls, one per batch of videos
+AGENT = AgentSpec(
+    key="youtube_extractor",
+    name="YouTube Link Extractor",
+    description="Extract links from YouTube video descriptions",
+    module="agents.youtube_extractor.routes",
+    path="/youtube-extractor",
+    max_concurrency=8,
+    executor="thread",
+    pool_size=8,
+    timeout=60.0,
+    health_probe="agents.youtube_extractor.service:health_probe",
+)
@@ -0,0 +1,65 @@
+"""
+YouTube Link Extractor agent models
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from core.models import BaseResponse, ExtractedLink
+
+
+class VideoMetadata(BaseModel):
+    """Video details as returned by a metadata source"""
+
+    video_id: str
+    title: Optional[str] = None
+    description: str = ""
+    channel_title: Optional[str] = None
+    published_at: Optional[datetime] = None
+
+
+class YouTubeLinkRequest(BaseModel):
+    """Request model for YouTube description link extraction"""
+
+    video_ids: List[str] = Field(
+        default_factory=list,
+        description="Video IDs or video URLs (watch, youtu.be, shorts)",
+        max_length=500,
+    )
+    playlist_id: Optional[str] = Field(
+        None, description="Playlist ID or URL whose videos should be included"
+    )
+    collection_name: Optional[str] = Field(
+        None, description="Name for the new collection"
+    )
+
+    @model_validator(mode="after")
+    def check_videos_or_playlist(self):
+        if not self.video_ids and not self.playlist_id:
+            raise ValueError("Provide video_ids, a playlist_id, or both")
+        return self
+
+
+class VideoLinks(BaseModel):
+    """Links found in one video's description"""
+
+    video_id: str
+    video_url: str
+    title: Optional[str] = None
+    channel_title: Optional[str] = None
+    links: List[ExtractedLink]
+
+
+class YouTubeLinkResponse(BaseResponse):
+    """Response model for YouTube description link extraction"""
+
+    collection_name: str
+    total_videos: int
+    total_links_found: int
+    videos: List[VideoLinks]
+    # Links across all videos, deduplicated, in first-seen order
+    extracted_links: List[ExtractedLink]
+    # Requested videos the source did not return (private, deleted, bad IDs)
+    missing_video_ids: List[str] = Field(default_factory=list)
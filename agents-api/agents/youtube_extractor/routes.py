@@ -0,0 +1,58 @@
+"""
+YouTube Link Extractor API routes
+"""
+
+from fastapi import APIRouter, HTTPException, Request
+
+from core.limiter import limiter
+from core.models import AgentStatus, HealthResponse
+
+from .models import YouTubeLinkRequest, YouTubeLinkResponse
+from .service import youtube_extractor_service
+
+# Create router for this agent
+router = APIRouter(prefix="/youtube-extractor", tags=["YouTube Link Extractor"])
+
+ERROR_STATUS_CODES = {
+    "INVALID_VIDEO_ID": 400,
+    "INVALID_PLAYLIST": 400,
+    "FETCH_ERROR": 502,
+}
+
+
+@router.post("/", response_model=YouTubeLinkResponse)
+@limiter.limit("20/minute")
+async def extract_youtube_links(request: Request, payload: YouTubeLinkRequest):
+    """
+    Extract links from YouTube video descriptions for collection creation.
+
+    This agent:
+    - Accepts video IDs or URLs and/or a playlist ID or URL
+    - Pulls video metadata in batches, concurrently, reusing cached videos
+    - Extracts links from each description and filters duplicates and noise
+    - Returns per-video links and a merged list ready for collection creation
+    """
+
+    result, error = await youtube_extractor_service.extract_links(
+        video_ids=payload.video_ids,
+        playlist_id=payload.playlist_id,
+        collection_name=payload.collection_name,
+    )
+
+    if error:
+        status_code = ERROR_STATUS_CODES.get(error.error_code, 500)
+        raise HTTPException(status_code=status_code, detail=error.dict())
+
+    return result
+
+
+@router.get("/health", response_model=HealthResponse)
+@limiter.exempt
+async def get_health(request: Request):
+    """Health check for the YouTube Link Extractor agent"""
+    return HealthResponse(
+        agent="YouTube Link Extractor",
+        status=AgentStatus.HEALTHY,
+        description="Ready to extract links from video descriptions",
+        version="1.0.0",
+    )
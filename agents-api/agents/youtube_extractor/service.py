@@ -0,0 +1,306 @@
+"""
+YouTube Link Extractor service
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from agents import get_runtime
+from config.settings import settings
+from core.agent_runtime import AgentTimeout
+from core.metrics import CACHE_REQUESTS
+from core.models import ErrorResponse, ExtractedLink
+from core.urlnorm import canonicalize_url
+from core.utils import clean_text, get_domain_from_url, is_valid_url, should_skip_url
+
+from .models import VideoLinks, VideoMetadata, YouTubeLinkResponse
+from .sources import MetadataSource, create_metadata_source
+
+logger = logging.getLogger(__name__)
+
+# Descriptions are plain text: URLs are found by pattern, not by parsing markup
+_URL_RE = re.compile(r"\b(?:https?://|www\.)[^\s<>\"'`]+", re.IGNORECASE)
+# Punctuation that ends a sentence rather than a URL
+_TRAILING_PUNCTUATION = ".,;:!?*'\""
+_BRACKETS = {")": "(", "]": "[", "}": "{"}
+# Separators between a label and its URL, e.g. "Gear list -> https://..."
+_LABEL_STRIP = " \t-–—:|•·→>=*(["
+
+_VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_PLAYLIST_ID_RE = re.compile(r"^[A-Za-z0-9_-]{10,}$")
+_VIDEO_PATH_PREFIXES = ("/shorts/", "/embed/", "/live/", "/v/")
+
+
+def parse_video_id(value: str) -> Optional[str]:
+    """Return the video ID in a bare ID or a watch, youtu.be or shorts URL"""
+    value = value.strip()
+    if _VIDEO_ID_RE.match(value):
+        return value
+    parsed = urlparse(value if "://" in value else f"https://{value}")
+    host = parsed.netloc.lower()
+    candidate = None
+    if host.endswith("youtu.be"):
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        if parsed.path == "/watch":
+            candidate = parse_qs(parsed.query).get("v", [""])[0]
+        else:
+            for prefix in _VIDEO_PATH_PREFIXES:
+                if parsed.path.startswith(prefix):
+                    candidate = parsed.path[len(prefix) :].split("/")[0]
+    if candidate and _VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def parse_playlist_id(value: str) -> Optional[str]:
+    """Return the playlist ID in a bare ID or any URL with a ``list`` parameter"""
+    value = value.strip()
+    if "list=" in value:
+        value = parse_qs(urlparse(value).query).get("list", [""])[0]
+    return value if _PLAYLIST_ID_RE.match(value) else None
+
+
+def _trim_url(url: str) -> str:
+    """Drop trailing punctuation and brackets that close text around the URL"""
+    while url:
+        last = url[-1]
+        if last in _TRAILING_PUNCTUATION:
+            url = url[:-1]
+        elif last in _BRACKETS and url.count(_BRACKETS[last]) < url.count(last):
+            url = url[:-1]
+        else:
+            break
+    return url
+
+
+def linkify(text: str) -> List[dict]:
+    """
+    Find URLs in plain text.
+
+    Each result has the URL and the text before the first URL on its line as
+    a label, which in descriptions is usually what the link is
+    ("Gear list: https://...").
+    """
+    links = []
+    for line in text.splitlines():
+        matches = list(_URL_RE.finditer(line))
+        if not matches:
+            continue
+        prefix = line[: matches[0].start()]
+        label = clean_text(prefix, max_length=200).strip(_LABEL_STRIP)
+        for match in matches:
+            url = _trim_url(match.group(0))
+            if url.lower().startswith("www."):
+                url = f"https://{url}"
+            links.append({"url": url, "label": label})
+    return links
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class YouTubeLinkExtractorService:
+    """Service for extracting links from YouTube video descriptions"""
+
+    def __init__(self, source: Optional[MetadataSource] = None):
+        self.source = source or create_metadata_source()
+        # Per-video results, least recently used first: (expires_at, links)
+        self._cache: "OrderedDict[str, Tuple[float, VideoLinks]]" = OrderedDict()
+
+    async def extract_links(
+        self,
+        video_ids: List[str],
+        playlist_id: Optional[str] = None,
+        collection_name: Optional[str] = None,
+    ) -> Tuple[Optional[YouTubeLinkResponse], Optional[ErrorResponse]]:
+        """
+        Extract links from the descriptions of videos and/or a playlist
+
+        Args:
+            video_ids: Video IDs or URLs
+            playlist_id: Optional playlist ID or URL to expand into its videos
+            collection_name: Optional custom collection name
+
+        Returns:
+            Tuple of (response, error) - one will be None
+        """
+        try:
+            requested, invalid = [], []
+            for value in video_ids:
+                video_id = parse_video_id(value)
+                if video_id:
+                    requested.append(video_id)
+                else:
+                    invalid.append(value)
+
+            if playlist_id:
+                parsed_playlist_id = parse_playlist_id(playlist_id)
+                if not parsed_playlist_id:
+                    return None, ErrorResponse(
+                        error="Invalid playlist",
+                        details="The provided playlist ID or URL is not valid",
+                        error_code="INVALID_PLAYLIST",
+                    )
+                requested.extend(
+                    await get_runtime("youtube_extractor").run(
+                        self.source.fetch_playlist_video_ids,
+                        parsed_playlist_id,
+                        settings.youtube_max_videos,
+                    )
+                )
+
+            # Keep the first occurrence of each video, up to the per-request cap
+            requested = list(dict.fromkeys(requested))[: settings.youtube_max_videos]
+            if not requested:
+                return None, ErrorResponse(
+                    error="No videos",
+                    details="No valid video IDs were given or found in the playlist",
+                    error_code="INVALID_VIDEO_ID",
+                )
+
+            found = await self._get_video_links(requested)
+            videos = [found[video_id] for video_id in requested if video_id in found]
+            missing = invalid + [v for v in requested if v not in found]
+            extracted_links = self._merge_links(videos)
+
+            if not collection_name:
+                if playlist_id and videos and videos[0].channel_title:
+                    collection_name = f"Links from {videos[0].channel_title}"
+                elif len(videos) == 1 and videos[0].title:
+                    collection_name = f"Links from {videos[0].title}"
+                else:
+                    collection_name = f"Links from {len(videos)} YouTube videos"
+
+            result = YouTubeLinkResponse(
+                success=True,
+                message=(
+                    f"Successfully extracted {len(extracted_links)} links "
+                    f"from {len(videos)} videos"
+                ),
+                collection_name=collection_name,
+                total_videos=len(videos),
+                total_links_found=len(extracted_links),
+                videos=videos,
+                extracted_links=extracted_links,
+                missing_video_ids=missing,
+            )
+            return result, None
+
+        except AgentTimeout:
+            raise
+        except requests.exceptions.RequestException:
+            # The error text can include request details; it stays in our logs
+            logger.exception("Fetching video metadata failed")
+            return None, ErrorResponse(
+                error="Failed to fetch video metadata",
+                details="The YouTube Data API request failed",
+                error_code="FETCH_ERROR",
+            )
+        except Exception:
+            logger.exception("Extracting video links failed")
+            return None, ErrorResponse(
+                error="Processing error",
+                details="The videos could not be processed",
+                error_code="PROCESSING_ERROR",
+            )
+
+    async def _get_video_links(self, video_ids: List[str]) -> Dict[str, VideoLinks]:
+        """Return cached results and fetch the rest in concurrent batches"""
+        found: Dict[str, VideoLinks] = {}
+        uncached = []
+        for video_id in video_ids:
+            cached = self._cache_get(video_id)
+            if cached is not None:
+                found[video_id] = cached
+            else:
+                uncached.append(video_id)
+
+        if uncached:
+            # One call per batch; the agent runtime bounds how many run at once
+            runtime = get_runtime("youtube_extractor")
+            batches = await asyncio.gather(
+                *(
+                    runtime.run(self.source.fetch_videos, chunk)
+                    for chunk in _chunks(uncached, self.source.batch_size)
+                )
+            )
+            for batch in batches:
+                for video_id, metadata in batch.items():
+                    video_links = self._links_for_video(metadata)
+                    self._cache_set(video_id, video_links)
+                    found[video_id] = video_links
+        return found
+
+    def _links_for_video(self, metadata: VideoMetadata) -> VideoLinks:
+        """Extract and filter the links in one video's description"""
+        links = []
+        seen_urls = set()
+        for link in linkify(metadata.description):
+            url = link["url"]
+            dedup_key = canonicalize_url(url) or url
+            if dedup_key in seen_urls:
+                continue
+            if not is_valid_url(url) or should_skip_url(url):
+                continue
+            links.append(
+                ExtractedLink(
+                    url=url,
+                    title=link["label"] or None,
+                    domain=get_domain_from_url(url),
+                    metadata={"video_id": metadata.video_id},
+                )
+            )
+            seen_urls.add(dedup_key)
+            if len(links) >= settings.max_links_per_extraction:
+                break
+
+        return VideoLinks(
+            video_id=metadata.video_id,
+            video_url=f"https://www.youtube.com/watch?v={metadata.video_id}",
+            title=metadata.title,
+            channel_title=metadata.channel_title,
+            links=links,
+        )
+
+    def _merge_links(self, videos: List[VideoLinks]) -> List[ExtractedLink]:
+        """Deduplicate links across videos, keeping the first video's copy"""
+        merged = {}
+        for video in videos:
+            for link in video.links:
+                merged.setdefault(canonicalize_url(link.url) or link.url, link)
+        return list(merged.values())
+
+    def _cache_get(self, video_id: str) -> Optional[VideoLinks]:
+        entry = self._cache.get(video_id)
+        if entry is None or entry[0] < time.monotonic():
+            CACHE_REQUESTS.inc("youtube_video", "miss")
+            return None
+        self._cache.move_to_end(video_id)
+        CACHE_REQUESTS.inc("youtube_video", "hit")
+        return entry[1]
+
+    def _cache_set(self, video_id: str, video_links: VideoLinks) -> None:
+        expires_at = time.monotonic() + settings.youtube_cache_ttl
+        self._cache[video_id] = (expires_at, video_links)
+        self._cache.move_to_end(video_id)
+        while len(self._cache) > settings.youtube_cache_size:
+            self._cache.popitem(last=False)
+
+
+def health_probe() -> bool:
+    """The agent needs a metadata source"""
+    return youtube_extractor_service.source is not None
+
+
+# Global instance
+youtube_extractor_service = YouTubeLinkExtractorService()
@@ -0,0 +1,145 @@
+"""
+Video metadata sources for the YouTube Link Extractor.
+
+A source answers two questions in batches: the details of up to
+``batch_size`` videos at once, and the video IDs of a playlist. The YouTube
+Data API source needs YOUTUBE_API_KEY; without it the agent fails to load.
+A JSON fixture can stand in for development and tests, but only when
+YOUTUBE_METADATA_SOURCE=fixture is set explicitly.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from config.settings import settings
+from core.fetcher import PoliteFetcher, fetcher
+
+from .models import VideoMetadata
+
+# Fixture shipped with the agent: {"videos": {id: {...}}, "playlists": {id: [ids]}}
+DEFAULT_FIXTURE_PATH = os.path.join(
+    os.path.dirname(__file__), "fixtures", "videos.json"
+)
+
+
+class MetadataSource:
+    """Interface of a video metadata source"""
+
+    # Largest number of video IDs one fetch_videos call accepts
+    batch_size: int = 50
+
+    def fetch_videos(self, video_ids: Sequence[str]) -> Dict[str, VideoMetadata]:
+        """Return metadata for the given videos; unknown IDs are left out"""
+        raise NotImplementedError
+
+    def fetch_playlist_video_ids(self, playlist_id: str, limit: int) -> List[str]:
+        """Return up to ``limit`` video IDs of a playlist, in playlist order"""
+        raise NotImplementedError
+
+
+class FixtureSource(MetadataSource):
+    """Serves metadata from a local JSON file"""
+
+    def __init__(self, path: str = DEFAULT_FIXTURE_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.videos = {
+            video_id: VideoMetadata(video_id=video_id, **video)
+            for video_id, video in data.get("videos", {}).items()
+        }
+        self.playlists: Dict[str, List[str]] = data.get("playlists", {})
+
+    def fetch_videos(self, video_ids: Sequence[str]) -> Dict[str, VideoMetadata]:
+        return {
+            video_id: self.videos[video_id]
+            for video_id in video_ids
+            if video_id in self.videos
+        }
+
+    def fetch_playlist_video_ids(self, playlist_id: str, limit: int) -> List[str]:
+        return self.playlists.get(playlist_id, [])[:limit]
+
+
+class YouTubeDataAPISource(MetadataSource):
+    """Fetches metadata from the YouTube Data API v3"""
+
+    base_url = "https://www.googleapis.com/youtube/v3"
+
+    def __init__(self, api_key: str, http: Optional[PoliteFetcher] = None):
+        self.api_key = api_key
+        self.http = http or fetcher
+        # The API is metered by quota, not crawled: allow a batch per fetch thread
+        self.http.configure_host(
+            urlparse(self.base_url).netloc, rate=20, burst=20, concurrency=8
+        )
+
+    def _get(self, endpoint: str, params: dict) -> dict:
+        """GET an API endpoint through the shared fetcher"""
+        # The key goes in a header so it never appears in URLs, and with them
+        # in exception messages and logs
+        response = self.http.get(
+            f"{self.base_url}/{endpoint}",
+            params=params,
+            headers={"X-Goog-Api-Key": self.api_key},
+            respect_robots=False,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_videos(self, video_ids: Sequence[str]) -> Dict[str, VideoMetadata]:
+        data = self._get(
+            "videos",
+            {
+                "part": "snippet",
+                "id": ",".join(video_ids[: self.batch_size]),
+                "maxResults": self.batch_size,
+            },
+        )
+        videos = {}
+        for item in data.get("items", []):
+            snippet = item.get("snippet", {})
+            videos[item["id"]] = VideoMetadata(
+                video_id=item["id"],
+                title=snippet.get("title"),
+                description=snippet.get("description") or "",
+                channel_title=snippet.get("channelTitle"),
+                published_at=snippet.get("publishedAt"),
+            )
+        return videos
+
+    def fetch_playlist_video_ids(self, playlist_id: str, limit: int) -> List[str]:
+        video_ids: List[str] = []
+        page_token = None
+        while len(video_ids) < limit:
+            params = {
+                "part": "contentDetails",
+                "playlistId": playlist_id,
+                "maxResults": self.batch_size,
+            }
+            if page_token:
+                params["pageToken"] = page_token
+            data = self._get("playlistItems", params)
+            video_ids.extend(
+                item["contentDetails"]["videoId"] for item in data.get("items", [])
+            )
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+        return video_ids[:limit]
+
+
+def create_metadata_source() -> MetadataSource:
+    """Build the source selected by YOUTUBE_METADATA_SOURCE ("api" by default)"""
+    source = settings.youtube_metadata_source or "api"
+    if source == "api":
+        if not settings.youtube_api_key:
+            raise ValueError(
+                "YouTube API key not configured. "
+                "Set YOUTUBE_API_KEY environment variable"
+            )
+        return YouTubeDataAPISource(settings.youtube_api_key)
+    if source == "fixture":
+        return FixtureSource(settings.youtube_fixture_path or DEFAULT_FIXTURE_PATH)
+    raise ValueError(f"Unknown YOUTUBE_METADATA_SOURCE: {source}")
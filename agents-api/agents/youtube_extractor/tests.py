@@ -0,0 +1,184 @@
+"""
+Tests for YouTube Link Extractor agent
+"""
+
+import pytest
+import requests
+
+from .models import VideoMetadata
+from .service import (
+    YouTubeLinkExtractorService,
+    linkify,
+    parse_playlist_id,
+    parse_video_id,
+)
+from .sources import FixtureSource, MetadataSource, YouTubeDataAPISource
+
+
+class CountingSource(MetadataSource):
+    """Source that synthesizes videos and records each batch it was asked for"""
+
+    batch_size = 50
+
+    def __init__(self):
+        self.batches = []
+
+    def fetch_videos(self, video_ids):
+        self.batches.append(list(video_ids))
+        return {
+            video_id: VideoMetadata(
+                video_id=video_id,
+                title=f"Video {video_id}",
+                description=f"Notes: https://example.com/notes/{video_id}",
+            )
+            for video_id in video_ids
+        }
+
+    def fetch_playlist_video_ids(self, playlist_id, limit):
+        return []
+
+
+class ForbiddenFetcher:
+    """Polite-fetcher stand-in answering every GET with a 403"""
+
+    def __init__(self):
+        self.calls = []
+
+    def configure_host(self, host, **limits):
+        pass
+
+    def get(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        response = requests.Response()
+        response.status_code = 403
+        response.reason = "Forbidden"
+        response.url = (
+            requests.Request("GET", url, params=kwargs["params"]).prepare().url
+        )
+        response._content = b"{}"
+        response._content_consumed = True
+        return response
+
+
+class BrokenSource(CountingSource):
+    """Source failing with an error whose text must not reach the client"""
+
+    def fetch_videos(self, video_ids):
+        raise ValueError("unexpected payload at /internal/cache/AIza-secret")
+
+
+class TestYouTubeLinkExtractorService:
+    """Test suite for YouTubeLinkExtractorService"""
+
+    def setup_method(self):
+        """Setup test instance"""
+        self.service = YouTubeLinkExtractorService(source=FixtureSource())
+
+    def test_parse_video_id(self):
+        """Test video IDs are read from bare IDs and common URL forms"""
+        assert parse_video_id("dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+        assert parse_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42") == (
+            "dQw4w9WgXcQ"
+        )
+        assert parse_video_id("https://youtu.be/dQw4w9WgXcQ?si=abc") == "dQw4w9WgXcQ"
+        assert parse_video_id("youtube.com/shorts/dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+        assert parse_video_id("https://example.com/watch?v=dQw4w9WgXcQ") is None
+        assert parse_video_id("not a video") is None
+
+    def test_parse_playlist_id(self):
+        """Test playlist IDs are read from bare IDs and list= URLs"""
+        url = "https://www.youtube.com/playlist?list=PLcur8tDemoHomeLab"
+        assert parse_playlist_id(url) == "PLcur8tDemoHomeLab"
+        assert parse_playlist_id("PLcur8tDemoHomeLab") == "PLcur8tDemoHomeLab"
+        assert parse_playlist_id("bad id") is None
+
+    def test_linkify_trims_punctuation_and_keeps_labels(self):
+        """Test URLs in plain text are found without surrounding punctuation"""
+        links = linkify(
+            "Gear list: https://kit.co/demo.\n"
+            "Follow me (https://twitter.com/demo) and www.cur8t.com!\n"
+            "Wiki: https://en.wikipedia.org/wiki/Bash_(Unix_shell)"
+        )
+
+        assert [link["url"] for link in links] == [
+            "https://kit.co/demo",
+            "https://twitter.com/demo",
+            "https://www.cur8t.com",
+            "https://en.wikipedia.org/wiki/Bash_(Unix_shell)",
+        ]
+        assert links[0]["label"] == "Gear list"
+
+    @pytest.mark.asyncio
+    async def test_extract_links_from_playlist(self):
+        """Test a playlist is expanded and links are merged across videos"""
+        result, error = await self.service.extract_links(
+            video_ids=["https://youtu.be/dQw4w9WgXcQ", "zzzzzzzzzzz"],
+            playlist_id="https://www.youtube.com/playlist?list=PLcur8tDemoHomeLab",
+        )
+
+        assert error is None
+        assert result.total_videos == 4
+        assert result.missing_video_ids == ["zzzzzzzzzzz"]
+        assert result.collection_name == "Links from Cur8t Demo Channel"
+
+        urls = [link.url for link in result.extracted_links]
+        # The gear list appears in two videos but is listed once
+        assert urls.count("https://kit.co/cur8tdemo/home-lab") == 1
+        # Links to files are filtered
+        assert "https://example.com/slides.pdf" not in urls
+        assert result.total_links_found == len(urls)
+
+    @pytest.mark.asyncio
+    async def test_metadata_is_fetched_in_batches_and_cached(self):
+        """Test many videos cost one source call per batch, and none when cached"""
+        source = CountingSource()
+        service = YouTubeLinkExtractorService(source=source)
+        video_ids = [f"video{i:06d}" for i in range(120)]
+
+        result, error = await service.extract_links(video_ids=video_ids)
+        assert error is None
+        assert result.total_videos == 120
+        assert sorted(len(batch) for batch in source.batches) == [20, 50, 50]
+
+        source.batches.clear()
+        result, error = await service.extract_links(video_ids=video_ids[:10])
+        assert error is None
+        assert result.total_videos == 10
+        assert source.batches == []
+
+    @pytest.mark.asyncio
+    async def test_invalid_playlist(self):
+        """Test an unparseable playlist is rejected"""
+        result, error = await self.service.extract_links(
+            video_ids=[], playlist_id="bad id"
+        )
+
+        assert result is None
+        assert error.error_code == "INVALID_PLAYLIST"
+
+    @pytest.mark.asyncio
+    async def test_api_key_is_not_leaked(self):
+        """Test the key is sent as a header and API errors don't echo request URLs"""
+        http = ForbiddenFetcher()
+        source = YouTubeDataAPISource("AIza-secret", http=http)
+        service = YouTubeLinkExtractorService(source=source)
+
+        result, error = await service.extract_links(video_ids=["dQw4w9WgXcQ"])
+
+        assert result is None
+        assert error.error_code == "FETCH_ERROR"
+        assert "AIza-secret" not in error.model_dump_json()
+        url, kwargs = http.calls[0]
+        assert "key" not in kwargs["params"]
+        assert kwargs["headers"] == {"X-Goog-Api-Key": "AIza-secret"}
+
+    @pytest.mark.asyncio
+    async def test_unexpected_errors_are_not_echoed(self):
+        """Test a processing failure answers with a fixed message"""
+        service = YouTubeLinkExtractorService(source=BrokenSource())
+
+        result, error = await service.extract_links(video_ids=["dQw4w9WgXcQ"])
+
+        assert result is None
+        assert error.error_code == "PROCESSING_ERROR"
+        assert "AIza-secret" not in error.model_dump_json()
@@ -0,0 +1,44 @@
+"""
+Benchmarks for link extraction on saved article pages
+"""
+
+import pytest
+from bs4 import BeautifulSoup
+
+from agents.article_extractor.service import ArticleLinkExtractorService
+from config.settings import settings
+from conftest import check_memory, load_page
+
+BASE_URL = "https://example.dev/posts/tail-latency"
+# name -> (minimum links found, peak memory budget for the whole extraction)
+PAGES = {
+    "article_longform.html": (120, 2 * 1024 * 1024),
+    "article_roundup.html": (800, 8 * 1024 * 1024),
+}
+
+
+@pytest.fixture(scope="module")
+def service():
+    return ArticleLinkExtractorService()
+
+
+@pytest.mark.parametrize("page", sorted(PAGES))
+def bench_extract_all_links(benchmark, service, page):
+    soup = BeautifulSoup(load_page(page), "html.parser")
+    links = benchmark(service._extract_all_links, soup, BASE_URL)
+    assert len(links) >= PAGES[page][0]
+
+
+@pytest.mark.parametrize("page", sorted(PAGES))
+def bench_parse_and_filter(benchmark, service, page):
+    """Whole extraction after the fetch: parse, collect and filter"""
+    html = load_page(page)
+    budget = PAGES[page][1]
+
+    def extract():
+        soup = BeautifulSoup(html, "html.parser")
+        return service._filter_links(service._extract_all_links(soup, BASE_URL))
+
+    links = benchmark(extract)
+    assert len(links) == settings.max_links_per_extraction
+    check_memory(benchmark, extract, budget)
@@ -0,0 +1,119 @@
+"""
+Benchmarks for bookmark export parsing and categorization prompts
+"""
+
+import asyncio
+import json
+
+import pytest
+from openai import OpenAI
+
+from agents.bookmark_importer.service import BookmarkImporterService
+from conftest import check_memory
+from core.utils import get_domain_from_url
+
+FOLDERS = ["Bookmarks bar", "Development", "Reading", "Work", "Recipes", "Travel"]
+# Peak memory allowed per bookmark while parsing an export
+BYTES_PER_BOOKMARK = 6 * 1024
+
+
+def make_export(count: int) -> str:
+    """A Chrome-style export with ``count`` bookmarks in nested folders"""
+    lines = [
+        "<!DOCTYPE NETSCAPE-Bookmark-file-1>",
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">',
+        "<TITLE>Bookmarks</TITLE>",
+        "<H1>Bookmarks</H1>",
+        "<DL><p>",
+    ]
+    per_folder = max(count // len(FOLDERS), 1)
+    written = 0
+    for folder in FOLDERS:
+        lines.append(f"    <DT><H3>{folder}</H3>")
+        lines.append("    <DL><p>")
+        for _ in range(per_folder if folder != FOLDERS[-1] else count - written):
+            lines.append(
+                f'        <DT><A HREF="https://site{written % 997}.example.com/'
+                f'{folder.lower().replace(" ", "-")}/page-{written}" '
+                f'ADD_DATE="1642512000">{folder} page {written}</A>'
+            )
+            written += 1
+        lines.append("    </DL><p>")
+    lines.append("</DL><p>")
+    return "\n".join(lines)
+
+
+def bookmark_data(count: int):
+    """Rows in the shape analyze_bookmarks passes to the prompt builder"""
+    data = []
+    for i in range(count):
+        url = f"https://site{i % 997}.example.com/articles/page-{i}"
+        data.append(
+            {
+                "url": url,
+                "title": f"Article {i} about topic {i % 40}",
+                "domain": get_domain_from_url(url),
+                "folder": FOLDERS[i % len(FOLDERS)],
+            }
+        )
+    return data
+
+
+@pytest.fixture(scope="module")
+def service():
+    return BookmarkImporterService()
+
+
+@pytest.mark.parametrize(
+    "count",
+    [1_000, 10_000, pytest.param(100_000, marks=pytest.mark.slow)],
+    ids=["1k", "10k", "100k"],
+)
+def bench_parse_bookmark_file(benchmark, count):
+    export = make_export(count)
+
+    def parse():
+        return BookmarkImporterService._parse_bookmark_file(export)
+
+    if count >= 100_000:
+        bookmarks, browser, folders = benchmark.pedantic(parse, rounds=1, iterations=1)
+    else:
+        bookmarks, browser, folders = benchmark(parse)
+        check_memory(benchmark, parse, count * BYTES_PER_BOOKMARK)
+    assert len(bookmarks) == count
+    assert sum(folders.values()) == count
+
+
+@pytest.mark.parametrize("count", [100, 1_000], ids=["100", "1k"])
+def bench_categorization_prompt(benchmark, service, count):
+    data = bookmark_data(count)
+    prompt = benchmark(service._create_categorization_prompt, data, 10, 3, None, True)
+    assert f"{count}. " in prompt
+
+
+def bench_categorize_with_stub_openai(benchmark, service, openai_stub):
+    """Prompt, request, response parsing and category building end to end"""
+    data = bookmark_data(500)
+    openai_stub.reply = json.dumps(
+        {
+            "categories": [
+                {
+                    "name": f"Topic {topic}",
+                    "description": "Stub category",
+                    "keywords": ["stub"],
+                    "bookmark_indices": list(range(topic + 1, 501, 10)),
+                    "confidence_score": 0.9,
+                    "suggested_collection_name": f"Topic {topic}",
+                }
+                for topic in range(10)
+            ]
+        }
+    )
+    service.client = OpenAI(api_key="benchmark", base_url=openai_stub.base_url)
+
+    def categorize():
+        return asyncio.run(service._categorize_with_openai(data, 10, 3, None, True))
+
+    categories = benchmark(categorize)
+    assert len(categories) == 10
+    assert sum(len(category.bookmarks) for category in categories) == 500
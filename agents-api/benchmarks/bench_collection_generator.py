@@ -0,0 +1,38 @@
+"""
+Benchmarks for collection generator re-ranking against a stub OpenAI server
+"""
+
+import json
+
+import pytest
+from openai import OpenAI
+
+from agents.collection_generator.service import CollectionGeneratorService
+
+
+@pytest.fixture(scope="module")
+def service(openai_stub):
+    service = CollectionGeneratorService()
+    service.client = OpenAI(api_key="benchmark", base_url=openai_stub.base_url)
+    return service
+
+
+def bench_rerank_prompt_and_reply(benchmark, service, openai_stub):
+    documents = [
+        {
+            "url": f"https://site{i % 97}.example.com/posts/{i}",
+            "title": f"Saved post {i} on async Python and databases",
+            "description": "A description long enough to be clipped " * 4,
+        }
+        for i in range(40)
+    ]
+    openai_stub.reply = json.dumps(
+        {
+            "collection_name": "Async Python",
+            "description": "Stub",
+            "selected": list(range(1, 41, 2)) + [0, 99, 3],
+        }
+    )
+
+    result = benchmark(service._rerank, "async python databases", documents, 20)
+    assert len(result["selected"]) == 20
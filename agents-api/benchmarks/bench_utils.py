@@ -0,0 +1,35 @@
+"""
+Benchmarks for the URL and text helpers in core.utils
+"""
+
+import re
+from urllib.parse import urljoin
+
+from conftest import load_page
+from core.utils import clean_text, is_valid_url, should_skip_url
+
+_HREF_RE = re.compile(r'href="([^"]*)"')
+_TEXT_RE = re.compile(r">([^<]{20,})<")
+
+BASE_URL = "https://example.dev/posts/tail-latency"
+PAGE = load_page("article_roundup.html")
+LINKS = [urljoin(BASE_URL, href) for href in _HREF_RE.findall(PAGE)]
+INVALID = ["not a url", "ftp://example.com/file", "https://", "https://exa mple.com/"]
+URLS = LINKS + INVALID
+TEXTS = [f"\n   {text}\t\t  " for text in _TEXT_RE.findall(PAGE)]
+
+
+def bench_is_valid_url(benchmark):
+    valid = benchmark(lambda: [is_valid_url(url) for url in URLS])
+    assert sum(valid) >= len(LINKS) * 0.95
+    assert not any(valid[len(LINKS) :])
+
+
+def bench_should_skip_url(benchmark):
+    skipped = benchmark(lambda: [should_skip_url(url) for url in URLS])
+    assert any(skipped) and not all(skipped)
+
+
+def bench_clean_text(benchmark):
+    cleaned = benchmark(lambda: [clean_text(text, max_length=120) for text in TEXTS])
+    assert all(text == text.strip() for text in cleaned)
@@ -0,0 +1,112 @@
+"""
+Shared fixtures for the agents-api benchmarks.
+
+Everything runs offline: pages are read from ``fixtures/``, bookmark exports
+are synthesized, and OpenAI calls go to a local stub server that answers
+chat completions with a canned JSON reply. Besides timing, benchmarks record
+the peak memory of one call in ``extra_info`` and fail when it exceeds a
+budget, so parser memory regressions show up as well.
+
+Usage:
+    python -m pytest benchmarks
+    python -m pytest benchmarks --benchmark-autosave        # keep a baseline
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:20%
+    python -m pytest benchmarks -m "not slow"               # skip 100k-row cases
+"""
+
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# The services build their OpenAI clients at import time
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: large inputs, several seconds per run")
+
+
+def load_page(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def peak_memory(fn: Callable[[], Any]) -> Tuple[Any, int]:
+    """Run ``fn`` once and return its result and peak traced allocation in bytes"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def check_memory(benchmark, fn: Callable[[], Any], budget_bytes: int) -> Any:
+    """Record the peak memory of ``fn`` and fail when it is over budget"""
+    result, peak = peak_memory(fn)
+    benchmark.extra_info["peak_kib"] = peak // 1024
+    assert peak <= budget_bytes, f"peak {peak // 1024} KiB > {budget_bytes // 1024} KiB"
+    return result
+
+
+class _OpenAIStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("content-length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.requests += 1
+        body = json.dumps(
+            {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": 0,
+                "model": request.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": self.server.reply},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 100,
+                    "completion_tokens": 50,
+                    "total_tokens": 150,
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def openai_stub():
+    """
+    Local OpenAI-compatible server; set ``.reply`` to the completion content
+
+    Yields the server, whose ``base_url`` is passed to ``OpenAI(base_url=...)``.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OpenAIStubHandler)
+    server.reply = "{}"
+    server.requests = 0
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
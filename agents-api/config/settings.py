@@ -41,6 +41,88 @@ class Settings:
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     )
 
+    # Outbound fetches: requests per second and burst per host, concurrent
+    # requests per host and in total, and how many may wait for a turn and how long
+    fetch_host_rate: float = float(os.getenv("FETCH_HOST_RATE", "2"))
+    fetch_host_burst: int = int(os.getenv("FETCH_HOST_BURST", "4"))
+    fetch_host_concurrency: int = int(os.getenv("FETCH_HOST_CONCURRENCY", "2"))
+    fetch_max_concurrency: int = int(os.getenv("FETCH_MAX_CONCURRENCY", "32"))
+    fetch_max_queue: int = int(os.getenv("FETCH_MAX_QUEUE", "256"))
+    fetch_queue_timeout: float = float(os.getenv("FETCH_QUEUE_TIMEOUT", "15"))
+    # Retries after 429/503 with Retry-After, when the wait is at most this long
+    fetch_max_retries: int = int(os.getenv("FETCH_MAX_RETRIES", "1"))
+    fetch_max_retry_wait: float = float(os.getenv("FETCH_MAX_RETRY_WAIT", "10"))
+    # Product token matched against robots.txt User-agent lines
+    fetch_robots_user_agent: str = os.getenv("FETCH_ROBOTS_USER_AGENT", "cur8t")
+    fetch_robots_ttl: int = int(os.getenv("FETCH_ROBOTS_TTL", "86400"))
+    fetch_dns_ttl: int = int(os.getenv("FETCH_DNS_TTL", "300"))
+
+    # Link enrichment (opt-in per request): page heads fetched at once across all
+    # requests, bytes and seconds per page, time budget per request, and cache
+    enrichment_max_concurrency: int = int(os.getenv("ENRICHMENT_MAX_CONCURRENCY", "16"))
+    enrichment_max_head_bytes: int = int(
+        os.getenv("ENRICHMENT_MAX_HEAD_BYTES", "65536")
+    )
+    enrichment_fetch_timeout: float = float(os.getenv("ENRICHMENT_FETCH_TIMEOUT", "5"))
+    enrichment_deadline_ms: int = int(os.getenv("ENRICHMENT_DEADLINE_MS", "2000"))
+    enrichment_cache_size: int = int(os.getenv("ENRICHMENT_CACHE_SIZE", "10000"))
+    enrichment_cache_ttl: int = int(os.getenv("ENRICHMENT_CACHE_TTL", "86400"))
+
+    # Agents are imported on their first request. Comma-separated agent keys
+    # (e.g. "article_extractor,bookmark_importer") or "all" load at startup
+    agents_preload: str = os.getenv("AGENTS_PRELOAD", "")
+    # Agents slower than this to import are logged with a warning
+    agent_import_budget_ms: int = int(os.getenv("AGENT_IMPORT_BUDGET_MS", "500"))
+
+    # YouTube Link Extractor: "api" (the default, needs YOUTUBE_API_KEY) or
+    # "fixture" (a local JSON file, for development and tests only)
+    youtube_api_key: str = os.getenv("YOUTUBE_API_KEY", "")
+    youtube_metadata_source: str = os.getenv("YOUTUBE_METADATA_SOURCE", "")
+    youtube_fixture_path: str = os.getenv("YOUTUBE_FIXTURE_PATH", "")
+    # Videos per request, after expanding playlists
+    youtube_max_videos: int = int(os.getenv("YOUTUBE_MAX_VIDEOS", "500"))
+    # Per-video results kept in memory, and for how many seconds
+    youtube_cache_size: int = int(os.getenv("YOUTUBE_CACHE_SIZE", "5000"))
+    youtube_cache_ttl: int = int(os.getenv("YOUTUBE_CACHE_TTL", "3600"))
+
+    # Watch Later Organizer: cluster state per library is kept as JSON files on
+    # local disk, so run a single instance of the agent
+    watch_later_state_dir: str = os.getenv(
+        "WATCH_LATER_STATE_DIR", os.path.join(".data", "watch_later")
+    )
+    # Libraries whose state is also kept in memory
+    watch_later_cache_size: int = int(os.getenv("WATCH_LATER_CACHE_SIZE", "100"))
+    # Cosine similarity a video needs to join an existing cluster
+    watch_later_similarity_threshold: float = float(
+        os.getenv("WATCH_LATER_SIMILARITY_THRESHOLD", "0.3")
+    )
+    watch_later_max_clusters: int = int(os.getenv("WATCH_LATER_MAX_CLUSTERS", "40"))
+    watch_later_max_videos: int = int(os.getenv("WATCH_LATER_MAX_VIDEOS", "20000"))
+
+    # Smart Export: links rendered per export, and bytes per streamed chunk
+    smart_export_max_links: int = int(os.getenv("SMART_EXPORT_MAX_LINKS", "50000"))
+    smart_export_chunk_bytes: int = int(os.getenv("SMART_EXPORT_CHUNK_BYTES", "16384"))
+
+    # Collection Generator: candidates sent for re-ranking, links per index, and
+    # whether a vector index is kept next to BM25
+    collection_generator_candidates: int = int(
+        os.getenv("COLLECTION_GENERATOR_CANDIDATES", "40")
+    )
+    collection_generator_max_links: int = int(
+        os.getenv("COLLECTION_GENERATOR_MAX_LINKS", "50000")
+    )
+    # Indexes kept in memory, least recently used dropped first, and seconds an
+    # unused index is kept
+    collection_generator_max_indexes: int = int(
+        os.getenv("COLLECTION_GENERATOR_MAX_INDEXES", "100")
+    )
+    collection_generator_index_ttl: int = int(
+        os.getenv("COLLECTION_GENERATOR_INDEX_TTL", "86400")
+    )
+    collection_generator_vectors: bool = os.getenv(
+        "COLLECTION_GENERATOR_VECTORS", "true"
+    ).lower() in {"1", "true", "yes"}
+
     # OpenAI Settings
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4-turbo-preview")
@@ -49,6 +131,10 @@ class Settings:
         os.getenv("MAX_CATEGORIES_PER_ANALYSIS", "10")
     )
     min_bookmarks_per_category: int = int(os.getenv("MIN_BOOKMARKS_PER_CATEGORY", "3"))
+    # Bookmarks accepted per uploaded file. Parsing grows faster than linearly
+    # (benchmarks: ~1.8s for 10k, ~113s for 100k), so larger exports are
+    # refused up front instead of timing out in a worker process
+    max_bookmarks_per_upload: int = int(os.getenv("MAX_BOOKMARKS_PER_UPLOAD", "20000"))
 
     # Rate Limiting (SlowAPI)
     rate_limit_default: str = os.getenv("RATE_LIMIT_DEFAULT", "60/minute")
@@ -60,6 +146,28 @@ class Settings:
     rate_limit_trust_forwarded: bool = os.getenv(
         "RATE_LIMIT_TRUST_FORWARDED", "true"
     ).lower() in {"1", "true", "yes"}
+    # Shared limit storage so limits hold across workers, e.g.
+    # redis://host:6379/0. memory:// keeps counters per process
+    rate_limit_storage_uri: str = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+    # fixed-window, moving-window (sliding log) or sliding-window-counter
+    rate_limit_strategy: str = os.getenv("RATE_LIMIT_STRATEGY", "moving-window")
+    rate_limit_key_prefix: str = os.getenv("RATE_LIMIT_KEY_PREFIX", "agents-api")
+    # Seconds to wait on the storage before treating it as unavailable
+    rate_limit_storage_timeout: float = float(
+        os.getenv("RATE_LIMIT_STORAGE_TIMEOUT", "0.25")
+    )
+    # Per-process limit applied while the storage is unreachable; empty disables
+    # the fallback and lets requests through unlimited instead
+    rate_limit_fallback: str = os.getenv("RATE_LIMIT_FALLBACK", "60/minute")
+    # Cost-weighted budget for expensive routes, per client, and how many
+    # estimated OpenAI tokens make up one credit (enrichment costs one credit
+    # per page head fetched)
+    rate_limit_credits_per_minute: int = int(
+        os.getenv("RATE_LIMIT_CREDITS_PER_MINUTE", "60")
+    )
+    rate_limit_tokens_per_credit: int = int(
+        os.getenv("RATE_LIMIT_TOKENS_PER_CREDIT", "1000")
+    )
 
 
 # Global settings instance
@@ -0,0 +1,11 @@
+"""
+Test-run defaults for agents-api.
+
+Settings are read when ``config.settings`` is first imported, so these must be
+set before any agent module loads. Values already in the environment win.
+"""
+
+import os
+
+# Agents with a YouTube metadata source serve the bundled fixture in tests
+os.environ.setdefault("YOUTUBE_METADATA_SOURCE", "fixture")
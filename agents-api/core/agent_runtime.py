@@ -0,0 +1,175 @@
+"""
+Agent declarations and per-agent execution resources.
+
+Every agent declares an ``AgentSpec``: what it is, where its routes live and
+how much of the worker it may use. Blocking or CPU-heavy work goes through the
+agent's ``AgentRuntime``, which gives each agent its own concurrency limit,
+executor and timeout, so a slow bookmark parse cannot take the threads or the
+event loop time that article extraction needs.
+"""
+
+import asyncio
+import importlib
+import inspect
+import logging
+import multiprocessing
+import time
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+from core.metrics import AGENT_TASK_DURATION, AGENT_TASKS_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on a health probe, whatever the agent's own timeout
+PROBE_TIMEOUT_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    """Declaration of an agent, exported as ``AGENT`` or via an entry point"""
+
+    key: str
+    name: str
+    description: str
+    status: str = "active"
+    # Module exposing ``router``, mounted under /agents; ``path`` is its prefix
+    module: Optional[str] = None
+    path: Optional[str] = None
+    # Tasks of this agent allowed to run at once on one worker
+    max_concurrency: int = 8
+    # "thread" for blocking I/O, "process" for CPU-bound work
+    executor: str = "thread"
+    pool_size: int = 4
+    # Seconds a task may wait for a slot, and then seconds it may run, before
+    # the request gets a 504
+    timeout: float = 30.0
+    # "module:function" returning a bool (or an awaitable of one)
+    health_probe: Optional[str] = None
+
+
+class AgentTimeout(HTTPException):
+    """Raised when an agent task exceeds its spec's timeout"""
+
+    def __init__(self, spec: AgentSpec):
+        super().__init__(
+            status_code=504,
+            detail=f"{spec.name} did not finish within {spec.timeout:g}s",
+        )
+
+
+def _resolve(reference: str) -> Callable[..., Any]:
+    module_name, _, attribute = reference.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class AgentRuntime:
+    """Concurrency limit, executor and timeout for one agent's blocking work"""
+
+    def __init__(self, spec: AgentSpec):
+        self.spec = spec
+        self._semaphore = asyncio.Semaphore(spec.max_concurrency)
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.spec.executor == "process":
+                # spawn: forking a process that runs threads is not safe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.spec.pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.spec.pool_size,
+                    thread_name_prefix=f"agent-{self.spec.key}",
+                )
+        return self._executor
+
+    def _task_done(self, future: "asyncio.Future[Any]") -> None:
+        """Free the slot once the executor has really finished the task"""
+        self._semaphore.release()
+        AGENT_TASKS_IN_FLIGHT.dec(self.spec.key)
+        if not future.cancelled():
+            # Retrieved here so an abandoned task's error is not logged as lost
+            future.exception()
+
+    def _discard_executor(self, executor: Executor) -> None:
+        """Drop a pool whose worker died (e.g. OOM-killed) so it is rebuilt"""
+        logger.warning("Agent %s executor broke; starting a new one", self.spec.key)
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run ``func(*args, **kwargs)`` on the agent's executor.
+
+        Process executors need a picklable module-level ``func``. Waiting for a
+        slot and running are each limited to the spec's timeout, after which
+        the caller gets ``AgentTimeout``. A task already running is not
+        interrupted and keeps its slot until it returns, so ``max_concurrency``
+        is never exceeded by abandoned work.
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        outcome = "error"
+        executor = None
+        try:
+            async with asyncio.timeout(self.spec.timeout):
+                await self._semaphore.acquire()
+            AGENT_TASKS_IN_FLIGHT.inc(self.spec.key)
+            try:
+                executor = self._get_executor()
+                future = loop.run_in_executor(executor, partial(func, *args, **kwargs))
+            except BaseException:
+                self._semaphore.release()
+                AGENT_TASKS_IN_FLIGHT.dec(self.spec.key)
+                raise
+            future.add_done_callback(self._task_done)
+
+            async with asyncio.timeout(self.spec.timeout):
+                result = await asyncio.shield(future)
+            outcome = "ok"
+            return result
+        except TimeoutError:
+            outcome = "timeout"
+            logger.warning("Agent %s task %s timed out", self.spec.key, func.__name__)
+            raise AgentTimeout(self.spec)
+        except BrokenExecutor:
+            if executor is not None:
+                self._discard_executor(executor)
+            raise
+        finally:
+            AGENT_TASK_DURATION.observe(
+                time.perf_counter() - start, self.spec.key, outcome
+            )
+
+    async def probe(self) -> bool:
+        """Run the agent's health probe; agents without one are healthy"""
+        if not self.spec.health_probe:
+            return True
+        try:
+            result = _resolve(self.spec.health_probe)()
+            if inspect.isawaitable(result):
+                result = await asyncio.wait_for(
+                    result, min(self.spec.timeout, PROBE_TIMEOUT_SECONDS)
+                )
+            return bool(result)
+        except Exception:
+            logger.exception("Health probe for agent %s failed", self.spec.key)
+            return False
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
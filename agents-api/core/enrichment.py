@@ -0,0 +1,324 @@
+"""
+Link enrichment: descriptions, tags, favicons and canonical URLs.
+
+``link_enricher.enrich`` fetches the <head> of each link through the polite
+fetcher, reading at most ENRICHMENT_MAX_HEAD_BYTES per page, and fills the
+link's description, tags and metadata from og:/twitter: meta tags and
+<link rel="canonical">. Results are cached per canonical URL.
+
+Fetches run on one small thread pool shared by all requests, so enrichment
+has a global budget. A request takes whatever finished by its deadline and
+returns the other links as they were; fetches already running finish in the
+background and land in the cache for the next request.
+
+Link URLs come from arbitrary pages, so heads are only fetched from hosts
+with public addresses, and callers can charge each fetch to the client.
+"""
+
+import asyncio
+import codecs
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from config.settings import settings
+from core.fetcher import fetcher
+from core.metrics import CACHE_REQUESTS, ENRICHMENT_RESULTS
+from core.models import ExtractedLink
+from core.urlnorm import canonicalize_url
+from core.utils import clean_text
+
+# Failed pages are retried sooner than enriched ones
+FAILURE_TTL = 600
+# Tags taken from article:tag and keywords meta
+MAX_TAGS = 10
+# The head is over once the body starts
+_HEAD_END_RE = re.compile(rb"</head\s*>|<body[\s>]", re.IGNORECASE)
+_HEAD_TAGS = SoupStrainer(["title", "meta", "link"])
+_META_CHARSET_RE = re.compile(
+    rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE
+)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+# Metadata keys copied from a page head onto the link
+METADATA_FIELDS = ("canonical_url", "favicon", "image", "site_name", "content_type")
+
+
+def _first(meta: Dict[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = meta.get(name)
+        if value:
+            return value
+    return None
+
+
+def detect_charset(data: bytes, content_type: Optional[str]) -> str:
+    """
+    Charset from a BOM, the Content-Type header or a <meta> tag, else UTF-8
+
+    requests assumes ISO-8859-1 for any text/html without a charset
+    parameter, which garbles UTF-8 pages that declare it only in <meta>.
+    """
+    for bom, charset in _BOMS:
+        if data.startswith(bom):
+            return charset
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip(" \"'"):
+            candidate = value.strip(" \"'")
+            break
+    else:
+        match = _META_CHARSET_RE.search(data)
+        candidate = match.group(1).decode("ascii") if match else ""
+    try:
+        return codecs.lookup(candidate).name if candidate else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+def parse_head(html: str, base_url: str) -> Dict[str, Any]:
+    """
+    Read title, description, tags, canonical URL, favicon and image from a head
+
+    Args:
+        html: Start of the page, at least up to </head> when there is one
+        base_url: URL of the page, for resolving relative links
+
+    Returns:
+        dict: The fields found; missing ones are left out
+    """
+    soup = BeautifulSoup(html, "html.parser", parse_only=_HEAD_TAGS)
+    meta: Dict[str, str] = {}
+    tags: List[str] = []
+    for tag in soup.find_all("meta"):
+        name = (tag.get("property") or tag.get("name") or "").strip().lower()
+        content = (tag.get("content") or "").strip()
+        if not name or not content:
+            continue
+        if name == "article:tag":
+            tags.append(content)
+        elif name == "keywords":
+            tags.extend(content.split(","))
+        else:
+            meta.setdefault(name, content)
+
+    links: Dict[str, str] = {}
+    for tag in soup.find_all("link", href=True):
+        for rel in tag.get("rel") or []:
+            links.setdefault(rel.lower(), tag["href"].strip())
+
+    head: Dict[str, Any] = {}
+    title_tag = soup.find("title")
+    title = _first(meta, "og:title", "twitter:title") or (
+        title_tag.get_text() if title_tag else None
+    )
+    if title:
+        head["title"] = clean_text(title, max_length=200)
+    description = _first(meta, "og:description", "twitter:description", "description")
+    if description:
+        head["description"] = clean_text(description, max_length=300)
+
+    cleaned_tags = [clean_text(tag).lower() for tag in tags]
+    if any(cleaned_tags):
+        head["tags"] = list(dict.fromkeys(t for t in cleaned_tags if t))[:MAX_TAGS]
+
+    canonical = links.get("canonical") or meta.get("og:url")
+    if canonical:
+        head["canonical_url"] = urljoin(base_url, canonical)
+    icon = links.get("icon") or links.get("apple-touch-icon")
+    head["favicon"] = urljoin(base_url, icon or "/favicon.ico")
+    image = _first(meta, "og:image", "og:image:url", "twitter:image")
+    if image:
+        head["image"] = urljoin(base_url, image)
+    site_name = meta.get("og:site_name")
+    if site_name:
+        head["site_name"] = clean_text(site_name, max_length=100)
+    return head
+
+
+def fetch_head(url: str) -> Dict[str, Any]:
+    """
+    Fetch the head of a page with a bounded read (blocking)
+
+    Reading stops at </head>, at ENRICHMENT_MAX_HEAD_BYTES or when
+    ENRICHMENT_FETCH_TIMEOUT runs out, whichever comes first.
+    """
+    timeout = settings.enrichment_fetch_timeout
+    deadline = time.monotonic() + timeout
+    response = fetcher.get(
+        url, stream=True, timeout=timeout, queue_timeout=timeout, public_only=True
+    )
+    try:
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "text/html").lower()
+        if "html" not in content_type:
+            # Nothing to parse; still worth knowing it is e.g. a PDF
+            return {"content_type": content_type.split(";")[0].strip()}
+
+        data = b""
+        for chunk in response.iter_content(chunk_size=8192):
+            data += chunk
+            if (
+                len(data) >= settings.enrichment_max_head_bytes
+                or _HEAD_END_RE.search(data)
+                or time.monotonic() >= deadline
+            ):
+                break
+        data = data[: settings.enrichment_max_head_bytes]
+        html = data.decode(detect_charset(data, content_type), errors="replace")
+        return parse_head(html, response.url or url)
+    finally:
+        response.close()
+
+
+def apply_head(link: ExtractedLink, head: Dict[str, Any]) -> ExtractedLink:
+    """Return a copy of ``link`` with the fields found in its page head"""
+    update: Dict[str, Any] = {}
+    metadata = dict(link.metadata or {})
+    if head.get("description"):
+        if link.description and link.description != head["description"]:
+            metadata["anchor_text"] = link.description
+        update["description"] = head["description"]
+    if head.get("title"):
+        if not link.title:
+            update["title"] = head["title"]
+        metadata["page_title"] = head["title"]
+    if head.get("tags"):
+        update["tags"] = list(dict.fromkeys((link.tags or []) + head["tags"]))
+    metadata.update((key, head[key]) for key in METADATA_FIELDS if head.get(key))
+    update["metadata"] = metadata
+    return link.model_copy(update=update)
+
+
+class LinkEnricher:
+    """Enriches links from their page heads, with a shared budget and a cache"""
+
+    def __init__(self):
+        # canonical URL -> (expires_at, head), least recently used first
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Fetches finish on pool threads, so the cache is shared with them
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.enrichment_max_concurrency,
+                thread_name_prefix="enrichment",
+            )
+        return self._executor
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                CACHE_REQUESTS.inc("link_enrichment", "miss")
+                return None
+            self._cache.move_to_end(key)
+        CACHE_REQUESTS.inc("link_enrichment", "hit")
+        return entry[1]
+
+    def _cache_set(self, key: str, head: Dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, head)
+            self._cache.move_to_end(key)
+            while len(self._cache) > settings.enrichment_cache_size:
+                self._cache.popitem(last=False)
+
+    def _store(self, key: str, future: Future) -> None:
+        """Cache a finished fetch, whether or not a request still waits for it"""
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self._cache_set(key, {}, FAILURE_TTL)
+            return
+        head = future.result()
+        self._cache_set(key, head, settings.enrichment_cache_ttl)
+        canonical = canonicalize_url(head.get("canonical_url") or "")
+        if canonical and canonical != key:
+            self._cache_set(canonical, head, settings.enrichment_cache_ttl)
+
+    async def enrich(
+        self,
+        links: List[ExtractedLink],
+        deadline_ms: Optional[int] = None,
+        charge: Optional[Callable[[int], None]] = None,
+    ) -> Tuple[List[ExtractedLink], int]:
+        """
+        Enrich links from their page heads, stopping at the deadline
+
+        Args:
+            links: Links to enrich
+            deadline_ms: Time budget, ENRICHMENT_DEADLINE_MS by default
+            charge: Called with the number of pages about to be fetched (cache
+                misses) before any fetch starts; it may raise to refuse them
+
+        Returns:
+            Tuple of (links, number enriched); links not enriched in time are
+            returned unchanged
+        """
+        deadline_ms = deadline_ms or settings.enrichment_deadline_ms
+        heads: Dict[str, Dict[str, Any]] = {}
+        misses: Dict[str, str] = {}
+        for link in links:
+            key = canonicalize_url(link.url) or link.url
+            if key in heads or key in misses:
+                continue
+            head = self._cache_get(key)
+            if head is not None:
+                heads[key] = head
+            else:
+                misses[key] = link.url
+
+        if misses and charge is not None:
+            charge(len(misses))
+        futures: Dict[str, Future] = {}
+        for key, url in misses.items():
+            future = self._get_executor().submit(fetch_head, url)
+            future.add_done_callback(lambda f, key=key: self._store(key, f))
+            futures[key] = future
+
+        if futures:
+            waiting = {asyncio.wrap_future(f): key for key, f in futures.items()}
+            done, pending = await asyncio.wait(
+                list(waiting), timeout=deadline_ms / 1000
+            )
+            for task in pending:
+                # Nobody awaits these any more; their results only feed the cache
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            for task in done:
+                if task.exception() is None:
+                    heads[waiting[task]] = task.result()
+                    ENRICHMENT_RESULTS.inc("enriched")
+                else:
+                    ENRICHMENT_RESULTS.inc("failed")
+            for key, future in futures.items():
+                # Fetches not started yet are dropped; running ones finish
+                if not future.done():
+                    future.cancel()
+                    ENRICHMENT_RESULTS.inc("deadline")
+
+        enriched = []
+        count = 0
+        for link in links:
+            head = heads.get(canonicalize_url(link.url) or link.url)
+            if head:
+                enriched.append(apply_head(link, head))
+                count += 1
+            else:
+                enriched.append(link)
+        return enriched, count
+
+
+# Global instance
+link_enricher = LinkEnricher()
@@ -0,0 +1,609 @@
+"""
+Polite outbound HTTP fetching shared by all agents.
+
+Every outbound request goes through ``fetcher``, which:
+
+- checks robots.txt, cached per origin, and slows down to its Crawl-delay
+- paces each host with a token bucket and caps concurrent requests per host
+- backs a host off when it answers 429/503 with Retry-After, and retries when
+  the wait is short
+- caches DNS lookups, so new connections to a host skip the resolver
+- admits requests from a bounded priority queue: interactive requests go
+  before background work, and callers get ``FetchBusy`` instead of waiting
+  without end once the queue is full
+- with ``public_only``, refuses hosts that resolve to private, loopback or
+  link-local addresses, on every redirect hop
+"""
+
+import ipaddress
+import itertools
+import math
+import socket
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config.settings import settings
+from core.metrics import FETCH_DURATION, FETCH_QUEUE_WAIT, FETCH_REFUSED
+from core.utils import create_http_session
+
+# Hosts whose pacing state is kept; idle ones beyond this are forgotten
+MAX_TRACKED_HOSTS = 10000
+# Longest back-off a Retry-After header can impose on a host
+MAX_BACKOFF_SECONDS = 600.0
+# Back-off after a 429 that carries no Retry-After
+DEFAULT_BACKOFF_SECONDS = 5.0
+# robots.txt bytes parsed; RFC 9309 asks for at least 500 KiB
+MAX_ROBOTS_BYTES = 512 * 1024
+# Redirect hops followed per fetch
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# How long a robots.txt that failed with 429/5xx blocks its origin
+ROBOTS_ERROR_TTL = 300
+
+
+class FetchPriority(IntEnum):
+    """Order in which waiting fetches get their turn; lower goes first"""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class FetchError(requests.RequestException):
+    """A fetch the fetcher refused to send"""
+
+
+class RobotsDisallowed(FetchError):
+    """robots.txt does not allow fetching the URL"""
+
+
+class FetchBusy(FetchError):
+    """No turn to fetch: too many fetches are waiting, or the wait timed out"""
+
+
+class PrivateAddress(FetchError):
+    """The URL's host resolves to an address that is not publicly routable"""
+
+
+def is_public_address(address: str) -> bool:
+    """False for private, loopback, link-local and other non-global addresses"""
+    try:
+        ip = ipaddress.ip_address(address.split("%")[0])
+    except ValueError:
+        return False
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class DNSCache:
+    """getaddrinfo results per (host, port), kept for ``ttl`` seconds"""
+
+    def __init__(self, ttl: float, max_entries: int = MAX_TRACKED_HOSTS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[str]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> List[str]:
+        """Addresses of a host, resolving it if the cached answer expired"""
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return addresses
+
+
+dns_cache = DNSCache(settings.fetch_dns_ttl)
+
+
+class _CachedDNSConnectionMixin:
+    """Connects to the cached addresses of a host, trying each in turn"""
+
+    def _new_conn(self):
+        addresses = dns_cache.resolve(self._dns_host, self.port)
+        dns_host = self._dns_host
+        try:
+            for position, address in enumerate(addresses, start=1):
+                # TLS still verifies and sends SNI for self.host
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except Exception:
+                    if position == len(addresses):
+                        raise
+        finally:
+            self._dns_host = dns_host
+
+
+class _CachedDNSHTTPConnection(_CachedDNSConnectionMixin, HTTPConnection):
+    pass
+
+
+class _CachedDNSHTTPSConnection(_CachedDNSConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDNSHTTPConnection
+
+
+class _CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDNSHTTPSConnection
+
+
+class CachedDNSAdapter(HTTPAdapter):
+    """requests adapter whose connections resolve hosts through ``dns_cache``"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CachedDNSHTTPConnectionPool,
+            "https": _CachedDNSHTTPSConnectionPool,
+        }
+
+
+class _HostState:
+    """Token bucket, concurrency and back-off of one host"""
+
+    __slots__ = (
+        "rate",
+        "burst",
+        "max_active",
+        "tokens",
+        "updated",
+        "active",
+        "blocked_until",
+        "pinned",
+    )
+
+    def __init__(self, rate: float, burst: int, max_active: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.max_active = max_active
+        self.tokens = float(burst)
+        self.updated = now
+        self.active = 0
+        self.blocked_until = 0.0
+        # Configured explicitly, so never forgotten
+        self.pinned = False
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until this host may take another request"""
+        if self.active >= self.max_active:
+            return math.inf
+        self._refill(now)
+        wait = self.blocked_until - now
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return max(wait, 0.0)
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+        self.active += 1
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return (
+            not self.pinned
+            and self.active == 0
+            and self.blocked_until <= now
+            and self.tokens >= self.burst
+        )
+
+
+class HostScheduler:
+    """
+    Grants fetch turns per host.
+
+    A waiting fetch goes when its host has a token and a free connection slot
+    and no better-priority fetch that could also go is waiting before it.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        host_concurrency: int,
+        max_concurrency: int,
+        max_queue: int,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.host_concurrency = host_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._hosts: "OrderedDict[str, _HostState]" = OrderedDict()
+        self._waiting: List[Tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def _state(self, host: str, now: float) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(
+                self.rate, self.burst, self.host_concurrency, now
+            )
+            if len(self._hosts) > MAX_TRACKED_HOSTS:
+                self._forget_idle_hosts(now)
+        else:
+            self._hosts.move_to_end(host)
+        return state
+
+    def _forget_idle_hosts(self, now: float) -> None:
+        waiting_hosts = {entry[2] for entry in self._waiting}
+        for host in list(self._hosts):
+            if len(self._hosts) <= MAX_TRACKED_HOSTS:
+                break
+            if host not in waiting_hosts and self._hosts[host].is_idle(now):
+                del self._hosts[host]
+
+    def configure_host(
+        self,
+        host: str,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> None:
+        """Override the pacing of one host, e.g. an API with a known quota"""
+        with self._cond:
+            state = self._state(host, time.monotonic())
+            state.rate = rate or state.rate
+            state.burst = burst or state.burst
+            state.max_active = concurrency or state.max_active
+            state.pinned = True
+            self._cond.notify_all()
+
+    def slow_down(self, host: str, min_interval: float) -> None:
+        """Space requests to a host at least ``min_interval`` seconds apart"""
+        with self._cond:
+            state = self._state(host, time.monotonic())
+            if not state.pinned:
+                state.rate = min(self.rate, 1 / min_interval)
+                state.burst = 1
+
+    def back_off(self, host: str, seconds: float) -> None:
+        """Send nothing to a host for the next ``seconds``"""
+        with self._cond:
+            now = time.monotonic()
+            state = self._state(host, now)
+            until = now + min(seconds, MAX_BACKOFF_SECONDS)
+            state.blocked_until = max(state.blocked_until, until)
+
+    def _wait_time(self, entry: Tuple[int, int, str], now: float) -> float:
+        if self._active >= self.max_concurrency:
+            return math.inf
+        wait = self._state(entry[2], now).wait_time(now)
+        if wait > 0:
+            return wait
+        for other in self._waiting:
+            if other < entry and self._state(other[2], now).wait_time(now) <= 0:
+                # Someone ahead can go too: let them, then look again
+                self._cond.notify_all()
+                return math.inf
+        return 0.0
+
+    def acquire(self, host: str, priority: FetchPriority, timeout: float) -> float:
+        """Wait for a turn to fetch from ``host``; returns the seconds waited"""
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                raise FetchBusy(f"{len(self._waiting)} fetches are already waiting")
+            entry = (int(priority), next(self._sequence), host)
+            self._waiting.append(entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(entry, now)
+                    if wait <= 0:
+                        self._state(host, now).take(now)
+                        self._active += 1
+                        return now - start
+                    if now >= deadline:
+                        raise FetchBusy(f"Timed out waiting to fetch from {host}")
+                    self._cond.wait(min(wait, deadline - now))
+            finally:
+                self._waiting.remove(entry)
+                self._cond.notify_all()
+
+    def release(self, host: str) -> None:
+        with self._cond:
+            self._hosts[host].active -= 1
+            self._active -= 1
+            self._cond.notify_all()
+
+
+class PoliteFetcher:
+    """Sends GET requests through robots.txt checks and per-host scheduling"""
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        scheduler: Optional[HostScheduler] = None,
+    ):
+        if session is None:
+            session = create_http_session()
+            adapter = CachedDNSAdapter()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.scheduler = scheduler or HostScheduler(
+            rate=settings.fetch_host_rate,
+            burst=settings.fetch_host_burst,
+            host_concurrency=settings.fetch_host_concurrency,
+            max_concurrency=settings.fetch_max_concurrency,
+            max_queue=settings.fetch_max_queue,
+        )
+        self.robots_user_agent = settings.fetch_robots_user_agent
+        # origin -> (expires, rules)
+        self._robots: "OrderedDict[str, Tuple[float, RobotFileParser]]" = OrderedDict()
+        self._robots_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def configure_host(self, host: str, **limits: Any) -> None:
+        """Override the pacing of one host; see HostScheduler.configure_host"""
+        self.scheduler.configure_host(host.lower(), **limits)
+
+    def get(
+        self,
+        url: str,
+        priority: FetchPriority = FetchPriority.INTERACTIVE,
+        respect_robots: bool = True,
+        queue_timeout: Optional[float] = None,
+        public_only: bool = False,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """
+        GET a URL politely
+
+        Args:
+            url: URL to fetch
+            priority: Turn order while waiting for the host
+            respect_robots: Check robots.txt first; off for APIs called by key
+            queue_timeout: Longest wait for a turn, FETCH_QUEUE_TIMEOUT by default
+            public_only: Refuse hosts with non-public addresses, for URLs
+                that come from untrusted pages
+            **kwargs: Passed on to requests, e.g. params or timeout
+
+        Returns:
+            requests.Response: The response, whatever its status
+
+        Raises:
+            RobotsDisallowed: robots.txt does not allow the URL
+            PrivateAddress: public_only is set and the host is not public
+            FetchBusy: The fetch could not get a turn
+            requests.RequestException: The request itself failed
+        """
+        priority = FetchPriority(priority)
+        kwargs.setdefault("timeout", settings.request_timeout)
+        # Redirects are followed here, so every hop is checked and paced
+        kwargs["allow_redirects"] = False
+        for _ in range(MAX_REDIRECTS + 1):
+            if public_only:
+                self._check_public(url)
+            response = self._get_once(
+                url, priority, respect_robots, kwargs, queue_timeout, public_only
+            )
+            location = response.headers.get("location")
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                return response
+            response.close()
+            url = urljoin(url, location)
+            kwargs.pop("params", None)
+        raise requests.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects")
+
+    @staticmethod
+    def _check_public(url: str) -> None:
+        """Raise PrivateAddress unless every address of the URL's host is public"""
+        parsed = urlparse(url)
+        default_port = 443 if parsed.scheme == "https" else 80
+        try:
+            addresses = dns_cache.resolve(
+                parsed.hostname or "", parsed.port or default_port
+            )
+        except (OSError, ValueError) as e:
+            raise requests.ConnectionError(f"Cannot resolve {parsed.hostname}: {e}")
+        # Connections use the same cached answer, so it cannot change in between
+        if not addresses or not all(is_public_address(a) for a in addresses):
+            FETCH_REFUSED.inc("private_address")
+            raise PrivateAddress(f"{parsed.hostname} is not a public address")
+
+    def _get_once(
+        self,
+        url: str,
+        priority: FetchPriority,
+        respect_robots: bool,
+        kwargs: Dict[str, Any],
+        queue_timeout: Optional[float],
+        public_only: bool = False,
+    ) -> requests.Response:
+        host = urlparse(url).netloc.lower()
+        if respect_robots and not self.allowed(url, priority, public_only):
+            FETCH_REFUSED.inc("robots")
+            raise RobotsDisallowed(f"robots.txt does not allow fetching {url}")
+
+        attempt = 0
+        while True:
+            response = self._send(host, url, priority, kwargs, queue_timeout)
+            delay = self._retry_after(response)
+            if delay is None:
+                return response
+            # The back-off also holds the retry until the host may be asked again
+            self.scheduler.back_off(host, delay)
+            attempt += 1
+            if attempt > settings.fetch_max_retries or (
+                delay > settings.fetch_max_retry_wait
+            ):
+                return response
+            response.close()
+
+    def allowed(
+        self,
+        url: str,
+        priority: FetchPriority = FetchPriority.INTERACTIVE,
+        public_only: bool = False,
+    ) -> bool:
+        """Whether robots.txt allows fetching ``url``"""
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        rules = self._robots_for(
+            f"{parsed.scheme}://{host}", host, priority, public_only
+        )
+        delay = rules.crawl_delay(self.robots_user_agent)
+        if delay:
+            self.scheduler.slow_down(host, float(delay))
+        return rules.can_fetch(self.robots_user_agent, url)
+
+    def _send(
+        self,
+        host: str,
+        url: str,
+        priority: FetchPriority,
+        kwargs: Dict[str, Any],
+        queue_timeout: Optional[float] = None,
+    ) -> requests.Response:
+        try:
+            waited = self.scheduler.acquire(
+                host, priority, timeout=queue_timeout or settings.fetch_queue_timeout
+            )
+        except FetchBusy:
+            FETCH_REFUSED.inc("busy")
+            raise
+        FETCH_QUEUE_WAIT.observe(waited, priority.name.lower())
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = self.session.get(url, **kwargs)
+            outcome = str(response.status_code)
+            return response
+        finally:
+            FETCH_DURATION.observe(time.perf_counter() - start, host, outcome)
+            self.scheduler.release(host)
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        """Seconds a 429/503 response asks us to wait, if any"""
+        if response.status_code not in (429, 503):
+            return None
+        value = response.headers.get("Retry-After")
+        delay = parse_retry_after(value) if value else None
+        if delay is None and response.status_code == 429:
+            return DEFAULT_BACKOFF_SECONDS
+        return delay
+
+    def _robots_for(
+        self, origin: str, host: str, priority: FetchPriority, public_only: bool
+    ) -> RobotFileParser:
+        with self._lock:
+            entry = self._robots.get(origin)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            lock = self._robots_locks.setdefault(origin, threading.Lock())
+
+        # One fetch per origin; others wait for its answer
+        with lock:
+            with self._lock:
+                entry = self._robots.get(origin)
+                if entry and entry[0] > time.monotonic():
+                    return entry[1]
+            rules, ttl = self._fetch_robots(origin, priority, public_only)
+            with self._lock:
+                self._robots[origin] = (time.monotonic() + ttl, rules)
+                self._robots.move_to_end(origin)
+                while len(self._robots) > MAX_TRACKED_HOSTS:
+                    self._robots.popitem(last=False)
+                self._robots_locks.pop(origin, None)
+            return rules
+
+    def _fetch_robots(
+        self, origin: str, priority: FetchPriority, public_only: bool
+    ) -> Tuple[RobotFileParser, float]:
+        """Fetch and parse robots.txt, following RFC 9309 for failures"""
+        url = f"{origin}/robots.txt"
+        kwargs = {
+            "timeout": settings.request_timeout,
+            "allow_redirects": False,
+            "stream": True,
+        }
+        rules = RobotFileParser()
+        # Redirects are followed here, like in get(), so each hop is checked
+        for _ in range(MAX_REDIRECTS + 1):
+            if public_only:
+                self._check_public(url)
+            response = self._send(urlparse(url).netloc.lower(), url, priority, kwargs)
+            location = response.headers.get("location")
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                break
+            response.close()
+            url = urljoin(url, location)
+        else:
+            # Too many redirects: treat robots.txt as unavailable
+            rules.allow_all = True
+            return rules, settings.fetch_robots_ttl
+
+        try:
+            if response.status_code == 200:
+                data = b""
+                for chunk in response.iter_content(chunk_size=8192):
+                    data += chunk
+                    if len(data) >= MAX_ROBOTS_BYTES:
+                        break
+                text = data[:MAX_ROBOTS_BYTES].decode("utf-8", "replace")
+                rules.parse(text.splitlines())
+                return rules, settings.fetch_robots_ttl
+        finally:
+            response.close()
+        if response.status_code == 429 or response.status_code in range(500, 600):
+            # The server could not answer: assume everything is disallowed
+            rules.disallow_all = True
+            return rules, ROBOTS_ERROR_TTL
+        # No robots.txt (4xx): everything is allowed
+        rules.allow_all = True
+        return rules, settings.fetch_robots_ttl
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """Seconds from a Retry-After value: delta-seconds or an HTTP date"""
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+# Global instance
+fetcher = PoliteFetcher()
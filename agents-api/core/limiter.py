@@ -1,8 +1,15 @@
 """
 Centralized SlowAPI rate limiter configuration.
+
+Counters live in the storage named by ``RATE_LIMIT_STORAGE_URI``. With Redis
+every worker and instance shares them, and the ``limits`` package applies each
+hit atomically (a Lua script for the moving window). ``memory://`` keeps them
+per process, which is what tests and single-worker development use. If the
+shared storage stops answering, SlowAPI switches to per-process counters with
+``RATE_LIMIT_FALLBACK`` and periodically retries the storage.
 """
 
-from typing import Optional
+from typing import Dict, Optional
 
 from fastapi import Request
 from slowapi import Limiter
@@ -28,8 +35,25 @@ def _forwarded_or_remote_address(request: Request) -> str:
     return get_remote_address(request)
 
 
+def limiter_storage_options() -> Dict[str, float]:
+    """Short socket timeouts so an unreachable Redis fails over quickly"""
+    if settings.rate_limit_storage_uri.startswith("redis"):
+        timeout = settings.rate_limit_storage_timeout
+        return {"socket_connect_timeout": timeout, "socket_timeout": timeout}
+    return {}
+
+
 # Create the Limiter instance. Keep it importable for decorators.
 limiter: Limiter = Limiter(
     key_func=_forwarded_or_remote_address,
     default_limits=[settings.rate_limit_default] if settings.rate_limit_enabled else [],
+    strategy=settings.rate_limit_strategy,
+    storage_uri=settings.rate_limit_storage_uri,
+    storage_options=limiter_storage_options(),
+    key_prefix=settings.rate_limit_key_prefix,
+    in_memory_fallback=(
+        [settings.rate_limit_fallback] if settings.rate_limit_fallback else []
+    ),
+    # Without a fallback, storage errors let requests through instead of a 500
+    swallow_errors=True,
 )
@@ -0,0 +1,291 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Counters, gauges and histograms are plain dicts keyed by label values and
+guarded by a lock, so recording a sample is a dict lookup and an addition.
+Nothing is aggregated or formatted until ``/metrics`` is scraped.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+REGISTRY: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _check(self, labelvalues: Tuple[str, ...]) -> None:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {labelvalues}"
+            )
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._check(labelvalues)
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in items
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._check(labelvalues)
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum, count]
+        self._data: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        self._check(labelvalues)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._data.get(labelvalues)
+            if data is None:
+                data = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._data[labelvalues] = data
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        """Observe the duration of the ``with`` block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def count(self, *labelvalues: str) -> int:
+        data = self._data.get(labelvalues)
+        return data[2] if data else 0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._data.items()]
+        names = self.labelnames + ("le",)
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = _format_value(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(names, labels + (le,))} "
+                    f"{cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP server metrics
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+
+# In-process caches
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result", ("cache", "result")
+)
+
+# Outbound HTTP fetches
+FETCH_DURATION = Histogram(
+    "outbound_fetch_duration_seconds",
+    "Outbound HTTP fetch latency by host",
+    ("host", "outcome"),
+)
+FETCH_QUEUE_WAIT = Histogram(
+    "outbound_fetch_queue_wait_seconds",
+    "Time outbound fetches waited for their host's turn",
+    ("priority",),
+)
+FETCH_REFUSED = Counter(
+    "outbound_fetch_refused_total",
+    "Outbound fetches refused before sending, by reason",
+    ("reason",),
+)
+ENRICHMENT_RESULTS = Counter(
+    "link_enrichment_total",
+    "Links sent for enrichment by result: enriched, failed or past the deadline",
+    ("result",),
+)
+
+# OpenAI usage
+OPENAI_REQUEST_DURATION = Histogram(
+    "openai_request_duration_seconds",
+    "OpenAI API call latency",
+    ("model", "outcome"),
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total", "OpenAI tokens consumed", ("model", "kind")
+)
+
+# Agent loading
+AGENT_IMPORT_DURATION = Gauge(
+    "agent_import_seconds", "Time taken to import each loaded agent", ("agent",)
+)
+AGENT_TASK_DURATION = Histogram(
+    "agent_task_duration_seconds",
+    "Agent executor task latency, including the wait for a slot",
+    ("agent", "outcome"),
+)
+AGENT_TASKS_IN_FLIGHT = Gauge(
+    "agent_tasks_in_flight", "Agent executor tasks currently running", ("agent",)
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency and in-flight requests.
+
+    Latency is labelled with the matched route template (e.g.
+    ``/agents/bookmark-importer/status/{session_id}``) rather than the raw path
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                template,
+                str(status_code),
+            )
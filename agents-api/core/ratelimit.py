@@ -0,0 +1,96 @@
+"""
+Cost-weighted rate limiting.
+
+The SlowAPI decorators count requests, so analysing 10 bookmarks costs the same
+as analysing 5,000. Expensive routes also charge a per-client budget of credits
+per minute, with a cost derived from the request (e.g. estimated OpenAI
+tokens). The budget is a moving window over the same storage as the SlowAPI
+counters, so it behaves like a token bucket that refills over one minute and is
+shared across workers when RATE_LIMIT_STORAGE_URI points at Redis.
+
+``CostLimiter`` is mirrored in extension-api (``app/core/ratelimit.py``).
+"""
+
+import logging
+import math
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request
+from limits import RateLimitItemPerMinute
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import STRATEGIES
+
+from config.settings import settings
+from core.limiter import _forwarded_or_remote_address, limiter_storage_options
+
+logger = logging.getLogger(__name__)
+
+# Seconds to keep using local budgets after the shared storage fails
+STORAGE_RETRY_SECONDS = 30.0
+
+
+class CostLimiter:
+    """Charges variable costs against per-identity budgets of credits per minute"""
+
+    def __init__(
+        self,
+        storage_uri: str,
+        strategy: str = "moving-window",
+        storage_options: Optional[Dict[str, float]] = None,
+        key_prefix: str = "cost",
+    ):
+        self.key_prefix = key_prefix
+        self._limiter = STRATEGIES[strategy](
+            storage_from_string(storage_uri, **(storage_options or {}))
+        )
+        self._fallback = STRATEGIES[strategy](MemoryStorage())
+        self._storage_dead_until = 0.0
+
+    def charge(self, identity: str, cost: int, per_minute: int) -> float:
+        """
+        Spend ``cost`` credits from ``identity``'s budget of ``per_minute``.
+
+        Returns 0 when the credits were spent, otherwise the seconds to wait
+        before retrying. A cost above the whole budget is capped to it, so the
+        largest allowed request is still possible with a full budget.
+        """
+        item = RateLimitItemPerMinute(per_minute)
+        cost = max(1, min(cost, per_minute))
+        if time.monotonic() >= self._storage_dead_until:
+            try:
+                return self._charge(self._limiter, item, identity, cost)
+            except Exception as e:
+                logger.warning("Rate limit storage unreachable, using local: %s", e)
+                self._storage_dead_until = time.monotonic() + STORAGE_RETRY_SECONDS
+        return self._charge(self._fallback, item, identity, cost)
+
+    def _charge(self, limiter, item, identity: str, cost: int) -> float:
+        if limiter.hit(item, self.key_prefix, identity, cost=cost):
+            return 0.0
+        reset_time, _ = limiter.get_window_stats(item, self.key_prefix, identity)
+        return max(reset_time - time.time(), 1.0)
+
+
+cost_limiter = CostLimiter(
+    settings.rate_limit_storage_uri,
+    strategy=settings.rate_limit_strategy,
+    storage_options=limiter_storage_options(),
+    key_prefix=f"{settings.rate_limit_key_prefix}:cost",
+)
+
+
+def charge_request(request: Request, cost: int) -> None:
+    """Charge ``cost`` credits to the calling client or raise a 429"""
+    if not settings.rate_limit_enabled:
+        return
+    budget = settings.rate_limit_credits_per_minute
+    retry_after = cost_limiter.charge(
+        _forwarded_or_remote_address(request), cost, budget
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded: {budget} credits per minute",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
@@ -0,0 +1,109 @@
+"""
+URL canonicalization used for de-duplicating links.
+
+``canonicalize_url`` maps URLs that point at the same resource to one string:
+scheme and host are lowercased, ``http`` is treated as ``https``, ``www.``,
+default ports, fragments, trailing slashes and tracking parameters are dropped,
+and the remaining query parameters are sorted. The canonical form is only a
+comparison key; the URL as submitted is what gets stored and displayed.
+
+This module is mirrored in agents-api (``core/urlnorm.py``) and extension-api
+(``app/core/urlnorm.py``); keep the two copies identical so both services agree
+on ``url_hash`` values.
+"""
+
+import hashlib
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only carry attribution/tracking data
+TRACKING_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "gbraid",
+        "wbraid",
+        "msclkid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "_hsenc",
+        "_hsmi",
+        "mkt_tok",
+        "ref_src",
+        "ref_url",
+        "si",
+    }
+)
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_MULTI_SLASH_RE = re.compile(r"/{2,}")
+# Characters left percent-encoded in paths; everything else unreserved is decoded
+_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+
+
+def _is_tracking_param(name: str) -> bool:
+    lowered = name.lower()
+    return lowered in TRACKING_PARAMS or lowered.startswith(TRACKING_PREFIXES)
+
+
+def _normalize_path(path: str) -> str:
+    path = _MULTI_SLASH_RE.sub("/", path)
+    # Re-encode so that equivalent escapes ("%7e" vs "~") compare equal
+    path = quote(unquote(path), safe=_PATH_SAFE)
+
+    segments = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if segments:
+                segments.pop()
+        elif segment != ".":
+            segments.append(segment)
+    path = "/".join(segments)
+
+    return path.rstrip("/")
+
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """Return the canonical comparison form of ``url``, or None if unparsable"""
+    try:
+        parts = urlsplit(url.strip())
+    except (ValueError, AttributeError):
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    try:
+        host = parts.hostname.encode("idna").decode("ascii").lower()
+        port = parts.port
+    except (UnicodeError, ValueError):
+        return None
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+
+    query_pairs = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(key)
+    ]
+    query = urlencode(sorted(query_pairs))
+
+    # Fragments are dropped except hash-bang / hash-routed single page apps
+    fragment = parts.fragment if parts.fragment.startswith(("!", "/")) else ""
+
+    return urlunsplit(("https", host, _normalize_path(parts.path), query, fragment))
+
+
+def url_hash(url: str) -> str:
+    """Stable hash of the canonical URL, used for the per-collection unique index"""
+    canonical = canonicalize_url(url) or url.strip()
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -1,12 +1,19 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
-from agents import get_active_routers, get_agent_list
+from agents import (
+    LazyAgentMiddleware,
+    get_agent_health,
+    get_agent_list,
+    preload_agents,
+    shutdown_agents,
+)
 from config.settings import settings
 from core.limiter import limiter
+from core.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
 
 # Create FastAPI app
 app = FastAPI(
@@ -25,9 +32,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include all active agent routes
-for router in get_active_routers():
-    app.include_router(router, prefix="/agents")
+# Agent routes are added on first use; preloaded agents are added now
+preload_agents(app, settings.agents_preload)
+app.add_event_handler("shutdown", shutdown_agents)
 
 # Rate limiter setup
 if settings.rate_limit_enabled:
@@ -35,6 +42,12 @@ if settings.rate_limit_enabled:
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
     app.add_middleware(SlowAPIMiddleware)
 
+# Outside SlowAPI so an agent's routes exist before its limits are looked up
+app.add_middleware(LazyAgentMiddleware)
+
+# Added last so request latency includes the time spent in other middleware
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/")
 async def root(request: Request):
@@ -52,9 +65,17 @@ async def root(request: Request):
 @app.get("/health")
 @limiter.exempt
 async def health_check(request: Request):
-    """Health check endpoint"""
+    """Health check endpoint, with the probe result of each loaded agent"""
     return {
         "status": "healthy",
         "service": "cur8t-agents-api",
         "version": settings.app_version,
+        "agents": await get_agent_health(),
     }
+
+
+@app.get("/metrics", include_in_schema=False)
+@limiter.exempt
+async def metrics(request: Request):
+    """Prometheus metrics endpoint"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,154 @@
+"""
+Tests for agent specs, plugin discovery and per-agent execution resources
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import agents
+from core.agent_runtime import AgentRuntime, AgentSpec, AgentTimeout
+
+
+def test_task_over_timeout_raises_504():
+    """Test that a task running past the spec's timeout gives a 504"""
+    runtime = AgentRuntime(
+        AgentSpec(key="slow", name="Slow", description="", timeout=0.1)
+    )
+
+    with pytest.raises(AgentTimeout) as exc_info:
+        asyncio.run(runtime.run(time.sleep, 0.5))
+    assert exc_info.value.status_code == 504
+    runtime.shutdown()
+
+
+def test_concurrency_is_limited_per_agent():
+    """Test that no more than max_concurrency tasks of an agent run at once"""
+    runtime = AgentRuntime(
+        AgentSpec(
+            key="busy", name="Busy", description="", max_concurrency=2, pool_size=8
+        )
+    )
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def task():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+
+    async def run_all():
+        await asyncio.gather(*(runtime.run(task) for _ in range(6)))
+
+    asyncio.run(run_all())
+    assert max(peak) == 2
+    runtime.shutdown()
+
+
+def test_queued_tasks_get_their_own_timeout():
+    """Test waiting for a slot does not eat into a task's run time"""
+    runtime = AgentRuntime(
+        AgentSpec(
+            key="queue", name="Queue", description="", max_concurrency=1, timeout=0.3
+        )
+    )
+
+    async def run_all():
+        # Together these take longer than the timeout, each one does not
+        await asyncio.gather(*(runtime.run(time.sleep, 0.2) for _ in range(2)))
+
+    asyncio.run(run_all())
+    runtime.shutdown()
+
+
+def test_timed_out_task_keeps_its_slot():
+    """Test an abandoned task still counts against max_concurrency"""
+    runtime = AgentRuntime(
+        AgentSpec(
+            key="stuck", name="Stuck", description="", max_concurrency=1, timeout=0.2
+        )
+    )
+
+    async def run_all():
+        with pytest.raises(AgentTimeout):
+            await runtime.run(time.sleep, 0.3)
+        start = time.perf_counter()
+        await runtime.run(time.sleep, 0)
+        return time.perf_counter() - start
+
+    # The second task only starts once the first has really finished
+    assert asyncio.run(run_all()) >= 0.05
+    runtime.shutdown()
+
+
+def test_process_executor_runs_tasks_in_workers():
+    """Test that "process" agents run tasks outside this process"""
+    runtime = AgentRuntime(
+        AgentSpec(key="cpu", name="CPU", description="", executor="process", timeout=30)
+    )
+
+    assert asyncio.run(runtime.run(os.getpid)) != os.getpid()
+    runtime.shutdown()
+
+
+def test_broken_process_pool_is_rebuilt():
+    """Test a worker dying fails its task, and the next task gets a new pool"""
+    runtime = AgentRuntime(
+        AgentSpec(
+            key="crash",
+            name="Crash",
+            description="",
+            executor="process",
+            pool_size=1,
+            timeout=30,
+        )
+    )
+
+    async def run_all():
+        with pytest.raises(BrokenProcessPool):
+            await runtime.run(os._exit, 1)
+        return await runtime.run(os.getpid)
+
+    assert asyncio.run(run_all()) != os.getpid()
+    runtime.shutdown()
+
+
+def test_entry_point_plugins_are_discovered(monkeypatch):
+    """Test that installed agents are registered without overriding built-ins"""
+    plugin = AgentSpec(key="plugin_agent", name="Plugin Agent", description="")
+    clash = AgentSpec(key="article_extractor", name="Impostor", description="")
+
+    class FakeEntryPoint:
+        def __init__(self, name, value):
+            self.name = name
+            self._value = value
+
+        def load(self):
+            if isinstance(self._value, Exception):
+                raise self._value
+            return self._value
+
+    def fake_entry_points(group):
+        assert group == agents.ENTRY_POINT_GROUP
+        return [
+            FakeEntryPoint("plugin", lambda: plugin),
+            FakeEntryPoint("clash", clash),
+            FakeEntryPoint("broken", ImportError("missing dependency")),
+            FakeEntryPoint("wrong_type", {"key": "dict_agent"}),
+        ]
+
+    monkeypatch.setattr(agents, "entry_points", fake_entry_points)
+    specs = agents.discover_agents()
+
+    assert specs["plugin_agent"] is plugin
+    assert specs["article_extractor"].name == "Article Link Extractor"
+    assert "dict_agent" not in specs
+    assert list(specs)[: len(agents.BUILTIN_AGENTS)] == list(agents.BUILTIN_AGENTS)
@@ -0,0 +1,186 @@
+"""
+Tests for link enrichment
+"""
+
+import asyncio
+import time
+
+import pytest
+
+import core.enrichment
+from core.enrichment import (
+    LinkEnricher,
+    apply_head,
+    detect_charset,
+    fetch_head,
+    parse_head,
+)
+from core.models import ExtractedLink
+
+HEAD = """
+<html><head>
+<title>Plain title</title>
+<meta property="og:title" content="Open Graph title">
+<meta name="description" content="Meta description">
+<meta name="twitter:description" content="Twitter description">
+<meta property="article:tag" content="Python">
+<meta name="keywords" content="web, python , APIs">
+<meta property="og:image" content="/cover.png">
+<link rel="canonical" href="/posts/1">
+<link rel="shortcut icon" href="https://cdn.example.com/icon.ico">
+</head><body><p>ignored</p></body></html>
+"""
+
+
+def test_parse_head_prefers_social_meta():
+    """Test og:/twitter: meta, canonical and icons are read and resolved"""
+    head = parse_head(HEAD, "https://example.com/posts/1?utm_source=feed")
+
+    assert head["title"] == "Open Graph title"
+    assert head["description"] == "Twitter description"
+    assert head["tags"] == ["python", "web", "apis"]
+    assert head["canonical_url"] == "https://example.com/posts/1"
+    assert head["favicon"] == "https://cdn.example.com/icon.ico"
+    assert head["image"] == "https://example.com/cover.png"
+
+
+def test_parse_head_defaults_favicon():
+    """Test a page without icon links falls back to /favicon.ico"""
+    head = parse_head("<title>x</title>", "https://example.com/a/b")
+    assert head["favicon"] == "https://example.com/favicon.ico"
+
+
+class FakeResponse:
+    """Streamed response as returned by the polite fetcher"""
+
+    def __init__(self, body: bytes, content_type: str):
+        self.headers = {"content-type": content_type}
+        self.url = "https://example.com/"
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+def test_detect_charset_order():
+    """Test a BOM wins over the header, which wins over <meta>; UTF-8 otherwise"""
+    meta = b'<meta charset="windows-1252">'
+    assert detect_charset(b"\xef\xbb\xbf" + meta, "text/html; charset=latin-1") == (
+        "utf-8"
+    )
+    assert detect_charset(meta, "text/html; charset=latin-1") == "iso8859-1"
+    assert detect_charset(meta, "text/html") == "cp1252"
+    assert detect_charset(b"<title>x</title>", "text/html") == "utf-8"
+    assert detect_charset(b'<meta charset="bogus">', None) == "utf-8"
+
+
+def test_fetch_head_decodes_meta_charset(monkeypatch):
+    """Test a UTF-8 page declared only in <meta> is not read as ISO-8859-1"""
+    body = (
+        '<html><head><meta charset="utf-8"><title>Café – naïve</title></head>'
+    ).encode("utf-8")
+    monkeypatch.setattr(
+        core.enrichment.fetcher,
+        "get",
+        lambda url, **kwargs: FakeResponse(body, "text/html"),
+    )
+
+    assert fetch_head("https://example.com/")["title"] == "Café – naïve"
+
+
+def test_apply_head_keeps_anchor_text():
+    """Test the page description replaces anchor text, which moves to metadata"""
+    link = ExtractedLink(url="https://example.com/posts/1", description="read this")
+    enriched = apply_head(link, parse_head(HEAD, link.url))
+
+    assert enriched.description == "Twitter description"
+    assert enriched.title == "Open Graph title"
+    assert enriched.metadata["anchor_text"] == "read this"
+    assert enriched.metadata["canonical_url"] == "https://example.com/posts/1"
+    assert link.metadata is None
+
+
+def test_enrich_returns_partial_results_at_deadline(monkeypatch):
+    """Test slow pages are skipped at the deadline and cached once they finish"""
+
+    def fake_fetch_head(url):
+        if "slow" in url:
+            time.sleep(0.3)
+        return {"description": f"About {url}"}
+
+    monkeypatch.setattr(core.enrichment, "fetch_head", fake_fetch_head)
+    enricher = LinkEnricher()
+    links = [
+        ExtractedLink(url="https://fast.example.com/"),
+        ExtractedLink(url="https://slow.example.com/"),
+    ]
+
+    start = time.monotonic()
+    enriched, count = asyncio.run(enricher.enrich(links, deadline_ms=100))
+    assert time.monotonic() - start < 0.25
+    assert count == 1
+    assert enriched[0].description == "About https://fast.example.com/"
+    assert enriched[1].description is None
+
+    # The slow fetch kept running and feeds the next request from the cache
+    time.sleep(0.3)
+    enriched, count = asyncio.run(enricher.enrich(links, deadline_ms=100))
+    assert count == 2
+
+
+def test_enrich_caches_failures(monkeypatch):
+    """Test a failing page is not fetched again while its failure is cached"""
+    calls = []
+
+    def failing_fetch_head(url):
+        calls.append(url)
+        raise RuntimeError("unreachable")
+
+    monkeypatch.setattr(core.enrichment, "fetch_head", failing_fetch_head)
+    enricher = LinkEnricher()
+    links = [ExtractedLink(url="https://down.example.com/")]
+
+    for _ in range(2):
+        enriched, count = asyncio.run(enricher.enrich(links, deadline_ms=500))
+        assert count == 0
+        assert enriched == links
+    assert len(calls) == 1
+
+
+def test_enrich_charges_each_fetch(monkeypatch):
+    """Test only cache misses are charged, and a refused charge fetches nothing"""
+    calls = []
+    charged = []
+
+    def fake_fetch_head(url):
+        calls.append(url)
+        return {"description": "About"}
+
+    monkeypatch.setattr(core.enrichment, "fetch_head", fake_fetch_head)
+    enricher = LinkEnricher()
+    links = [
+        ExtractedLink(url="https://a.example.com/"),
+        ExtractedLink(url="https://a.example.com/?utm_source=x"),
+        ExtractedLink(url="https://b.example.com/"),
+    ]
+
+    asyncio.run(enricher.enrich(links, deadline_ms=500, charge=charged.append))
+    asyncio.run(enricher.enrich(links, deadline_ms=500, charge=charged.append))
+    assert charged == [2]
+
+    def refuse(fetches):
+        raise RuntimeError("over budget")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            enricher.enrich(
+                [ExtractedLink(url="https://c.example.com/")], charge=refuse
+            )
+        )
+    assert len(calls) == 2
@@ -0,0 +1,248 @@
+"""
+Tests for the polite outbound fetcher
+"""
+
+import io
+import threading
+import time
+
+import pytest
+import requests
+
+import core.fetcher
+from core.fetcher import (
+    MAX_ROBOTS_BYTES,
+    FetchBusy,
+    FetchPriority,
+    HostScheduler,
+    PoliteFetcher,
+    PrivateAddress,
+    RobotsDisallowed,
+    is_public_address,
+    parse_retry_after,
+)
+
+
+def _response(status_code: int, body: str = "", headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body.encode()
+    response._content_consumed = True
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeSession:
+    """Answers GETs from a dict of URL -> list of responses"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        queue = self.responses.get(url)
+        if not queue:
+            return _response(404)
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+
+def _scheduler(**overrides) -> HostScheduler:
+    limits = dict(
+        rate=1000, burst=10, host_concurrency=4, max_concurrency=8, max_queue=16
+    )
+    limits.update(overrides)
+    return HostScheduler(**limits)
+
+
+def test_parse_retry_after():
+    """Test both delta-seconds and HTTP-date forms are understood"""
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+
+
+def test_host_rate_is_paced():
+    """Test requests to one host are spaced by its token bucket"""
+    scheduler = _scheduler(rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(3):
+        scheduler.acquire("example.com", FetchPriority.INTERACTIVE, timeout=5)
+        scheduler.release("example.com")
+    assert time.monotonic() - start >= 0.09
+
+    # Another host has its own bucket
+    start = time.monotonic()
+    scheduler.acquire("other.com", FetchPriority.INTERACTIVE, timeout=5)
+    assert time.monotonic() - start < 0.05
+
+
+def test_interactive_fetches_go_first():
+    """Test a waiting interactive fetch overtakes earlier background fetches"""
+    scheduler = _scheduler(max_concurrency=1)
+    scheduler.acquire("a.com", FetchPriority.INTERACTIVE, timeout=5)
+    order = []
+
+    def fetch(host, priority):
+        scheduler.acquire(host, priority, timeout=5)
+        order.append(host)
+        scheduler.release(host)
+
+    threads = [threading.Thread(target=fetch, args=("b.com", FetchPriority.BACKGROUND))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(
+        threading.Thread(target=fetch, args=("c.com", FetchPriority.INTERACTIVE))
+    )
+    threads[1].start()
+    time.sleep(0.05)
+
+    scheduler.release("a.com")
+    for thread in threads:
+        thread.join(5)
+    assert order == ["c.com", "b.com"]
+
+
+def test_full_queue_is_refused():
+    """Test fetches beyond the queue bound fail fast instead of waiting"""
+    scheduler = _scheduler(host_concurrency=1, max_queue=0)
+    with pytest.raises(FetchBusy):
+        scheduler.acquire("example.com", FetchPriority.INTERACTIVE, timeout=5)
+
+    scheduler = _scheduler(host_concurrency=1)
+    scheduler.acquire("example.com", FetchPriority.INTERACTIVE, timeout=5)
+    with pytest.raises(FetchBusy):
+        scheduler.acquire("example.com", FetchPriority.INTERACTIVE, timeout=0.05)
+
+
+def test_robots_txt_is_honoured_and_cached():
+    """Test disallowed paths are refused and robots.txt is fetched once"""
+    session = FakeSession(
+        {
+            "https://example.com/robots.txt": [
+                _response(200, "User-agent: *\nDisallow: /private\n")
+            ],
+            "https://example.com/public": [_response(200, "ok")],
+        }
+    )
+    fetcher = PoliteFetcher(session=session, scheduler=_scheduler())
+
+    assert fetcher.get("https://example.com/public").status_code == 200
+    with pytest.raises(RobotsDisallowed):
+        fetcher.get("https://example.com/private/page")
+    assert session.requested.count("https://example.com/robots.txt") == 1
+
+
+def test_robots_txt_server_error_disallows():
+    """Test a 5xx robots.txt blocks the origin, while a 404 allows everything"""
+    session = FakeSession(
+        {
+            "https://down.com/robots.txt": [_response(503)],
+            "https://open.com/page": [_response(200, "ok")],
+        }
+    )
+    fetcher = PoliteFetcher(session=session, scheduler=_scheduler())
+
+    assert not fetcher.allowed("https://down.com/page")
+    assert fetcher.get("https://open.com/page").status_code == 200
+
+
+def test_retry_after_backs_off_and_retries():
+    """Test a 429 with a short Retry-After is retried after the wait"""
+    session = FakeSession(
+        {
+            "https://api.example.com/items": [
+                _response(429, headers={"Retry-After": "0"}),
+                _response(200, "ok"),
+            ]
+        }
+    )
+    fetcher = PoliteFetcher(session=session, scheduler=_scheduler())
+
+    response = fetcher.get("https://api.example.com/items", respect_robots=False)
+    assert response.status_code == 200
+    assert session.requested == ["https://api.example.com/items"] * 2
+
+
+def test_is_public_address():
+    """Test private, loopback, link-local and mapped addresses are not public"""
+    for address in ["10.0.0.1", "127.0.0.1", "169.254.169.254", "::1", "fe80::1%1"]:
+        assert not is_public_address(address)
+    assert not is_public_address("::ffff:192.168.0.1")
+    assert not is_public_address("not an address")
+    assert is_public_address("93.184.216.34")
+    assert is_public_address("2606:2800:220:1::1")
+
+
+def test_public_only_refuses_private_hosts_and_redirects(monkeypatch):
+    """Test private targets are refused up front and after a redirect"""
+    addresses = {"public.example.com": ["93.184.216.34"], "internal": ["10.0.0.5"]}
+    monkeypatch.setattr(
+        core.fetcher.dns_cache, "resolve", lambda host, port: addresses[host]
+    )
+    session = FakeSession(
+        {
+            "https://public.example.com/robots.txt": [_response(404)],
+            "https://public.example.com/page": [_response(200, "ok")],
+            "https://public.example.com/go": [
+                _response(302, headers={"Location": "http://internal/admin"})
+            ],
+        }
+    )
+    fetcher = PoliteFetcher(session=session, scheduler=_scheduler())
+
+    page = fetcher.get("https://public.example.com/page", public_only=True)
+    assert page.status_code == 200
+    with pytest.raises(PrivateAddress):
+        fetcher.get("https://internal/admin", public_only=True)
+    with pytest.raises(PrivateAddress):
+        fetcher.get("https://public.example.com/go", public_only=True)
+    assert not any("internal" in url for url in session.requested)
+
+
+def test_public_only_checks_robots_txt_redirects(monkeypatch):
+    """Test robots.txt cannot bounce a public_only fetch to a private host"""
+    addresses = {"public.example.com": ["93.184.216.34"]}
+    # IP literals resolve to themselves
+    monkeypatch.setattr(
+        core.fetcher.dns_cache,
+        "resolve",
+        lambda host, port: addresses.get(host, [host]),
+    )
+    session = FakeSession(
+        {
+            "https://public.example.com/robots.txt": [
+                _response(
+                    301,
+                    headers={"Location": "http://169.254.169.254/latest/meta-data"},
+                )
+            ],
+        }
+    )
+    fetcher = PoliteFetcher(session=session, scheduler=_scheduler())
+
+    with pytest.raises(PrivateAddress):
+        fetcher.get("https://public.example.com/page", public_only=True)
+    assert session.requested == ["https://public.example.com/robots.txt"]
+
+
+class CountingBody(io.BytesIO):
+    """Raw response body that records how many bytes were read"""
+
+    def read(self, size=-1, **kwargs):
+        data = super().read(size)
+        self.bytes_read = getattr(self, "bytes_read", 0) + len(data)
+        return data
+
+
+def test_robots_txt_read_stops_at_the_cap():
+    """Test a huge robots.txt is streamed only up to MAX_ROBOTS_BYTES"""
+    body = CountingBody(b"User-agent: *\nDisallow: /private\n" + b"#" * (8 << 20))
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = body
+    session = FakeSession({"https://big.example.com/robots.txt": [response]})
+    fetcher = PoliteFetcher(session=session, scheduler=_scheduler())
+
+    assert not fetcher.allowed("https://big.example.com/private/page")
+    assert body.bytes_read < MAX_ROBOTS_BYTES + 64 * 1024
@@ -2,6 +2,10 @@
 Integration tests for the Cur8t Agents API
 """
 
+import os
+import subprocess
+import sys
+
 import requests
 from fastapi.testclient import TestClient
 
@@ -72,3 +76,66 @@ def test_invalid_article_url():
 
     response = client.post("/agents/article-extractor/", json=test_data)
     assert response.status_code == 422  # Validation error from FastAPI
+
+
+def test_metrics_endpoint():
+    """Test that request latency is exported per route template"""
+    client.get("/health")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/health",status="200"}'
+        in body
+    )
+    assert "http_requests_in_flight" in body
+
+
+def test_rate_limiter_falls_back_when_storage_is_down(monkeypatch):
+    """Test that an unreachable limit storage degrades to local limits"""
+    from core.limiter import limiter
+
+    def storage_down(*args, **kwargs):
+        raise ConnectionError("storage unavailable")
+
+    monkeypatch.setattr(limiter._limiter, "hit", storage_down)
+    monkeypatch.setattr(limiter, "_storage_dead", False)
+
+    # The root endpoint is only covered by the default limit
+    response = client.get("/")
+    assert response.status_code == 200
+    assert limiter._storage_dead is True
+
+
+LAZY_AGENTS_SCRIPT = """
+import sys
+import main
+from fastapi.testclient import TestClient
+
+assert "openai" not in sys.modules
+assert "bs4" not in sys.modules
+
+client = TestClient(main.app)
+assert client.get("/agents/article-extractor/health").status_code == 200
+assert client.get("/agents/bookmark-importer/health").status_code == 503
+statuses = {a["name"]: a["status"] for a in client.get("/").json()["agents"]}
+assert statuses["Bookmark File Importer"] == "unavailable"
+assert statuses["Article Link Extractor"] == "active"
+"""
+
+
+def test_agents_load_lazily_and_fail_independently():
+    """Test that agents import on first request and a broken one is isolated"""
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    result = subprocess.run(
+        [sys.executable, "-c", LAZY_AGENTS_SCRIPT],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,38 @@
+"""
+Tests for the cost-weighted rate limiter
+"""
+
+from core.ratelimit import CostLimiter
+
+
+def test_charges_until_budget_is_spent():
+    """Test that costs are deducted from the per-minute budget"""
+    limiter = CostLimiter("memory://")
+
+    assert limiter.charge("client-a", 40, 100) == 0
+    assert limiter.charge("client-a", 60, 100) == 0
+    assert limiter.charge("client-a", 1, 100) > 0
+
+    # Budgets are per identity
+    assert limiter.charge("client-b", 100, 100) == 0
+
+
+def test_cost_above_budget_is_capped():
+    """Test that one request larger than the budget can still run once"""
+    limiter = CostLimiter("memory://")
+
+    assert limiter.charge("client-a", 5000, 100) == 0
+    assert limiter.charge("client-a", 1, 100) > 0
+
+
+def test_falls_back_to_local_budget_when_storage_fails(monkeypatch):
+    """Test that an unreachable storage degrades to per-process budgets"""
+    limiter = CostLimiter("memory://")
+
+    def storage_down(*args, **kwargs):
+        raise ConnectionError("storage unavailable")
+
+    monkeypatch.setattr(limiter._limiter, "hit", storage_down)
+
+    assert limiter.charge("client-a", 100, 100) == 0
+    assert limiter.charge("client-a", 1, 100) > 0
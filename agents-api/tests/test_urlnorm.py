@@ -0,0 +1,40 @@
+"""
+Tests for URL canonicalization
+"""
+
+from core.urlnorm import canonicalize_url, url_hash
+
+
+def test_equivalent_urls_share_canonical_form():
+    """Scheme, www, default port, trailing slash and tracking params are ignored"""
+    variants = [
+        "https://example.com/a/b?x=1&y=2",
+        "http://www.Example.com:80/a/b/?y=2&x=1",
+        "https://example.com/a//b?x=1&utm_source=feed&y=2&fbclid=abc",
+        "https://EXAMPLE.com/a/b/?x=1&y=2#section",
+    ]
+
+    canonical = {canonicalize_url(url) for url in variants}
+    assert canonical == {"https://example.com/a/b?x=1&y=2"}
+    assert len({url_hash(url) for url in variants}) == 1
+
+
+def test_distinct_urls_stay_distinct():
+    """Meaningful differences in path, query, port and hash routes are kept"""
+    urls = [
+        "https://example.com/a",
+        "https://example.com/b",
+        "https://example.com/a?page=2",
+        "https://example.com:8443/a",
+        "https://example.com/#!/inbox",
+        "https://example.com/#!/sent",
+    ]
+
+    assert len({url_hash(url) for url in urls}) == len(urls)
+
+
+def test_unsupported_urls():
+    """Non-web URLs have no canonical form but still hash"""
+    assert canonicalize_url("mailto:someone@example.com") is None
+    assert canonicalize_url("not a url") is None
+    assert len(url_hash("not a url")) == 64
@@ -0,0 +1,6 @@
+-- Indexes backing keyset pagination and delta sync of favorites in the extension API
+-- Newest-first pages: ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS "favorites_user_created_idx" ON "favorites" ("user_id", "created_at" DESC, "id" DESC);--> statement-breakpoint
+
+-- Changes since a timestamp: ORDER BY updated_at, id
+CREATE INDEX IF NOT EXISTS "favorites_user_updated_idx" ON "favorites" ("user_id", "updated_at", "id");
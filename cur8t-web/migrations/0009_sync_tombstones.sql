@@ -0,0 +1,41 @@
+-- Change tracking for the extension API /sync endpoint
+-- Inserts and updates are found through updated_at; deletes are recorded here
+CREATE TABLE IF NOT EXISTS "sync_tombstones" (
+	"id" bigserial PRIMARY KEY NOT NULL,
+	"user_id" text NOT NULL,
+	"entity" text NOT NULL,
+	"entity_id" uuid NOT NULL,
+	"deleted_at" timestamp DEFAULT (now() AT TIME ZONE 'utc') NOT NULL
+);--> statement-breakpoint
+
+CREATE INDEX IF NOT EXISTS "sync_tombstones_user_deleted_idx" ON "sync_tombstones" ("user_id", "deleted_at", "id");--> statement-breakpoint
+
+-- Row-level delete triggers also fire for ON DELETE CASCADE, so links removed
+-- together with their collection are recorded as well
+CREATE OR REPLACE FUNCTION record_sync_tombstone() RETURNS trigger AS $$
+BEGIN
+	INSERT INTO sync_tombstones (user_id, entity, entity_id)
+	VALUES (OLD.user_id, TG_ARGV[0], OLD.id);
+	RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;--> statement-breakpoint
+
+DROP TRIGGER IF EXISTS "collections_sync_tombstone" ON "collections";--> statement-breakpoint
+CREATE TRIGGER "collections_sync_tombstone" AFTER DELETE ON "collections"
+	FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone('collections');--> statement-breakpoint
+
+DROP TRIGGER IF EXISTS "links_sync_tombstone" ON "links";--> statement-breakpoint
+CREATE TRIGGER "links_sync_tombstone" AFTER DELETE ON "links"
+	FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone('links');--> statement-breakpoint
+
+DROP TRIGGER IF EXISTS "favorites_sync_tombstone" ON "favorites";--> statement-breakpoint
+CREATE TRIGGER "favorites_sync_tombstone" AFTER DELETE ON "favorites"
+	FOR EACH ROW EXECUTE FUNCTION record_sync_tombstone('favorites');--> statement-breakpoint
+
+-- Keyset scans of changed rows per user
+CREATE INDEX IF NOT EXISTS "collections_user_updated_idx" ON "collections" ("user_id", "updated_at", "id");--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS "links_user_updated_idx" ON "links" ("user_id", "updated_at", "id");
+
+-- Tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS can be pruned at any time;
+-- clients whose watermark is older than that are told to reset, e.g.:
+-- DELETE FROM sync_tombstones WHERE deleted_at < (now() AT TIME ZONE 'utc') - interval '30 days';
@@ -0,0 +1,15 @@
+-- One favorite per (user, url), so batched inserts can dedupe with ON CONFLICT
+-- First, remove duplicates by keeping only the earliest favorite for each user-url pair
+WITH duplicates AS (
+  SELECT id,
+         ROW_NUMBER() OVER (PARTITION BY user_id, url ORDER BY created_at ASC, id ASC) as rn
+  FROM favorites
+)
+DELETE FROM favorites
+WHERE id IN (
+  SELECT id FROM duplicates WHERE rn > 1
+);--> statement-breakpoint
+
+-- Add the composite unique constraint on (user_id, url)
+ALTER TABLE "favorites" DROP CONSTRAINT IF EXISTS "favorites_user_id_url_unique";--> statement-breakpoint
+ALTER TABLE "favorites" ADD CONSTRAINT "favorites_user_id_url_unique" UNIQUE("user_id", "url");
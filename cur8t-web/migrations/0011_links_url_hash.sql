@@ -0,0 +1,8 @@
+-- Per-collection de-duplication of links by canonical URL
+-- url_hash is sha256(canonical URL) as computed by the API services (core/urlnorm.py).
+-- Rows without a hash (older rows, or rows written without one) never conflict.
+ALTER TABLE "links" ADD COLUMN IF NOT EXISTS "url_hash" text;--> statement-breakpoint
+
+CREATE UNIQUE INDEX IF NOT EXISTS "links_collection_url_hash_unique" ON "links" ("link_collection_id", "url_hash");
+
+-- Existing rows are hashed by extension-api/backfill_url_hashes.py
@@ -0,0 +1,15 @@
+-- Shared page title cache for the extension API, keyed by canonical URL
+-- url_hash is sha256(canonical URL) as computed by the API services (core/urlnorm.py).
+-- A NULL title means the page had no usable title; failed fetches are stored the
+-- same way with a shorter expiry.
+CREATE TABLE IF NOT EXISTS "url_metadata_cache" (
+	"url_hash" text PRIMARY KEY NOT NULL,
+	"url" text NOT NULL,
+	"title" text,
+	"fetched_at" timestamp DEFAULT (now() AT TIME ZONE 'utc') NOT NULL,
+	"expires_at" timestamp NOT NULL
+);--> statement-breakpoint
+
+-- Expired rows are ignored on read and can be pruned with
+-- DELETE FROM url_metadata_cache WHERE expires_at < now() AT TIME ZONE 'utc';
+CREATE INDEX IF NOT EXISTS "url_metadata_cache_expires_idx" ON "url_metadata_cache" ("expires_at");
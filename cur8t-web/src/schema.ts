@@ -1,13 +1,17 @@
 import {
+  bigserial,
   boolean,
+  index,
   integer,
   jsonb,
   pgTable,
   text,
   timestamp,
   unique,
+  uniqueIndex,
   uuid,
 } from 'drizzle-orm/pg-core';
+import { sql } from 'drizzle-orm';
 
 // Define the users table
 export const UsersTable = pgTable('users', {
@@ -57,40 +61,68 @@ export const GitHubSettingsTable = pgTable('github_settings', {
 });
 
 // Define the link_collection table (list group)
-export const CollectionsTable = pgTable('collections', {
-  id: uuid('id').defaultRandom().primaryKey().notNull(),
-  title: text('title').notNull(),
-  likes: integer('likes').default(0).notNull(),
-  description: text('description').default('').notNull(),
-  userId: text('user_id')
-    .notNull()
-    .references(() => UsersTable.id, { onDelete: 'cascade' }),
-  url: text('url').notNull(),
-  createdAt: timestamp('created_at').notNull().defaultNow(),
-  updatedAt: timestamp('updated_at')
-    .notNull()
-    .$onUpdate(() => new Date()),
-  visibility: text('visibility').notNull().default('private'),
-  sharedEmails: text('shared_emails').array().default([]).notNull(),
-  totalLinks: integer('total_links').default(0).notNull(),
-});
+export const CollectionsTable = pgTable(
+  'collections',
+  {
+    id: uuid('id').defaultRandom().primaryKey().notNull(),
+    title: text('title').notNull(),
+    likes: integer('likes').default(0).notNull(),
+    description: text('description').default('').notNull(),
+    userId: text('user_id')
+      .notNull()
+      .references(() => UsersTable.id, { onDelete: 'cascade' }),
+    url: text('url').notNull(),
+    createdAt: timestamp('created_at').notNull().defaultNow(),
+    updatedAt: timestamp('updated_at')
+      .notNull()
+      .$onUpdate(() => new Date()),
+    visibility: text('visibility').notNull().default('private'),
+    sharedEmails: text('shared_emails').array().default([]).notNull(),
+    totalLinks: integer('total_links').default(0).notNull(),
+  },
+  (table) => ({
+    // Delta sync in the extension API
+    userUpdatedIdx: index('collections_user_updated_idx').on(
+      table.userId,
+      table.updatedAt,
+      table.id
+    ),
+  })
+);
 
 // Define the link table (single link)
-export const LinksTable = pgTable('links', {
-  id: uuid('id').defaultRandom().primaryKey().notNull(),
-  title: text('title').notNull(),
-  url: text('url').notNull(),
-  linkCollectionId: uuid('link_collection_id')
-    .references(() => CollectionsTable.id, { onDelete: 'cascade' })
-    .notNull(),
-  userId: text('user_id')
-    .notNull()
-    .references(() => UsersTable.id, { onDelete: 'cascade' }),
-  createdAt: timestamp('created_at').notNull().defaultNow(),
-  updatedAt: timestamp('updated_at')
-    .notNull()
-    .$onUpdate(() => new Date()),
-});
+export const LinksTable = pgTable(
+  'links',
+  {
+    id: uuid('id').defaultRandom().primaryKey().notNull(),
+    title: text('title').notNull(),
+    url: text('url').notNull(),
+    linkCollectionId: uuid('link_collection_id')
+      .references(() => CollectionsTable.id, { onDelete: 'cascade' })
+      .notNull(),
+    userId: text('user_id')
+      .notNull()
+      .references(() => UsersTable.id, { onDelete: 'cascade' }),
+    // sha256 of the canonical URL, set by the API services for de-duplication
+    urlHash: text('url_hash'),
+    createdAt: timestamp('created_at').notNull().defaultNow(),
+    updatedAt: timestamp('updated_at')
+      .notNull()
+      .$onUpdate(() => new Date()),
+  },
+  (table) => ({
+    // One link per canonical URL per collection
+    collectionUrlHashUnique: uniqueIndex(
+      'links_collection_url_hash_unique'
+    ).on(table.linkCollectionId, table.urlHash),
+    // Delta sync in the extension API
+    userUpdatedIdx: index('links_user_updated_idx').on(
+      table.userId,
+      table.updatedAt,
+      table.id
+    ),
+  })
+);
 
 export const SavedCollectionsTable = pgTable(
   'saved_collections',
@@ -149,18 +181,76 @@ export const AccessRequestsTable = pgTable(
 );
 
 // Define the favorites table for user's important links
-export const FavoritesTable = pgTable('favorites', {
-  id: uuid('id').defaultRandom().primaryKey().notNull(),
-  title: text('title').notNull(),
-  url: text('url').notNull(),
-  userId: text('user_id')
-    .notNull()
-    .references(() => UsersTable.id, { onDelete: 'cascade' }),
-  createdAt: timestamp('created_at').notNull().defaultNow(),
-  updatedAt: timestamp('updated_at')
-    .notNull()
-    .$onUpdate(() => new Date()),
-});
+export const FavoritesTable = pgTable(
+  'favorites',
+  {
+    id: uuid('id').defaultRandom().primaryKey().notNull(),
+    title: text('title').notNull(),
+    url: text('url').notNull(),
+    userId: text('user_id')
+      .notNull()
+      .references(() => UsersTable.id, { onDelete: 'cascade' }),
+    createdAt: timestamp('created_at').notNull().defaultNow(),
+    updatedAt: timestamp('updated_at')
+      .notNull()
+      .$onUpdate(() => new Date()),
+  },
+  (table) => ({
+    // One favorite per URL per user (batched inserts use ON CONFLICT on this)
+    userUrlUnique: unique().on(table.userId, table.url),
+    // Keyset pagination (newest first) and delta sync in the extension API
+    userCreatedIdx: index('favorites_user_created_idx').on(
+      table.userId,
+      table.createdAt.desc(),
+      table.id.desc()
+    ),
+    userUpdatedIdx: index('favorites_user_updated_idx').on(
+      table.userId,
+      table.updatedAt,
+      table.id
+    ),
+  })
+);
+
+// Deleted collections, links and favorites, written by delete triggers
+// (see migrations/0009_sync_tombstones.sql) for the extension API /sync endpoint
+export const SyncTombstonesTable = pgTable(
+  'sync_tombstones',
+  {
+    id: bigserial('id', { mode: 'number' }).primaryKey().notNull(),
+    userId: text('user_id').notNull(),
+    entity: text('entity').notNull(), // collections | links | favorites
+    entityId: uuid('entity_id').notNull(),
+    deletedAt: timestamp('deleted_at')
+      .notNull()
+      .default(sql`(now() AT TIME ZONE 'utc')`),
+  },
+  (table) => ({
+    userDeletedIdx: index('sync_tombstones_user_deleted_idx').on(
+      table.userId,
+      table.deletedAt,
+      table.id
+    ),
+  })
+);
+
+// Page titles shared by every extension API instance, keyed by canonical URL
+// (see migrations/0012_url_metadata_cache.sql); a null title means none was found
+export const UrlMetadataCacheTable = pgTable(
+  'url_metadata_cache',
+  {
+    urlHash: text('url_hash').primaryKey().notNull(),
+    url: text('url').notNull(),
+    title: text('title'),
+    fetchedAt: timestamp('fetched_at')
+      .notNull()
+      .default(sql`(now() AT TIME ZONE 'utc')`),
+    expiresAt: timestamp('expires_at').notNull(),
+  },
+  (table) => ({
+    expiresIdx: index('url_metadata_cache_expires_idx').on(table.expiresAt),
+  })
+);
 
 // Subscription plans table (no AI token fields yet)
 export const PlansTable = pgTable(
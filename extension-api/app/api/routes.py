@@ -1,29 +1,58 @@
+import asyncio
+import base64
 import hashlib
 import hmac
+import json
 import logging
+import math
 import os
 import uuid
-from datetime import datetime
-from typing import Any, Dict, Optional, Union
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from fastapi import APIRouter, Header, HTTPException, Request
-
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import Response
+from starlette.requests import ClientDisconnect
 
+from ..core.config import settings
 from ..core.database import (
+    DatabaseSession,
     clear_cache,
-    execute_insert,
-    execute_query,
-    execute_query_all,
-    execute_query_one,
+    execute_prepared,
+    fetch_prepared_all,
+    fetch_prepared_one,
+    get_db_session,
     get_pool,
+    get_read_db_session,
     health_check,
 )
+from ..core.ingest import (
+    CsvLineParser,
+    IngestLineError,
+    IngestProgressResponse,
+    IngestRow,
+    detect_format,
+    insert_links_batch,
+    parse_ndjson_line,
+    read_batches,
+)
+from ..core.ratelimit import cost_limiter, plan_credit_budget
+from ..core.serialization import (
+    FAVORITE_FIELDS,
+    LINK_FIELDS,
+    json_response,
+    rows_to_dicts,
+)
+from ..core.statements import Row
 from ..core.subscription import subscription_service
-from ..core.utils import extract_title_from_url, generate_fallback_title, limiter
+from ..core.title_backfill import title_backfill
+from ..core.title_cache import title_cache
+from ..core.urlnorm import url_hash
+from ..core.utils import generate_fallback_title, limiter
 from ..models.schemas import (
+    BatchFavoriteResult,
+    BatchFavoritesRequest,
+    BatchFavoritesResponse,
     BulkCreateLinkResponse,
     BulkLinkRequest,
     Collection,
@@ -41,43 +70,38 @@ from ..models.schemas import (
     FavoritesResponse,
     Link,
     SubscriptionErrorResponse,
+    SyncChanges,
+    SyncResponse,
     TopCollectionsResponse,
     UpdateFavoriteRequest,
     UpdateFavoriteResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
-async def get_user_id_from_api_key(authorization: Optional[str] = Header(None)) -> str:
+async def get_user_id_from_api_key(
+    authorization: Optional[str] = Header(None),
+    db: Optional[DatabaseSession] = None,
+) -> str:
     """Extract and validate API key, then return the associated user ID"""
-    logger.info(f"🔑 Authorization header received: {authorization}")
-    logger.info(f"🔑 Authorization type: {type(authorization)}")
-    logger.info(f"🔑 Authorization is None: {authorization is None}")
-
+    # Never log the header or the key itself
     if not authorization:
-        logger.error("❌ No authorization header provided")
+        logger.debug("No authorization header provided")
         raise HTTPException(status_code=401, detail="Authorization header required")
 
-    logger.info(
-        f"🔑 Authorization starts with 'Bearer ': {authorization.startswith('Bearer ')}"
-    )
-
     if not authorization.startswith("Bearer "):
-        logger.error(
-            f"❌ Invalid authorization format. Expected 'Bearer <api_key>', got: {authorization}"
-        )
+        logger.debug("Authorization header is not a Bearer token")
         raise HTTPException(status_code=401, detail="Invalid authorization format")
 
     api_key = authorization[7:]  # Remove "Bearer " prefix
-    logger.info(
-        f"🔑 Extracted API key: {api_key[:8]}...{api_key[-4:] if len(api_key) > 12 else api_key}"
-    )
 
     # Get the pepper from environment variables
     pepper = os.getenv("API_KEY_PEPPER")
     if not pepper:
-        logger.error("❌ API_KEY_PEPPER environment variable not set")
+        logger.error("API_KEY_PEPPER environment variable not set")
         raise HTTPException(status_code=500, detail="Server configuration error")
 
     # Compute HMAC-SHA256 hash with pepper to compare with stored value
@@ -87,38 +111,109 @@ async def get_user_id_from_api_key(authorization: Optional[str] = Header(None))
 
     # Validate API key against database
     try:
-        api_key_query = """
-            SELECT ak.user_id, ak.name, ak.created_at, u.name as user_name
-            FROM api_keys ak
-            JOIN users u ON ak.user_id = u.id
-            WHERE ak.key = $1
-        """
-
-        logger.info(f"🔍 Validating API key in database (HMAC hash compare)...")
-        api_key_result = await execute_query_one(api_key_query, (api_key_hash,))
+        api_key_result = await fetch_prepared_one("auth.api_key", api_key_hash, db=db)
 
         if not api_key_result:
-            logger.error(f"❌ Invalid API key: {api_key[:8]}...")
+            logger.debug("Unknown API key presented")
             raise HTTPException(status_code=401, detail="Invalid API key")
 
         user_id = api_key_result["user_id"]
-        api_key_name = api_key_result["name"]
-        user_name = api_key_result["user_name"]
-
-        logger.info(
-            f"✅ Valid API key '{api_key_name}' for user: {user_name} (ID: {user_id})"
-        )
+        logger.debug("Authenticated user %s", user_id)
         return user_id
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Database error during API key validation: {str(e)}")
+        logger.error("Database error during API key validation: %s", e)
         raise HTTPException(
             status_code=500, detail="Authentication service unavailable"
         )
 
 
+async def _resolve_link_titles(links: List[CreateLinkRequest]) -> List[str]:
+    """Return the given title for each link, extracting it from the page if empty"""
+    titles = []
+    for link_data in links:
+        final_title = link_data.title or ""
+        if not final_title.strip():
+            try:
+                final_title = await title_cache.get_title(str(link_data.url))
+            except Exception:
+                final_title = generate_fallback_title(str(link_data.url))
+        titles.append(final_title)
+    return titles
+
+
+def _link_from_row(row) -> Link:
+    return Link(
+        id=str(row["id"]),
+        title=row["title"],
+        url=row["url"],
+        linkCollectionId=str(row["link_collection_id"]),
+        userId=row["user_id"],
+        createdAt=row["created_at"],
+        updatedAt=row["updated_at"],
+    )
+
+
+def _dedupe_links(
+    links: List[CreateLinkRequest],
+) -> Tuple[List[CreateLinkRequest], List[str]]:
+    """Drop links whose canonical URL repeats an earlier one in the same request"""
+    unique_links, hashes, seen = [], [], set()
+    for link_data in links:
+        link_hash = url_hash(str(link_data.url))
+        if link_hash not in seen:
+            seen.add(link_hash)
+            unique_links.append(link_data)
+            hashes.append(link_hash)
+    return unique_links, hashes
+
+
+async def _insert_links(
+    collection_id: str,
+    user_id: str,
+    links: List[CreateLinkRequest],
+    titles: List[str],
+    hashes: List[str],
+    db: DatabaseSession,
+) -> List[Row]:
+    """Insert links in one statement, skipping URLs already in the collection"""
+    if not links:
+        return []
+    rows = await fetch_prepared_all(
+        "links.insert_many",
+        collection_id,
+        user_id,
+        datetime.utcnow(),
+        [str(uuid.uuid4()) for _ in links],
+        titles,
+        [str(link_data.url) for link_data in links],
+        hashes,
+        db=db,
+    )
+    return rows
+
+
+async def _charge_request(user_id: str, cost: int, db: DatabaseSession) -> None:
+    """Charge ``cost`` credits against the user's plan budget or raise a 429"""
+    if not settings.rate_limit_enabled:
+        return
+    subscription = await subscription_service.get_user_subscription(user_id, db=db)
+    budget = plan_credit_budget(subscription["limits"] if subscription else {})
+    retry_after = cost_limiter.charge(user_id, cost, budget)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": f"Rate limit exceeded: {budget} credits per minute",
+                "plan": subscription["plan_slug"] if subscription else None,
+                "retry_after": math.ceil(retry_after),
+            },
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
 @router.get("/")
 @limiter.exempt
 def root():
@@ -141,18 +236,18 @@ async def test_db():
             result = await conn.fetchval("SELECT 1 as test")
             return {"status": "success", "result": result}
     except Exception as e:
-        logger.error(f"❌ Database test failed: {str(e)}")
+        logger.error("Database test failed: %s", e)
         return {"status": "error", "error": str(e)}
 
 
 @router.get("/test-auth")
-async def test_auth(authorization: Optional[str] = Header(None)):
+async def test_auth(
+    authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
+):
     """Test endpoint to debug API key authentication"""
-    logger.info(f"🧪 TEST AUTH - Received header: {authorization}")
-    logger.info(f"🧪 TEST AUTH - Header type: {type(authorization)}")
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
+        user_id = await get_user_id_from_api_key(authorization, db)
 
         response = {
             "success": True,
@@ -198,7 +293,7 @@ async def test_auth(authorization: Optional[str] = Header(None)):
             ),
         }
 
-    logger.info(f"🧪 TEST AUTH - Response: {response}")
+    logger.debug("Test auth success=%s", response["success"])
     return response
 
 
@@ -207,29 +302,19 @@ async def test_auth(authorization: Optional[str] = Header(None)):
 )
 @limiter.limit("60/minute")
 async def get_top_collections(
-    request: Request, authorization: Optional[str] = Header(None)
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_read_db_session),
 ):
     """Get user's top 5 collections"""
-    logger.info("🚀 TOP COLLECTIONS - Endpoint called")
-    logger.info(f"🚀 TOP COLLECTIONS - Authorization header: {authorization}")
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
-        logger.info(f"🚀 TOP COLLECTIONS - User ID extracted: {user_id}")
+        user_id = await get_user_id_from_api_key(authorization, db)
 
         # Get user's top collections array
-        user_query = """
-            SELECT top_collections 
-            FROM users 
-            WHERE id = $1 
-            LIMIT 1
-        """
-        logger.info(f"🔍 Executing user query for user_id: {user_id}")
-        user_result = await execute_query_one(user_query, (user_id,))
-        logger.info(f"🔍 User query result: {user_result}")
+        user_result = await fetch_prepared_one("users.top_collections", user_id, db=db)
 
         if not user_result:
-            logger.error(f"❌ User not found in database: {user_id}")
+            logger.warning("User %s not found for top collections", user_id)
             raise HTTPException(status_code=404, detail="User not found")
 
         top_collection_ids = (
@@ -239,21 +324,14 @@ async def get_top_collections(
         if not top_collection_ids:
             return TopCollectionsResponse(data=[])
 
-        # Convert list to format for SQL IN clause
-        placeholders = ",".join(["%s"] * len(top_collection_ids))
-
         # Get the actual collection details
         # Cast the text array to UUID array for proper comparison
-        collections_query = """
-            SELECT id, title, description, visibility, total_links as "totalLinks", created_at as "createdAt"
-            FROM collections 
-            WHERE user_id = $1 AND id = ANY($2::uuid[])
-        """
-
-        collections_result = await execute_query_all(
-            collections_query,
-            (user_id, top_collection_ids),
+        collections_result = await fetch_prepared_all(
+            "collections.by_ids",
+            user_id,
+            top_collection_ids,
             cache_key=f"top_collections_{user_id}",
+            db=db,
         )
 
         # Maintain the order from top_collection_ids
@@ -275,12 +353,10 @@ async def get_top_collections(
 
         return TopCollectionsResponse(data=ordered_collections)
 
-    except HTTPException as e:
-        logger.error(f"❌ HTTP Exception in top collections: {e.detail}")
+    except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Unexpected error in top collections: {str(e)}")
-        logger.error(f"❌ Exception type: {type(e)}")
+        logger.exception("Unexpected error in top collections")
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch top collections: {str(e)}"
         )
@@ -297,17 +373,16 @@ async def create_collection(
     request: Request,
     collection_data: CreateCollectionRequest,
     authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
 ):
     """Create a new collection"""
-    logger.info("📁 CREATE COLLECTION - Endpoint called")
-    logger.info(f"📁 CREATE COLLECTION - Title: {collection_data.title}")
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
+        user_id = await get_user_id_from_api_key(authorization, db)
+        await _charge_request(user_id, 1, db)
 
         # Check subscription limits
         can_create, error_message, plan_slug = (
-            await subscription_service.check_collection_limit(user_id)
+            await subscription_service.check_collection_limit(user_id, db=db)
         )
         if not can_create:
             raise HTTPException(
@@ -327,28 +402,21 @@ async def create_collection(
 
         # Create new collection
         collection_id = str(uuid.uuid4())
-        insert_collection_query = """
-            INSERT INTO collections (id, title, description, visibility, user_id, total_links, created_at, updated_at, url)
-            VALUES ($1::uuid, $2, $3, $4, $5, $6, $7, $8, $9)
-            RETURNING id, title, description, visibility, total_links, created_at
-        """
-
         now = datetime.utcnow()
         # For collections without links, use a default URL
         collection_url = "https://cur8t.com"
-        created_collection = await execute_insert(
-            insert_collection_query,
-            (
-                collection_id,
-                collection_data.title,
-                collection_data.description,
-                collection_data.visibility,
-                user_id,
-                0,
-                now,
-                now,
-                collection_url,
-            ),
+        created_collection = await fetch_prepared_one(
+            "collections.insert",
+            collection_id,
+            collection_data.title,
+            collection_data.description,
+            collection_data.visibility,
+            user_id,
+            0,
+            now,
+            now,
+            collection_url,
+            db=db,
         )
 
         if not created_collection:
@@ -363,9 +431,7 @@ async def create_collection(
             createdAt=created_collection["created_at"],
         )
 
-        logger.info(
-            f"📁 CREATE COLLECTION - Successfully created collection: {collection_id}"
-        )
+        logger.debug("Created collection %s", collection_id)
 
         return CreateCollectionResponse(success=True, data=response_collection)
 
@@ -387,67 +453,44 @@ async def create_link(
     collection_id: str,
     link_data: CreateLinkRequest,
     authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
 ):
     """Add a link to a collection"""
-    logger.info(f"🔗 CREATE LINK - Endpoint called for collection: {collection_id}")
-    logger.info(
-        f"🔗 CREATE LINK - Authorization header present: {authorization is not None}"
-    )
-
     try:
-        logger.info(f"🔑 Extracting user ID from API key...")
-        user_id = await get_user_id_from_api_key(authorization)
-        logger.info(f"✅ User ID extracted successfully: {user_id}")
+        user_id = await get_user_id_from_api_key(authorization, db)
+        await _charge_request(user_id, 1, db)
 
         # Validate collection exists and belongs to user
-        logger.info(f"🔍 Validating collection ownership...")
-        collection_query = """
-            SELECT id, total_links 
-            FROM collections 
-            WHERE id = $1::uuid AND user_id = $2
-        """
-        logger.info(f"🔍 Collection query: {collection_query}")
-        logger.info(f"🔍 Collection ID: {collection_id}, User ID: {user_id}")
-
-        collection_result = await execute_query_one(
-            collection_query, (collection_id, user_id)
+        collection_result = await fetch_prepared_one(
+            "collections.owned", collection_id, user_id, db=db
         )
 
-        logger.info(f"🔍 Collection query result: {collection_result}")
-
         if not collection_result:
-            logger.error(f"❌ Collection not found or doesn't belong to user")
             raise HTTPException(status_code=404, detail="Collection not found")
 
-        logger.info(
-            f"✅ Collection validation successful. Current total links: {collection_result['total_links']}"
+        # Adding a URL that is already in the collection returns the existing link
+        link_hash = url_hash(str(link_data.url))
+        existing_link = await fetch_prepared_one(
+            "links.by_hash", collection_id, link_hash, db=db
         )
+        if existing_link:
+            return CreateLinkResponse(success=True, data=_link_from_row(existing_link))
 
         # Check subscription limits for links
-        logger.info(f"📊 About to check subscription limits for links...")
-        logger.info(f"📊 User ID: {user_id}, Collection ID: {collection_id}")
-
         try:
             can_add, error_message, plan_slug = (
-                await subscription_service.check_links_limit(user_id, collection_id)
+                await subscription_service.check_links_limit(
+                    user_id, collection_id, db=db
+                )
             )
-            logger.info(f"📊 Subscription check completed:")
-            logger.info(f"   - Can add links: {can_add}")
-            logger.info(f"   - Error message: {error_message}")
-            logger.info(f"   - Plan slug: {plan_slug}")
         except Exception as sub_error:
-            logger.error(f"❌ Exception during subscription check: {str(sub_error)}")
-            logger.error(f"❌ Exception type: {type(sub_error)}")
-            import traceback
-
-            logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+            logger.exception("Subscription check failed for user %s", user_id)
             raise HTTPException(
                 status_code=500, detail=f"Subscription service error: {str(sub_error)}"
             )
 
         if not can_add:
-            logger.error(f"❌ Subscription limit exceeded: {error_message}")
-            logger.error(f"❌ Plan: {plan_slug}, Upgrade required: True")
+            logger.debug("Link limit reached for user %s (%s)", user_id, plan_slug)
             raise HTTPException(
                 status_code=403,
                 detail={
@@ -457,38 +500,37 @@ async def create_link(
                 },
             )
 
-        logger.info(f"✅ Subscription limits check passed")
-
         # Extract title if not provided
-        logger.info(f"📝 Processing link title...")
         final_title = link_data.title or ""
+        backfill_title = False
         if not final_title.strip():
-            logger.info(f"📝 No title provided, extracting from URL...")
-            try:
-                final_title = await extract_title_from_url(str(link_data.url))
-                logger.info(f"📝 Title extracted: {final_title}")
-            except Exception as title_error:
-                logger.warning(f"⚠️ Title extraction failed: {str(title_error)}")
+            defer_title = link_data.defer_title
+            if defer_title is None:
+                defer_title = settings.defer_link_titles
+            cached_title = title_cache.peek(str(link_data.url))
+            if cached_title:
+                final_title = cached_title
+            elif defer_title:
+                # Insert under a placeholder; the page is fetched after responding
                 final_title = generate_fallback_title(str(link_data.url))
-                logger.info(f"📝 Using fallback title: {final_title}")
+                backfill_title = True
+            else:
+                # Don't hold a pooled connection while the page is fetched
+                await db.release()
+                try:
+                    final_title = await title_cache.get_title(str(link_data.url))
+                except Exception as title_error:
+                    logger.debug("Title extraction failed: %s", title_error)
+                    final_title = generate_fallback_title(str(link_data.url))
 
         # Insert the new link
-        logger.info(f"💾 Inserting new link into database...")
         link_id = str(uuid.uuid4())
-        insert_link_query = """
-            INSERT INTO links (id, title, url, link_collection_id, user_id, created_at, updated_at)
-            VALUES ($1::uuid, $2, $3, $4::uuid, $5, $6, $7)
-            RETURNING id, title, url, link_collection_id, user_id, created_at, updated_at
-        """
-
         now = datetime.utcnow()
-        logger.info(f"💾 Inserting link with ID: {link_id}")
-        logger.info(f"💾 URL: {link_data.url}")
-        logger.info(f"💾 Title: {final_title}")
 
-        created_link = await execute_insert(
-            insert_link_query,
-            (
+        # Insert the link and bump the collection counter atomically
+        async with db.transaction():
+            created_link = await fetch_prepared_one(
+                "links.insert",
                 link_id,
                 final_title,
                 str(link_data.url),
@@ -496,63 +538,39 @@ async def create_link(
                 user_id,
                 now,
                 now,
-            ),
-        )
-
-        if not created_link:
-            logger.error(f"❌ Failed to insert link into database")
-            raise HTTPException(status_code=500, detail="Failed to create link")
-
-        logger.info(f"✅ Link inserted successfully: {created_link}")
-
-        # Update collection's total links count
-        logger.info(f"📊 Updating collection total links count...")
-        current_total = collection_result["total_links"]
-        new_total = current_total + 1
-        logger.info(f"📊 Current total: {current_total}, New total: {new_total}")
+                link_hash,
+                db=db,
+            )
 
-        update_collection_query = """
-            UPDATE collections 
-            SET total_links = $1 
-            WHERE id = $2::uuid AND user_id = $3
-        """
+            if not created_link:
+                # Inserted concurrently by another request
+                existing_link = await fetch_prepared_one(
+                    "links.by_hash", collection_id, link_hash, db=db
+                )
+                if not existing_link:
+                    raise HTTPException(status_code=500, detail="Failed to create link")
+                return CreateLinkResponse(
+                    success=True, data=_link_from_row(existing_link)
+                )
 
-        await execute_query(
-            update_collection_query,
-            (new_total, collection_id, user_id),
-            fetch_all=False,
-        )
+            # Relative update: the count read above may be stale by now
+            await execute_prepared(
+                "collections.add_total_links", 1, collection_id, user_id, db=db
+            )
 
-        logger.info(f"✅ Collection total links updated successfully")
+        if backfill_title:
+            title_backfill.enqueue(link_id, str(link_data.url), final_title)
 
         # Create response link object
-        logger.info(f"📤 Creating response object...")
-        response_link = Link(
-            id=str(created_link["id"]),
-            title=created_link["title"],
-            url=created_link["url"],
-            linkCollectionId=str(created_link["link_collection_id"]),
-            userId=created_link["user_id"],
-            createdAt=created_link["created_at"],
-            updatedAt=created_link["updated_at"],
-        )
+        response_link = _link_from_row(created_link)
 
-        logger.info(
-            f"🎉 CREATE LINK - Successfully completed for collection: {collection_id}"
-        )
+        logger.debug("Created link %s in collection %s", link_id, collection_id)
         return CreateLinkResponse(success=True, data=response_link)
 
     except HTTPException:
-        logger.error(
-            f"❌ HTTP Exception in create_link: {request.status_code if hasattr(request, 'status_code') else 'unknown'}"
-        )
         raise
     except Exception as e:
-        logger.error(f"❌ Unexpected error in create_link: {str(e)}")
-        logger.error(f"❌ Exception type: {type(e)}")
-        import traceback
-
-        logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+        logger.exception("Unexpected error in create_link")
         raise HTTPException(status_code=500, detail=f"Failed to create link: {str(e)}")
 
 
@@ -568,32 +586,41 @@ async def create_bulk_links(
     collection_id: str,
     bulk_data: BulkLinkRequest,
     authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
 ):
     """Add multiple links to a collection at once"""
-    logger.info(f"📦 BULK LINKS - Endpoint called for collection: {collection_id}")
-    logger.info(f"📦 BULK LINKS - Number of links to add: {len(bulk_data.links)}")
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
+        user_id = await get_user_id_from_api_key(authorization, db)
+        await _charge_request(user_id, 1 + len(bulk_data.links), db)
 
         # Validate collection exists and belongs to user
-        collection_query = """
-            SELECT id, total_links 
-            FROM collections 
-            WHERE id = $1::uuid AND user_id = $2
-        """
-        collection_result = await execute_query_one(
-            collection_query, (collection_id, user_id)
+        collection_result = await fetch_prepared_one(
+            "collections.owned", collection_id, user_id, db=db
         )
 
         if not collection_result:
             raise HTTPException(status_code=404, detail="Collection not found")
 
+        # Only canonical URLs new to this collection count against the quota
+        new_links, new_hashes = _dedupe_links(bulk_data.links)
+        if new_hashes:
+            existing_rows = await fetch_prepared_all(
+                "links.existing_hashes", collection_id, new_hashes, db=db
+            )
+            existing = {row["url_hash"] for row in existing_rows}
+            kept = [
+                (link_data, link_hash)
+                for link_data, link_hash in zip(new_links, new_hashes)
+                if link_hash not in existing
+            ]
+            new_links = [link_data for link_data, _ in kept]
+            new_hashes = [link_hash for _, link_hash in kept]
+
         # Check subscription limits for bulk links
-        links_to_add = len(bulk_data.links)
+        links_to_add = len(new_links)
         can_add, error_message, plan_slug = (
             await subscription_service.check_links_limit(
-                user_id, collection_id, links_to_add
+                user_id, collection_id, links_to_add, db=db
             )
         )
         if not can_add:
@@ -606,81 +633,38 @@ async def create_bulk_links(
                 },
             )
 
-        current_total = collection_result["total_links"]
-        created_links = []
-        now = datetime.utcnow()
+        # Resolve titles first so the connection isn't held during page fetches
+        await db.release()
+        titles = await _resolve_link_titles(new_links)
 
-        # Process each link
-        for link_data in bulk_data.links:
-            try:
-                # Extract title if not provided
-                final_title = link_data.title or ""
-                if not final_title.strip():
-                    try:
-                        final_title = await extract_title_from_url(str(link_data.url))
-                    except Exception:
-                        final_title = generate_fallback_title(str(link_data.url))
-
-                # Insert the new link
-                link_id = str(uuid.uuid4())
-                insert_link_query = """
-                    INSERT INTO links (id, title, url, link_collection_id, user_id, created_at, updated_at)
-                    VALUES ($1::uuid, $2, $3, $4::uuid, $5, $6, $7)
-                    RETURNING id, title, url, link_collection_id, user_id, created_at, updated_at
-                """
-
-                created_link = await execute_insert(
-                    insert_link_query,
-                    (
-                        link_id,
-                        final_title,
-                        str(link_data.url),
-                        collection_id,
-                        user_id,
-                        now,
-                        now,
-                    ),
-                )
+        async with db.transaction():
+            created_links = await _insert_links(
+                collection_id, user_id, new_links, titles, new_hashes, db
+            )
 
-                if created_link:
-                    response_link = Link(
-                        id=str(created_link["id"]),
-                        title=created_link["title"],
-                        url=created_link["url"],
-                        linkCollectionId=str(created_link["link_collection_id"]),
-                        userId=created_link["user_id"],
-                        createdAt=created_link["created_at"],
-                        updatedAt=created_link["updated_at"],
-                    )
-                    created_links.append(response_link)
-                    current_total += 1
-
-            except Exception as e:
-                logger.error(f"❌ Failed to create link {link_data.url}: {str(e)}")
-                # Continue with other links even if one fails
-                continue
-
-        # Update collection's total links count
-        update_collection_query = """
-            UPDATE collections 
-            SET total_links = $1 
-            WHERE id = $2::uuid AND user_id = $3
-        """
-        await execute_query(
-            update_collection_query,
-            (current_total, collection_id, user_id),
-            fetch_all=False,
-        )
+            # Relative update: the count read above may be stale by now
+            await execute_prepared(
+                "collections.add_total_links",
+                len(created_links),
+                collection_id,
+                user_id,
+                db=db,
+            )
 
-        logger.info(
-            f"📦 BULK LINKS - Successfully added {len(created_links)} out of {len(bulk_data.links)} links"
+        logger.debug(
+            "Bulk added %d of %d links to %s",
+            len(created_links),
+            len(bulk_data.links),
+            collection_id,
         )
 
-        return BulkCreateLinkResponse(
-            success=True,
-            data=created_links,
-            total_added=len(created_links),
-            total_requested=len(bulk_data.links),
+        return json_response(
+            {
+                "success": True,
+                "data": rows_to_dicts(created_links, LINK_FIELDS),
+                "total_added": len(created_links),
+                "total_requested": len(bulk_data.links),
+            }
         )
 
     except HTTPException:
@@ -691,6 +675,185 @@ async def create_bulk_links(
         )
 
 
+# Rejected lines reported individually per import; the rest are only counted
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+
+def _ndjson_event(event: str, **fields: Any) -> str:
+    return json.dumps({"event": event, **fields}) + "\n"
+
+
+async def _import_link_batch(
+    collection_id: str,
+    user_id: str,
+    rows: List[IngestRow],
+    db: DatabaseSession,
+) -> Tuple[int, Optional[int]]:
+    """
+    Insert one import batch in its own transaction
+
+    Returns:
+        Tuple[int, Optional[int]]: Links added and the collection's new
+        total_links, or None when nothing was added
+    """
+    # Canonical URLs repeated in the batch or already saved don't use quota
+    new_rows: Dict[str, IngestRow] = {}
+    for row in rows:
+        new_rows.setdefault(row[2], row)
+    if new_rows:
+        existing_rows = await fetch_prepared_all(
+            "links.existing_hashes", collection_id, list(new_rows), db=db
+        )
+        for row in existing_rows:
+            new_rows.pop(row["url_hash"], None)
+    if not new_rows:
+        return 0, None
+
+    can_add, error_message, plan_slug = await subscription_service.check_links_limit(
+        user_id, collection_id, len(new_rows), db=db
+    )
+    if not can_add:
+        raise HTTPException(
+            status_code=403,
+            detail={
+                "error": error_message,
+                "plan": plan_slug,
+                "upgrade_required": True,
+            },
+        )
+
+    async with db.transaction():
+        inserted = await insert_links_batch(
+            db, collection_id, user_id, list(new_rows.values())
+        )
+        result = await fetch_prepared_one(
+            "collections.add_total_links", inserted, collection_id, user_id, db=db
+        )
+    return inserted, result["total_links"] if result else None
+
+
+async def _import_link_events(
+    request: Request,
+    collection_id: str,
+    user_id: str,
+    total_links: int,
+    body_format: str,
+    budget: Optional[int],
+    db: DatabaseSession,
+):
+    """Consume the import body batch by batch, yielding NDJSON progress events"""
+    parse_line = parse_ndjson_line if body_format == "ndjson" else CsvLineParser()
+    totals = {"processed": 0, "inserted": 0, "duplicates": 0, "invalid": 0}
+    batch_number = 0
+
+    try:
+        async for rows, errors in read_batches(
+            request.stream(),
+            parse_line,
+            settings.import_batch_size,
+            settings.import_max_rows,
+        ):
+            for line_number, message in errors:
+                if totals["invalid"] < IMPORT_MAX_REPORTED_ERRORS:
+                    yield _ndjson_event("invalid", line=line_number, error=message)
+                totals["invalid"] += 1
+
+            # Large imports are slowed to the plan's credit budget, not failed
+            while budget and rows:
+                retry_after = cost_limiter.charge(user_id, len(rows), budget)
+                if not retry_after:
+                    break
+                yield _ndjson_event(
+                    "throttled", retry_after=math.ceil(retry_after), **totals
+                )
+                await asyncio.sleep(retry_after)
+
+            inserted, new_total = await _import_link_batch(
+                collection_id, user_id, rows, db
+            )
+            # Don't hold a pooled connection while waiting on the upload
+            await db.release()
+
+            batch_number += 1
+            if new_total is not None:
+                total_links = new_total
+            totals["processed"] += len(rows)
+            totals["inserted"] += inserted
+            totals["duplicates"] += len(rows) - inserted
+            yield _ndjson_event("progress", batch=batch_number, **totals)
+
+        logger.debug(
+            "Imported %d of %d links into %s",
+            totals["inserted"],
+            totals["processed"],
+            collection_id,
+        )
+        yield _ndjson_event("done", total_links=total_links, **totals)
+
+    except ClientDisconnect:
+        logger.debug("Client disconnected during import into %s", collection_id)
+    except HTTPException as e:
+        detail = e.detail if isinstance(e.detail, dict) else {"error": e.detail}
+        yield _ndjson_event("error", status=e.status_code, **detail, **totals)
+    except IngestLineError as e:
+        yield _ndjson_event("error", status=400, error=str(e), **totals)
+    except Exception:
+        logger.exception("Link import into %s failed", collection_id)
+        yield _ndjson_event("error", status=500, error="Import failed", **totals)
+    finally:
+        await db.release()
+
+
+@router.post("/collections/{collection_id}/links/import")
+@limiter.limit("10/minute")
+async def import_links(
+    request: Request,
+    collection_id: str,
+    authorization: Optional[str] = Header(None),
+    content_type: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
+):
+    """
+    Stream links into a collection from an NDJSON or CSV request body.
+
+    Rows are validated and inserted in batches of IMPORT_BATCH_SIZE, each in its
+    own transaction, so a failure part way through keeps the earlier batches.
+    The response is NDJSON: a ``progress`` event per batch, ``invalid`` events
+    for rejected lines and a final ``done`` or ``error`` event.
+    """
+    body_format = detect_format(content_type)
+    if body_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Send links as application/x-ndjson or text/csv",
+        )
+
+    user_id = await get_user_id_from_api_key(authorization, db)
+    collection_result = await fetch_prepared_one(
+        "collections.owned", collection_id, user_id, db=db
+    )
+    if not collection_result:
+        raise HTTPException(status_code=404, detail="Collection not found")
+
+    budget = None
+    if settings.rate_limit_enabled:
+        subscription = await subscription_service.get_user_subscription(user_id, db=db)
+        budget = plan_credit_budget(subscription["limits"] if subscription else {})
+    await db.release()
+
+    return IngestProgressResponse(
+        _import_link_events(
+            request,
+            collection_id,
+            user_id,
+            collection_result["total_links"],
+            body_format,
+            budget,
+            db,
+        )
+    )
+
+
 @router.post(
     "/collections/with-links",
     response_model=Union[
@@ -702,20 +865,16 @@ async def create_collection_with_links(
     request: Request,
     request_data: CreateCollectionWithLinksRequest,
     authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
 ):
     """Create a new collection and add multiple links to it in one call"""
-    logger.info("🚀 CREATE COLLECTION WITH LINKS - Endpoint called")
-    logger.info(f"🚀 CREATE COLLECTION WITH LINKS - Title: {request_data.title}")
-    logger.info(
-        f"🚀 CREATE COLLECTION WITH LINKS - Number of links: {len(request_data.links)}"
-    )
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
+        user_id = await get_user_id_from_api_key(authorization, db)
+        await _charge_request(user_id, 1 + len(request_data.links), db)
 
         # Check subscription limits for collection creation
         can_create, error_message, plan_slug = (
-            await subscription_service.check_collection_limit(user_id)
+            await subscription_service.check_collection_limit(user_id, db=db)
         )
         if not can_create:
             raise HTTPException(
@@ -728,10 +887,11 @@ async def create_collection_with_links(
             )
 
         # Check subscription limits for links
-        links_to_add = len(request_data.links)
+        new_links, new_hashes = _dedupe_links(request_data.links)
+        links_to_add = len(new_links)
         can_add_links, links_error_message, links_plan_slug = (
             await subscription_service.check_links_limit(
-                user_id, "new_collection", links_to_add
+                user_id, "new_collection", links_to_add, db=db
             )
         )
         if not can_add_links:
@@ -750,22 +910,20 @@ async def create_collection_with_links(
                 status_code=422, detail="Visibility must be 'private' or 'public'"
             )
 
+        # Resolve titles first so the connection isn't held during page fetches
+        await db.release()
+        titles = await _resolve_link_titles(new_links)
+
         # Create new collection
         collection_id = str(uuid.uuid4())
-        insert_collection_query = """
-            INSERT INTO collections (id, title, description, visibility, user_id, total_links, created_at, updated_at, url)
-            VALUES ($1::uuid, $2, $3, $4, $5, $6, $7, $8, $9)
-            RETURNING id, title, description, visibility, total_links, created_at
-        """
-
         now = datetime.utcnow()
         # Use the first link's URL as the collection URL, or a default if no links
         collection_url = (
             request_data.links[0].url if request_data.links else "https://cur8t.com"
         )
-        created_collection = await execute_insert(
-            insert_collection_query,
-            (
+        async with db.transaction():
+            created_collection = await fetch_prepared_one(
+                "collections.insert",
                 collection_id,
                 request_data.title,
                 request_data.description,
@@ -775,76 +933,27 @@ async def create_collection_with_links(
                 now,
                 now,
                 str(collection_url),
-            ),
-        )
-
-        if not created_collection:
-            raise HTTPException(status_code=500, detail="Failed to create collection")
-
-        # Process each link
-        created_links = []
-        current_total = 0
+                db=db,
+            )
 
-        for link_data in request_data.links:
-            try:
-                # Extract title if not provided
-                final_title = link_data.title or ""
-                if not final_title.strip():
-                    try:
-                        final_title = await extract_title_from_url(str(link_data.url))
-                    except Exception:
-                        final_title = generate_fallback_title(str(link_data.url))
-
-                # Insert the new link
-                link_id = str(uuid.uuid4())
-                insert_link_query = """
-                    INSERT INTO links (id, title, url, link_collection_id, user_id, created_at, updated_at)
-                    VALUES ($1::uuid, $2, $3, $4::uuid, $5, $6, $7)
-                    RETURNING id, title, url, link_collection_id, user_id, created_at, updated_at
-                """
-
-                created_link = await execute_insert(
-                    insert_link_query,
-                    (
-                        link_id,
-                        final_title,
-                        str(link_data.url),
-                        collection_id,
-                        user_id,
-                        now,
-                        now,
-                    ),
+            if not created_collection:
+                raise HTTPException(
+                    status_code=500, detail="Failed to create collection"
                 )
 
-                if created_link:
-                    response_link = Link(
-                        id=str(created_link["id"]),
-                        title=created_link["title"],
-                        url=created_link["url"],
-                        linkCollectionId=str(created_link["link_collection_id"]),
-                        userId=created_link["user_id"],
-                        createdAt=created_link["created_at"],
-                        updatedAt=created_link["updated_at"],
-                    )
-                    created_links.append(response_link)
-                    current_total += 1
-
-            except Exception as e:
-                logger.error(f"❌ Failed to create link {link_data.url}: {str(e)}")
-                # Continue with other links even if one fails
-                continue
-
-        # Update collection's total links count
-        update_collection_query = """
-            UPDATE collections 
-            SET total_links = $1 
-            WHERE id = $2::uuid AND user_id = $3
-        """
-        await execute_query(
-            update_collection_query,
-            (current_total, collection_id, user_id),
-            fetch_all=False,
-        )
+            created_links = await _insert_links(
+                collection_id, user_id, new_links, titles, new_hashes, db
+            )
+            current_total = len(created_links)
+
+            # Update collection's total links count
+            await execute_prepared(
+                "collections.set_total_links",
+                current_total,
+                collection_id,
+                user_id,
+                db=db,
+            )
 
         # Create response collection object
         response_collection = Collection(
@@ -856,14 +965,14 @@ async def create_collection_with_links(
             createdAt=created_collection["created_at"],
         )
 
-        logger.info(
-            f"🚀 CREATE COLLECTION WITH LINKS - Successfully created collection with {len(created_links)} links"
+        logger.debug(
+            "Created collection %s with %d links", collection_id, len(created_links)
         )
 
         return CreateCollectionWithLinksResponse(
             success=True,
             collection=response_collection,
-            links=created_links,
+            links=[_link_from_row(row) for row in created_links],
             total_added=len(created_links),
             total_requested=len(request_data.links),
         )
@@ -880,18 +989,17 @@ async def create_collection_with_links(
 @router.get("/subscription/status", response_model=Dict[str, Any])
 @limiter.limit("60/minute")
 async def get_subscription_status(
-    request: Request, authorization: Optional[str] = Header(None)
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_read_db_session),
 ):
     """Get user's current subscription status and limits"""
-    logger.info("📊 SUBSCRIPTION STATUS - Endpoint called")
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
-        logger.info(f"📊 SUBSCRIPTION STATUS - User ID extracted: {user_id}")
+        user_id = await get_user_id_from_api_key(authorization, db)
 
         # Get subscription and usage data
-        subscription = await subscription_service.get_user_subscription(user_id)
-        usage = await subscription_service.get_user_usage(user_id)
+        subscription = await subscription_service.get_user_subscription(user_id, db=db)
+        usage = await subscription_service.get_user_usage(user_id, db=db)
 
         if not subscription:
             raise HTTPException(
@@ -904,58 +1012,162 @@ async def get_subscription_status(
             "limits": subscription["limits"],
         }
 
-    except HTTPException as e:
-        logger.error(f"❌ HTTP Exception in subscription status: {e.detail}")
+    except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Unexpected error in subscription status: {str(e)}")
+        logger.exception("Unexpected error in subscription status")
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch subscription status: {str(e)}"
         )
 
 
 # Favorites endpoints
+def _pack_cursor(payload: Any) -> str:
+    """Encode a JSON-serialisable payload as an opaque URL-safe cursor"""
+    raw = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _unpack_cursor(cursor: str) -> Any:
+    """Decode a cursor produced by ``_pack_cursor``"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def _encode_cursor(mode: str, timestamp: datetime, row_id: Any) -> str:
+    """Build an opaque pagination cursor from the last row of a page"""
+    return _pack_cursor([mode, timestamp.isoformat(), str(row_id)])
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, datetime, str]:
+    """Parse a cursor produced by ``_encode_cursor``"""
+    try:
+        mode, timestamp, row_id = _unpack_cursor(cursor)
+        if mode not in ("created", "updated"):
+            raise ValueError(mode)
+        return mode, datetime.fromisoformat(timestamp), str(uuid.UUID(row_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
 @router.get("/favorites", response_model=Union[FavoritesResponse, ErrorResponse])
 @limiter.limit("120/minute")
-async def get_favorites(request: Request, authorization: Optional[str] = Header(None)):
-    """Get user's favorite links"""
-    logger.info("⭐ FAVORITES - Endpoint called")
-
+async def get_favorites(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.favorites_max_page_size),
+    cursor: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    authorization: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_read_db_session),
+):
+    """
+    Get user's favorite links.
+
+    Without parameters the full list is returned, newest first. With ``limit``
+    (or a ``cursor`` from a previous page) results are keyset-paginated on
+    (created_at, id). With ``since`` only favorites created or updated at or
+    after that time are returned, oldest change first. Responses carry an ETag;
+    send it back as If-None-Match to get a 304 when nothing has changed.
+    """
     try:
-        user_id = await get_user_id_from_api_key(authorization)
-        logger.info(f"⭐ FAVORITES - User ID extracted: {user_id}")
-
-        # Get user's favorites
-        favorites_query = """
-            SELECT id, title, url, user_id as "userId", created_at as "createdAt", updated_at as "updatedAt"
-            FROM favorites 
-            WHERE user_id = $1
-            ORDER BY created_at DESC
-        """
-
-        favorites_result = await execute_query_all(
-            favorites_query, (user_id,), cache_key=f"favorites_{user_id}"
-        )
+        user_id = await get_user_id_from_api_key(authorization, db)
 
-        favorites = []
-        for fav_data in favorites_result:
-            favorite = Favorite(
-                id=str(fav_data["id"]),
-                title=fav_data["title"],
-                url=fav_data["url"],
-                userId=fav_data["userId"],
-                createdAt=fav_data["createdAt"],
-                updatedAt=fav_data["updatedAt"],
+        # Fingerprint the user's favorites before touching any rows
+        version = await fetch_prepared_one("favorites.version", user_id, db=db)
+        fingerprint = "|".join(
+            str(part)
+            for part in (
+                user_id,
+                version["count"],
+                version["last_updated"],
+                limit,
+                cursor,
+                since,
             )
-            favorites.append(favorite)
+        )
+        etag = 'W/"' + hashlib.sha1(fingerprint.encode("utf-8")).hexdigest() + '"'
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        mode = None
+        if cursor:
+            mode, after_ts, after_id = _decode_cursor(cursor)
+        elif since is not None:
+            if since.tzinfo is not None:
+                # Stored timestamps are naive UTC
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+            mode, after_ts, after_id = "updated", since, str(uuid.UUID(int=0))
+        elif limit is not None:
+            mode = "created"
+
+        if mode is None:
+            # Legacy full listing; one cache entry per user, valid for its ETag
+            favorites_result = await fetch_prepared_all(
+                "favorites.list",
+                user_id,
+                cache_key=f"favorites_{user_id}",
+                cache_version=etag,
+                db=db,
+            )
+            content = {
+                "data": rows_to_dicts(favorites_result, FAVORITE_FIELDS),
+                "next_cursor": None,
+                "has_more": False,
+            }
+        else:
+            page_size = limit or settings.favorites_page_size
+            # Fetch one extra row to learn whether another page exists
+            if mode == "updated":
+                rows = await fetch_prepared_all(
+                    "favorites.changed_since",
+                    user_id,
+                    after_ts,
+                    after_id,
+                    page_size + 1,
+                    db=db,
+                )
+            elif cursor:
+                rows = await fetch_prepared_all(
+                    "favorites.page_after",
+                    user_id,
+                    after_ts,
+                    after_id,
+                    page_size + 1,
+                    db=db,
+                )
+            else:
+                rows = await fetch_prepared_all(
+                    "favorites.page", user_id, page_size + 1, db=db
+                )
 
-        return FavoritesResponse(data=favorites)
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                sort_key = last["updatedAt"] if mode == "updated" else last["createdAt"]
+                next_cursor = _encode_cursor(mode, sort_key, last["id"])
 
-    except HTTPException as e:
-        logger.error(f"❌ HTTP Exception in favorites: {e.detail}")
+            content = {
+                "data": rows_to_dicts(rows, FAVORITE_FIELDS),
+                "next_cursor": next_cursor,
+                "has_more": has_more,
+            }
+
+        return json_response(content, headers={"ETag": etag})
+
+    except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Unexpected error in favorites: {str(e)}")
+        logger.exception("Unexpected error in favorites")
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch favorites: {str(e)}"
         )
@@ -972,20 +1184,16 @@ async def create_favorite(
     request: Request,
     favorite_data: CreateFavoriteRequest,
     authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
 ):
     """Add a new favorite link"""
-    logger.info("⭐ CREATE FAVORITE - Endpoint called")
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
+        user_id = await get_user_id_from_api_key(authorization, db)
+        await _charge_request(user_id, 1, db)
 
         # Check if favorite already exists
-        existing_query = """
-            SELECT id FROM favorites 
-            WHERE user_id = $1 AND url = $2
-        """
-        existing_result = await execute_query_one(
-            existing_query, (user_id, str(favorite_data.url))
+        existing_result = await fetch_prepared_one(
+            "favorites.exists", user_id, str(favorite_data.url), db=db
         )
 
         if existing_result:
@@ -995,7 +1203,7 @@ async def create_favorite(
 
         # Check subscription limits for favorites
         can_add, error_message, plan_slug = (
-            await subscription_service.check_favorites_limit(user_id)
+            await subscription_service.check_favorites_limit(user_id, db=db)
         )
         if not can_add:
             raise HTTPException(
@@ -1009,27 +1217,23 @@ async def create_favorite(
 
         # Insert new favorite
         favorite_id = str(uuid.uuid4())
-        insert_favorite_query = """
-            INSERT INTO favorites (id, title, url, user_id, created_at, updated_at)
-            VALUES ($1::uuid, $2, $3, $4, $5, $6)
-            RETURNING id, title, url, user_id, created_at, updated_at
-        """
-
         now = datetime.utcnow()
-        created_favorite = await execute_insert(
-            insert_favorite_query,
-            (
-                favorite_id,
-                favorite_data.title,
-                str(favorite_data.url),
-                user_id,
-                now,
-                now,
-            ),
+        created_favorite = await fetch_prepared_one(
+            "favorites.insert",
+            favorite_id,
+            favorite_data.title,
+            str(favorite_data.url),
+            user_id,
+            now,
+            now,
+            db=db,
         )
 
         if not created_favorite:
-            raise HTTPException(status_code=500, detail="Failed to create favorite")
+            # Lost a race with a concurrent insert of the same URL
+            raise HTTPException(
+                status_code=409, detail="This URL is already in your favorites"
+            )
 
         response_favorite = Favorite(
             id=str(created_favorite["id"]),
@@ -1063,24 +1267,21 @@ async def update_favorite(
     favorite_id: str,
     favorite_data: UpdateFavoriteRequest,
     authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
 ):
     """Update a favorite link's title"""
-    logger.info(f"⭐ UPDATE FAVORITE - Endpoint called for ID: {favorite_id}")
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
+        user_id = await get_user_id_from_api_key(authorization, db)
 
         # Update the favorite
-        update_query = """
-            UPDATE favorites 
-            SET title = $1, updated_at = $2
-            WHERE id = $3::uuid AND user_id = $4
-            RETURNING id, title, url, user_id, created_at, updated_at
-        """
-
         now = datetime.utcnow()
-        updated_favorite = await execute_insert(
-            update_query, (favorite_data.title, now, favorite_id, user_id)
+        updated_favorite = await fetch_prepared_one(
+            "favorites.update_title",
+            favorite_data.title,
+            now,
+            favorite_id,
+            user_id,
+            db=db,
         )
 
         if not updated_favorite:
@@ -1114,22 +1315,19 @@ async def update_favorite(
 )
 @limiter.limit("60/minute")
 async def delete_favorite(
-    request: Request, favorite_id: str, authorization: Optional[str] = Header(None)
+    request: Request,
+    favorite_id: str,
+    authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
 ):
     """Delete a favorite link"""
-    logger.info(f"⭐ DELETE FAVORITE - Endpoint called for ID: {favorite_id}")
-
     try:
-        user_id = await get_user_id_from_api_key(authorization)
+        user_id = await get_user_id_from_api_key(authorization, db)
 
         # Delete the favorite
-        delete_query = """
-            DELETE FROM favorites 
-            WHERE id = $1::uuid AND user_id = $2
-            RETURNING id
-        """
-
-        deleted_favorite = await execute_insert(delete_query, (favorite_id, user_id))
+        deleted_favorite = await fetch_prepared_one(
+            "favorites.delete", favorite_id, user_id, db=db
+        )
 
         if not deleted_favorite:
             raise HTTPException(
@@ -1149,32 +1347,338 @@ async def delete_favorite(
         )
 
 
-@router.get("/test-subscription")
-async def test_subscription(authorization: Optional[str] = Header(None)):
-    """Test endpoint to debug subscription service"""
-    logger.info("🧪 TEST SUBSCRIPTION - Endpoint called")
+def _favorite_from_row(row) -> Favorite:
+    """Build a Favorite from a row with snake_case columns (RETURNING clauses)"""
+    return Favorite(
+        id=str(row["id"]),
+        title=row["title"],
+        url=row["url"],
+        userId=row["user_id"],
+        createdAt=row["created_at"],
+        updatedAt=row["updated_at"],
+    )
+
 
+def _parse_uuid(value: str) -> Optional[str]:
     try:
-        user_id = await get_user_id_from_api_key(authorization)
-        logger.info(f"🧪 TEST SUBSCRIPTION - User ID extracted: {user_id}")
+        return str(uuid.UUID(value))
+    except (ValueError, AttributeError, TypeError):
+        return None
 
-        # Test subscription service step by step
-        logger.info("🧪 TEST SUBSCRIPTION - Step 1: Testing get_user_subscription")
-        subscription = await subscription_service.get_user_subscription(user_id)
-        logger.info(f"🧪 TEST SUBSCRIPTION - Subscription result: {subscription}")
 
-        logger.info("🧪 TEST SUBSCRIPTION - Step 2: Testing get_user_usage")
-        usage = await subscription_service.get_user_usage(user_id)
-        logger.info(f"🧪 TEST SUBSCRIPTION - Usage result: {usage}")
+@router.post(
+    "/favorites/batch",
+    response_model=Union[BatchFavoritesResponse, ErrorResponse],
+)
+@limiter.limit("30/minute")
+async def batch_favorites(
+    request: Request,
+    batch: BatchFavoritesRequest,
+    authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
+):
+    """
+    Apply many favorite creates, updates and deletes in one transaction.
+
+    Deletes run first so they free quota for creates in the same batch. Creates
+    of a URL that is already a favorite (or repeated in the batch) are reported
+    as ``duplicate``; creates beyond the plan's favorites limit are reported as
+    ``limit_exceeded``. One result is returned per requested item.
+    """
+    total_items = len(batch.create) + len(batch.update) + len(batch.delete)
+    if total_items > settings.favorites_batch_max_items:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Batch too large ({total_items} items, max "
+            f"{settings.favorites_batch_max_items})",
+        )
+
+    try:
+        user_id = await get_user_id_from_api_key(authorization, db)
+        await _charge_request(user_id, 1 + total_items, db)
+        subscription = await subscription_service.get_user_subscription(user_id, db=db)
+        limits = subscription["limits"] if subscription else {}
+        plan_slug = subscription["plan_slug"] if subscription else None
+
+        results: List[BatchFavoriteResult] = []
+        now = datetime.utcnow()
+
+        async with db.transaction():
+            # Deletes
+            delete_ids = {}
+            for index, raw_id in enumerate(batch.delete):
+                favorite_id = _parse_uuid(raw_id)
+                if favorite_id is None:
+                    results.append(
+                        BatchFavoriteResult(
+                            op="delete", index=index, status="invalid", id=raw_id
+                        )
+                    )
+                else:
+                    delete_ids.setdefault(favorite_id, []).append(index)
+            deleted = set()
+            if delete_ids:
+                rows = await fetch_prepared_all(
+                    "favorites.delete_many", user_id, list(delete_ids), db=db
+                )
+                deleted = {str(row["id"]) for row in rows}
+            for favorite_id, indexes in delete_ids.items():
+                status = "deleted" if favorite_id in deleted else "not_found"
+                for index in indexes:
+                    results.append(
+                        BatchFavoriteResult(
+                            op="delete", index=index, status=status, id=favorite_id
+                        )
+                    )
+
+            # Updates; the last title wins when an id is repeated
+            update_titles = {}
+            update_indexes = {}
+            for index, item in enumerate(batch.update):
+                favorite_id = _parse_uuid(item.id)
+                if favorite_id is None:
+                    results.append(
+                        BatchFavoriteResult(
+                            op="update", index=index, status="invalid", id=item.id
+                        )
+                    )
+                else:
+                    update_titles[favorite_id] = item.title
+                    update_indexes.setdefault(favorite_id, []).append(index)
+            updated = {}
+            if update_titles:
+                rows = await fetch_prepared_all(
+                    "favorites.update_many",
+                    user_id,
+                    list(update_titles),
+                    list(update_titles.values()),
+                    now,
+                    db=db,
+                )
+                updated = {str(row["id"]): _favorite_from_row(row) for row in rows}
+            for favorite_id, indexes in update_indexes.items():
+                favorite = updated.get(favorite_id)
+                for index in indexes:
+                    results.append(
+                        BatchFavoriteResult(
+                            op="update",
+                            index=index,
+                            status="updated" if favorite else "not_found",
+                            id=favorite_id,
+                            data=favorite,
+                        )
+                    )
+
+            # Creates
+            if batch.create:
+                urls = [str(item.url) for item in batch.create]
+                existing_rows = await fetch_prepared_all(
+                    "favorites.existing_urls", user_id, urls, db=db
+                )
+                taken = {row["url"] for row in existing_rows}
+                count_row = await fetch_prepared_one("favorites.count", user_id, db=db)
+                remaining = limits.get("favorites", 0) - count_row["count"]
+
+                to_insert = {}
+                for index, (item, url) in enumerate(zip(batch.create, urls)):
+                    if url in taken:
+                        results.append(
+                            BatchFavoriteResult(
+                                op="create", index=index, status="duplicate"
+                            )
+                        )
+                    elif remaining <= 0:
+                        results.append(
+                            BatchFavoriteResult(
+                                op="create", index=index, status="limit_exceeded"
+                            )
+                        )
+                    else:
+                        taken.add(url)
+                        remaining -= 1
+                        to_insert[url] = (index, str(uuid.uuid4()), item.title)
+
+                inserted = {}
+                if to_insert:
+                    rows = await fetch_prepared_all(
+                        "favorites.insert_many",
+                        user_id,
+                        [entry[1] for entry in to_insert.values()],
+                        [entry[2] for entry in to_insert.values()],
+                        list(to_insert),
+                        now,
+                        db=db,
+                    )
+                    inserted = {row["url"]: _favorite_from_row(row) for row in rows}
+                for url, (index, favorite_id, _title) in to_insert.items():
+                    favorite = inserted.get(url)
+                    results.append(
+                        BatchFavoriteResult(
+                            op="create",
+                            index=index,
+                            # Not returned: inserted concurrently by another request
+                            status="created" if favorite else "duplicate",
+                            id=favorite.id if favorite else None,
+                            data=favorite,
+                        )
+                    )
+
+        order = {"delete": 0, "update": 1, "create": 2}
+        results.sort(key=lambda result: (order[result.op], result.index))
+
+        # Clear cache for this user's favorites
+        clear_cache()
+
+        return BatchFavoritesResponse(success=True, results=results, plan=plan_slug)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in batch favorites")
+        raise HTTPException(
+            status_code=500, detail=f"Failed to apply favorites batch: {str(e)}"
+        )
+
+
+# Delta sync endpoint
+_SYNC_FIELDS = {
+    "collections": ["id", "title", "description", "visibility", "total_links"],
+    "links": ["id", "title", "url", "link_collection_id"],
+    "favorites": ["id", "title", "url"],
+}
+_SYNC_EPOCH = datetime(1970, 1, 1)
+_ZERO_UUID = str(uuid.UUID(int=0))
 
-        logger.info("🧪 TEST SUBSCRIPTION - Step 3: Testing check_links_limit")
+
+def _sync_value(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+@router.get("/sync", response_model=Union[SyncResponse, ErrorResponse])
+@limiter.limit("60/minute")
+async def sync(
+    request: Request,
+    since: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=settings.sync_max_page_size),
+    authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
+):
+    """
+    Return collections, links and favorites changed since a watermark.
+
+    Call without ``since`` for a full snapshot. Each response carries a
+    ``watermark``; pass it as ``since`` on the next call. When ``has_more`` is
+    true, call again with ``cursor`` (and no ``since``) until it is false.
+    Upserts are rows in ``fields`` order; deletes are ids. Runs on the primary
+    so the watermark is never ahead of the data it was read with.
+    """
+    try:
+        user_id = await get_user_id_from_api_key(authorization, db)
+        page_size = limit or settings.sync_page_size
+
+        if cursor:
+            try:
+                state = _unpack_cursor(cursor)
+                watermark = datetime.fromisoformat(state["w"])
+                reset = bool(state["r"])
+                positions = {
+                    entity: (datetime.fromisoformat(ts), row_id)
+                    for entity, (ts, row_id) in state["p"].items()
+                    if entity in _SYNC_FIELDS or entity == "tombstones"
+                }
+            except Exception:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        else:
+            now_row = await fetch_prepared_one("sync.now", db=db)
+            watermark = now_row["now"]
+            if since is not None and since.tzinfo is not None:
+                # Stored timestamps are naive UTC
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+
+            retention = timedelta(days=settings.sync_tombstone_retention_days)
+            reset = since is None or since < watermark - retention
+            if reset:
+                # Full snapshot; there is nothing local to delete from
+                positions = {
+                    entity: (_SYNC_EPOCH, _ZERO_UUID) for entity in _SYNC_FIELDS
+                }
+            else:
+                start = since - timedelta(seconds=settings.sync_overlap_seconds)
+                positions = {entity: (start, _ZERO_UUID) for entity in _SYNC_FIELDS}
+                positions["tombstones"] = (start, 0)
+
+        changes = {
+            entity: SyncChanges(fields=fields + ["updated_at"])
+            for entity, fields in _SYNC_FIELDS.items()
+        }
+        pending = {}
+
+        for entity, (after_ts, after_id) in positions.items():
+            # One extra row tells us whether this entity has another page
+            rows = await fetch_prepared_all(
+                f"sync.{entity}", user_id, after_ts, after_id, page_size + 1, db=db
+            )
+            if len(rows) > page_size:
+                rows = rows[:page_size]
+                last = rows[-1]
+                if entity == "tombstones":
+                    pending[entity] = [last["deleted_at"].isoformat(), last["id"]]
+                else:
+                    pending[entity] = [last["updated_at"].isoformat(), str(last["id"])]
+
+            if entity == "tombstones":
+                for row in rows:
+                    if row["entity"] in changes:
+                        changes[row["entity"]].deletes.append(str(row["entity_id"]))
+            else:
+                columns = changes[entity].fields
+                changes[entity].upserts = [
+                    [_sync_value(row[column]) for column in columns] for row in rows
+                ]
+
+        next_cursor = None
+        if pending:
+            next_cursor = _pack_cursor(
+                {"w": watermark.isoformat(), "r": reset, "p": pending}
+            )
+
+        return SyncResponse(
+            watermark=watermark,
+            reset=reset,
+            has_more=bool(pending),
+            cursor=next_cursor,
+            **changes,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Unexpected error in sync")
+        raise HTTPException(status_code=500, detail=f"Failed to sync: {str(e)}")
+
+
+@router.get("/test-subscription")
+async def test_subscription(
+    authorization: Optional[str] = Header(None),
+    db: DatabaseSession = Depends(get_db_session),
+):
+    """Test endpoint to debug subscription service"""
+    try:
+        user_id = await get_user_id_from_api_key(authorization, db)
+
+        # Test subscription service step by step
+        subscription = await subscription_service.get_user_subscription(user_id, db=db)
+        usage = await subscription_service.get_user_usage(user_id, db=db)
         can_add, error_message, plan_slug = (
-            await subscription_service.check_links_limit(user_id, "test-collection", 1)
+            await subscription_service.check_links_limit(
+                user_id, "test-collection", 1, db=db
+            )
         )
-        logger.info(f"🧪 TEST SUBSCRIPTION - Links limit check result:")
-        logger.info(f"   - Can add: {can_add}")
-        logger.info(f"   - Error message: {error_message}")
-        logger.info(f"   - Plan slug: {plan_slug}")
 
         response = {
             "success": True,
@@ -1188,18 +1692,12 @@ async def test_subscription(authorization: Optional[str] = Header(None)):
             },
         }
 
-        logger.info(f"🧪 TEST SUBSCRIPTION - Response: {response}")
         return response
 
-    except HTTPException as e:
-        logger.error(f"❌ HTTP Exception in test subscription: {e.detail}")
+    except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Unexpected error in test subscription: {str(e)}")
-        logger.error(f"❌ Exception type: {type(e)}")
-        import traceback
-
-        logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+        logger.exception("Unexpected error in test subscription")
         raise HTTPException(
             status_code=500, detail=f"Test subscription failed: {str(e)}"
         )
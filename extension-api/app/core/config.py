@@ -15,9 +15,64 @@ class Settings(BaseModel):
     # Clerk secret key (optional for now)
     clerk_secret_key: Optional[str] = os.getenv("CLERK_SECRET_KEY")
 
+    # Optional read replica used for SELECT-only routes
+    database_replica_url: Optional[str] = os.getenv("DATABASE_REPLICA_URL") or None
+
+    # Connection pool sizing and per-session settings
+    db_pool_min_size: int = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+    db_pool_max_size: int = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+    db_command_timeout: float = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+    db_max_inactive_connection_lifetime: float = float(
+        os.getenv("DB_MAX_INACTIVE_CONNECTION_LIFETIME", "300")
+    )
+    # asyncpg's per-connection cache for ad-hoc (non-registry) statements
+    db_statement_cache_size: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    db_work_mem: str = os.getenv("DB_WORK_MEM", "64MB")
+    db_maintenance_work_mem: str = os.getenv("DB_MAINTENANCE_WORK_MEM", "256MB")
+    # Queries slower than this are counted and logged as slow
+    db_slow_query_ms: float = float(os.getenv("DB_SLOW_QUERY_MS", "250"))
+
+    # Prepare hot statements on each pooled connection. Disable when running
+    # behind a transaction-mode pooler that does not support prepared statements:
+    # registry statements then run unprepared and asyncpg's statement cache is off
+    db_prepare_statements: bool = os.getenv(
+        "DB_PREPARE_STATEMENTS", "true"
+    ).lower() in {"1", "true", "yes"}
+
+    # GET /favorites page sizes when ?limit= is omitted / its upper bound
+    favorites_page_size: int = int(os.getenv("FAVORITES_PAGE_SIZE", "100"))
+    favorites_max_page_size: int = int(os.getenv("FAVORITES_MAX_PAGE_SIZE", "500"))
+
+    # Maximum creates + updates + deletes in one POST /favorites/batch
+    favorites_batch_max_items: int = int(os.getenv("FAVORITES_BATCH_MAX_ITEMS", "200"))
+
+    # /sync: rows per entity per response, and its upper bound
+    sync_page_size: int = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+    sync_max_page_size: int = int(os.getenv("SYNC_MAX_PAGE_SIZE", "2000"))
+    # Re-scan this far behind the client's watermark to cover clock skew and
+    # transactions that committed late
+    sync_overlap_seconds: float = float(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+    # Tombstones older than this may be pruned; older watermarks get a reset
+    sync_tombstone_retention_days: int = int(
+        os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30")
+    )
+
+    # Streaming link import: rows per COPY batch / transaction, and per request
+    import_batch_size: int = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+    import_max_rows: int = int(os.getenv("IMPORT_MAX_ROWS", "100000"))
+
     # Debug mode
     debug: bool = os.getenv("DEBUG", "True").lower() == "true"
 
+    # Logging. Per-step route logs are DEBUG and off at the default level
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    # "json" for one JSON object per line, "text" for plain lines
+    log_format: str = os.getenv("LOG_FORMAT", "json").lower()
+    # Fraction of successful requests that get an access log line (0.0 - 1.0)
+    log_sample_rate: float = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+    # Records beyond this many pending are dropped instead of blocking
+    log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
     # Rate limiting
     rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in {
         "1",
@@ -29,6 +84,52 @@ class Settings(BaseModel):
     rate_limit_trust_forwarded: bool = os.getenv(
         "RATE_LIMIT_TRUST_FORWARDED", "true"
     ).lower() in {"1", "true", "yes"}
+    # Shared limit storage so limits hold across workers, e.g.
+    # redis://host:6379/0. memory:// keeps counters per process
+    rate_limit_storage_uri: str = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+    # fixed-window, moving-window (sliding log) or sliding-window-counter
+    rate_limit_strategy: str = os.getenv("RATE_LIMIT_STRATEGY", "moving-window")
+    rate_limit_key_prefix: str = os.getenv("RATE_LIMIT_KEY_PREFIX", "extension-api")
+    # Seconds to wait on the storage before treating it as unavailable
+    rate_limit_storage_timeout: float = float(
+        os.getenv("RATE_LIMIT_STORAGE_TIMEOUT", "0.25")
+    )
+    # Per-process limit applied while the storage is unreachable; empty disables
+    # the fallback and lets requests through unlimited instead
+    rate_limit_fallback: str = os.getenv("RATE_LIMIT_FALLBACK", "120/minute")
+    # Smallest per-user credit budget for write routes; plans may raise it
+    rate_limit_min_credits: int = int(os.getenv("RATE_LIMIT_MIN_CREDITS", "120"))
+
+    # Outbound fetches (page titles): requests per second and burst per host,
+    # concurrent requests per host and in total, and the queue waiting for a turn
+    fetch_host_rate: float = float(os.getenv("FETCH_HOST_RATE", "2"))
+    fetch_host_burst: int = int(os.getenv("FETCH_HOST_BURST", "4"))
+    fetch_host_concurrency: int = int(os.getenv("FETCH_HOST_CONCURRENCY", "2"))
+    fetch_max_concurrency: int = int(os.getenv("FETCH_MAX_CONCURRENCY", "64"))
+    fetch_max_queue: int = int(os.getenv("FETCH_MAX_QUEUE", "512"))
+    fetch_queue_timeout: float = float(os.getenv("FETCH_QUEUE_TIMEOUT", "10"))
+    fetch_timeout: float = float(os.getenv("FETCH_TIMEOUT", "10"))
+    # Retries after 429/503 with Retry-After, when the wait is at most this long
+    fetch_max_retries: int = int(os.getenv("FETCH_MAX_RETRIES", "1"))
+    fetch_max_retry_wait: float = float(os.getenv("FETCH_MAX_RETRY_WAIT", "5"))
+    fetch_user_agent: str = os.getenv(
+        "FETCH_USER_AGENT", "Mozilla/5.0 (compatible; cur8t/1.0; +https://cur8t.com)"
+    )
+    # Page bytes read at most when looking for a link's <title>
+    title_max_bytes: int = int(os.getenv("TITLE_MAX_BYTES", "32768"))
+    # Product token matched against robots.txt User-agent lines
+    fetch_robots_user_agent: str = os.getenv("FETCH_ROBOTS_USER_AGENT", "cur8t")
+    fetch_robots_ttl: int = int(os.getenv("FETCH_ROBOTS_TTL", "86400"))
+    fetch_dns_ttl: int = int(os.getenv("FETCH_DNS_TTL", "300"))
+    # Page titles per canonical URL, in process and in url_metadata_cache
+    title_cache_size: int = int(os.getenv("TITLE_CACHE_SIZE", "10000"))
+    title_cache_ttl: int = int(os.getenv("TITLE_CACHE_TTL", "604800"))
+    # Failed title fetches are retried after this many seconds
+    title_cache_negative_ttl: int = int(os.getenv("TITLE_CACHE_NEGATIVE_TTL", "3600"))
+    # Insert links without a title right away and fetch the title afterwards
+    defer_link_titles: bool = os.getenv("DEFER_LINK_TITLES", "false").lower() == "true"
+    title_backfill_workers: int = int(os.getenv("TITLE_BACKFILL_WORKERS", "4"))
+    title_backfill_queue_size: int = int(os.getenv("TITLE_BACKFILL_QUEUE_SIZE", "1000"))
 
     # API Key Security: HMAC-SHA256 pepper
     api_key_pepper: Optional[str] = os.getenv("API_KEY_PEPPER")
@@ -1,59 +1,196 @@
 import asyncio
+import json
 import logging
 import time
 from contextlib import asynccontextmanager
-from functools import lru_cache
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple
 
 import asyncpg
 
 from .config import settings
+from .metrics import CACHE_REQUESTS, DB_QUERY_DURATION
+from .statements import STATEMENTS, Row, prepare_statements
 
 logger = logging.getLogger(__name__)
 
-# Global connection pool
+# Global connection pools; the read pool is only created when a replica is set
 _pool = None
+_read_pool = None
+_pool_lock = asyncio.Lock()
+
+
+class PoolMetrics:
+    """In-process counters used to size the pool from real traffic"""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.started_at = time.time()
+        self.acquires = 0
+        self.acquire_wait_total = 0.0
+        self.acquire_wait_max = 0.0
+        self.queries = 0
+        self.slow_queries = 0
+        # Per-second query counts for the recent QPS window
+        self._buckets = [0] * window_seconds
+        self._bucket_times = [0] * window_seconds
+
+    def record_acquire(self, wait: float):
+        self.acquires += 1
+        self.acquire_wait_total += wait
+        if wait > self.acquire_wait_max:
+            self.acquire_wait_max = wait
+
+    def record_query(self, name: str, duration: float):
+        self.queries += 1
+        DB_QUERY_DURATION.observe(duration, name)
+        second = int(time.time())
+        slot = second % self.window_seconds
+        if self._bucket_times[slot] != second:
+            self._bucket_times[slot] = second
+            self._buckets[slot] = 0
+        self._buckets[slot] += 1
+
+        if duration * 1000 >= settings.db_slow_query_ms:
+            self.slow_queries += 1
+            logger.warning("Slow query %s took %.3fs", name, duration)
+
+    def queries_per_second(self) -> float:
+        now = int(time.time())
+        recent = sum(
+            count
+            for count, second in zip(self._buckets, self._bucket_times)
+            if now - second < self.window_seconds
+        )
+        window = min(self.window_seconds, max(1.0, time.time() - self.started_at))
+        return recent / window
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "acquires": self.acquires,
+            "acquire_wait_avg_ms": (
+                round(self.acquire_wait_total / self.acquires * 1000, 3)
+                if self.acquires
+                else 0.0
+            ),
+            "acquire_wait_max_ms": round(self.acquire_wait_max * 1000, 3),
+            "queries": self.queries,
+            "queries_per_second": round(self.queries_per_second(), 3),
+            "slow_queries": self.slow_queries,
+            "slow_query_threshold_ms": settings.db_slow_query_ms,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class PreparedConnection(asyncpg.Connection):
+    """Connection that keeps the statements prepared from the registry"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: Dict[str, asyncpg.prepared_stmt.PreparedStatement] = {}
+
+
+async def _init_connection(conn: PreparedConnection):
+    """Set up codecs and prepare hot statements on each new pool connection"""
+    # Decode jsonb columns (e.g. plans.limits) once at the protocol level
+    await conn.set_type_codec(
+        "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+    )
+    if settings.db_prepare_statements:
+        await prepare_statements(conn)
+
+
+async def _create_pool(database_url: str, label: str):
+    """Create a connection pool configured from settings"""
+    logger.info("Creating %s database pool", label)
+    pool = await asyncpg.create_pool(
+        database_url,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+        command_timeout=settings.db_command_timeout,
+        max_inactive_connection_lifetime=settings.db_max_inactive_connection_lifetime,
+        # Without prepared statements asyncpg must not cache (prepare) any either
+        statement_cache_size=(
+            settings.db_statement_cache_size if settings.db_prepare_statements else 0
+        ),
+        ssl="require" if "neon.tech" in database_url else False,
+        init=_init_connection,
+        connection_class=PreparedConnection,
+        record_class=Row,
+        server_settings={
+            "jit": "off",  # Disable JIT for better performance
+            "work_mem": settings.db_work_mem,
+            "maintenance_work_mem": settings.db_maintenance_work_mem,
+        },
+    )
+
+    # Test the connection
+    async with pool.acquire() as conn:
+        await conn.execute("SELECT 1")
+        logger.info("Database %s pool created", label)
+
+    return pool
 
 
 async def get_pool():
-    """Get or create the database connection pool"""
+    """Get or create the primary database connection pool"""
     global _pool
     if _pool is None:
-        try:
-            logger.info(
-                f"🔗 Creating database pool with URL: {settings.database_url[:20]}..."
-            )
-            _pool = await asyncpg.create_pool(
-                settings.database_url,
-                min_size=5,
-                max_size=20,
-                command_timeout=60,
-                ssl="require" if "neon.tech" in settings.database_url else False,
-                server_settings={
-                    "jit": "off",  # Disable JIT for better performance
-                    "work_mem": "64MB",  # Increase work memory
-                    "maintenance_work_mem": "256MB",  # Increase maintenance memory
-                },
-            )
-
-            # Test the connection
-            async with _pool.acquire() as conn:
-                await conn.execute("SELECT 1")
-                logger.info("✅ Database pool created successfully")
-
-        except Exception as e:
-            logger.error(f"❌ Failed to create database pool: {str(e)}")
-            raise
+        async with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = await _create_pool(settings.database_url, "primary")
+                except Exception as e:
+                    logger.error("Failed to create database pool: %s", e)
+                    raise
 
     return _pool
 
 
-@asynccontextmanager
-async def get_db_connection():
-    """Async context manager for database connections"""
-    pool = await get_pool()
-    async with pool.acquire() as connection:
-        yield connection
+async def get_read_pool():
+    """
+    Get the pool for SELECT-only paths.
+
+    Returns the read-replica pool when DATABASE_REPLICA_URL is set, otherwise
+    the primary pool.
+    """
+    global _read_pool
+    if not settings.database_replica_url:
+        return await get_pool()
+    if _read_pool is None:
+        async with _pool_lock:
+            if _read_pool is None:
+                try:
+                    _read_pool = await _create_pool(
+                        settings.database_replica_url, "replica"
+                    )
+                except Exception as e:
+                    logger.error("Failed to create replica pool: %s", e)
+                    raise
+
+    return _read_pool
+
+
+async def _timed_acquire(pool):
+    """Acquire a pool connection, recording how long the caller waited"""
+    start_time = time.perf_counter()
+    conn = await pool.acquire()
+    pool_metrics.record_acquire(time.perf_counter() - start_time)
+    return conn
+
+
+def _pool_stats(pool) -> Dict[str, Any]:
+    """Size, in-use and idle connection counts for a pool"""
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    return {
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+        "size": size,
+        "in_use": size - idle,
+        "idle": idle,
+    }
 
 
 # Query result cache for frequently accessed data
@@ -61,90 +198,174 @@ _query_cache = {}
 _cache_ttl = 300  # 5 minutes
 
 
-async def execute_query(
-    query: str,
-    params: Optional[tuple] = None,
-    fetch_one: bool = False,
-    fetch_all: bool = True,
-    cache_key: Optional[str] = None,
-) -> Union[Dict[str, Any], List[Dict[str, Any]], int, None]:
-    """Execute a database query and return results with optional caching"""
-    start_time = time.time()
-
-    # Check cache for read operations
-    if cache_key and fetch_all and not fetch_one:
-        cached_result = _query_cache.get(cache_key)
-        if cached_result:
-            logger.info(f"📦 Cache hit for key: {cache_key}")
-            return cached_result
-
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        if fetch_one:
-            result = await conn.fetchrow(query, *(params or ()))
-            query_time = time.time() - start_time
-            logger.info(f"⚡ Query executed in {query_time:.3f}s")
-            return dict(result) if result else None
-        elif fetch_all:
-            results = await conn.fetch(query, *(params or ()))
-            result_list = [dict(row) for row in results] if results else []
-
-            # Cache the result if cache_key is provided
-            if cache_key:
-                _query_cache[cache_key] = result_list
-                # Schedule cache cleanup
-                asyncio.create_task(_cleanup_cache(cache_key))
-
-            query_time = time.time() - start_time
-            logger.info(
-                f"⚡ Query executed in {query_time:.3f}s | Rows: {len(result_list)}"
-            )
-            return result_list
-        else:
-            result = await conn.execute(query, *(params or ()))
-            query_time = time.time() - start_time
-            logger.info(f"⚡ Query executed in {query_time:.3f}s")
-            return result
+class DatabaseSession:
+    """
+    Request-scoped database session.
+
+    Holds a single pooled connection for the lifetime of a request so that the
+    auth lookup, limit checks and writes share one acquire. The connection is
+    acquired lazily on first use and returned to the pool by ``release()``,
+    which routes may also call early before slow non-database work.
+    """
+
+    def __init__(self, readonly: bool = False):
+        self.readonly = readonly
+        self._pool = None
+        self._conn = None
+
+    async def connection(self):
+        """Return the session's connection, acquiring it on first use"""
+        if self._conn is None:
+            self._pool = await (get_read_pool() if self.readonly else get_pool())
+            self._conn = await _timed_acquire(self._pool)
+        return self._conn
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Run the enclosed statements in a transaction on the session connection"""
+        conn = await self.connection()
+        async with conn.transaction():
+            yield self
+
+    async def release(self):
+        """Return the connection to the pool; the next query re-acquires"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await self._pool.release(conn)
+
+
+async def get_db_session():
+    """FastAPI dependency providing a DatabaseSession for the current request"""
+    session = DatabaseSession()
+    try:
+        yield session
+    finally:
+        await session.release()
 
 
-async def execute_query_one(
-    query: str, params: Optional[tuple] = None, cache_key: Optional[str] = None
-) -> Optional[Dict[str, Any]]:
-    """Execute a query and return one result as a dictionary"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        result = await conn.fetchrow(query, *(params or ()))
-        return dict(result) if result else None
+async def get_read_db_session():
+    """
+    FastAPI dependency providing a read-only session for SELECT-only routes.
+
+    Queries go to the replica pool when one is configured, so results may lag
+    the primary by the replication delay.
+    """
+    session = DatabaseSession(readonly=True)
+    try:
+        yield session
+    finally:
+        await session.release()
 
 
-async def execute_query_all(
-    query: str, params: Optional[tuple] = None, cache_key: Optional[str] = None
-) -> List[Dict[str, Any]]:
-    """Execute a query and return all results as a list of dictionaries"""
-    return await execute_query(query, params, fetch_all=True, cache_key=cache_key)
+@asynccontextmanager
+async def _session_connection(db: Optional[DatabaseSession]):
+    """Use the request session's connection, or a one-off pool acquire"""
+    if db is not None:
+        yield await db.connection()
+    else:
+        pool = await get_pool()
+        conn = await _timed_acquire(pool)
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+
+
+async def _get_statement(conn, name: str):
+    """Return the connection's prepared statement for a registry name"""
+    statement = conn.prepared.get(name)
+    if statement is None:
+        statement = await conn.prepare(STATEMENTS[name])
+        conn.prepared[name] = statement
+    return statement
+
+
+async def fetch_prepared_one(
+    name: str, *args: Any, db: Optional[DatabaseSession] = None
+) -> Optional[Row]:
+    """Run a registered statement and return its first row"""
+    async with _session_connection(db) as conn:
+        start_time = time.perf_counter()
+        if settings.db_prepare_statements:
+            statement = await _get_statement(conn, name)
+            result = await statement.fetchrow(*args)
+        else:
+            result = await conn.fetchrow(STATEMENTS[name], *args)
+    query_time = time.perf_counter() - start_time
+    pool_metrics.record_query(name, query_time)
+    logger.debug("%s executed in %.3fs", name, query_time)
+    return result
 
 
-async def execute_insert(
-    query: str, params: Optional[tuple] = None
-) -> Optional[Dict[str, Any]]:
-    """Execute an insert query and return the inserted record"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        result = await conn.fetchrow(query, *(params or ()))
-        return dict(result) if result else None
+async def fetch_prepared_all(
+    name: str,
+    *args: Any,
+    cache_key: Optional[str] = None,
+    cache_version: Optional[str] = None,
+    db: Optional[DatabaseSession] = None,
+) -> List[Row]:
+    """
+    Run a registered statement and return all rows, with optional caching
+
+    A cached entry is only used while its ``cache_version`` matches; a new
+    version replaces it under the same key.
+    """
+    if cache_key:
+        cached = _query_cache.get(cache_key)
+        if cached is not None and cached[0] == cache_version:
+            CACHE_REQUESTS.inc("query", "hit")
+            logger.debug("Cache hit for key: %s", cache_key)
+            return cached[1]
+        CACHE_REQUESTS.inc("query", "miss")
+
+    async with _session_connection(db) as conn:
+        start_time = time.perf_counter()
+        if settings.db_prepare_statements:
+            statement = await _get_statement(conn, name)
+            results = await statement.fetch(*args)
+        else:
+            results = await conn.fetch(STATEMENTS[name], *args)
+    query_time = time.perf_counter() - start_time
+    pool_metrics.record_query(name, query_time)
+
+    if cache_key:
+        entry = (cache_version, results)
+        _query_cache[cache_key] = entry
+        asyncio.create_task(_cleanup_cache(cache_key, entry))
+
+    logger.debug("%s executed in %.3fs | Rows: %d", name, query_time, len(results))
+    return results
+
+
+async def execute_prepared(
+    name: str, *args: Any, db: Optional[DatabaseSession] = None
+) -> str:
+    """Run a registered statement that returns no rows and return its status"""
+    async with _session_connection(db) as conn:
+        start_time = time.perf_counter()
+        if settings.db_prepare_statements:
+            statement = await _get_statement(conn, name)
+            await statement.fetch(*args)
+            status = statement.get_statusmsg()
+        else:
+            status = await conn.execute(STATEMENTS[name], *args)
+    query_time = time.perf_counter() - start_time
+    pool_metrics.record_query(name, query_time)
+    logger.debug("%s executed in %.3fs", name, query_time)
+    return status
 
 
-async def _cleanup_cache(cache_key: str):
-    """Clean up cache entry after TTL"""
+async def _cleanup_cache(cache_key: str, entry: Tuple[Optional[str], List[Row]]):
+    """Clean up cache entry after TTL, unless a newer one has replaced it"""
     await asyncio.sleep(_cache_ttl)
-    _query_cache.pop(cache_key, None)
+    if _query_cache.get(cache_key) is entry:
+        del _query_cache[cache_key]
 
 
 def clear_cache():
     """Clear the query cache"""
-    global _query_cache
     _query_cache.clear()
-    logger.info("🗑️ Query cache cleared")
+    logger.debug("Query cache cleared")
 
 
 async def health_check():
@@ -153,15 +374,13 @@ async def health_check():
         pool = await get_pool()
         async with pool.acquire() as conn:
             # Test basic connectivity
-            result = await conn.fetchval("SELECT 1")
+            await conn.fetchval("SELECT 1")
 
             # Get connection pool stats
-            pool_stats = {
-                "min_size": pool.get_min_size(),
-                "max_size": pool.get_max_size(),
-                "size": pool.get_size(),
-                "free_size": "N/A",  # asyncpg doesn't expose free size
-            }
+            pool_stats = _pool_stats(pool)
+            pool_stats["metrics"] = pool_metrics.snapshot()
+            if _read_pool is not None:
+                pool_stats["replica"] = _pool_stats(_read_pool)
 
             # Get cache stats
             cache_stats = {
@@ -169,9 +388,9 @@ async def health_check():
                 "cache_keys": list(_query_cache.keys()),
             }
 
-            logger.info(f"🏥 Health check - Pool: {pool_stats} | Cache: {cache_stats}")
+            logger.debug("Health check - Pool: %s | Cache: %s", pool_stats, cache_stats)
             return {"status": "healthy", "pool": pool_stats, "cache": cache_stats}
 
     except Exception as e:
-        logger.error(f"❌ Health check failed: {str(e)}")
+        logger.error("Health check failed: %s", e)
         return {"status": "unhealthy", "error": str(e)}
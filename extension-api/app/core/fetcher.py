@@ -0,0 +1,544 @@
+"""
+Polite outbound HTTP fetching.
+
+Every outbound request goes through ``fetcher``, which:
+
+- checks robots.txt, cached per origin, and slows down to its Crawl-delay
+- paces each host with a token bucket and caps concurrent requests per host
+- backs a host off when it answers 429/503 with Retry-After, and retries when
+  the wait is short
+- caches DNS lookups, so new connections to a host skip the resolver
+- admits requests from a bounded priority queue: interactive requests go
+  before background work, and callers get ``FetchBusy`` instead of waiting
+  without end once the queue is full
+
+This mirrors ``core/fetcher.py`` of the agents API on asyncio and httpx.
+"""
+
+import asyncio
+import itertools
+import math
+import socket
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpcore
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import FETCH_DURATION, FETCH_QUEUE_WAIT, FETCH_REFUSED
+
+# Hosts whose pacing state is kept; idle ones beyond this are forgotten
+MAX_TRACKED_HOSTS = 10000
+# Longest back-off a Retry-After header can impose on a host
+MAX_BACKOFF_SECONDS = 600.0
+# Back-off after a 429 that carries no Retry-After
+DEFAULT_BACKOFF_SECONDS = 5.0
+# robots.txt bytes parsed; RFC 9309 asks for at least 500 KiB
+MAX_ROBOTS_BYTES = 512 * 1024
+# Redirect hops followed per fetch
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# How long a robots.txt that failed with 429/5xx blocks its origin
+ROBOTS_ERROR_TTL = 300
+
+
+class FetchPriority(IntEnum):
+    """Order in which waiting fetches get their turn; lower goes first"""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class FetchError(httpx.HTTPError):
+    """A fetch the fetcher refused to send"""
+
+
+class RobotsDisallowed(FetchError):
+    """robots.txt does not allow fetching the URL"""
+
+
+class FetchBusy(FetchError):
+    """No turn to fetch: too many fetches are waiting, or the wait timed out"""
+
+
+class DNSCache:
+    """getaddrinfo results per (host, port), kept for ``ttl`` seconds"""
+
+    def __init__(self, ttl: float, max_entries: int = MAX_TRACKED_HOSTS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[str]]]" = (
+            OrderedDict()
+        )
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """Addresses of a host, resolving it if the cached answer expired"""
+        key = (host, port)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._entries[key] = (now + self.ttl, addresses)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return addresses
+
+
+dns_cache = DNSCache(settings.fetch_dns_ttl)
+
+
+class _CachedDNSBackend(httpcore.AsyncNetworkBackend):
+    """Connects to the cached addresses of a host, trying each in turn"""
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend):
+        self._backend = backend
+
+    async def connect_tcp(self, host, port, timeout=None, **kwargs):
+        addresses = await dns_cache.resolve(host, port)
+        for position, address in enumerate(addresses, start=1):
+            # TLS still verifies and sends SNI for the original host
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout=timeout, **kwargs
+                )
+            except Exception:
+                if position == len(addresses):
+                    raise
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class CachedDNSTransport(httpx.AsyncHTTPTransport):
+    """httpx transport whose connections resolve hosts through ``dns_cache``"""
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        # httpx builds its connection pool without a resolver hook
+        self._pool._network_backend = _CachedDNSBackend(self._pool._network_backend)
+
+
+class _HostState:
+    """Token bucket, concurrency and back-off of one host"""
+
+    __slots__ = (
+        "rate",
+        "burst",
+        "max_active",
+        "tokens",
+        "updated",
+        "active",
+        "blocked_until",
+        "pinned",
+    )
+
+    def __init__(self, rate: float, burst: int, max_active: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.max_active = max_active
+        self.tokens = float(burst)
+        self.updated = now
+        self.active = 0
+        self.blocked_until = 0.0
+        # Configured explicitly, so never forgotten
+        self.pinned = False
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until this host may take another request"""
+        if self.active >= self.max_active:
+            return math.inf
+        self._refill(now)
+        wait = self.blocked_until - now
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return max(wait, 0.0)
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+        self.active += 1
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return (
+            not self.pinned
+            and self.active == 0
+            and self.blocked_until <= now
+            and self.tokens >= self.burst
+        )
+
+
+class HostScheduler:
+    """
+    Grants fetch turns per host.
+
+    A waiting fetch goes when its host has a token and a free connection slot
+    and no better-priority fetch that could also go is waiting before it.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        host_concurrency: int,
+        max_concurrency: int,
+        max_queue: int,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.host_concurrency = host_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._hosts: "OrderedDict[str, _HostState]" = OrderedDict()
+        self._waiting: List[Tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        # Resolved to wake every waiter whenever a turn may have opened up
+        self._changed: Optional[asyncio.Future] = None
+
+    def _state(self, host: str, now: float) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(
+                self.rate, self.burst, self.host_concurrency, now
+            )
+            if len(self._hosts) > MAX_TRACKED_HOSTS:
+                self._forget_idle_hosts(now)
+        else:
+            self._hosts.move_to_end(host)
+        return state
+
+    def _forget_idle_hosts(self, now: float) -> None:
+        waiting_hosts = {entry[2] for entry in self._waiting}
+        for host in list(self._hosts):
+            if len(self._hosts) <= MAX_TRACKED_HOSTS:
+                break
+            if host not in waiting_hosts and self._hosts[host].is_idle(now):
+                del self._hosts[host]
+
+    def _notify_all(self) -> None:
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+        self._changed = None
+
+    def _changed_future(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._changed is None or self._changed.get_loop() is not loop:
+            self._changed = loop.create_future()
+        return self._changed
+
+    def configure_host(
+        self,
+        host: str,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> None:
+        """Override the pacing of one host, e.g. an API with a known quota"""
+        state = self._state(host, time.monotonic())
+        state.rate = rate or state.rate
+        state.burst = burst or state.burst
+        state.max_active = concurrency or state.max_active
+        state.pinned = True
+        self._notify_all()
+
+    def slow_down(self, host: str, min_interval: float) -> None:
+        """Space requests to a host at least ``min_interval`` seconds apart"""
+        state = self._state(host, time.monotonic())
+        if not state.pinned:
+            state.rate = min(self.rate, 1 / min_interval)
+            state.burst = 1
+
+    def back_off(self, host: str, seconds: float) -> None:
+        """Send nothing to a host for the next ``seconds``"""
+        now = time.monotonic()
+        state = self._state(host, now)
+        until = now + min(seconds, MAX_BACKOFF_SECONDS)
+        state.blocked_until = max(state.blocked_until, until)
+
+    def _wait_time(self, entry: Tuple[int, int, str], now: float) -> float:
+        if self._active >= self.max_concurrency:
+            return math.inf
+        wait = self._state(entry[2], now).wait_time(now)
+        if wait > 0:
+            return wait
+        for other in self._waiting:
+            if other < entry and self._state(other[2], now).wait_time(now) <= 0:
+                # Someone ahead can go too: let them, then look again
+                self._notify_all()
+                return math.inf
+        return 0.0
+
+    async def acquire(
+        self, host: str, priority: FetchPriority, timeout: float
+    ) -> float:
+        """Wait for a turn to fetch from ``host``; returns the seconds waited"""
+        start = time.monotonic()
+        deadline = start + timeout
+        if len(self._waiting) >= self.max_queue:
+            raise FetchBusy(f"{len(self._waiting)} fetches are already waiting")
+        entry = (int(priority), next(self._sequence), host)
+        self._waiting.append(entry)
+        try:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(entry, now)
+                if wait <= 0:
+                    self._state(host, now).take(now)
+                    self._active += 1
+                    return now - start
+                if now >= deadline:
+                    raise FetchBusy(f"Timed out waiting to fetch from {host}")
+                await asyncio.wait(
+                    [self._changed_future()], timeout=min(wait, deadline - now)
+                )
+        finally:
+            self._waiting.remove(entry)
+            self._notify_all()
+
+    def release(self, host: str) -> None:
+        self._hosts[host].active -= 1
+        self._active -= 1
+        self._notify_all()
+
+
+class PoliteFetcher:
+    """Sends GET requests through robots.txt checks and per-host scheduling"""
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        scheduler: Optional[HostScheduler] = None,
+    ):
+        self._client = client
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.scheduler = scheduler or HostScheduler(
+            rate=settings.fetch_host_rate,
+            burst=settings.fetch_host_burst,
+            host_concurrency=settings.fetch_host_concurrency,
+            max_concurrency=settings.fetch_max_concurrency,
+            max_queue=settings.fetch_max_queue,
+        )
+        self.robots_user_agent = settings.fetch_robots_user_agent
+        # origin -> (expires, rules)
+        self._robots: "OrderedDict[str, Tuple[float, RobotFileParser]]" = OrderedDict()
+        self._robots_pending: Dict[str, asyncio.Future] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client; connections belong to one event loop, so one per loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or (
+            self._client_loop is not None and self._client_loop is not loop
+        ):
+            self._client = httpx.AsyncClient(
+                transport=CachedDNSTransport(),
+                headers={"User-Agent": settings.fetch_user_agent},
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def configure_host(self, host: str, **limits: Any) -> None:
+        """Override the pacing of one host; see HostScheduler.configure_host"""
+        self.scheduler.configure_host(host.lower(), **limits)
+
+    async def get(
+        self,
+        url: str,
+        priority: FetchPriority = FetchPriority.INTERACTIVE,
+        respect_robots: bool = True,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        GET a URL politely
+
+        Args:
+            url: URL to fetch
+            priority: Turn order while waiting for the host
+            respect_robots: Check robots.txt first; off for APIs called by key
+            **kwargs: Passed on to httpx, e.g. params or timeout. With
+                stream=True the body is left unread; close the response
+
+        Returns:
+            httpx.Response: The response, whatever its status
+
+        Raises:
+            RobotsDisallowed: robots.txt does not allow the URL
+            FetchBusy: The fetch could not get a turn
+            httpx.HTTPError: The request itself failed
+        """
+        priority = FetchPriority(priority)
+        kwargs.setdefault("timeout", settings.fetch_timeout)
+        # Redirects are followed here, so every hop is checked and paced
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await self._get_once(url, priority, respect_robots, kwargs)
+            location = response.headers.get("location")
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                return response
+            await response.aclose()
+            url = urljoin(url, location)
+            kwargs.pop("params", None)
+        raise httpx.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects")
+
+    async def _get_once(
+        self,
+        url: str,
+        priority: FetchPriority,
+        respect_robots: bool,
+        kwargs: Dict[str, Any],
+    ) -> httpx.Response:
+        host = urlparse(url).netloc.lower()
+        if respect_robots and not await self.allowed(url, priority):
+            FETCH_REFUSED.inc("robots")
+            raise RobotsDisallowed(f"robots.txt does not allow fetching {url}")
+
+        attempt = 0
+        while True:
+            response = await self._send(host, url, priority, kwargs)
+            delay = self._retry_after(response)
+            if delay is None:
+                return response
+            # The back-off also holds the retry until the host may be asked again
+            self.scheduler.back_off(host, delay)
+            attempt += 1
+            if attempt > settings.fetch_max_retries or (
+                delay > settings.fetch_max_retry_wait
+            ):
+                return response
+            await response.aclose()
+
+    async def allowed(
+        self, url: str, priority: FetchPriority = FetchPriority.INTERACTIVE
+    ) -> bool:
+        """Whether robots.txt allows fetching ``url``"""
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        rules = await self._robots_for(f"{parsed.scheme}://{host}", host, priority)
+        delay = rules.crawl_delay(self.robots_user_agent)
+        if delay:
+            self.scheduler.slow_down(host, float(delay))
+        return rules.can_fetch(self.robots_user_agent, url)
+
+    async def _send(
+        self, host: str, url: str, priority: FetchPriority, kwargs: Dict[str, Any]
+    ) -> httpx.Response:
+        try:
+            waited = await self.scheduler.acquire(
+                host, priority, timeout=settings.fetch_queue_timeout
+            )
+        except FetchBusy:
+            FETCH_REFUSED.inc("busy")
+            raise
+        FETCH_QUEUE_WAIT.observe(waited, priority.name.lower())
+
+        start = time.perf_counter()
+        outcome = "error"
+        options = dict(kwargs)
+        stream = options.pop("stream", False)
+        follow_redirects = options.pop("follow_redirects", False)
+        try:
+            request = self.client.build_request("GET", url, **options)
+            response = await self.client.send(
+                request, stream=stream, follow_redirects=follow_redirects
+            )
+            outcome = str(response.status_code)
+            return response
+        finally:
+            FETCH_DURATION.observe(time.perf_counter() - start, host, outcome)
+            self.scheduler.release(host)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        """Seconds a 429/503 response asks us to wait, if any"""
+        if response.status_code not in (429, 503):
+            return None
+        value = response.headers.get("Retry-After")
+        delay = parse_retry_after(value) if value else None
+        if delay is None and response.status_code == 429:
+            return DEFAULT_BACKOFF_SECONDS
+        return delay
+
+    async def _robots_for(
+        self, origin: str, host: str, priority: FetchPriority
+    ) -> RobotFileParser:
+        entry = self._robots.get(origin)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        # One fetch per origin; others wait for its answer
+        pending = self._robots_pending.get(origin)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch_robots(origin, host, priority))
+            self._robots_pending[origin] = pending
+            pending.add_done_callback(lambda _: self._robots_pending.pop(origin, None))
+        rules, ttl = await asyncio.shield(pending)
+        self._robots[origin] = (time.monotonic() + ttl, rules)
+        self._robots.move_to_end(origin)
+        while len(self._robots) > MAX_TRACKED_HOSTS:
+            self._robots.popitem(last=False)
+        return rules
+
+    async def _fetch_robots(
+        self, origin: str, host: str, priority: FetchPriority
+    ) -> Tuple[RobotFileParser, float]:
+        """Fetch and parse robots.txt, following RFC 9309 for failures"""
+        response = await self._send(
+            host,
+            f"{origin}/robots.txt",
+            priority,
+            {"timeout": settings.fetch_timeout, "follow_redirects": True},
+        )
+        rules = RobotFileParser()
+        if response.status_code == 200:
+            text = response.content[:MAX_ROBOTS_BYTES].decode("utf-8", "replace")
+            rules.parse(text.splitlines())
+            return rules, settings.fetch_robots_ttl
+        if response.status_code == 429 or response.status_code in range(500, 600):
+            # The server could not answer: assume everything is disallowed
+            rules.disallow_all = True
+            return rules, ROBOTS_ERROR_TTL
+        # No robots.txt (4xx): everything is allowed
+        rules.allow_all = True
+        return rules, settings.fetch_robots_ttl
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """Seconds from a Retry-After value: delta-seconds or an HTTP date"""
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+# Global instance
+fetcher = PoliteFetcher()
@@ -0,0 +1,231 @@
+"""
+Streaming link import.
+
+Request bodies are read chunk by chunk and split into lines, so an import of
+100k links never holds more than one batch in memory. Each line is either a
+JSON object (``{"url": ..., "title": ...}``) or a CSV record (``url,title``
+with an optional header row). Valid rows are written per batch through COPY
+into a temporary table and moved into ``links`` with a single
+``INSERT ... SELECT``, which lets the per-collection ``url_hash`` constraint
+drop duplicates without a round trip per row.
+"""
+
+import csv
+import json
+import time
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+
+from .database import DatabaseSession, pool_metrics
+from .urlnorm import canonicalize_url, url_hash
+from .utils import generate_fallback_title
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json")
+CSV_TYPES = ("text/csv", "application/csv")
+
+MAX_LINE_BYTES = 16 * 1024
+MAX_URL_LENGTH = 2048
+MAX_TITLE_LENGTH = 500
+
+# Rows that survive validation: (title, url, url_hash)
+IngestRow = Tuple[str, str, str]
+
+_CREATE_STAGING = """
+    CREATE TEMP TABLE link_import (
+        title text NOT NULL,
+        url text NOT NULL,
+        url_hash text NOT NULL
+    ) ON COMMIT DROP
+"""
+
+_INSERT_FROM_STAGING = """
+    INSERT INTO links (id, title, url, link_collection_id, user_id,
+                       created_at, updated_at, url_hash)
+    SELECT gen_random_uuid(), title, url, $1::uuid, $2, $3, $3, url_hash
+    FROM link_import
+    ON CONFLICT (link_collection_id, url_hash) DO NOTHING
+"""
+
+
+class IngestLineError(ValueError):
+    """A single input line that cannot be imported"""
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    """Map a Content-Type header to ``"ndjson"`` or ``"csv"``"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return "ndjson"
+    if media_type in CSV_TYPES:
+        return "csv"
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Yield ``(line_number, text)`` for each non-blank line of a byte stream"""
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise IngestLineError(f"Line {line_number + len(lines) + 1} is too long")
+        for raw in lines:
+            line_number += 1
+            text = raw.decode("utf-8", errors="replace").strip()
+            if text:
+                yield line_number, text
+    if buffer.strip():
+        yield line_number + 1, buffer.decode("utf-8", errors="replace").strip()
+
+
+async def read_batches(
+    chunks: AsyncIterator[bytes],
+    parse_line: Callable[[str], Optional[IngestRow]],
+    batch_size: int,
+    max_rows: int,
+) -> AsyncIterator[Tuple[List[IngestRow], List[Tuple[int, str]]]]:
+    """
+    Yield ``(rows, errors)`` for every ``batch_size`` valid rows.
+
+    ``errors`` holds ``(line_number, message)`` for lines rejected since the
+    previous batch. Raises IngestLineError once more than ``max_rows`` rows
+    have been read.
+    """
+    rows: List[IngestRow] = []
+    errors: List[Tuple[int, str]] = []
+    total = 0
+    async for line_number, text in iter_lines(chunks):
+        try:
+            row = parse_line(text)
+        except IngestLineError as e:
+            errors.append((line_number, str(e)))
+            row = None
+        if row is not None:
+            total += 1
+            if total > max_rows:
+                raise IngestLineError(f"Imports are limited to {max_rows} links")
+            rows.append(row)
+        if len(rows) >= batch_size or len(errors) >= batch_size:
+            yield rows, errors
+            rows, errors = [], []
+    if rows or errors:
+        yield rows, errors
+
+
+def validate_link(url: Optional[str], title: Optional[str]) -> IngestRow:
+    """Check one imported link and return the row to insert"""
+    if not isinstance(url, str) or not url.strip():
+        raise IngestLineError("Missing url")
+    url = url.strip()
+    if len(url) > MAX_URL_LENGTH:
+        raise IngestLineError("URL is too long")
+    if canonicalize_url(url) is None:
+        raise IngestLineError("Not a valid http(s) URL")
+
+    if title is not None and not isinstance(title, str):
+        raise IngestLineError("Title must be a string")
+    # Pages are not fetched during an import; untitled links get a fallback
+    title = (title or "").strip()[:MAX_TITLE_LENGTH] or generate_fallback_title(url)
+    return title, url, url_hash(url)
+
+
+def parse_ndjson_line(text: str) -> IngestRow:
+    try:
+        item = json.loads(text)
+    except ValueError:
+        raise IngestLineError("Invalid JSON")
+    if isinstance(item, str):
+        return validate_link(item, None)
+    if not isinstance(item, dict):
+        raise IngestLineError("Expected an object with a url")
+    return validate_link(item.get("url"), item.get("title"))
+
+
+class CsvLineParser:
+    """
+    Parses CSV records one line at a time.
+
+    A first row naming a ``url`` column is treated as the header and may also
+    name a ``title`` column; without one, the first column is the URL and the
+    second the title. Fields may be quoted but cannot span lines.
+    """
+
+    def __init__(self):
+        self._url_index = 0
+        self._title_index: Optional[int] = 1
+        self._first = True
+
+    def __call__(self, text: str) -> Optional[IngestRow]:
+        try:
+            fields = next(csv.reader([text]))
+        except (csv.Error, StopIteration):
+            raise IngestLineError("Invalid CSV")
+
+        if self._first:
+            self._first = False
+            header = [field.strip().lower() for field in fields]
+            if "url" in header:
+                self._url_index = header.index("url")
+                self._title_index = header.index("title") if "title" in header else None
+                return None
+
+        if self._url_index >= len(fields):
+            raise IngestLineError("Missing url")
+        title = None
+        if self._title_index is not None and self._title_index < len(fields):
+            title = fields[self._title_index]
+        return validate_link(fields[self._url_index], title)
+
+
+async def insert_links_batch(
+    db: DatabaseSession,
+    collection_id: str,
+    user_id: str,
+    rows: List[IngestRow],
+) -> int:
+    """
+    COPY a batch into a staging table and insert it into the collection.
+
+    Must run inside ``db.transaction()``; the staging table is dropped at
+    commit. Returns the number of links actually inserted.
+    """
+    conn = await db.connection()
+    start_time = time.perf_counter()
+    await conn.execute(_CREATE_STAGING)
+    await conn.copy_records_to_table(
+        "link_import", records=rows, columns=["title", "url", "url_hash"]
+    )
+    status = await conn.execute(
+        _INSERT_FROM_STAGING, collection_id, user_id, datetime.utcnow()
+    )
+    pool_metrics.record_query("links.copy_batch", time.perf_counter() - start_time)
+    # Status is "INSERT 0 <rows>"
+    return int(status.rsplit(" ", 1)[-1])
+
+
+class IngestProgressResponse(StreamingResponse):
+    """
+    NDJSON progress stream produced while the request body is still being read.
+
+    StreamingResponse normally reads ``receive`` in the background to notice
+    disconnects, which would swallow the body chunks the import is consuming;
+    here the body iterator is the only reader and a disconnect surfaces as
+    ``ClientDisconnect`` from ``request.stream()``.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, content, status_code: int = 200, headers=None, **kwargs):
+        # GZipMiddleware holds back small writes until the stream closes, which
+        # would delay every progress event to the end; it passes through
+        # responses that already declare an encoding
+        headers = {"Content-Encoding": "identity", **(headers or {})}
+        super().__init__(content, status_code, headers, **kwargs)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
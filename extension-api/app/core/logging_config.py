@@ -0,0 +1,119 @@
+"""
+Logging setup for the extension API.
+
+Records are put on a bounded in-memory queue by a ``QueueHandler`` attached to
+the root logger and formatted/written by a ``QueueListener`` thread, so the
+event loop never pays for string formatting or stdout I/O. When the queue is
+full, records are dropped and counted instead of blocking the request.
+
+Per-request access logs are sampled for successful responses (see
+``should_log_request``); client and server errors are always logged.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+# Attributes present on every LogRecord; anything else came in via ``extra=``
+_RESERVED_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__.keys()
+) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as a single JSON line, including any ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that defers all formatting to the listener thread"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock implementation formats the message here, on the caller's
+        # thread. The listener runs in the same process, so the record can be
+        # handed over untouched and formatted there.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def configure_logging() -> None:
+    """Install the queue handler on the root logger and start the listener"""
+    global _listener
+
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(
+        maxsize=settings.log_queue_size
+    )
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(settings.log_level.upper())
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, output, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def should_log_request(status_code: int) -> bool:
+    """Always log errors; log successful requests at the configured sample rate"""
+    if status_code >= 400:
+        return True
+    rate = settings.log_sample_rate
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def dropped_records() -> int:
+    """Number of log records dropped because the queue was full"""
+    return DroppingQueueHandler.dropped
@@ -0,0 +1,93 @@
+"""
+Plan-aware, cost-weighted rate limiting.
+
+The SlowAPI decorators count requests, so a one-link bulk call costs the same
+as a 1000-link one. Write routes also charge the user a budget of credits per
+minute: one per request plus one per link or favorite it carries. The budget is
+a moving window over the same storage as the SlowAPI counters, so it behaves
+like a token bucket refilled over one minute and is shared across workers when
+RATE_LIMIT_STORAGE_URI points at Redis.
+
+The budget size comes from the user's plan ``limits``: ``creditsPerMinute``
+when the plan sets it, otherwise room to fill two collections a minute
+(``linksPerCollection``), never below RATE_LIMIT_MIN_CREDITS.
+
+``CostLimiter`` is mirrored in agents-api (``core/ratelimit.py``).
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from limits import RateLimitItemPerMinute
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import STRATEGIES
+
+from .config import settings
+from .utils import limiter_storage_options
+
+logger = logging.getLogger(__name__)
+
+# Seconds to keep using local budgets after the shared storage fails
+STORAGE_RETRY_SECONDS = 30.0
+
+
+class CostLimiter:
+    """Charges variable costs against per-identity budgets of credits per minute"""
+
+    def __init__(
+        self,
+        storage_uri: str,
+        strategy: str = "moving-window",
+        storage_options: Optional[Dict[str, float]] = None,
+        key_prefix: str = "cost",
+    ):
+        self.key_prefix = key_prefix
+        self._limiter = STRATEGIES[strategy](
+            storage_from_string(storage_uri, **(storage_options or {}))
+        )
+        self._fallback = STRATEGIES[strategy](MemoryStorage())
+        self._storage_dead_until = 0.0
+
+    def charge(self, identity: str, cost: int, per_minute: int) -> float:
+        """
+        Spend ``cost`` credits from ``identity``'s budget of ``per_minute``.
+
+        Returns 0 when the credits were spent, otherwise the seconds to wait
+        before retrying. A cost above the whole budget is capped to it, so the
+        largest allowed request is still possible with a full budget.
+        """
+        item = RateLimitItemPerMinute(per_minute)
+        cost = max(1, min(cost, per_minute))
+        if time.monotonic() >= self._storage_dead_until:
+            try:
+                return self._charge(self._limiter, item, identity, cost)
+            except Exception as e:
+                logger.warning("Rate limit storage unreachable, using local: %s", e)
+                self._storage_dead_until = time.monotonic() + STORAGE_RETRY_SECONDS
+        return self._charge(self._fallback, item, identity, cost)
+
+    def _charge(self, limiter, item, identity: str, cost: int) -> float:
+        if limiter.hit(item, self.key_prefix, identity, cost=cost):
+            return 0.0
+        reset_time, _ = limiter.get_window_stats(item, self.key_prefix, identity)
+        return max(reset_time - time.time(), 1.0)
+
+
+cost_limiter = CostLimiter(
+    settings.rate_limit_storage_uri,
+    strategy=settings.rate_limit_strategy,
+    storage_options=limiter_storage_options(),
+    key_prefix=f"{settings.rate_limit_key_prefix}:cost",
+)
+
+
+def plan_credit_budget(limits: Dict[str, Any]) -> int:
+    """Credits per minute for a plan's ``limits``"""
+    explicit = limits.get("creditsPerMinute")
+    if isinstance(explicit, int) and explicit > 0:
+        return explicit
+    links_per_collection = limits.get("linksPerCollection")
+    if not isinstance(links_per_collection, int):
+        links_per_collection = 0
+    return max(settings.rate_limit_min_credits, 2 * links_per_collection)
@@ -0,0 +1,58 @@
+"""
+JSON encoding for trusted database rows.
+
+List endpoints used to copy every row into a Pydantic model, validate it again
+through ``response_model`` and then run ``jsonable_encoder`` plus the stdlib
+encoder over the result. Rows coming back from our own statements already have
+the right types, so the hot paths map columns straight to response keys and
+hand the dicts to orjson, which encodes UUIDs and datetimes natively.
+
+The field maps below must produce the same keys as the matching models in
+``models/schemas.py`` (``Link``, ``Favorite``).
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi.responses import ORJSONResponse
+
+# (response key, row column) pairs
+FieldMap = Sequence[Tuple[str, str]]
+
+LINK_FIELDS: FieldMap = (
+    ("id", "id"),
+    ("title", "title"),
+    ("url", "url"),
+    ("linkCollectionId", "link_collection_id"),
+    ("userId", "user_id"),
+    ("createdAt", "created_at"),
+    ("updatedAt", "updated_at"),
+)
+
+# favorites.* statements already alias their columns to the response keys
+FAVORITE_FIELDS: FieldMap = (
+    ("id", "id"),
+    ("title", "title"),
+    ("url", "url"),
+    ("userId", "userId"),
+    ("createdAt", "createdAt"),
+    ("updatedAt", "updatedAt"),
+)
+
+
+def rows_to_dicts(rows: Iterable[Mapping[str, Any]], fields: FieldMap) -> List[dict]:
+    """Map each row's columns to response keys without building models"""
+    return [{key: row[column] for key, column in fields} for row in rows]
+
+
+def json_response(
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> ORJSONResponse:
+    """
+    Return ``content`` encoded by orjson, skipping ``response_model`` checks.
+
+    Only pass values built from database rows or other trusted data; nothing
+    here validates the shape against the declared response model.
+    """
+    return ORJSONResponse(content=content, status_code=status_code, headers=headers)
@@ -0,0 +1,303 @@
+"""
+Registry of named, parameterized SQL statements used on the hot paths.
+
+Every statement listed here is prepared once per pooled connection when the
+connection is created (see ``database._init_connection``) and executed by name
+through the ``*_prepared`` helpers in ``database``. With
+DB_PREPARE_STATEMENTS=false the same helpers run the SQL unprepared. Rows come
+back as ``Row`` records, which support both ``row["column"]`` and
+``row.column`` access without copying into a dict.
+"""
+
+import logging
+from typing import Dict
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+
+class Row(asyncpg.Record):
+    """asyncpg record with attribute access, used instead of dict(row) copies"""
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+STATEMENTS: Dict[str, str] = {
+    # Authentication
+    "auth.api_key": """
+        SELECT ak.user_id, ak.name, ak.created_at, u.name as user_name
+        FROM api_keys ak
+        JOIN users u ON ak.user_id = u.id
+        WHERE ak.key = $1
+    """,
+    # Subscriptions and plans
+    "subscriptions.active": """
+        SELECT s.product_id, s.variant_id, s.status, s.created_at
+        FROM subscriptions s
+        WHERE s.user_id = $1 AND s.status IN ('active', 'trialing')
+        ORDER BY s.created_at DESC
+        LIMIT 1
+    """,
+    "plans.by_product": """
+        SELECT id, name, slug, interval, price_cents, limits
+        FROM plans
+        WHERE product_id = $1 OR variant_id = $2
+        LIMIT 1
+    """,
+    "plans.free": """
+        SELECT id, name, slug, interval, price_cents, limits
+        FROM plans
+        WHERE slug = 'free'
+        LIMIT 1
+    """,
+    # Usage counters for limit checks, fetched in a single round-trip
+    "usage.counts": """
+        SELECT
+            (SELECT COUNT(*) FROM collections WHERE user_id = $1) as collections,
+            (SELECT COUNT(*) FROM links WHERE user_id = $1) as total_links,
+            (SELECT COUNT(*) FROM favorites WHERE user_id = $1) as favorites,
+            (
+                SELECT COALESCE(cardinality(top_collections), 0)
+                FROM users
+                WHERE id = $1
+            ) as top_collections
+    """,
+    "links.count_for_collection": """
+        SELECT COUNT(*) as count
+        FROM links
+        WHERE link_collection_id = $1::uuid
+    """,
+    # Top collections
+    "users.top_collections": """
+        SELECT top_collections
+        FROM users
+        WHERE id = $1
+        LIMIT 1
+    """,
+    "collections.by_ids": """
+        SELECT id, title, description, visibility, total_links as "totalLinks",
+               created_at as "createdAt"
+        FROM collections
+        WHERE user_id = $1 AND id = ANY($2::uuid[])
+    """,
+    # Collections and links
+    "collections.owned": """
+        SELECT id, total_links
+        FROM collections
+        WHERE id = $1::uuid AND user_id = $2
+    """,
+    "collections.insert": """
+        INSERT INTO collections (id, title, description, visibility, user_id,
+                                 total_links, created_at, updated_at, url)
+        VALUES ($1::uuid, $2, $3, $4, $5, $6, $7, $8, $9)
+        RETURNING id, title, description, visibility, total_links, created_at
+    """,
+    "collections.set_total_links": """
+        UPDATE collections
+        SET total_links = $1, updated_at = (now() AT TIME ZONE 'utc')
+        WHERE id = $2::uuid AND user_id = $3
+    """,
+    # Relative, so concurrent imports into one collection don't lose counts
+    "collections.add_total_links": """
+        UPDATE collections
+        SET total_links = total_links + $1, updated_at = (now() AT TIME ZONE 'utc')
+        WHERE id = $2::uuid AND user_id = $3
+        RETURNING total_links
+    """,
+    # Links are unique per collection by url_hash (see core/urlnorm.py); a
+    # duplicate insert returns no row
+    "links.insert": """
+        INSERT INTO links (id, title, url, link_collection_id, user_id,
+                           created_at, updated_at, url_hash)
+        VALUES ($1::uuid, $2, $3, $4::uuid, $5, $6, $7, $8)
+        ON CONFLICT (link_collection_id, url_hash) DO NOTHING
+        RETURNING id, title, url, link_collection_id, user_id, created_at,
+                  updated_at
+    """,
+    "links.insert_many": """
+        INSERT INTO links (id, title, url, link_collection_id, user_id,
+                           created_at, updated_at, url_hash)
+        SELECT l.id, l.title, l.url, $1::uuid, $2, $3, $3, l.url_hash
+        FROM unnest($4::uuid[], $5::text[], $6::text[], $7::text[])
+             AS l(id, title, url, url_hash)
+        ON CONFLICT (link_collection_id, url_hash) DO NOTHING
+        RETURNING id, title, url, link_collection_id, user_id, created_at,
+                  updated_at
+    """,
+    "links.by_hash": """
+        SELECT id, title, url, link_collection_id, user_id, created_at,
+               updated_at
+        FROM links
+        WHERE link_collection_id = $1::uuid AND url_hash = $2
+    """,
+    "links.existing_hashes": """
+        SELECT url_hash
+        FROM links
+        WHERE link_collection_id = $1::uuid AND url_hash = ANY($2::text[])
+    """,
+    # Deferred title backfill: only replaces the placeholder title, so a title
+    # the user set in the meantime is kept
+    "links.backfill_title": """
+        UPDATE links
+        SET title = $1, updated_at = (now() AT TIME ZONE 'utc')
+        WHERE id = $2::uuid AND title = $3
+    """,
+    # Favorites
+    "favorites.list": """
+        SELECT id, title, url, user_id as "userId", created_at as "createdAt",
+               updated_at as "updatedAt"
+        FROM favorites
+        WHERE user_id = $1
+        ORDER BY created_at DESC
+    """,
+    # Keyset pages, newest first. The cursor is the (created_at, id) of the
+    # last row of the previous page
+    "favorites.page": """
+        SELECT id, title, url, user_id as "userId", created_at as "createdAt",
+               updated_at as "updatedAt"
+        FROM favorites
+        WHERE user_id = $1
+        ORDER BY created_at DESC, id DESC
+        LIMIT $2
+    """,
+    "favorites.page_after": """
+        SELECT id, title, url, user_id as "userId", created_at as "createdAt",
+               updated_at as "updatedAt"
+        FROM favorites
+        WHERE user_id = $1 AND (created_at, id) < ($2::timestamp, $3::uuid)
+        ORDER BY created_at DESC, id DESC
+        LIMIT $4
+    """,
+    # Delta sync: rows changed after (updated_at, id), oldest change first
+    "favorites.changed_since": """
+        SELECT id, title, url, user_id as "userId", created_at as "createdAt",
+               updated_at as "updatedAt"
+        FROM favorites
+        WHERE user_id = $1 AND (updated_at, id) > ($2::timestamp, $3::uuid)
+        ORDER BY updated_at, id
+        LIMIT $4
+    """,
+    # Cheap fingerprint of the user's favorites, used for ETags
+    "favorites.version": """
+        SELECT COUNT(*) as count, MAX(updated_at) as last_updated
+        FROM favorites
+        WHERE user_id = $1
+    """,
+    "favorites.exists": """
+        SELECT id FROM favorites
+        WHERE user_id = $1 AND url = $2
+    """,
+    "favorites.insert": """
+        INSERT INTO favorites (id, title, url, user_id, created_at, updated_at)
+        VALUES ($1::uuid, $2, $3, $4, $5, $6)
+        ON CONFLICT (user_id, url) DO NOTHING
+        RETURNING id, title, url, user_id, created_at, updated_at
+    """,
+    # Batched mutations. Arrays are zipped with unnest so each is one round-trip
+    "favorites.count": """
+        SELECT COUNT(*) as count FROM favorites WHERE user_id = $1
+    """,
+    "favorites.existing_urls": """
+        SELECT url FROM favorites
+        WHERE user_id = $1 AND url = ANY($2::text[])
+    """,
+    "favorites.insert_many": """
+        INSERT INTO favorites (id, title, url, user_id, created_at, updated_at)
+        SELECT i.id, i.title, i.url, $1, $5, $5
+        FROM unnest($2::uuid[], $3::text[], $4::text[]) AS i(id, title, url)
+        ON CONFLICT (user_id, url) DO NOTHING
+        RETURNING id, title, url, user_id, created_at, updated_at
+    """,
+    "favorites.update_many": """
+        UPDATE favorites f
+        SET title = u.title, updated_at = $4
+        FROM unnest($2::uuid[], $3::text[]) AS u(id, title)
+        WHERE f.id = u.id AND f.user_id = $1
+        RETURNING f.id, f.title, f.url, f.user_id, f.created_at, f.updated_at
+    """,
+    "favorites.delete_many": """
+        DELETE FROM favorites
+        WHERE user_id = $1 AND id = ANY($2::uuid[])
+        RETURNING id
+    """,
+    "favorites.update_title": """
+        UPDATE favorites
+        SET title = $1, updated_at = $2
+        WHERE id = $3::uuid AND user_id = $4
+        RETURNING id, title, url, user_id, created_at, updated_at
+    """,
+    "favorites.delete": """
+        DELETE FROM favorites
+        WHERE id = $1::uuid AND user_id = $2
+        RETURNING id
+    """,
+    # Delta sync. Each scan resumes after the (updated_at, id) of the last row
+    # returned; deletes come from the trigger-maintained sync_tombstones table
+    "sync.now": """
+        SELECT (now() AT TIME ZONE 'utc') as now
+    """,
+    "sync.collections": """
+        SELECT id, title, description, visibility, total_links, updated_at
+        FROM collections
+        WHERE user_id = $1 AND (updated_at, id) > ($2::timestamp, $3::uuid)
+        ORDER BY updated_at, id
+        LIMIT $4
+    """,
+    "sync.links": """
+        SELECT id, title, url, link_collection_id, updated_at
+        FROM links
+        WHERE user_id = $1 AND (updated_at, id) > ($2::timestamp, $3::uuid)
+        ORDER BY updated_at, id
+        LIMIT $4
+    """,
+    "sync.favorites": """
+        SELECT id, title, url, updated_at
+        FROM favorites
+        WHERE user_id = $1 AND (updated_at, id) > ($2::timestamp, $3::uuid)
+        ORDER BY updated_at, id
+        LIMIT $4
+    """,
+    "sync.tombstones": """
+        SELECT id, entity, entity_id, deleted_at
+        FROM sync_tombstones
+        WHERE user_id = $1 AND (deleted_at, id) > ($2::timestamp, $3::bigint)
+        ORDER BY deleted_at, id
+        LIMIT $4
+    """,
+    # Page titles shared by every instance (see core/title_cache.py)
+    "url_metadata.get": """
+        SELECT title,
+               EXTRACT(EPOCH FROM expires_at - (now() AT TIME ZONE 'utc')) AS ttl
+        FROM url_metadata_cache
+        WHERE url_hash = $1 AND expires_at > (now() AT TIME ZONE 'utc')
+    """,
+    "url_metadata.upsert": """
+        INSERT INTO url_metadata_cache (url_hash, url, title, fetched_at, expires_at)
+        VALUES (
+            $1, $2, $3, (now() AT TIME ZONE 'utc'),
+            (now() AT TIME ZONE 'utc') + make_interval(secs => $4)
+        )
+        ON CONFLICT (url_hash) DO UPDATE
+        SET url = EXCLUDED.url, title = EXCLUDED.title,
+            fetched_at = EXCLUDED.fetched_at, expires_at = EXCLUDED.expires_at
+    """,
+}
+
+
+async def prepare_statements(conn: asyncpg.Connection) -> None:
+    """Prepare every registered statement on a freshly opened connection"""
+    for name, query in STATEMENTS.items():
+        try:
+            conn.prepared[name] = await conn.prepare(query)
+        except asyncpg.PostgresError as e:
+            # A pending migration (missing table, column or constraint) must
+            # not take the whole pool down; the statement is prepared lazily
+            # (and fails) only when it is used
+            logger.warning("Skipping statement %s: %s", name, e)
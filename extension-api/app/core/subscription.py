@@ -7,7 +7,7 @@ import logging
 from typing import Any, Dict, Optional, Tuple
 
 from .config import settings
-from .database import execute_query_all, execute_query_one
+from .database import DatabaseSession, fetch_prepared_one
 
 logger = logging.getLogger(__name__)
 
@@ -16,68 +16,33 @@ class SubscriptionService:
     """Service for managing subscription limits and enforcement"""
 
     @staticmethod
-    async def get_user_subscription(user_id: str) -> Optional[Dict[str, Any]]:
+    async def get_user_subscription(
+        user_id: str, db: Optional[DatabaseSession] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Get user's current subscription plan and limits.
         Returns None if user has no active subscription (defaults to Free plan).
         """
-        logger.info(f"🔍 GET_USER_SUBSCRIPTION - Called for user: {user_id}")
-
         try:
             # First check if user has an active subscription
-            logger.info(f"🔍 Checking for active subscriptions...")
-            subscription_query = """
-                SELECT s.product_id, s.variant_id, s.status, s.created_at
-                FROM subscriptions s
-                WHERE s.user_id = $1 AND s.status IN ('active', 'trialing')
-                ORDER BY s.created_at DESC
-                LIMIT 1
-            """
-
-            logger.info(f"🔍 Subscription query: {subscription_query}")
-            logger.info(f"🔍 Query params: user_id={user_id}")
-
-            subscription = await execute_query_one(subscription_query, (user_id,))
-            logger.info(f"🔍 Subscription query result: {subscription}")
+            subscription = await fetch_prepared_one(
+                "subscriptions.active", user_id, db=db
+            )
 
             if subscription:
-                logger.info(f"✅ Found active subscription: {subscription}")
                 # User has active subscription, get plan details
-                plan_query = """
-                    SELECT id, name, slug, interval, price_cents, limits
-                    FROM plans
-                    WHERE product_id = $1 OR variant_id = $2
-                    LIMIT 1
-                """
-
-                logger.info(f"🔍 Plan query: {plan_query}")
-                logger.info(
-                    f"🔍 Plan query params: product_id={subscription['product_id']}, variant_id={subscription['variant_id']}"
-                )
-
-                plan = await execute_query_one(
-                    plan_query, (subscription["product_id"], subscription["variant_id"])
+                plan = await fetch_prepared_one(
+                    "plans.by_product",
+                    subscription["product_id"],
+                    subscription["variant_id"],
+                    db=db,
                 )
 
-                logger.info(f"🔍 Plan query result: {plan}")
-
                 if plan and plan.get("limits"):
-                    # Ensure limits is properly parsed as JSON
+                    # jsonb is decoded by the connection's type codec
                     limits = plan["limits"]
-                    if isinstance(limits, str):
-                        import json
-
-                        try:
-                            limits = json.loads(limits)
-                            logger.info(f"🔍 Parsed limits from JSON string: {limits}")
-                        except json.JSONDecodeError as e:
-                            logger.error(f"❌ Failed to parse limits JSON: {e}")
-                            limits = None
-
                     if limits and isinstance(limits, dict):
-                        logger.info(
-                            f"✅ Found plan with valid limits: {plan['name']} ({plan['slug']})"
-                        )
+                        logger.debug("User %s is on plan %s", user_id, plan["slug"])
                         return {
                             "plan_id": plan["id"],
                             "plan_name": plan["name"],
@@ -88,42 +53,19 @@ class SubscriptionService:
                             "subscription_status": subscription["status"],
                         }
                     else:
-                        logger.warning(f"⚠️ Plan found but limits are invalid: {limits}")
+                        logger.warning("Plan %s has invalid limits", plan["slug"])
                 else:
-                    logger.warning(f"⚠️ Plan found but no limits: {plan}")
+                    logger.warning(
+                        "No plan with limits for product %s",
+                        subscription["product_id"],
+                    )
 
             # Fallback to Free plan
-            logger.info(f"🔍 No active subscription found, checking for free plan...")
-            free_plan_query = """
-                SELECT id, name, slug, interval, price_cents, limits
-                FROM plans
-                WHERE slug = 'free'
-                LIMIT 1
-            """
-
-            logger.info(f"🔍 Free plan query: {free_plan_query}")
-            free_plan = await execute_query_one(free_plan_query)
-            logger.info(f"🔍 Free plan query result: {free_plan}")
+            free_plan = await fetch_prepared_one("plans.free", db=db)
 
             if free_plan and free_plan.get("limits"):
-                # Ensure limits is properly parsed as JSON
                 limits = free_plan["limits"]
-                if isinstance(limits, str):
-                    import json
-
-                    try:
-                        limits = json.loads(limits)
-                        logger.info(
-                            f"🔍 Parsed free plan limits from JSON string: {limits}"
-                        )
-                    except json.JSONDecodeError as e:
-                        logger.error(f"❌ Failed to parse free plan limits JSON: {e}")
-                        limits = None
-
                 if limits and isinstance(limits, dict):
-                    logger.info(
-                        f"✅ Found free plan with valid limits: {free_plan['name']} ({free_plan['slug']})"
-                    )
                     return {
                         "plan_id": free_plan["id"],
                         "plan_name": free_plan["name"],
@@ -134,14 +76,10 @@ class SubscriptionService:
                         "subscription_status": "free",
                     }
                 else:
-                    logger.warning(
-                        f"⚠️ Free plan found but limits are invalid: {limits}"
-                    )
+                    logger.warning("Free plan has invalid limits")
 
             # Hard fallback if no plans exist
-            logger.warning(
-                f"⚠️ No valid plans found in database for user {user_id}, using hardcoded defaults"
-            )
+            logger.warning("No valid plans found in database, using hardcoded defaults")
             hardcoded_plan = {
                 "plan_id": "free",
                 "plan_name": "Free",
@@ -157,15 +95,10 @@ class SubscriptionService:
                 },
                 "subscription_status": "free",
             }
-            logger.info(f"✅ Returning hardcoded plan: {hardcoded_plan}")
             return hardcoded_plan
 
-        except Exception as e:
-            logger.error(f"❌ Error getting user subscription for {user_id}: {str(e)}")
-            logger.error(f"❌ Exception type: {type(e)}")
-            import traceback
-
-            logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+        except Exception:
+            logger.exception("Error getting user subscription for %s", user_id)
 
             # Return hardcoded defaults on error
             hardcoded_plan = {
@@ -183,101 +116,29 @@ class SubscriptionService:
                 },
                 "subscription_status": "free",
             }
-            logger.info(f"✅ Returning hardcoded plan on error: {hardcoded_plan}")
             return hardcoded_plan
 
     @staticmethod
-    async def get_user_usage(user_id: str) -> Dict[str, int]:
+    async def get_user_usage(
+        user_id: str, db: Optional[DatabaseSession] = None
+    ) -> Dict[str, int]:
         """Get current usage counts for a user"""
-        logger.info(f"🔍 GET_USER_USAGE - Called for user: {user_id}")
-
         try:
-            # Get collections count
-            logger.info(f"🔍 Getting collections count...")
-            collections_query = """
-                SELECT COUNT(*) as count
-                FROM collections
-                WHERE user_id = $1
-            """
-            logger.info(f"🔍 Collections query: {collections_query}")
-            logger.info(f"🔍 Query params: user_id={user_id}")
-
-            collections_result = await execute_query_one(collections_query, (user_id,))
-            logger.info(f"🔍 Collections query result: {collections_result}")
-
-            collections_count = collections_result["count"] if collections_result else 0
-            logger.info(f"✅ Collections count: {collections_count}")
-
-            # Get total links count
-            logger.info(f"🔍 Getting total links count...")
-            links_query = """
-                SELECT COUNT(*) as count
-                FROM links
-                WHERE user_id = $1
-            """
-            logger.info(f"🔍 Links query: {links_query}")
-            logger.info(f"🔍 Query params: user_id={user_id}")
-
-            links_result = await execute_query_one(links_query, (user_id,))
-            logger.info(f"🔍 Links query result: {links_result}")
-
-            total_links_count = links_result["count"] if links_result else 0
-            logger.info(f"✅ Total links count: {total_links_count}")
-
-            # Get favorites count
-            logger.info(f"🔍 Getting favorites count...")
-            favorites_query = """
-                SELECT COUNT(*) as count
-                FROM favorites
-                WHERE user_id = $1
-            """
-            logger.info(f"🔍 Favorites query: {favorites_query}")
-            logger.info(f"🔍 Query params: user_id={user_id}")
-
-            favorites_result = await execute_query_one(favorites_query, (user_id,))
-            logger.info(f"🔍 Favorites query result: {favorites_result}")
-
-            favorites_count = favorites_result["count"] if favorites_result else 0
-            logger.info(f"✅ Favorites count: {favorites_count}")
-
-            # Get top collections count
-            logger.info(f"🔍 Getting top collections count...")
-            top_collections_query = """
-                SELECT top_collections
-                FROM users
-                WHERE id = $1
-            """
-            logger.info(f"🔍 Top collections query: {top_collections_query}")
-            logger.info(f"🔍 Query params: user_id={user_id}")
-
-            top_collections_result = await execute_query_one(
-                top_collections_query, (user_id,)
-            )
-            logger.info(f"🔍 Top collections query result: {top_collections_result}")
-
-            top_collections_count = (
-                len(top_collections_result["top_collections"])
-                if top_collections_result and top_collections_result["top_collections"]
-                else 0
-            )
-            logger.info(f"✅ Top collections count: {top_collections_count}")
+            # All four counters come back from a single prepared statement
+            counts = await fetch_prepared_one("usage.counts", user_id, db=db)
 
             usage_summary = {
-                "collections": collections_count,
-                "totalLinks": total_links_count,
-                "favorites": favorites_count,
-                "topCollections": top_collections_count,
+                "collections": counts["collections"],
+                "totalLinks": counts["total_links"],
+                "favorites": counts["favorites"],
+                # NULL when the user row does not exist yet
+                "topCollections": counts["top_collections"] or 0,
             }
 
-            logger.info(f"🎉 Usage summary: {usage_summary}")
             return usage_summary
 
-        except Exception as e:
-            logger.error(f"❌ Error getting user usage for {user_id}: {str(e)}")
-            logger.error(f"❌ Exception type: {type(e)}")
-            import traceback
-
-            logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+        except Exception:
+            logger.exception("Error getting user usage for %s", user_id)
 
             # Return zeros on error
             fallback_usage = {
@@ -286,29 +147,31 @@ class SubscriptionService:
                 "favorites": 0,
                 "topCollections": 0,
             }
-            logger.info(f"✅ Returning fallback usage on error: {fallback_usage}")
             return fallback_usage
 
     @staticmethod
-    async def check_collection_limit(user_id: str) -> Tuple[bool, str, Optional[str]]:
+    async def check_collection_limit(
+        user_id: str, db: Optional[DatabaseSession] = None
+    ) -> Tuple[bool, str, Optional[str]]:
         """
         Check if user can create more collections.
         Returns (can_create, error_message, plan_slug)
         """
         try:
-            subscription = await SubscriptionService.get_user_subscription(user_id)
+            subscription = await SubscriptionService.get_user_subscription(
+                user_id, db=db
+            )
             if not subscription:
                 return False, "Unable to determine subscription status", None
 
-            usage = await SubscriptionService.get_user_usage(user_id)
+            usage = await SubscriptionService.get_user_usage(user_id, db=db)
             limits = subscription["limits"]
 
             # Safety check: ensure limits is a dict
             if not isinstance(limits, dict):
                 logger.error(
-                    f"❌ Invalid limits format. Expected dict, got: {type(limits)}"
+                    "Invalid limits format: expected dict, got %s", type(limits)
                 )
-                logger.error(f"❌ Limits value: {limits}")
                 return (
                     False,
                     "Invalid subscription plan configuration",
@@ -325,152 +188,97 @@ class SubscriptionService:
             return True, "", subscription["plan_slug"]
 
         except Exception as e:
-            logger.error(
-                f"Error checking collection limit for user {user_id}: {str(e)}"
-            )
+            logger.error("Error checking collection limit for user %s: %s", user_id, e)
             return False, "Error checking subscription limits", None
 
     @staticmethod
     async def check_links_limit(
-        user_id: str, collection_id: str, links_to_add: int = 1
+        user_id: str,
+        collection_id: str,
+        links_to_add: int = 1,
+        db: Optional[DatabaseSession] = None,
     ) -> Tuple[bool, str, Optional[str]]:
         """
         Check if user can add more links to a collection.
         Returns (can_add, error_message, plan_slug)
         """
-        logger.info(
-            f"🔍 CHECK_LINKS_LIMIT - Called for user: {user_id}, collection: {collection_id}, links_to_add: {links_to_add}"
-        )
-
         try:
-            logger.info(f"🔍 Getting user subscription...")
-            subscription = await SubscriptionService.get_user_subscription(user_id)
+            subscription = await SubscriptionService.get_user_subscription(
+                user_id, db=db
+            )
             if not subscription:
-                logger.error(f"❌ No subscription found for user: {user_id}")
                 return False, "Unable to determine subscription status", None
 
-            logger.info(
-                f"✅ Subscription found: {subscription['plan_name']} ({subscription['plan_slug']})"
-            )
-            logger.info(f"✅ Subscription limits: {subscription['limits']}")
-
             # Safety check: ensure limits is a dict
             limits = subscription["limits"]
             if not isinstance(limits, dict):
                 logger.error(
-                    f"❌ Invalid limits format. Expected dict, got: {type(limits)}"
+                    "Invalid limits format: expected dict, got %s", type(limits)
                 )
-                logger.error(f"❌ Limits value: {limits}")
                 return (
                     False,
                     "Invalid subscription plan configuration",
                     subscription["plan_slug"],
                 )
 
-            logger.info(f"🔍 Getting user usage...")
-            usage = await SubscriptionService.get_user_usage(user_id)
-            logger.info(f"✅ User usage: {usage}")
-
-            logger.info(f"✅ Plan limits: {limits}")
+            usage = await SubscriptionService.get_user_usage(user_id, db=db)
 
             # Check per-collection limit (skip for new collections)
             if collection_id != "new_collection":
-                logger.info(f"🔍 Checking per-collection limit...")
-                collection_links_query = """
-                    SELECT COUNT(*) as count
-                    FROM links
-                    WHERE link_collection_id = $1
-                """
-
-                logger.info(f"🔍 Collection links query: {collection_links_query}")
-                logger.info(f"🔍 Query params: collection_id={collection_id}")
-
-                collection_links_result = await execute_query_one(
-                    collection_links_query, (collection_id,)
-                )
-                logger.info(
-                    f"🔍 Collection links query result: {collection_links_result}"
+                collection_links_result = await fetch_prepared_one(
+                    "links.count_for_collection", collection_id, db=db
                 )
 
                 current_collection_links = (
                     collection_links_result["count"] if collection_links_result else 0
                 )
-                logger.info(f"🔍 Current collection links: {current_collection_links}")
-                logger.info(f"🔍 Links to add: {links_to_add}")
-                logger.info(f"🔍 Per-collection limit: {limits['linksPerCollection']}")
-                logger.info(
-                    f"🔍 Will exceed limit: {current_collection_links + links_to_add > limits['linksPerCollection']}"
-                )
-
                 if (
                     current_collection_links + links_to_add
                     > limits["linksPerCollection"]
                 ):
                     error_msg = f"Links per collection limit reached ({limits['linksPerCollection']}). Upgrade your plan to add more links."
-                    logger.warning(f"⚠️ Per-collection limit exceeded: {error_msg}")
                     return False, error_msg, subscription["plan_slug"]
-
-                logger.info(f"✅ Per-collection limit check passed")
             else:
-                logger.info(
-                    f"🔍 Skipping per-collection limit check for new collection"
-                )
                 # For new collections, just check if the links_to_add doesn't exceed the per-collection limit
                 if links_to_add > limits["linksPerCollection"]:
                     error_msg = f"Links per collection limit exceeded ({limits['linksPerCollection']}). Upgrade your plan to add more links."
-                    logger.warning(
-                        f"⚠️ Per-collection limit exceeded for new collection: {error_msg}"
-                    )
                     return False, error_msg, subscription["plan_slug"]
-                logger.info(f"✅ New collection per-collection limit check passed")
 
             # Check total links limit
-            logger.info(f"🔍 Checking total links limit...")
-            logger.info(f"🔍 Current total links: {usage['totalLinks']}")
-            logger.info(f"🔍 Links to add: {links_to_add}")
-            logger.info(f"🔍 Total links limit: {limits['totalLinks']}")
-            logger.info(
-                f"🔍 Will exceed limit: {usage['totalLinks'] + links_to_add > limits['totalLinks']}"
-            )
 
             if usage["totalLinks"] + links_to_add > limits["totalLinks"]:
                 error_msg = f"Total links limit reached ({limits['totalLinks']}). Upgrade your plan to add more links."
-                logger.warning(f"⚠️ Total links limit exceeded: {error_msg}")
                 return False, error_msg, subscription["plan_slug"]
 
-            logger.info(f"✅ Total links limit check passed")
-            logger.info(f"🎉 All subscription limit checks passed successfully!")
-
             return True, "", subscription["plan_slug"]
 
-        except Exception as e:
-            logger.error(f"❌ Error checking links limit for user {user_id}: {str(e)}")
-            logger.error(f"❌ Exception type: {type(e)}")
-            import traceback
-
-            logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+        except Exception:
+            logger.exception("Error checking links limit for user %s", user_id)
             return False, "Error checking subscription limits", None
 
     @staticmethod
-    async def check_favorites_limit(user_id: str) -> Tuple[bool, str, Optional[str]]:
+    async def check_favorites_limit(
+        user_id: str, db: Optional[DatabaseSession] = None
+    ) -> Tuple[bool, str, Optional[str]]:
         """
         Check if user can add more favorites.
         Returns (can_add, error_message, plan_slug)
         """
         try:
-            subscription = await SubscriptionService.get_user_subscription(user_id)
+            subscription = await SubscriptionService.get_user_subscription(
+                user_id, db=db
+            )
             if not subscription:
                 return False, "Unable to determine subscription status", None
 
-            usage = await SubscriptionService.get_user_usage(user_id)
+            usage = await SubscriptionService.get_user_usage(user_id, db=db)
             limits = subscription["limits"]
 
             # Safety check: ensure limits is a dict
             if not isinstance(limits, dict):
                 logger.error(
-                    f"❌ Invalid limits format. Expected dict, got: {type(limits)}"
+                    "Invalid limits format: expected dict, got %s", type(limits)
                 )
-                logger.error(f"❌ Limits value: {limits}")
                 return (
                     False,
                     "Invalid subscription plan configuration",
@@ -487,31 +295,34 @@ class SubscriptionService:
             return True, "", subscription["plan_slug"]
 
         except Exception as e:
-            logger.error(f"Error checking favorites limit for user {user_id}: {str(e)}")
+            logger.error("Error checking favorites limit for user %s: %s", user_id, e)
             return False, "Error checking subscription limits", None
 
     @staticmethod
     async def check_top_collections_limit(
-        user_id: str, collections_to_add: int = 1
+        user_id: str,
+        collections_to_add: int = 1,
+        db: Optional[DatabaseSession] = None,
     ) -> Tuple[bool, str, Optional[str]]:
         """
         Check if user can add more top collections.
         Returns (can_add, error_message, plan_slug)
         """
         try:
-            subscription = await SubscriptionService.get_user_subscription(user_id)
+            subscription = await SubscriptionService.get_user_subscription(
+                user_id, db=db
+            )
             if not subscription:
                 return False, "Unable to determine subscription status", None
 
-            usage = await SubscriptionService.get_user_usage(user_id)
+            usage = await SubscriptionService.get_user_usage(user_id, db=db)
             limits = subscription["limits"]
 
             # Safety check: ensure limits is a dict
             if not isinstance(limits, dict):
                 logger.error(
-                    f"❌ Invalid limits format. Expected dict, got: {type(limits)}"
+                    "Invalid limits format: expected dict, got %s", type(limits)
                 )
-                logger.error(f"❌ Limits value: {limits}")
                 return (
                     False,
                     "Invalid subscription plan configuration",
@@ -529,7 +340,7 @@ class SubscriptionService:
 
         except Exception as e:
             logger.error(
-                f"Error checking top collections limit for user {user_id}: {str(e)}"
+                "Error checking top collections limit for user %s: %s", user_id, e
             )
             return False, "Error checking subscription limits", None
 
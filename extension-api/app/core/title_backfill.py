@@ -0,0 +1,120 @@
+"""
+Deferred title backfill for links added without a title.
+
+With DEFER_LINK_TITLES (or ``defer_title`` on the request) ``create_link``
+inserts the link straight away under ``generate_fallback_title`` and hands it
+to ``title_backfill``. A bounded pool of TITLE_BACKFILL_WORKERS tasks looks
+the page title up through ``title_cache`` at background fetch priority and
+replaces the placeholder. The update bumps ``updated_at``, so clients pick the
+new title up through /sync.
+
+The queue lives in this process and holds at most TITLE_BACKFILL_QUEUE_SIZE
+links. When it is full, or the process stops, the remaining links simply keep
+their fallback title.
+"""
+
+import asyncio
+import logging
+from typing import List, NamedTuple, Optional
+
+from .config import settings
+from .database import execute_prepared
+from .fetcher import FetchPriority
+from .metrics import TITLE_BACKFILL, TITLE_BACKFILL_QUEUED
+from .title_cache import title_cache
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillJob(NamedTuple):
+    link_id: str
+    url: str
+    # Title the link was inserted with; only this title is replaced
+    placeholder: str
+
+
+class TitleBackfill:
+    """Bounded in-process queue and worker pool for link title backfill"""
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_started(self) -> asyncio.Queue:
+        """Start the workers on the running loop the first time a job arrives"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._queue is None
+            or not self._tasks
+            or self._tasks[0].get_loop() is not loop
+        ):
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._tasks = [
+                loop.create_task(self._worker(), name=f"title-backfill-{i}")
+                for i in range(self.workers)
+            ]
+        return self._queue
+
+    def enqueue(self, link_id: str, url: str, placeholder: str) -> bool:
+        """
+        Queue a link for title backfill without waiting
+
+        Returns:
+            bool: False when the queue is full and the link keeps its placeholder
+        """
+        queue = self._ensure_started()
+        try:
+            queue.put_nowait(BackfillJob(link_id, url, placeholder))
+        except asyncio.QueueFull:
+            TITLE_BACKFILL.inc("dropped")
+            return False
+        TITLE_BACKFILL_QUEUED.inc()
+        return True
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            TITLE_BACKFILL_QUEUED.dec()
+            try:
+                await self._backfill(job)
+            except Exception:
+                TITLE_BACKFILL.inc("failed")
+                logger.exception("Title backfill failed for link %s", job.link_id)
+            finally:
+                queue.task_done()
+
+    async def _backfill(self, job: BackfillJob) -> None:
+        title = await title_cache.get_title(job.url, priority=FetchPriority.BACKGROUND)
+        if title == job.placeholder:
+            TITLE_BACKFILL.inc("unchanged")
+            return
+        status = await execute_prepared(
+            "links.backfill_title", title, job.link_id, job.placeholder
+        )
+        # "UPDATE 0" when the link was renamed or deleted in the meantime
+        TITLE_BACKFILL.inc("updated" if status != "UPDATE 0" else "skipped")
+
+    async def join(self) -> None:
+        """Wait until every queued link has been processed"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        """Cancel the workers; links still queued keep their placeholder"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._queue is not None:
+            TITLE_BACKFILL_QUEUED.dec(amount=self._queue.qsize())
+        self._tasks = []
+        self._queue = None
+
+
+# Global instance
+title_backfill = TitleBackfill(
+    workers=settings.title_backfill_workers,
+    queue_size=settings.title_backfill_queue_size,
+)
@@ -0,0 +1,148 @@
+"""
+Page title cache shared across the fleet.
+
+``title_cache.get_title`` looks a URL up by its canonical hash, in order:
+this process's LRU, the ``url_metadata_cache`` table shared by every
+instance, and only then the page itself. Whatever the fetch finds is written
+back to both, so a popular URL is fetched about once per TITLE_CACHE_TTL no
+matter how many users add it or which instance they hit.
+
+Pages without a usable title are cached too (as a NULL title), and fetches
+that fail are cached the same way for the shorter TITLE_CACHE_NEGATIVE_TTL.
+The table is only an optimisation: when it cannot be read or written the
+title is fetched as before.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .config import settings
+from .database import execute_prepared, fetch_prepared_one
+from .fetcher import FetchBusy, FetchPriority
+from .metrics import CACHE_REQUESTS
+from .urlnorm import canonicalize_url, url_hash
+from .utils import fetch_page_title, generate_fallback_title
+
+logger = logging.getLogger(__name__)
+
+
+class TitleCache:
+    """Titles by canonical URL: process LRU, then Postgres, then the page"""
+
+    def __init__(self):
+        # url_hash -> (expires_at, title or None), least recently used first
+        self._cache: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        # One lookup per URL at a time; concurrent adds wait for its answer
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def _local_get(self, key: str) -> Tuple[bool, Optional[str]]:
+        entry = self._cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            CACHE_REQUESTS.inc("title", "miss")
+            return False, None
+        self._cache.move_to_end(key)
+        CACHE_REQUESTS.inc("title", "hit")
+        return True, entry[1]
+
+    def _local_set(self, key: str, title: Optional[str], ttl: float) -> None:
+        self._cache[key] = (time.monotonic() + ttl, title)
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.title_cache_size:
+            self._cache.popitem(last=False)
+
+    async def _shared_get(self, key: str) -> Tuple[bool, Optional[str], float]:
+        """Read the shared table; returns (found, title, seconds left)"""
+        try:
+            row = await fetch_prepared_one("url_metadata.get", key)
+        except Exception as e:
+            logger.warning("Title cache read failed: %s", e)
+            return False, None, 0.0
+        if row is None:
+            CACHE_REQUESTS.inc("title_shared", "miss")
+            return False, None, 0.0
+        CACHE_REQUESTS.inc("title_shared", "hit")
+        return True, row["title"], max(float(row["ttl"]), 0.0)
+
+    async def _shared_set(
+        self, key: str, url: str, title: Optional[str], ttl: float
+    ) -> None:
+        try:
+            await execute_prepared("url_metadata.upsert", key, url, title, float(ttl))
+        except Exception as e:
+            logger.warning("Title cache write failed: %s", e)
+
+    async def _lookup(
+        self, key: str, url: str, priority: FetchPriority
+    ) -> Optional[str]:
+        found, title, ttl = await self._shared_get(key)
+        if found:
+            self._local_set(key, title, min(ttl, settings.title_cache_ttl))
+            return title
+
+        try:
+            title = await fetch_page_title(url, priority=priority)
+            ttl = settings.title_cache_ttl
+        except FetchBusy:
+            # Our own queue is full; the page itself may be fine
+            return None
+        except Exception as e:
+            logger.debug("Title fetch failed for %s: %s", url, e)
+            title = None
+            ttl = settings.title_cache_negative_ttl
+
+        self._local_set(key, title, ttl)
+        await self._shared_set(key, url, title, ttl)
+        return title
+
+    async def get_title(
+        self, url: str, priority: FetchPriority = FetchPriority.INTERACTIVE
+    ) -> str:
+        """
+        Return the page title of a URL, or a title built from the URL
+
+        Args:
+            url: Page to title
+            priority: Fetch priority used when the page has to be fetched
+
+        Returns:
+            str: The cached or fetched page title, or a fallback title
+        """
+        canonical = canonicalize_url(url)
+        if not canonical:
+            return generate_fallback_title(url)
+        key = url_hash(canonical)
+
+        found, title = self._local_get(key)
+        if not found:
+            pending = self._pending.get(key)
+            if pending is None or pending.get_loop() is not asyncio.get_running_loop():
+                pending = asyncio.ensure_future(self._lookup(key, url, priority))
+                self._pending[key] = pending
+                pending.add_done_callback(lambda _: self._pending.pop(key, None))
+            try:
+                title = await asyncio.shield(pending)
+            except Exception as e:
+                logger.debug("Title lookup failed for %s: %s", url, e)
+                title = None
+        return title or generate_fallback_title(url)
+
+    def peek(self, url: str) -> Optional[str]:
+        """Return a title this process already has, without I/O or metrics"""
+        canonical = canonicalize_url(url)
+        if not canonical:
+            return None
+        entry = self._cache.get(url_hash(canonical))
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def clear(self) -> None:
+        """Drop this process's entries; the shared table is left alone"""
+        self._cache.clear()
+
+
+# Global instance
+title_cache = TitleCache()
@@ -1,35 +1,132 @@
+import codecs
+import html
 import re
-from typing import Optional
+from typing import Dict, Optional
 from urllib.parse import urlparse
 
-import httpx
 from fastapi import Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from app.core.config import settings
+from app.core.fetcher import FetchPriority, fetcher
 
+# Content types worth reading for a <title>
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+# Reading can stop once the title or the whole head has been seen
+_TITLE_END_RE = re.compile(rb"</title\s*>|</head\s*>", re.IGNORECASE)
+_META_CHARSET_RE = re.compile(
+    rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE
+)
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title", re.IGNORECASE | re.DOTALL)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+def _is_html(content_type: Optional[str]) -> bool:
+    """Missing types are sniffed from the bytes; anything else must be HTML"""
+    if not content_type:
+        return True
+    return content_type.split(";")[0].strip().lower() in _HTML_TYPES
 
-async def extract_title_from_url(url: str) -> str:
-    """Extract title from URL by fetching the page and parsing the <title> tag"""
+
+def _detect_charset(data: bytes, content_type: Optional[str]) -> Optional[str]:
+    """Charset from a BOM, the Content-Type header or a <meta> tag, if any"""
+    for bom, charset in _BOMS:
+        if data.startswith(bom):
+            return charset
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip(" \"'"):
+            candidate = value.strip(" \"'")
+            break
+    else:
+        match = _META_CHARSET_RE.search(data)
+        candidate = match.group(1).decode("ascii") if match else ""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10)
-            response.raise_for_status()
-
-            # Find title tag in HTML
-            title_match = re.search(
-                r"<title[^>]*>([^<]+)</title>", response.text, re.IGNORECASE
-            )
-            if title_match:
-                title = title_match.group(1).strip()
-                # Clean up common title suffixes
-                title = re.sub(r"\s*[\|\-]\s*.*$", "", title)
-                return title[:100]  # Limit to 100 characters
-    except Exception:
-        pass
+        return codecs.lookup(candidate).name if candidate else None
+    except LookupError:
+        return None
+
 
-    return generate_fallback_title(url)
+def sniff_title(data: bytes, content_type: Optional[str] = None) -> Optional[str]:
+    """Find the <title> in the start of a page; None when there is none"""
+    charset = _detect_charset(data, content_type)
+    if b"\x00" in data[:1024] and not (charset or "").startswith("utf-16"):
+        return None  # Binary content served as (or without) a text type
+    if charset:
+        # The read may stop inside a multi-byte character; only that is lost
+        text = data.decode(charset, "replace")
+    else:
+        try:
+            # Incremental, so a character cut off at the end is not an error
+            text = codecs.getincrementaldecoder("utf-8")().decode(data)
+        except UnicodeDecodeError:
+            # Undeclared legacy pages are usually windows-1252
+            text = data.decode("cp1252", "replace")
+    match = _TITLE_RE.search(text)
+    if not match:
+        return None
+    title = " ".join(html.unescape(match.group(1)).split())
+    return title or None
+
+
+async def read_page_start(response, max_bytes: int) -> bytes:
+    """Read a streamed response until the title or head ends, or max_bytes"""
+    data = b""
+    async for chunk in response.aiter_bytes():
+        data += chunk
+        if len(data) >= max_bytes or _TITLE_END_RE.search(data):
+            break
+    return data[:max_bytes]
+
+
+async def fetch_page_title(
+    url: str, priority: FetchPriority = FetchPriority.INTERACTIVE
+) -> Optional[str]:
+    """
+    Fetch a page and parse its <title> tag, returning None when there is none
+
+    Only the start of the page is downloaded: the body is streamed and reading
+    stops at </title> or </head>, or after TITLE_MAX_BYTES. Responses that
+    are not HTML are not read at all. Fetch errors are raised.
+    """
+    response = await fetcher.get(url, priority=priority, stream=True)
+    try:
+        response.raise_for_status()
+        content_type = response.headers.get("content-type")
+        if not _is_html(content_type):
+            return None
+        data = await read_page_start(response, settings.title_max_bytes)
+    finally:
+        await response.aclose()
+
+    title = sniff_title(data, content_type)
+    if title:
+        # Clean up common title suffixes
+        title = re.sub(r"\s*[\|\-]\s*.*$", "", title)
+        if title:
+            return title[:100]  # Limit to 100 characters
+    return None
+
+
+async def extract_title_from_url(
+    url: str, priority: FetchPriority = FetchPriority.INTERACTIVE
+) -> str:
+    """
+    Extract title from URL by fetching the page and parsing the <title> tag
+
+    Falls back to a title built from the URL when the page has no usable
+    title or cannot be fetched.
+    """
+    try:
+        title = await fetch_page_title(url, priority=priority)
+    except Exception:
+        title = None
+    return title or generate_fallback_title(url)
 
 
 def generate_fallback_title(url: str) -> str:
@@ -69,8 +166,27 @@ def rate_limit_key_from_api_key(request: Request) -> str:
     return f"ip:{get_remote_address(request)}"
 
 
-# Shared limiter instance importable for decorators
+def limiter_storage_options() -> Dict[str, float]:
+    """Short socket timeouts so an unreachable Redis fails over quickly"""
+    if settings.rate_limit_storage_uri.startswith("redis"):
+        timeout = settings.rate_limit_storage_timeout
+        return {"socket_connect_timeout": timeout, "socket_timeout": timeout}
+    return {}
+
+
+# Shared limiter instance importable for decorators. Counters live in
+# RATE_LIMIT_STORAGE_URI (Redis to share them across workers); when that storage
+# is unreachable SlowAPI falls back to per-process RATE_LIMIT_FALLBACK limits
 limiter: Limiter = Limiter(
     key_func=rate_limit_key_from_api_key,
     default_limits=[settings.rate_limit_default] if settings.rate_limit_enabled else [],
+    strategy=settings.rate_limit_strategy,
+    storage_uri=settings.rate_limit_storage_uri,
+    storage_options=limiter_storage_options(),
+    key_prefix=settings.rate_limit_key_prefix,
+    in_memory_fallback=(
+        [settings.rate_limit_fallback] if settings.rate_limit_fallback else []
+    ),
+    # Without a fallback, storage errors let requests through instead of a 500
+    swallow_errors=True,
 )
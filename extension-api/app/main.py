@@ -3,20 +3,26 @@ import logging
 import time
 from collections import defaultdict
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import ORJSONResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from app.api import routes
 from app.core.config import settings
+from app.core.database import health_check
+from app.core.fetcher import fetcher
+from app.core.logging_config import configure_logging, should_log_request
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
+from app.core.title_backfill import title_backfill
 from app.core.utils import limiter
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Legacy in-memory rate limiting removed; SlowAPI is used instead
@@ -26,6 +32,7 @@ app = FastAPI(
     description="FastAPI backend for browser extension",
     version="1.0.0",
     debug=settings.debug,
+    default_response_class=ORJSONResponse,
 )
 
 # Add compression middleware
@@ -49,18 +56,32 @@ if settings.rate_limit_enabled:
     app.add_middleware(SlowAPIMiddleware)
 
 
-# Request logging middleware
+# Request logging middleware: one structured line per request, sampled for
+# successful responses. The query string is left out since it may carry tokens
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    logger.info(f"📥 Incoming request: {request.method} {request.url}")
-
-    response = await call_next(request)
-
-    process_time = time.time() - start_time
-    logger.info(
-        f"📤 Response status: {response.status_code} | Time: {process_time:.3f}s"
-    )
+    start_time = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        logger.exception(
+            "request failed",
+            extra={"method": request.method, "path": request.url.path},
+        )
+        raise
+
+    if should_log_request(response.status_code):
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        logger.log(
+            logging.WARNING if response.status_code >= 500 else logging.INFO,
+            "request",
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "duration_ms": round(duration_ms, 2),
+            },
+        )
     return response
 
 
@@ -79,7 +100,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so request latency includes the time spent in other middleware
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(routes.router, prefix="/api/v1")
+app.add_event_handler("shutdown", title_backfill.stop)
+app.add_event_handler("shutdown", fetcher.aclose)
 
 
 # Add root route for status monitoring
@@ -99,3 +125,10 @@ async def root():
 async def root_health_check():
     """Health check endpoint for status monitoring"""
     return await health_check()
+
+
+@app.get("/metrics", include_in_schema=False)
+@limiter.exempt
+async def metrics(request: Request):
+    """Prometheus metrics endpoint"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
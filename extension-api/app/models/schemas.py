@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from pydantic import BaseModel, HttpUrl
 
@@ -16,6 +16,9 @@ class Collection(BaseModel):
 class CreateLinkRequest(BaseModel):
     title: Optional[str] = None
     url: HttpUrl
+    # Without a title: add the link now and fill the title in later (/sync
+    # picks it up). Defaults to DEFER_LINK_TITLES
+    defer_title: Optional[bool] = None
 
 
 class Link(BaseModel):
@@ -95,6 +98,9 @@ class Favorite(BaseModel):
 
 class FavoritesResponse(BaseModel):
     data: List[Favorite]
+    # Set when more pages are available; pass back as ?cursor=
+    next_cursor: Optional[str] = None
+    has_more: bool = False
 
 
 class CreateFavoriteRequest(BaseModel):
@@ -119,3 +125,48 @@ class UpdateFavoriteResponse(BaseModel):
 class DeleteFavoriteResponse(BaseModel):
     success: bool
     message: str
+
+
+class BatchFavoriteUpdate(BaseModel):
+    id: str
+    title: str
+
+
+class BatchFavoritesRequest(BaseModel):
+    create: List[CreateFavoriteRequest] = []
+    update: List[BatchFavoriteUpdate] = []
+    delete: List[str] = []
+
+
+class BatchFavoriteResult(BaseModel):
+    op: str  # create | update | delete
+    index: int  # position within the op's list in the request
+    # created | updated | deleted | duplicate | not_found | invalid | limit_exceeded
+    status: str
+    id: Optional[str] = None
+    data: Optional[Favorite] = None
+
+
+class BatchFavoritesResponse(BaseModel):
+    success: bool
+    results: List[BatchFavoriteResult]
+    plan: Optional[str] = None
+
+
+class SyncChanges(BaseModel):
+    # Column names for each row in upserts
+    fields: List[str]
+    upserts: List[List[Any]] = []
+    deletes: List[str] = []
+
+
+class SyncResponse(BaseModel):
+    # Pass back as ?since= on the next sync once has_more is false
+    watermark: datetime
+    # True when the client must drop local state and apply this as a snapshot
+    reset: bool = False
+    has_more: bool = False
+    cursor: Optional[str] = None
+    collections: SyncChanges
+    links: SyncChanges
+    favorites: SyncChanges
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Backfill links.url_hash for rows written without one (migration 0011).
+
+Rows are hashed in batches with the same canonicalization the API uses. When a
+collection already holds the same canonical URL more than once, only the oldest
+row gets the hash; the others are left NULL and reported, or deleted with
+--delete-duplicates (the collection's total_links is corrected as well).
+Safe to re-run; rows inserted without a hash later are picked up next time.
+
+Usage: python backfill_url_hashes.py [--batch-size 1000] [--delete-duplicates]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.urlnorm import url_hash
+
+SELECT_BATCH = """
+    SELECT id, url, link_collection_id, created_at
+    FROM links
+    WHERE url_hash IS NULL AND (created_at, id) > ($1::timestamp, $2::uuid)
+    ORDER BY created_at, id
+    LIMIT $3
+"""
+
+SET_HASH = """
+    UPDATE links l
+    SET url_hash = v.url_hash
+    FROM unnest($1::uuid[], $2::text[]) AS v(id, url_hash)
+    WHERE l.id = v.id
+      AND NOT EXISTS (
+          SELECT 1 FROM links o
+          WHERE o.link_collection_id = l.link_collection_id
+            AND o.url_hash = v.url_hash
+      )
+    RETURNING l.id
+"""
+
+DELETE_DUPLICATES = """
+    DELETE FROM links
+    WHERE url_hash IS NULL AND id = ANY($1::uuid[])
+    RETURNING link_collection_id
+"""
+
+RECOUNT_COLLECTIONS = """
+    UPDATE collections c
+    SET total_links = (SELECT COUNT(*) FROM links l WHERE l.link_collection_id = c.id)
+    WHERE c.id = ANY($1::uuid[])
+"""
+
+
+async def backfill(batch_size: int, delete_duplicates: bool) -> None:
+    conn = await asyncpg.connect(settings.database_url)
+    try:
+        after_created, after_id = (
+            datetime(1970, 1, 1),
+            "00000000-0000-0000-0000-000000000000",
+        )
+        hashed = 0
+        duplicates = []
+
+        while True:
+            rows = await conn.fetch(SELECT_BATCH, after_created, after_id, batch_size)
+            if not rows:
+                break
+            after_created, after_id = rows[-1]["created_at"], rows[-1]["id"]
+
+            # Oldest row first wins within a batch; earlier batches win overall
+            seen = set()
+            ids, hashes = [], []
+            for row in rows:
+                key = (row["link_collection_id"], url_hash(row["url"]))
+                if key in seen:
+                    duplicates.append(row["id"])
+                    continue
+                seen.add(key)
+                ids.append(row["id"])
+                hashes.append(key[1])
+
+            async with conn.transaction():
+                updated = await conn.fetch(SET_HASH, ids, hashes)
+            updated_ids = {row["id"] for row in updated}
+            duplicates.extend(row_id for row_id in ids if row_id not in updated_ids)
+            hashed += len(updated_ids)
+            print(f"Hashed {hashed} links so far")
+
+        print(f"Done: {hashed} links hashed, {len(duplicates)} duplicates")
+
+        if delete_duplicates and duplicates:
+            async with conn.transaction():
+                deleted = await conn.fetch(DELETE_DUPLICATES, duplicates)
+                collection_ids = list({row["link_collection_id"] for row in deleted})
+                await conn.execute(RECOUNT_COLLECTIONS, collection_ids)
+            print(
+                f"Deleted {len(deleted)} duplicate links across "
+                f"{len(collection_ids)} collections"
+            )
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--delete-duplicates", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.delete_duplicates))
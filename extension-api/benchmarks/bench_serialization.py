@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Compare response encoding paths for list-heavy endpoints.
+
+"models" is what GET /favorites and the bulk links route used to do: build a
+Pydantic model per row, validate the response model, run jsonable_encoder and
+the stdlib encoder. "orjson" is the current path: map row columns to response
+keys and encode with orjson through ``json_response``. No database is needed;
+rows are synthesized.
+
+Usage: python benchmarks/bench_serialization.py [--rows 1000] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.core.serialization import (  # noqa: E402
+    FAVORITE_FIELDS,
+    LINK_FIELDS,
+    json_response,
+    rows_to_dicts,
+)
+from app.models.schemas import (  # noqa: E402
+    BulkCreateLinkResponse,
+    Favorite,
+    FavoritesResponse,
+    Link,
+)
+
+
+def make_favorite_rows(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "title": f"Favorite {i}",
+            "url": f"https://example.com/articles/{i}?ref=bench",
+            "userId": "user_2abcdefghijklmnop",
+            "createdAt": now - timedelta(minutes=i),
+            "updatedAt": now - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def make_link_rows(count: int) -> list:
+    now = datetime.utcnow()
+    collection_id = uuid.uuid4()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "title": f"Link {i}",
+            "url": f"https://example.com/posts/{i}",
+            "link_collection_id": collection_id,
+            "user_id": "user_2abcdefghijklmnop",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def favorites_models(rows: list) -> bytes:
+    response = FavoritesResponse(
+        data=[
+            Favorite(
+                id=str(row["id"]),
+                title=row["title"],
+                url=row["url"],
+                userId=row["userId"],
+                createdAt=row["createdAt"],
+                updatedAt=row["updatedAt"],
+            )
+            for row in rows
+        ]
+    )
+    return json.dumps(jsonable_encoder(response)).encode("utf-8")
+
+
+def favorites_orjson(rows: list) -> bytes:
+    return json_response(
+        {
+            "data": rows_to_dicts(rows, FAVORITE_FIELDS),
+            "next_cursor": None,
+            "has_more": False,
+        }
+    ).body
+
+
+def links_models(rows: list) -> bytes:
+    links = [
+        Link(
+            id=str(row["id"]),
+            title=row["title"],
+            url=row["url"],
+            linkCollectionId=str(row["link_collection_id"]),
+            userId=row["user_id"],
+            createdAt=row["created_at"],
+            updatedAt=row["updated_at"],
+        )
+        for row in rows
+    ]
+    response = BulkCreateLinkResponse(
+        success=True, data=links, total_added=len(links), total_requested=len(links)
+    )
+    # FastAPI re-validates the returned model against response_model
+    response = BulkCreateLinkResponse.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(response)).encode("utf-8")
+
+
+def links_orjson(rows: list) -> bytes:
+    return json_response(
+        {
+            "success": True,
+            "data": rows_to_dicts(rows, LINK_FIELDS),
+            "total_added": len(rows),
+            "total_requested": len(rows),
+        }
+    ).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = [
+        (
+            "favorites",
+            make_favorite_rows(args.rows),
+            favorites_models,
+            favorites_orjson,
+        ),
+        ("bulk links", make_link_rows(args.rows), links_models, links_orjson),
+    ]
+    print(f"{args.rows} rows, best of 5 x {args.repeat} runs")
+    for name, rows, old, new in cases:
+        # Both paths must produce the same document
+        assert json.loads(old(rows)) == json.loads(new(rows)), name
+        old_time = min(timeit.repeat(lambda: old(rows), number=args.repeat, repeat=5))
+        new_time = min(timeit.repeat(lambda: new(rows), number=args.repeat, repeat=5))
+        print(
+            f"{name:>10}: models {old_time / args.repeat * 1000:7.2f} ms  "
+            f"orjson {new_time / args.repeat * 1000:7.2f} ms  "
+            f"({old_time / new_time:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
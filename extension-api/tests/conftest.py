@@ -0,0 +1,116 @@
+"""
+Shared fakes for extension-api tests.
+
+Routes reach Postgres only through the registry helpers (``fetch_prepared_one``,
+``fetch_prepared_all``, ``execute_prepared``) and a ``DatabaseSession``. The
+``fake_db`` fixture swaps the helpers for ``FakeDatabase``, which answers each
+statement by name, and ``client`` serves the app with a ``FakeSession``.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.core import subscription, title_backfill, title_cache
+from app.core.database import get_db_session, get_read_db_session
+from app.core.utils import limiter
+from app.main import app
+
+USER_ID = "user_1"
+AUTH = {"Authorization": "Bearer test-key"}
+
+
+class FakeDatabase:
+    """
+    Answers registry statements by name and records every call
+
+    ``results[name]`` is either the value to return or a callable taking the
+    statement arguments. Unknown statements return None, [] or "UPDATE 1".
+    """
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {"auth.api_key": {"user_id": USER_ID}}
+        self.calls: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def _answer(self, name: str, args: Tuple[Any, ...], default: Any) -> Any:
+        self.calls.append((name, args))
+        result = self.results.get(name, default)
+        if isinstance(result, Exception):
+            raise result
+        return result(*args) if callable(result) else result
+
+    def args(self, name: str) -> List[Tuple[Any, ...]]:
+        """Arguments of every call to one statement, in order"""
+        return [args for called, args in self.calls if called == name]
+
+    async def fetch_one(self, name: str, *args: Any, db=None):
+        return self._answer(name, args, None)
+
+    async def fetch_all(
+        self, name: str, *args: Any, cache_key=None, cache_version=None, db=None
+    ):
+        return self._answer(name, args, [])
+
+    async def execute(self, name: str, *args: Any, db=None):
+        return self._answer(name, args, "UPDATE 1")
+
+
+class FakeSession:
+    """DatabaseSession stand-in; counts releases and transactions"""
+
+    def __init__(self):
+        self.releases = 0
+        self.transactions = 0
+
+    async def connection(self):
+        raise AssertionError("Routes under test should not need a raw connection")
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.transactions += 1
+        yield self
+
+    async def release(self):
+        self.releases += 1
+
+
+def patch_statements(monkeypatch, fake: FakeDatabase, *modules: Any) -> None:
+    """Point the statement helpers imported by ``modules`` at ``fake``"""
+    helpers: Dict[str, Callable] = {
+        "fetch_prepared_one": fake.fetch_one,
+        "fetch_prepared_all": fake.fetch_all,
+        "execute_prepared": fake.execute,
+    }
+    for module in modules:
+        for name, helper in helpers.items():
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, helper)
+
+
+@pytest.fixture
+def fake_db(monkeypatch) -> FakeDatabase:
+    fake = FakeDatabase()
+    patch_statements(
+        monkeypatch, fake, routes, subscription, title_cache, title_backfill
+    )
+    return fake
+
+
+@pytest.fixture
+def session() -> FakeSession:
+    return FakeSession()
+
+
+@pytest.fixture
+def client(fake_db, session, monkeypatch):
+    # Route decorators keep their own per-minute counters otherwise
+    monkeypatch.setattr(limiter, "enabled", False)
+    app.dependency_overrides[get_db_session] = lambda: session
+    app.dependency_overrides[get_read_db_session] = lambda: session
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
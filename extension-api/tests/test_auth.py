@@ -0,0 +1,45 @@
+"""
+Tests for API key authentication on the request session
+"""
+
+from .conftest import AUTH, USER_ID
+
+
+def test_missing_and_malformed_headers_are_rejected(client, fake_db):
+    """Test no header or a non-Bearer header is a 401 without a lookup"""
+    assert client.get("/api/v1/top-collections").status_code == 401
+    response = client.get(
+        "/api/v1/top-collections", headers={"Authorization": "Token abc"}
+    )
+    assert response.status_code == 401
+    assert fake_db.args("auth.api_key") == []
+
+
+def test_unknown_key_is_rejected(client, fake_db):
+    """Test a key with no matching hash is a 401"""
+    fake_db.results["auth.api_key"] = None
+
+    response = client.get("/api/v1/top-collections", headers=AUTH)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid API key"
+
+
+def test_key_is_looked_up_by_peppered_hash(client, fake_db):
+    """Test only the HMAC of the key reaches the database"""
+    fake_db.results["users.top_collections"] = {"top_collections": []}
+
+    response = client.get("/api/v1/top-collections", headers=AUTH)
+    assert response.status_code == 200
+    assert response.json() == {"data": []}
+    [(key_hash,)] = fake_db.args("auth.api_key")
+    assert len(key_hash) == 64 and "test-key" not in key_hash
+    assert fake_db.args("users.top_collections") == [(USER_ID,)]
+
+
+def test_auth_database_error_is_a_500(client, fake_db):
+    """Test a failing lookup reports the auth service as unavailable"""
+    fake_db.results["auth.api_key"] = ConnectionError("pool closed")
+
+    response = client.get("/api/v1/top-collections", headers=AUTH)
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Authentication service unavailable"
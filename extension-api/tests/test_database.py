@@ -0,0 +1,228 @@
+"""
+Tests for the request-scoped database session, statement helpers and pool
+metrics
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.core import database
+from app.core.database import (
+    DatabaseSession,
+    PoolMetrics,
+    _pool_stats,
+    fetch_prepared_all,
+    fetch_prepared_one,
+)
+
+
+class FakeStatement:
+    def __init__(self, conn, query):
+        self.conn = conn
+        self.query = query
+
+    async def fetchrow(self, *args):
+        self.conn.executed.append(("prepared", self.query, args))
+        return {"args": args}
+
+    async def fetch(self, *args):
+        self.conn.executed.append(("prepared", self.query, args))
+        return [{"args": args}]
+
+
+class FakeConnection:
+    def __init__(self):
+        self.prepared = {}
+        self.executed = []
+        self.in_transaction = False
+
+    async def prepare(self, query):
+        return FakeStatement(self, query)
+
+    async def fetchrow(self, query, *args):
+        self.executed.append(("unprepared", query, args))
+        return {"args": args}
+
+    async def fetch(self, query, *args):
+        self.executed.append(("unprepared", query, args))
+        return [{"args": args}]
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.in_transaction = True
+        try:
+            yield
+        finally:
+            self.in_transaction = False
+
+
+class FakePool:
+    def __init__(self, size: int = 0, idle: int = 0):
+        self.acquired = 0
+        self.released = []
+        self.size = size
+        self.idle = idle
+
+    def get_size(self):
+        return self.size
+
+    def get_idle_size(self):
+        return self.idle
+
+    def get_min_size(self):
+        return 5
+
+    def get_max_size(self):
+        return 20
+
+    async def acquire(self):
+        self.acquired += 1
+        return FakeConnection()
+
+    async def release(self, conn):
+        self.released.append(conn)
+
+
+def _use_pool(monkeypatch) -> FakePool:
+    pool = FakePool()
+
+    async def get_pool():
+        return pool
+
+    monkeypatch.setattr(database, "get_pool", get_pool)
+    return pool
+
+
+def test_session_acquires_lazily_and_reuses_its_connection(monkeypatch):
+    """Test a session acquires once, on first use, and shares the connection"""
+    pool = _use_pool(monkeypatch)
+
+    async def run():
+        session = DatabaseSession()
+        assert pool.acquired == 0
+        first = await session.connection()
+        assert await session.connection() is first
+        await fetch_prepared_one("auth.api_key", "hash", db=session)
+        await fetch_prepared_one("users.top_collections", "user_1", db=session)
+        await session.release()
+        return first
+
+    conn = asyncio.run(run())
+    assert pool.acquired == 1
+    assert pool.released == [conn]
+    assert len(conn.executed) == 2
+
+
+def test_release_then_query_reacquires(monkeypatch):
+    """Test a route can release early and the next query acquires again"""
+    pool = _use_pool(monkeypatch)
+
+    async def run():
+        session = DatabaseSession()
+        await session.connection()
+        await session.release()
+        await session.release()  # A second release is a no-op
+        await session.connection()
+        await session.release()
+
+    asyncio.run(run())
+    assert pool.acquired == 2
+    assert len(pool.released) == 2
+
+
+def test_transaction_runs_on_the_session_connection(monkeypatch):
+    """Test statements inside db.transaction() use the same connection"""
+    _use_pool(monkeypatch)
+
+    async def run():
+        session = DatabaseSession()
+        async with session.transaction():
+            conn = await session.connection()
+            assert conn.in_transaction
+        return conn
+
+    assert not asyncio.run(run()).in_transaction
+
+
+def test_helpers_without_a_session_release_their_connection(monkeypatch):
+    """Test a one-off query acquires and releases its own connection"""
+    pool = _use_pool(monkeypatch)
+
+    row = asyncio.run(fetch_prepared_one("auth.api_key", "hash"))
+    assert row == {"args": ("hash",)}
+    assert pool.acquired == 1
+    assert len(pool.released) == 1
+
+
+def test_cached_rows_are_kept_per_key_and_checked_by_version(monkeypatch):
+    """Test a new version replaces the cached rows instead of adding a key"""
+    pool = _use_pool(monkeypatch)
+    monkeypatch.setattr(database, "_query_cache", {})
+
+    async def run():
+        for version in ("v1", "v1", "v2", "v2", "v1"):
+            await fetch_prepared_all(
+                "favorites.list",
+                "user_1",
+                cache_key="favorites_user_1",
+                cache_version=version,
+            )
+
+    asyncio.run(run())
+    # Only the two version changes miss the cache
+    assert pool.acquired == 3
+    assert list(database._query_cache) == ["favorites_user_1"]
+    assert database._query_cache["favorites_user_1"][0] == "v1"
+
+
+def test_pool_stats_report_connections_in_use():
+    """Test in-use connections are the pool size minus idle ones"""
+    assert _pool_stats(FakePool(size=8, idle=3)) == {
+        "min_size": 5,
+        "max_size": 20,
+        "size": 8,
+        "in_use": 5,
+        "idle": 3,
+    }
+
+
+def test_pool_metrics_track_waits_and_slow_queries(monkeypatch):
+    """Test acquire waits are averaged and queries over the threshold counted"""
+    monkeypatch.setattr(database.settings, "db_slow_query_ms", 100.0)
+    metrics = PoolMetrics(window_seconds=60)
+    metrics.record_acquire(0.002)
+    metrics.record_acquire(0.004)
+    metrics.record_query("auth.api_key", 0.01)
+    metrics.record_query("favorites.list", 0.5)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["acquires"] == 2
+    assert snapshot["acquire_wait_avg_ms"] == 3.0
+    assert snapshot["acquire_wait_max_ms"] == 4.0
+    assert snapshot["queries"] == 2
+    assert snapshot["slow_queries"] == 1
+    assert snapshot["queries_per_second"] > 0
+
+
+def test_concurrent_first_requests_create_one_pool(monkeypatch):
+    """Test the pool lock stops concurrent first requests building two pools"""
+    created = []
+
+    async def create_pool(database_url, label):
+        created.append(label)
+        await asyncio.sleep(0.01)
+        return FakePool()
+
+    monkeypatch.setattr(database, "_create_pool", create_pool)
+    monkeypatch.setattr(database, "_pool", None)
+    monkeypatch.setattr(database.settings, "database_replica_url", None)
+
+    async def run():
+        monkeypatch.setattr(database, "_pool_lock", asyncio.Lock())
+        return await asyncio.gather(
+            database.get_pool(), database.get_pool(), database.get_read_pool()
+        )
+
+    pools = asyncio.run(run())
+    assert created == ["primary"]
+    assert pools[0] is pools[1] is pools[2]
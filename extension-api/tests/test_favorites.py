@@ -0,0 +1,158 @@
+"""
+Tests for GET /favorites: keyset pagination, delta reads and ETags
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes import (
+    _decode_cursor,
+    _encode_cursor,
+    _etag_matches,
+    _pack_cursor,
+    _unpack_cursor,
+)
+
+from .conftest import AUTH, USER_ID
+
+BASE = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def _favorite(i: int) -> dict:
+    return {
+        "id": uuid.UUID(int=i + 1),
+        "title": f"Favorite {i}",
+        "url": f"https://example.com/{i}",
+        "userId": USER_ID,
+        "createdAt": BASE - timedelta(minutes=i),
+        "updatedAt": BASE + timedelta(minutes=i),
+    }
+
+
+def test_cursor_round_trip():
+    """Test cursors are unpadded URL-safe text that decode to what was packed"""
+    payload = {"w": "2025-01-01T00:00:00", "p": {"links": ["x", "y"]}}
+    cursor = _pack_cursor(payload)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert _unpack_cursor(cursor) == payload
+
+    row_id = uuid.uuid4()
+    mode, timestamp, decoded_id = _decode_cursor(
+        _encode_cursor("created", BASE, row_id)
+    )
+    assert (mode, timestamp, decoded_id) == ("created", BASE, str(row_id))
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-base64!",
+        _pack_cursor(["sideways", BASE.isoformat(), str(uuid.uuid4())]),
+        _pack_cursor(["created", "yesterday", str(uuid.uuid4())]),
+        _pack_cursor(["created", BASE.isoformat(), "not-a-uuid"]),
+        _pack_cursor({"mode": "created"}),
+    ],
+)
+def test_invalid_cursors_are_a_400(cursor):
+    """Test tampered or foreign cursors are rejected, not passed to SQL"""
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_etag_matching():
+    """Test If-None-Match lists and wildcards are honoured"""
+    etag = 'W/"abc"'
+    assert _etag_matches('W/"abc"', etag)
+    assert _etag_matches('"x", W/"abc"', etag)
+    assert _etag_matches("*", etag)
+    assert not _etag_matches('W/"other"', etag)
+    assert not _etag_matches(None, etag)
+
+
+@pytest.fixture
+def favorites(fake_db):
+    fake_db.results["favorites.version"] = {"count": 5, "last_updated": BASE}
+    rows = [_favorite(i) for i in range(5)]
+    fake_db.results["favorites.list"] = rows
+    fake_db.results["favorites.page"] = lambda user_id, limit: rows[:limit]
+    fake_db.results["favorites.page_after"] = lambda user_id, ts, row_id, limit: [
+        row for row in rows if (row["createdAt"], str(row["id"])) < (ts, row_id)
+    ][:limit]
+    return rows
+
+
+def test_full_listing_carries_an_etag(client, favorites):
+    """Test the legacy listing returns every favorite and no cursor"""
+    response = client.get("/api/v1/favorites", headers=AUTH)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["data"]) == 5
+    assert body["next_cursor"] is None and body["has_more"] is False
+    assert response.headers["ETag"].startswith('W/"')
+
+
+def test_unchanged_favorites_are_a_304(client, fake_db, favorites):
+    """Test a matching If-None-Match skips the rows entirely"""
+    etag = client.get("/api/v1/favorites", headers=AUTH).headers["ETag"]
+    fake_db.calls.clear()
+
+    response = client.get("/api/v1/favorites", headers={**AUTH, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert fake_db.args("favorites.list") == []
+
+    # Any change to the fingerprint produces a new tag
+    fake_db.results["favorites.version"] = {"count": 4, "last_updated": BASE}
+    response = client.get("/api/v1/favorites", headers={**AUTH, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_keyset_pages_walk_every_favorite_once(client, fake_db, favorites):
+    """Test following next_cursor returns each favorite once, newest first"""
+    seen = []
+    params = {"limit": 2}
+    while True:
+        body = client.get("/api/v1/favorites", params=params, headers=AUTH).json()
+        seen += [item["id"] for item in body["data"]]
+        if not body["has_more"]:
+            assert body["next_cursor"] is None
+            break
+        params = {"limit": 2, "cursor": body["next_cursor"]}
+
+    assert seen == [str(row["id"]) for row in favorites]
+    # One extra row is read to learn whether another page exists
+    assert fake_db.args("favorites.page") == [(USER_ID, 3)]
+    assert len(fake_db.args("favorites.page_after")) == 2
+
+
+def test_since_reads_changes_in_utc(client, fake_db, favorites):
+    """Test an aware ?since= is converted to naive UTC for the changed scan"""
+    fake_db.results["favorites.changed_since"] = favorites[:1]
+
+    response = client.get(
+        "/api/v1/favorites",
+        params={"since": "2025-01-01T14:00:00+02:00"},
+        headers=AUTH,
+    )
+    assert response.status_code == 200
+    [(user_id, after_ts, after_id, limit)] = fake_db.args("favorites.changed_since")
+    assert after_ts == datetime(2025, 1, 1, 12, 0, 0)
+    assert after_id == str(uuid.UUID(int=0))
+
+
+def test_invalid_cursor_and_limit_are_rejected(client, favorites):
+    """Test a bad cursor is a 400 and an out-of-range limit a 422"""
+    response = client.get(
+        "/api/v1/favorites", params={"cursor": "garbage"}, headers=AUTH
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+    response = client.get("/api/v1/favorites", params={"limit": 0}, headers=AUTH)
+    assert response.status_code == 422
@@ -0,0 +1,125 @@
+"""
+Tests for POST /favorites/batch
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.core.subscription import subscription_service
+
+from .conftest import AUTH, USER_ID
+
+NOW = datetime(2025, 1, 1)
+
+
+def _row(favorite_id, url: str, title: str = "Title") -> dict:
+    return {
+        "id": favorite_id,
+        "title": title,
+        "url": url,
+        "user_id": USER_ID,
+        "created_at": NOW,
+        "updated_at": NOW,
+    }
+
+
+@pytest.fixture
+def plan(monkeypatch):
+    limits = {"favorites": 3}
+
+    async def get_user_subscription(user_id, db=None):
+        return {"limits": limits, "plan_slug": "free"}
+
+    monkeypatch.setattr(
+        subscription_service, "get_user_subscription", get_user_subscription
+    )
+    return limits
+
+
+def test_oversized_batch_is_rejected_up_front(client, fake_db, plan):
+    """Test a batch over FAVORITES_BATCH_MAX_ITEMS is a 422 with no queries"""
+    batch = {"delete": [str(uuid.uuid4())] * (settings.favorites_batch_max_items + 1)}
+
+    response = client.post("/api/v1/favorites/batch", json=batch, headers=AUTH)
+    assert response.status_code == 422
+    assert fake_db.calls == []
+
+
+def test_batch_reports_one_result_per_item(client, fake_db, session, plan):
+    """Test every op gets its status, in delete, update, create order"""
+    gone, kept, renamed = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    fake_db.results["favorites.delete_many"] = [{"id": gone}]
+    fake_db.results["favorites.update_many"] = [
+        _row(renamed, "https://example.com/r", "New")
+    ]
+    fake_db.results["favorites.existing_urls"] = [{"url": "https://example.com/old"}]
+    # One favorite is left after the delete, so two of the three creates fit
+    fake_db.results["favorites.count"] = {"count": 1}
+    fake_db.results["favorites.insert_many"] = lambda user_id, ids, titles, urls, now: [
+        _row(favorite_id, url) for favorite_id, url in zip(ids, urls)
+    ]
+
+    batch = {
+        "delete": [str(gone), str(kept), "nope"],
+        "update": [{"id": str(renamed), "title": "New"}, {"id": "x", "title": "y"}],
+        "create": [
+            {"url": "https://example.com/old", "title": "Dup"},
+            {"url": "https://example.com/a", "title": "A"},
+            {"url": "https://example.com/a", "title": "A again"},
+            {"url": "https://example.com/b", "title": "B"},
+            {"url": "https://example.com/c", "title": "C"},
+        ],
+    }
+    response = client.post("/api/v1/favorites/batch", json=batch, headers=AUTH)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["plan"] == "free"
+
+    statuses = [(r["op"], r["index"], r["status"]) for r in body["results"]]
+    assert statuses == [
+        ("delete", 0, "deleted"),
+        ("delete", 1, "not_found"),
+        ("delete", 2, "invalid"),
+        ("update", 0, "updated"),
+        ("update", 1, "invalid"),
+        ("create", 0, "duplicate"),
+        ("create", 1, "created"),
+        ("create", 2, "duplicate"),
+        ("create", 3, "created"),
+        ("create", 4, "limit_exceeded"),
+    ]
+    assert session.transactions == 1
+    # Invalid ids never reach the database
+    [(_, delete_ids)] = fake_db.args("favorites.delete_many")
+    assert delete_ids == [str(gone), str(kept)]
+    [(_, _, _, urls, _)] = fake_db.args("favorites.insert_many")
+    assert urls == ["https://example.com/a", "https://example.com/b"]
+
+
+def test_create_lost_to_a_concurrent_insert_is_a_duplicate(client, fake_db, plan):
+    """Test a create that ON CONFLICT skipped is reported, not as created"""
+    fake_db.results["favorites.count"] = {"count": 0}
+    fake_db.results["favorites.insert_many"] = []
+
+    response = client.post(
+        "/api/v1/favorites/batch",
+        json={"create": [{"url": "https://example.com/a", "title": "A"}]},
+        headers=AUTH,
+    )
+    [result] = response.json()["results"]
+    assert (result["status"], result["id"]) == ("duplicate", None)
+
+
+def test_batch_database_error_is_a_500(client, fake_db, plan):
+    """Test a failing statement surfaces as a 500"""
+    fake_db.results["favorites.delete_many"] = ConnectionError("gone")
+
+    response = client.post(
+        "/api/v1/favorites/batch",
+        json={"delete": [str(uuid.uuid4())]},
+        headers=AUTH,
+    )
+    assert response.status_code == 500
@@ -0,0 +1,175 @@
+"""
+Tests for the polite outbound fetcher
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.fetcher import (
+    FetchBusy,
+    FetchPriority,
+    HostScheduler,
+    PoliteFetcher,
+    RobotsDisallowed,
+    parse_retry_after,
+)
+
+
+def _scheduler(**overrides) -> HostScheduler:
+    limits = dict(
+        rate=1000, burst=10, host_concurrency=4, max_concurrency=8, max_queue=16
+    )
+    limits.update(overrides)
+    return HostScheduler(**limits)
+
+
+class FakeServer:
+    """Answers requests from a dict of URL -> list of responses"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.requested.append(url)
+        queue = self.responses.get(url)
+        if not queue:
+            return httpx.Response(404)
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+
+def _fetcher(server: FakeServer, **limits) -> PoliteFetcher:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    return PoliteFetcher(client=client, scheduler=_scheduler(**limits))
+
+
+def test_parse_retry_after():
+    """Test both delta-seconds and HTTP-date forms are understood"""
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+
+
+def test_robots_txt_is_honoured_and_cached():
+    """Test disallowed paths are refused and robots.txt is fetched once"""
+    server = FakeServer(
+        {
+            "https://example.com/robots.txt": [
+                httpx.Response(200, text="User-agent: *\nDisallow: /private\n")
+            ],
+            "https://example.com/public": [httpx.Response(200, text="ok")],
+        }
+    )
+
+    async def run():
+        fetcher = _fetcher(server)
+        assert (await fetcher.get("https://example.com/public")).status_code == 200
+        with pytest.raises(RobotsDisallowed):
+            await fetcher.get("https://example.com/private/page")
+
+    asyncio.run(run())
+    assert server.requested.count("https://example.com/robots.txt") == 1
+
+
+def test_robots_txt_server_error_disallows():
+    """Test a 5xx robots.txt blocks the origin, while a 404 allows everything"""
+    server = FakeServer({"https://down.com/robots.txt": [httpx.Response(503)]})
+
+    async def run():
+        fetcher = _fetcher(server)
+        assert not await fetcher.allowed("https://down.com/page")
+        assert await fetcher.allowed("https://open.com/page")
+
+    asyncio.run(run())
+
+
+def test_retry_after_backs_off_and_retries():
+    """Test a 429 with a short Retry-After is retried after the wait"""
+    server = FakeServer(
+        {
+            "https://api.example.com/items": [
+                httpx.Response(429, headers={"Retry-After": "0"}),
+                httpx.Response(200, text="ok"),
+            ]
+        }
+    )
+
+    async def run():
+        fetcher = _fetcher(server)
+        return await fetcher.get("https://api.example.com/items", respect_robots=False)
+
+    assert asyncio.run(run()).status_code == 200
+    assert server.requested == ["https://api.example.com/items"] * 2
+
+
+def test_redirects_are_checked_per_hop():
+    """Test each redirect hop goes through robots.txt of its own origin"""
+    server = FakeServer(
+        {
+            "https://a.com/start": [
+                httpx.Response(302, headers={"Location": "https://b.com/secret"})
+            ],
+            "https://b.com/robots.txt": [
+                httpx.Response(200, text="User-agent: *\nDisallow: /secret\n")
+            ],
+        }
+    )
+
+    async def run():
+        with pytest.raises(RobotsDisallowed):
+            await _fetcher(server).get("https://a.com/start")
+
+    asyncio.run(run())
+    assert "https://b.com/secret" not in server.requested
+
+
+def test_redirect_loops_stop():
+    """Test a redirect loop ends with TooManyRedirects"""
+    server = FakeServer(
+        {"https://a.com/loop": [httpx.Response(301, headers={"Location": "/loop"})]}
+    )
+
+    async def run():
+        with pytest.raises(httpx.TooManyRedirects):
+            await _fetcher(server).get("https://a.com/loop", respect_robots=False)
+
+    asyncio.run(run())
+
+
+def test_full_queue_is_refused():
+    """Test a fetch is refused with FetchBusy once the wait queue is full"""
+    scheduler = _scheduler(max_queue=0)
+
+    async def run():
+        with pytest.raises(FetchBusy):
+            await scheduler.acquire("example.com", FetchPriority.INTERACTIVE, 1.0)
+
+    asyncio.run(run())
+
+
+def test_interactive_fetches_go_first():
+    """Test waiting interactive fetches are granted before background ones"""
+    scheduler = _scheduler(host_concurrency=1)
+    order = []
+
+    async def fetch(name, priority):
+        await scheduler.acquire("example.com", priority, timeout=5)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        scheduler.release("example.com")
+
+    async def run():
+        await scheduler.acquire("example.com", FetchPriority.INTERACTIVE, timeout=5)
+        tasks = [
+            asyncio.create_task(fetch("background", FetchPriority.BACKGROUND)),
+            asyncio.create_task(fetch("interactive", FetchPriority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        scheduler.release("example.com")
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ["interactive", "background"]
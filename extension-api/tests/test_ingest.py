@@ -0,0 +1,294 @@
+"""
+Tests for streaming link import: line splitting, parsing, batching and the
+import endpoint
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.api import routes
+from app.core.ingest import (
+    MAX_LINE_BYTES,
+    CsvLineParser,
+    IngestLineError,
+    detect_format,
+    iter_lines,
+    parse_ndjson_line,
+    read_batches,
+)
+from app.core.subscription import subscription_service
+from app.core.urlnorm import url_hash
+from app.main import app
+
+from .conftest import AUTH
+
+COLLECTION_ID = "00000000-0000-0000-0000-000000000001"
+IMPORT_URL = f"/api/v1/collections/{COLLECTION_ID}/links/import"
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_detect_format():
+    """Test NDJSON and CSV media types are recognised, parameters ignored"""
+    assert detect_format("application/x-ndjson") == "ndjson"
+    assert detect_format("application/json; charset=utf-8") == "ndjson"
+    assert detect_format("TEXT/CSV") == "csv"
+    assert detect_format("text/plain") is None
+    assert detect_format(None) is None
+
+
+def test_iter_lines_splits_across_chunks():
+    """Test lines split over chunk boundaries are rejoined and numbered"""
+    data = "first\n\n  second  \nthird é".encode("utf-8")
+
+    lines = asyncio.run(_collect(iter_lines(_chunks(data, 3))))
+    assert lines == [(1, "first"), (3, "second"), (4, "third é")]
+
+
+def test_iter_lines_rejects_overlong_lines():
+    """Test a line longer than MAX_LINE_BYTES stops the import"""
+    data = b"ok\n" + b"x" * (MAX_LINE_BYTES + 1)
+
+    with pytest.raises(IngestLineError, match="Line 2"):
+        asyncio.run(_collect(iter_lines(_chunks(data, 4096))))
+
+
+def test_parse_ndjson_line():
+    """Test objects and bare strings are accepted, anything else rejected"""
+    title, url, link_hash = parse_ndjson_line(
+        '{"url": "https://example.com/a", "title": " A "}'
+    )
+    assert (title, url, link_hash) == (
+        "A",
+        "https://example.com/a",
+        url_hash("https://example.com/a"),
+    )
+    # Untitled links get a title built from the URL, not a page fetch
+    assert parse_ndjson_line('"https://example.com/b"')[0]
+
+    for line, error in [
+        ("{not json", "Invalid JSON"),
+        ("[1, 2]", "Expected an object"),
+        ('{"title": "no url"}', "Missing url"),
+        ('{"url": "ftp://example.com/file"}', "Not a valid"),
+        ('{"url": "https://example.com", "title": 5}', "Title must be"),
+    ]:
+        with pytest.raises(IngestLineError, match=error):
+            parse_ndjson_line(line)
+
+
+def test_csv_parser_uses_the_header_columns():
+    """Test a header row picks the url and title columns by name"""
+    parse = CsvLineParser()
+    assert parse("Title,URL,notes") is None
+    title, url, _ = parse('"Hello, world",https://example.com/a,x')
+    assert (title, url) == ("Hello, world", "https://example.com/a")
+
+
+def test_csv_parser_without_header():
+    """Test without a header the first column is the url, the second the title"""
+    parse = CsvLineParser()
+    assert parse("https://example.com/a,First")[:2] == (
+        "First",
+        "https://example.com/a",
+    )
+    assert parse("https://example.com/b")[1] == "https://example.com/b"
+    with pytest.raises(IngestLineError):
+        parse("not a url,Title")
+
+
+def test_read_batches_groups_rows_and_errors():
+    """Test rows come out in batches with the lines rejected alongside them"""
+    lines = [json.dumps({"url": f"https://example.com/{i}"}) for i in range(5)]
+    lines.insert(2, "garbage")
+    data = "\n".join(lines).encode()
+
+    batches = asyncio.run(
+        _collect(read_batches(_chunks(data, 7), parse_ndjson_line, 2, 100))
+    )
+    assert [len(rows) for rows, _ in batches] == [2, 2, 1]
+    assert batches[1][1] == [(3, "Invalid JSON")]
+
+
+def test_read_batches_enforces_max_rows():
+    """Test reading stops once more than max_rows valid rows arrive"""
+    data = "\n".join(f'"https://example.com/{i}"' for i in range(4)).encode()
+
+    with pytest.raises(IngestLineError, match="limited to 3"):
+        asyncio.run(_collect(read_batches(_chunks(data, 64), parse_ndjson_line, 10, 3)))
+
+
+@pytest.fixture
+def importer(fake_db, monkeypatch):
+    fake_db.results["collections.owned"] = {"id": COLLECTION_ID, "total_links": 10}
+    inserted_batches = []
+
+    async def insert_links_batch(db, collection_id, user_id, rows):
+        inserted_batches.append(rows)
+        return len(rows)
+
+    async def check_links_limit(user_id, collection_id, count=1, db=None):
+        return True, None, "pro"
+
+    monkeypatch.setattr(routes, "insert_links_batch", insert_links_batch)
+    monkeypatch.setattr(subscription_service, "check_links_limit", check_links_limit)
+    monkeypatch.setattr(routes.settings, "import_batch_size", 2)
+    return inserted_batches
+
+
+def _events(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_import_rejects_unknown_content_types(client, importer):
+    """Test a body that is neither NDJSON nor CSV is a 415"""
+    response = client.post(
+        IMPORT_URL, content=b"x", headers={**AUTH, "Content-Type": "text/plain"}
+    )
+    assert response.status_code == 415
+
+
+def test_import_of_a_missing_collection_is_a_404(client, fake_db, importer):
+    """Test the collection is checked before the body is read"""
+    fake_db.results["collections.owned"] = None
+
+    response = client.post(
+        IMPORT_URL,
+        content=b"https://example.com\n",
+        headers={**AUTH, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 404
+
+
+def test_import_streams_progress_events(client, fake_db, importer):
+    """Test each batch reports progress and the stream ends with done"""
+    # Another import adds 5 links to the collection while this one runs
+    stored = {"total_links": 15}
+
+    def add_total_links(count, collection_id, user_id):
+        stored["total_links"] += count
+        return dict(stored)
+
+    fake_db.results["collections.add_total_links"] = add_total_links
+    fake_db.results["links.existing_hashes"] = [
+        {"url_hash": url_hash("https://example.com/0")}
+    ]
+    body = "url,title\n" + "".join(
+        f"https://example.com/{i},Link {i}\n" for i in range(3)
+    )
+    body += "https://example.com/0,Repeat\nnot a url\n"
+
+    response = client.post(
+        IMPORT_URL,
+        content=body.encode(),
+        headers={**AUTH, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = _events(response)
+
+    # Lines rejected after the last full batch arrive with a final empty batch
+    assert [event["event"] for event in events] == [
+        "progress",
+        "progress",
+        "invalid",
+        "progress",
+        "done",
+    ]
+    assert events[2]["line"] == 6
+    assert events[-1] == {
+        "event": "done",
+        "total_links": 17,
+        "processed": 4,
+        "inserted": 2,
+        "duplicates": 2,
+        "invalid": 1,
+    }
+    # Already-saved and repeated URLs never reach the insert
+    assert [len(rows) for rows in importer] == [1, 1]
+    # The count is added to the stored total rather than overwriting it
+    assert [args[0] for args in fake_db.args("collections.add_total_links")] == [1, 1]
+    assert fake_db.args("collections.set_total_links") == []
+
+
+def test_import_over_the_plan_limit_ends_with_an_error_event(
+    client, importer, monkeypatch
+):
+    """Test a limit hit mid-stream becomes a final error event, not a 500"""
+
+    async def check_links_limit(user_id, collection_id, count=1, db=None):
+        return False, "Link limit reached", "free"
+
+    monkeypatch.setattr(subscription_service, "check_links_limit", check_links_limit)
+
+    response = client.post(
+        IMPORT_URL,
+        content=b'"https://example.com/a"\n',
+        headers={**AUTH, "Content-Type": "application/x-ndjson"},
+    )
+    [event] = _events(response)
+    assert event["event"] == "error"
+    assert (event["status"], event["error"], event["plan"]) == (
+        403,
+        "Link limit reached",
+        "free",
+    )
+
+
+async def _asgi_post(url: str, body: bytes, headers: dict) -> list:
+    """Drive the app directly and keep every ASGI message it sends"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": url,
+        "raw_path": url.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    messages = []
+
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def test_progress_is_not_held_back_by_gzip(client, importer):
+    """Test a gzip-accepting client gets each event as it is produced"""
+    body = "".join(f'"https://example.com/{i}"\n' for i in range(4)).encode()
+    headers = {
+        **AUTH,
+        "Content-Type": "application/x-ndjson",
+        "Accept-Encoding": "gzip, deflate",
+    }
+
+    messages = asyncio.run(_asgi_post(IMPORT_URL, body, headers))
+    [start] = [m for m in messages if m["type"] == "http.response.start"]
+    assert dict(start["headers"])[b"content-encoding"] == b"identity"
+
+    chunks = [m for m in messages if m["type"] == "http.response.body"]
+    # The first batch's progress arrives, readable, while more is still to come
+    assert chunks[0]["more_body"] is True
+    assert json.loads(chunks[0]["body"])["event"] == "progress"
@@ -0,0 +1,110 @@
+"""
+Tests for adding links: canonical-URL deduplication and the collection count
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.api.routes import _dedupe_links
+from app.core.subscription import subscription_service
+from app.core.urlnorm import url_hash
+from app.models.schemas import CreateLinkRequest
+
+from .conftest import AUTH, USER_ID
+
+COLLECTION_ID = "00000000-0000-0000-0000-000000000001"
+NOW = datetime(2025, 1, 1)
+
+
+def test_dedupe_links_keeps_the_first_of_each_canonical_url():
+    """Test repeats differing only in tracking params or host case are dropped"""
+    links = [
+        CreateLinkRequest(url="https://example.com/a?utm_source=x", title="First"),
+        CreateLinkRequest(url="https://example.com/b"),
+        CreateLinkRequest(url="https://EXAMPLE.com/a", title="Repeat"),
+        CreateLinkRequest(url="https://www.example.com/b"),
+    ]
+
+    unique_links, hashes = _dedupe_links(links)
+    assert unique_links == links[:2]
+    assert hashes == [
+        url_hash("https://example.com/a"),
+        url_hash("https://example.com/b"),
+    ]
+
+
+def test_dedupe_links_scales_to_large_requests():
+    """Test thousands of distinct links keep their order and hashes"""
+    links = [CreateLinkRequest(url=f"https://example.com/{i}") for i in range(5000)]
+
+    unique_links, hashes = _dedupe_links(links + links)
+    assert unique_links == links
+    assert len(set(hashes)) == len(hashes) == 5000
+
+
+def _row(url: str, title: str = "Title") -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "title": title,
+        "url": url,
+        "link_collection_id": uuid.UUID(COLLECTION_ID),
+        "user_id": USER_ID,
+        "created_at": NOW,
+        "updated_at": NOW,
+    }
+
+
+@pytest.fixture
+def collection(fake_db, monkeypatch):
+    # The count read here is stale: other writers add links meanwhile
+    fake_db.results["collections.owned"] = {"id": COLLECTION_ID, "total_links": 10}
+
+    async def check_links_limit(user_id, collection_id, count=1, db=None):
+        return True, None, "pro"
+
+    monkeypatch.setattr(subscription_service, "check_links_limit", check_links_limit)
+    return fake_db
+
+
+def test_create_link_adds_to_the_stored_count(client, collection):
+    """Test a new link increments total_links in SQL instead of overwriting it"""
+    collection.results["links.insert"] = lambda *args: _row(args[2], args[1])
+
+    response = client.post(
+        f"/api/v1/collections/{COLLECTION_ID}/links",
+        json={"url": "https://example.com/a", "title": "A"},
+        headers=AUTH,
+    )
+    assert response.status_code == 200
+    assert collection.args("collections.add_total_links") == [
+        (1, COLLECTION_ID, USER_ID)
+    ]
+    assert collection.args("collections.set_total_links") == []
+
+
+def test_bulk_links_add_only_what_was_inserted(client, collection):
+    """Test the count grows by the rows inserted, not the rows requested"""
+    collection.results["links.insert_many"] = (
+        lambda collection_id, user_id, now, ids, titles, urls, hashes: [
+            _row(urls[0], titles[0])
+        ]
+    )
+
+    response = client.post(
+        f"/api/v1/collections/{COLLECTION_ID}/links/bulk",
+        json={
+            "links": [
+                {"url": "https://example.com/a", "title": "A"},
+                {"url": "https://example.com/b", "title": "B"},
+            ]
+        },
+        headers=AUTH,
+    )
+    assert response.status_code == 200
+    assert response.json()["total_added"] == 1
+    assert collection.args("collections.add_total_links") == [
+        (1, COLLECTION_ID, USER_ID)
+    ]
+    assert collection.args("collections.set_total_links") == []
@@ -0,0 +1,117 @@
+"""
+Tests for GET /sync: snapshots, deltas with tombstones and paging
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.routes import _SYNC_EPOCH, _ZERO_UUID
+from app.core.config import settings
+
+from .conftest import AUTH
+
+NOW = datetime(2025, 3, 1, 12, 0, 0)
+
+
+def _link(i: int) -> dict:
+    return {
+        "id": uuid.UUID(int=i + 1),
+        "title": f"Link {i}",
+        "url": f"https://example.com/{i}",
+        "link_collection_id": uuid.UUID(int=1000),
+        "updated_at": NOW - timedelta(minutes=10 - i),
+    }
+
+
+@pytest.fixture
+def sync_db(fake_db):
+    fake_db.results["sync.now"] = {"now": NOW}
+    return fake_db
+
+
+def test_first_sync_is_a_snapshot(client, sync_db):
+    """Test a call without since scans everything and skips tombstones"""
+    sync_db.results["sync.links"] = [_link(0)]
+
+    response = client.get("/api/v1/sync", headers=AUTH)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["reset"] is True and body["has_more"] is False
+    assert body["watermark"] == NOW.isoformat()
+    assert body["links"]["fields"] == [
+        "id",
+        "title",
+        "url",
+        "link_collection_id",
+        "updated_at",
+    ]
+    assert body["links"]["upserts"][0][0] == str(uuid.UUID(int=1))
+    assert sync_db.args("sync.tombstones") == []
+    assert sync_db.args("sync.collections")[0][1:3] == (_SYNC_EPOCH, _ZERO_UUID)
+
+
+def test_delta_sync_reports_deletes_from_tombstones(client, sync_db):
+    """Test a recent watermark re-scans with overlap and maps tombstones"""
+    deleted = uuid.uuid4()
+    sync_db.results["sync.tombstones"] = [
+        {"id": 7, "entity": "links", "entity_id": deleted, "deleted_at": NOW},
+        {"id": 8, "entity": "unknown", "entity_id": uuid.uuid4(), "deleted_at": NOW},
+    ]
+    since = NOW - timedelta(hours=1)
+
+    response = client.get(
+        "/api/v1/sync", params={"since": since.isoformat()}, headers=AUTH
+    )
+    body = response.json()
+    assert body["reset"] is False
+    assert body["links"]["deletes"] == [str(deleted)]
+    assert body["favorites"]["deletes"] == []
+
+    start = since - timedelta(seconds=settings.sync_overlap_seconds)
+    [(_, after_ts, after_id, _)] = sync_db.args("sync.tombstones")
+    assert (after_ts, after_id) == (start, 0)
+
+
+def test_watermark_older_than_retention_resets(client, sync_db):
+    """Test tombstones may be pruned, so an old watermark gets a snapshot"""
+    days = settings.sync_tombstone_retention_days + 1
+    since = NOW - timedelta(days=days)
+
+    body = client.get(
+        "/api/v1/sync", params={"since": since.isoformat()}, headers=AUTH
+    ).json()
+    assert body["reset"] is True
+    assert sync_db.args("sync.tombstones") == []
+
+
+def test_pages_resume_from_the_cursor(client, sync_db):
+    """Test has_more hands out a cursor that resumes each entity in place"""
+    links = [_link(i) for i in range(3)]
+    sync_db.results["sync.links"] = lambda user_id, ts, row_id, limit: [
+        row for row in links if (row["updated_at"], str(row["id"])) > (ts, row_id)
+    ][:limit]
+
+    first = client.get("/api/v1/sync", params={"limit": 2}, headers=AUTH).json()
+    assert first["has_more"] is True
+    assert len(first["links"]["upserts"]) == 2
+
+    second = client.get(
+        "/api/v1/sync", params={"cursor": first["cursor"], "limit": 2}, headers=AUTH
+    ).json()
+    assert second["has_more"] is False and second["cursor"] is None
+    assert [row[0] for row in second["links"]["upserts"]] == [str(links[2]["id"])]
+    # The watermark of the first page is kept; the clock is read once
+    assert second["watermark"] == first["watermark"]
+    assert second["reset"] is True
+    assert len(sync_db.args("sync.now")) == 1
+    # Entities that were done are not scanned again
+    assert len(sync_db.args("sync.collections")) == 1
+
+
+def test_invalid_sync_cursor_is_a_400(client, sync_db):
+    """Test a cursor that does not decode is rejected"""
+    response = client.get("/api/v1/sync", params={"cursor": "abc"}, headers=AUTH)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
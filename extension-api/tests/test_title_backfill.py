@@ -0,0 +1,109 @@
+"""
+Tests for the deferred link title backfill
+"""
+
+import asyncio
+
+import pytest
+
+from app.core import title_backfill as title_backfill_module
+from app.core.title_backfill import TitleBackfill
+
+PLACEHOLDER = "example.com"
+
+
+@pytest.fixture
+def titles(fake_db, monkeypatch):
+    """Page titles by URL, served in place of the title cache"""
+    pages = {}
+
+    async def get_title(url, priority=None):
+        return pages.get(url, PLACEHOLDER)
+
+    monkeypatch.setattr(title_backfill_module.title_cache, "get_title", get_title)
+    return pages
+
+
+def _run(backfill: TitleBackfill, *jobs) -> None:
+    async def run():
+        for job in jobs:
+            assert backfill.enqueue(*job)
+        await backfill.join()
+        await backfill.stop()
+
+    asyncio.run(run())
+
+
+def test_fetched_titles_replace_the_placeholder(fake_db, titles):
+    """Test the update is conditional on the placeholder still being there"""
+    titles["https://example.com/a"] = "Real title"
+
+    _run(
+        TitleBackfill(workers=2, queue_size=4),
+        ("1", "https://example.com/a", PLACEHOLDER),
+    )
+    assert fake_db.args("links.backfill_title") == [("Real title", "1", PLACEHOLDER)]
+
+
+def test_unchanged_titles_are_not_written(fake_db, titles):
+    """Test a lookup that only finds the fallback title skips the update"""
+    _run(
+        TitleBackfill(workers=1, queue_size=4),
+        ("1", "https://example.com/b", PLACEHOLDER),
+    )
+    assert fake_db.args("links.backfill_title") == []
+
+
+def test_renamed_links_are_skipped_and_failures_isolated(fake_db, titles):
+    """Test UPDATE 0 and a failing job do not stop the other jobs"""
+    titles.update(
+        {
+            "https://example.com/renamed": "A",
+            "https://example.com/broken": "B",
+            "https://example.com/ok": "C",
+        }
+    )
+
+    def backfill_title(title, link_id, placeholder):
+        if link_id == "broken":
+            raise ConnectionError("gone")
+        return "UPDATE 0" if link_id == "renamed" else "UPDATE 1"
+
+    fake_db.results["links.backfill_title"] = backfill_title
+
+    _run(
+        TitleBackfill(workers=1, queue_size=4),
+        ("renamed", "https://example.com/renamed", PLACEHOLDER),
+        ("broken", "https://example.com/broken", PLACEHOLDER),
+        ("ok", "https://example.com/ok", PLACEHOLDER),
+    )
+    assert [args[1] for args in fake_db.args("links.backfill_title")] == [
+        "renamed",
+        "broken",
+        "ok",
+    ]
+
+
+def test_full_queue_drops_the_job(fake_db, titles):
+    """Test enqueue refuses without waiting once the queue is full"""
+    backfill = TitleBackfill(workers=1, queue_size=1)
+
+    async def run():
+        # The worker has not run yet, so the first job still fills the queue
+        first = backfill.enqueue("1", "https://example.com/1", PLACEHOLDER)
+        second = backfill.enqueue("2", "https://example.com/2", PLACEHOLDER)
+        await backfill.stop()
+        return first, second
+
+    assert asyncio.run(run()) == (True, False)
+    assert fake_db.args("links.backfill_title") == []
+
+
+def test_workers_restart_on_a_new_loop(fake_db, titles):
+    """Test a backfill stopped on one loop starts again on the next"""
+    titles["https://example.com/a"] = "A"
+    backfill = TitleBackfill(workers=1, queue_size=4)
+
+    _run(backfill, ("1", "https://example.com/a", PLACEHOLDER))
+    _run(backfill, ("2", "https://example.com/a", PLACEHOLDER))
+    assert [args[1] for args in fake_db.args("links.backfill_title")] == ["1", "2"]
@@ -0,0 +1,124 @@
+"""
+Tests for the fleet-wide page title cache
+"""
+
+import asyncio
+
+import pytest
+
+from app.core import title_cache as title_cache_module
+from app.core.config import settings
+from app.core.fetcher import FetchBusy
+from app.core.metrics import CACHE_REQUESTS
+from app.core.title_cache import title_cache
+from app.core.urlnorm import canonicalize_url, url_hash
+from app.core.utils import generate_fallback_title
+
+URL = "https://example.com/page"
+
+
+@pytest.fixture
+def fetches(fake_db, monkeypatch):
+    """Count page fetches; ``fetches.result`` is the title or exception"""
+
+    class Fetches:
+        count = 0
+        result = "Page title"
+
+    async def fetch_page_title(url, priority=None):
+        Fetches.count += 1
+        await asyncio.sleep(0.01)
+        if isinstance(Fetches.result, Exception):
+            raise Fetches.result
+        return Fetches.result
+
+    monkeypatch.setattr(title_cache_module, "fetch_page_title", fetch_page_title)
+    title_cache.clear()
+    yield Fetches
+    title_cache.clear()
+
+
+def test_concurrent_lookups_share_one_fetch(fake_db, fetches):
+    """Test simultaneous adds of one URL wait on a single fetch"""
+
+    async def run():
+        return await asyncio.gather(
+            *(title_cache.get_title(URL) for _ in range(5)),
+            title_cache.get_title(URL + "?utm_source=mail"),
+        )
+
+    assert asyncio.run(run()) == ["Page title"] * 6
+    assert fetches.count == 1
+    # The answer is written back to the shared table once
+    [(key, url, title, ttl)] = fake_db.args("url_metadata.upsert")
+    assert key == url_hash(canonicalize_url(URL))
+    assert (title, ttl) == ("Page title", settings.title_cache_ttl)
+    assert title_cache.peek(URL) == "Page title"
+
+
+def test_shared_table_hit_skips_the_fetch(fake_db, fetches):
+    """Test a title another instance stored is used without fetching"""
+    fake_db.results["url_metadata.get"] = {"title": "Shared", "ttl": 60.0}
+
+    assert asyncio.run(title_cache.get_title(URL)) == "Shared"
+    assert fetches.count == 0
+    assert fake_db.args("url_metadata.upsert") == []
+
+
+def test_failed_fetches_are_cached_negatively(fake_db, fetches):
+    """Test a failing page is remembered for the negative TTL"""
+    fetches.result = ConnectionError("refused")
+
+    async def run():
+        return [await title_cache.get_title(URL) for _ in range(2)]
+
+    assert asyncio.run(run()) == [generate_fallback_title(URL)] * 2
+    assert fetches.count == 1
+    [(_, _, title, ttl)] = fake_db.args("url_metadata.upsert")
+    assert (title, ttl) == (None, settings.title_cache_negative_ttl)
+
+
+def test_busy_fetcher_is_not_cached(fake_db, fetches):
+    """Test a full fetch queue falls back now and fetches again later"""
+    fetches.result = FetchBusy("queue full")
+
+    async def run():
+        return [await title_cache.get_title(URL) for _ in range(2)]
+
+    assert asyncio.run(run()) == [generate_fallback_title(URL)] * 2
+    assert fetches.count == 2
+    assert fake_db.args("url_metadata.upsert") == []
+
+
+def test_database_errors_fall_back_to_fetching(fake_db, fetches):
+    """Test the shared table failing never fails the lookup"""
+    fake_db.results["url_metadata.get"] = ConnectionError("down")
+    fake_db.results["url_metadata.upsert"] = ConnectionError("down")
+
+    assert asyncio.run(title_cache.get_title(URL)) == "Page title"
+    assert fetches.count == 1
+
+
+def test_unparseable_urls_get_a_fallback_without_io(fake_db, fetches):
+    """Test a URL that does not canonicalize is never looked up"""
+    assert asyncio.run(title_cache.get_title("not a url")) == generate_fallback_title(
+        "not a url"
+    )
+    assert fetches.count == 0 and fake_db.calls == []
+
+
+def test_peek_leaves_the_metrics_alone(fake_db, fetches, monkeypatch):
+    """Test peek reports cached titles without counting hits or misses"""
+    asyncio.run(title_cache.get_title(URL))
+    before = (CACHE_REQUESTS.get("title", "hit"), CACHE_REQUESTS.get("title", "miss"))
+
+    assert title_cache.peek(URL) == "Page title"
+    assert title_cache.peek("https://example.com/other") is None
+    assert (
+        CACHE_REQUESTS.get("title", "hit"),
+        CACHE_REQUESTS.get("title", "miss"),
+    ) == before
+
+    # Expired entries are not handed out
+    monkeypatch.setattr(title_cache_module.time, "monotonic", lambda: float("inf"))
+    assert title_cache.peek(URL) is None
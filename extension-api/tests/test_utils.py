@@ -0,0 +1,122 @@
+"""
+Tests for page title sniffing and the streamed title fetch
+"""
+
+import asyncio
+import codecs
+
+import httpx
+import pytest
+
+from app.core import utils
+from app.core.fetcher import HostScheduler, PoliteFetcher
+from app.core.utils import extract_title_from_url, fetch_page_title, sniff_title
+
+HTML = "<html><head><title>Café – naïve</title></head><body>"
+
+
+@pytest.mark.parametrize(
+    "data, content_type",
+    [
+        (HTML.encode("utf-8"), "text/html; charset=utf-8"),
+        (HTML.encode("utf-8"), None),
+        (b'<meta charset="utf-8">' + HTML.encode("utf-8"), "text/html"),
+        (HTML.encode("cp1252"), "text/html; charset=windows-1252"),
+        (codecs.BOM_UTF16_LE + HTML.encode("utf-16-le"), "text/html"),
+    ],
+)
+def test_sniff_title_charsets(data, content_type):
+    """Test the charset comes from a BOM, the header or <meta>"""
+    assert sniff_title(data, content_type) == "Café – naïve"
+
+
+def test_sniff_title_survives_a_cut_multibyte_character():
+    """Test a read that stops mid-character keeps the declared charset"""
+    data = "<title>Café naïve</title><p>é".encode("utf-8")[:-1]
+
+    assert sniff_title(data, "text/html; charset=utf-8") == "Café naïve"
+    assert sniff_title(data, "text/html") == "Café naïve"
+
+
+def test_sniff_title_falls_back_to_cp1252_when_undeclared():
+    """Test undeclared bytes that are not UTF-8 are read as windows-1252"""
+    assert sniff_title(b"<title>Caf\xe9</title>", None) == "Café"
+
+
+def test_sniff_title_ignores_binary_and_empty_titles():
+    """Test binary bodies and blank titles give None; entities are unescaped"""
+    assert sniff_title(b"\x89PNG\r\n\x1a\n\x00\x00<title>x</title>") is None
+    assert sniff_title(b"<title>   </title>") is None
+    assert sniff_title(b"<p>no title</p>") is None
+    assert sniff_title(b"<title>Tom &amp;\n Jerry</title>") == "Tom & Jerry"
+
+
+class CountingStream(httpx.AsyncByteStream):
+    """Response body that records how many chunks were read"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.sent += 1
+            yield chunk
+
+
+def _use_server(monkeypatch, handler) -> None:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    scheduler = HostScheduler(
+        rate=1000, burst=10, host_concurrency=4, max_concurrency=8, max_queue=16
+    )
+    monkeypatch.setattr(utils, "fetcher", PoliteFetcher(client, scheduler))
+
+
+def test_fetch_stops_reading_at_the_title(monkeypatch):
+    """Test the body is only read up to </title> and suffixes are trimmed"""
+    body = CountingStream(
+        [b"<html><head><title>Docs | Site</title>"] + [b"x" * 1024] * 50
+    )
+
+    def handler(request):
+        if request.url.path == "/robots.txt":
+            return httpx.Response(404)
+        return httpx.Response(200, headers={"content-type": "text/html"}, stream=body)
+
+    _use_server(monkeypatch, handler)
+
+    assert asyncio.run(fetch_page_title("https://example.com/docs")) == "Docs"
+    assert body.sent == 1
+
+
+def test_non_html_is_not_read(monkeypatch):
+    """Test a PDF gets no title and its body is never downloaded"""
+    body = CountingStream([b"%PDF-1.7"])
+
+    def handler(request):
+        if request.url.path == "/robots.txt":
+            return httpx.Response(404)
+        return httpx.Response(
+            200, headers={"content-type": "application/pdf"}, stream=body
+        )
+
+    _use_server(monkeypatch, handler)
+
+    assert asyncio.run(fetch_page_title("https://example.com/a.pdf")) is None
+    assert body.sent == 0
+
+
+def test_fetch_errors_raise_but_extract_falls_back(monkeypatch):
+    """Test fetch_page_title raises on errors and the wrapper uses the URL"""
+
+    def handler(request):
+        if request.url.path == "/robots.txt":
+            return httpx.Response(404)
+        return httpx.Response(500)
+
+    _use_server(monkeypatch, handler)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(fetch_page_title("https://example.com/broken"))
+    title = asyncio.run(extract_title_from_url("https://example.com/broken"))
+    assert title == utils.generate_fallback_title("https://example.com/broken")